@@ -6,7 +6,6 @@ import os
 from salt.utils import parsers
 from salt.utils.verify import verify_env, verify_files
 from salt.config import _expand_glob_path
-import salt.cli.caller
 
 
 class SaltCall(parsers.SaltCallOptionParser):
@@ -56,6 +55,9 @@ class SaltCall(parsers.SaltCallOptionParser):
         # Setup file logging!
         self.setup_logfile_logger()
 
+        # The caller imports most of salt, don't import it to print the help
+        # or the version
+        import salt.cli.caller
         caller = salt.cli.caller.Caller.factory(self.config)
 
         if self.options.doc:
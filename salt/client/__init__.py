@@ -26,6 +26,7 @@ import sys
 import time
 import logging
 import errno
+import heapq
 import re
 from datetime import datetime
 from salt.ext.six import string_types
@@ -90,6 +91,103 @@ def get_local_client(
         return LocalClient(mopts=opts, skip_perm_errors=skip_perm_errors)
 
 
+class ReturnTracker(object):
+    '''
+    Keep count of the minions which returned for a job and of those still
+    pending
+
+    Every update is incremental, so a return costs the same no matter how many
+    minions the job targets. The deadlines of the pending minions are kept in
+    a heap, so finding the minions which timed out only looks at the expired
+    deadlines.
+    '''
+    def __init__(self, minions=(), timeout=None):
+        self.timeout = timeout
+        # All the minions expected to return
+        self.minions = set()
+        # All the minions which returned, including unexpected ones
+        self.found = set()
+        # Expected minions which did not return yet
+        self.pending = set()
+        # Pending minions past their deadline
+        self.timed_out = set()
+        self.deadlines = {}
+        self._heap = []
+        self.add_minions(minions)
+
+    def add_minions(self, minions):
+        '''
+        Expect returns from more minions, starting their timeouts
+        '''
+        now = time.time()
+        for id_ in minions:
+            if id_ in self.minions:
+                continue
+            self.minions.add(id_)
+            if id_ not in self.found:
+                self.pending.add(id_)
+                self._set_deadline(id_, now)
+
+    def add_return(self, id_):
+        '''
+        Record the return of a minion, return False if it already returned
+        '''
+        if id_ in self.found:
+            return False
+        self.found.add(id_)
+        self.pending.discard(id_)
+        self.timed_out.discard(id_)
+        self.deadlines.pop(id_, None)
+        return True
+
+    def extend(self, id_):
+        '''
+        Restart the timeout of a minion which is still running the job
+        '''
+        if id_ not in self.minions:
+            self.add_minions([id_])
+        elif id_ in self.pending:
+            self._set_deadline(id_, time.time())
+
+    def all_returned(self):
+        '''
+        Return True once every expected minion returned
+        '''
+        return not self.pending
+
+    def expire(self, now=None):
+        '''
+        Mark the pending minions past their deadline as timed out, return True
+        if all of the pending minions timed out
+        '''
+        if now is None:
+            now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            deadline, id_ = heapq.heappop(self._heap)
+            # Deadlines which were restarted or returned are stale
+            if self.deadlines.get(id_) == deadline:
+                del self.deadlines[id_]
+                self.timed_out.add(id_)
+        return len(self.timed_out) >= len(self.pending)
+
+    def stats(self):
+        '''
+        Return the progress of the job
+        '''
+        return {'minion_count': len(self.minions),
+                'return_count': len(self.minions) - len(self.pending),
+                'pending': len(self.pending),
+                'timed_out': len(self.timed_out)}
+
+    def _set_deadline(self, id_, now):
+        if self.timeout is None:
+            return
+        deadline = now + self.timeout
+        self.deadlines[id_] = deadline
+        self.timed_out.discard(id_)
+        heapq.heappush(self._heap, (deadline, id_))
+
+
 class LocalClient(object):
     '''
     The interface used by the :command:`salt` CLI tool on the Salt Master
@@ -615,6 +713,7 @@ class LocalClient(object):
             expr_form='glob',
             ret='',
             kwarg=None,
+            progress=False,
             **kwargs):
         '''
         Yields the individual minion returns as they come in
@@ -622,6 +721,10 @@ class LocalClient(object):
         The function signature is the same as :py:meth:`cmd` with the
         following exceptions.
 
+        :param progress: Follow every minion return with the progress of the
+            job, a dict of the ``minion_count``, ``return_count``, ``pending``
+            and ``timed_out`` minions
+
         :return: A generator
 
         .. code-block:: python
@@ -646,15 +749,19 @@ class LocalClient(object):
         if not pub_data:
             yield pub_data
         else:
+            tracker = ReturnTracker()
             for fn_ret in self.get_iter_returns(pub_data['jid'],
                                                 pub_data['minions'],
                                                 self._get_timeout(timeout),
                                                 tgt,
                                                 expr_form,
+                                                tracker=tracker,
                                                 **kwargs):
                 if not fn_ret:
                     continue
                 yield fn_ret
+                if progress:
+                    yield tracker.stats()
 
     def cmd_iter_no_block(
             self,
@@ -855,26 +962,26 @@ class LocalClient(object):
             tgt_type='glob',
             expect_minions=False,
             gather_errors=True,
+            tracker=None,
             **kwargs):
         '''
         Watch the event system and return job data as it comes in
 
+        :param tracker: A :py:class:`ReturnTracker` to account the returns in,
+            its ``stats()`` give the progress of the job at any time.
+
         :returns: all of the information for the JID
         '''
-        if not isinstance(minions, set):
-            if isinstance(minions, string_types):
-                minions = set([minions])
-            elif isinstance(minions, (list, tuple)):
-                minions = set(list(minions))
+        if isinstance(minions, string_types):
+            minions = [minions]
 
         if timeout is None:
             timeout = self.opts['timeout']
-        start = int(time.time())
-
-        # timeouts per minion, id_ -> timeout time
-        minion_timeouts = {}
 
-        found = set()
+        if tracker is None:
+            tracker = ReturnTracker()
+        tracker.timeout = timeout
+        tracker.add_minions(minions)
         # Check to see if the jid is real, if not return the empty dict
         try:
             if self.returners['{0}.get_load'.format(self.opts['master_job_cache'])](jid) == {}:
@@ -916,15 +1023,15 @@ class LocalClient(object):
                         ret = {raw['data']['id']: raw['data']['data']}
                         yield ret
                 if 'minions' in raw.get('data', {}):
-                    minions.update(raw['data']['minions'])
+                    tracker.add_minions(raw['data']['minions'])
                     continue
                 if 'return' not in raw['data']:
                     continue
                 if kwargs.get('raw', False):
-                    found.add(raw['data']['id'])
+                    tracker.add_return(raw['data']['id'])
                     yield raw
                 else:
-                    found.add(raw['data']['id'])
+                    tracker.add_return(raw['data']['id'])
                     ret = {raw['data']['id']: {'ret': raw['data']['return']}}
                     if 'out' in raw['data']:
                         ret[raw['data']['id']]['out'] = raw['data']['out']
@@ -936,12 +1043,12 @@ class LocalClient(object):
                     yield ret
 
             # if we have all of the returns (and we aren't a syndic), no need for anything fancy
-            if len(found.intersection(minions)) >= len(minions) and not self.opts['order_masters']:
+            if tracker.all_returned() and not self.opts['order_masters']:
                 # All minions have returned, break out of the loop
-                log.debug('jid {0} found all minions {1}'.format(jid, found))
+                log.debug('jid {0} found all minions {1}'.format(jid, tracker.found))
                 break
-            elif len(found.intersection(minions)) >= len(minions) and self.opts['order_masters']:
-                if len(found) >= len(minions) and len(minions) > 0 and time.time() > gather_syndic_wait:
+            elif tracker.all_returned() and self.opts['order_masters']:
+                if len(tracker.found) >= len(tracker.minions) and tracker.minions and time.time() > gather_syndic_wait:
                     # There were some minions to find and we found them
                     # However, this does not imply that *all* masters have yet responded with expected minion lists.
                     # Therefore, continue to wait up to the syndic_wait period (calculated in gather_syndic_wait) to see
@@ -951,13 +1058,6 @@ class LocalClient(object):
             # If we get here we may not have gathered the minion list yet. Keep waiting
             # for all lower-level masters to respond with their minion lists
 
-            # let start the timeouts for all remaining minions
-
-            for id_ in minions - found:
-                # if we have a new minion in the list, make sure it has a timeout
-                if id_ not in minion_timeouts:
-                    minion_timeouts[id_] = time.time() + timeout
-
             # if the jinfo has timed out and some minions are still running the job
             # re-do the ping
             if time.time() > timeout_at and minions_running:
@@ -992,10 +1092,10 @@ class LocalClient(object):
 
                 # TODO: move to a library??
                 if 'minions' in raw.get('data', {}):
-                    minions.update(raw['data']['minions'])
+                    tracker.add_minions(raw['data']['minions'])
                     continue
                 if 'syndic' in raw.get('data', {}):
-                    minions.update(raw['syndic'])
+                    tracker.add_minions(raw['syndic'])
                     continue
                 if 'return' not in raw.get('data', {}):
                     continue
@@ -1004,11 +1104,9 @@ class LocalClient(object):
                 if raw['data']['return'] == {}:
                     continue
 
-                # if we didn't originally target the minion, lets add it to the list
-                if raw['data']['id'] not in minions:
-                    minions.add(raw['data']['id'])
-                # update this minion's timeout, as long as the job is still running
-                minion_timeouts[raw['data']['id']] = time.time() + timeout
+                # update this minion's timeout, as long as the job is still
+                # running, adding it if we didn't originally target it
+                tracker.extend(raw['data']['id'])
                 # a minion returned, so we know its running somewhere
                 minions_running = True
 
@@ -1017,20 +1115,14 @@ class LocalClient(object):
             now = time.time()
             # if we have finished waiting, and no minions are running the job
             # then we need to see if each minion has timedout
-            done = (now > timeout_at) and not minions_running
-            if done:
-                # if all minions have timeod out
-                for id_ in minions - found:
-                    if now < minion_timeouts[id_]:
-                        done = False
-                        break
-            if done:
+            # if all minions have timed out
+            if (now > timeout_at) and not minions_running and tracker.expire(now):
                 break
 
             # don't spin
             time.sleep(0.01)
         if expect_minions:
-            for minion in list((minions - found)):
+            for minion in list(tracker.pending):
                 yield {minion: {'failed': True}}
 
     def get_returns(
@@ -1042,7 +1134,7 @@ class LocalClient(object):
         '''
         Get the returns for the command line interface via the event system
         '''
-        minions = set(minions)
+        tracker = ReturnTracker(minions)
         if timeout is None:
             timeout = self.opts['timeout']
         start = int(time.time())
@@ -1053,7 +1145,6 @@ class LocalClient(object):
             )
         )
 
-        found = set()
         ret = {}
         # Check to see if the jid is real, if not return the empty dict
         try:
@@ -1070,22 +1161,22 @@ class LocalClient(object):
             wait = max(1, time_left)
             raw = self.event.get_event(wait, jid)
             if raw is not None and 'return' in raw:
-                found.add(raw['id'])
+                tracker.add_return(raw['id'])
                 ret[raw['id']] = raw['return']
-                if len(found.intersection(minions)) >= len(minions):
+                if tracker.all_returned():
                     # All minions have returned, break out of the loop
                     log.debug('jid {0} found all minions'.format(jid))
                     break
                 continue
             # Then event system timeout was reached and nothing was returned
-            if len(found.intersection(minions)) >= len(minions):
+            if tracker.all_returned():
                 # All minions have returned, break out of the loop
                 log.debug('jid {0} found all minions'.format(jid))
                 break
             if int(time.time()) > timeout_at:
                 log.info(
                     'jid {0} minions {1} did not return in time'.format(
-                        jid, (minions - found)
+                        jid, tracker.pending
                     )
                 )
                 break
@@ -1189,7 +1280,7 @@ class LocalClient(object):
         Get the returns for the command line interface via the event system
         '''
         log.trace('entered - function get_cli_static_event_returns()')
-        minions = set(minions)
+        tracker = ReturnTracker(minions)
         if verbose:
             msg = 'Executing job with jid {0}'.format(jid)
             print(msg)
@@ -1202,7 +1293,6 @@ class LocalClient(object):
 
         start = int(time.time())
         timeout_at = start + timeout
-        found = set()
         ret = {}
         # Check to see if the jid is real, if not return the empty dict
         try:
@@ -1224,27 +1314,27 @@ class LocalClient(object):
             raw = self.event.get_event(wait, jid_tag)
             if raw is not None and 'return' in raw:
                 if 'minions' in raw.get('data', {}):
-                    minions.update(raw['data']['minions'])
+                    tracker.add_minions(raw['data']['minions'])
                     continue
-                found.add(raw['id'])
+                tracker.add_return(raw['id'])
                 ret[raw['id']] = {'ret': raw['return']}
                 ret[raw['id']]['success'] = raw.get('success', False)
                 if 'out' in raw:
                     ret[raw['id']]['out'] = raw['out']
-                if len(found.intersection(minions)) >= len(minions):
+                if tracker.all_returned():
                     # All minions have returned, break out of the loop
                     break
                 continue
             # Then event system timeout was reached and nothing was returned
-            if len(found.intersection(minions)) >= len(minions):
+            if tracker.all_returned():
                 # All minions have returned, break out of the loop
                 break
             if int(time.time()) > timeout_at:
                 if verbose or show_timeout:
                     if self.opts.get('minion_data_cache', False) \
                             or tgt_type in ('glob', 'pcre', 'list'):
-                        if len(found) < len(minions):
-                            fail = sorted(list(minions.difference(found)))
+                        if tracker.pending:
+                            fail = sorted(tracker.pending)
                             for minion in fail:
                                 ret[minion] = {
                                     'out': 'no_return',
@@ -1280,20 +1370,20 @@ class LocalClient(object):
 
         # lazy load the connected minions
         connected_minions = None
-        return_count = 0
+        tracker = ReturnTracker()
 
         for ret in self.get_iter_returns(jid,
                                          minions,
                                          timeout=timeout,
                                          tgt=tgt,
                                          tgt_type=tgt_type,
-                                         expect_minions=(verbose or show_timeout)
+                                         expect_minions=(verbose or show_timeout),
+                                         tracker=tracker
                                          ):
-            return_count = return_count + 1
             if progress:
                 for id_, min_ret in six.iteritems(ret):
                     if not min_ret.get('failed') is True:
-                        yield {'minion_count': len(minions), 'return_count': return_count}
+                        yield tracker.stats()
             # replace the return structure for missing minions
             for id_, min_ret in six.iteritems(ret):
                 if min_ret.get('failed') is True:
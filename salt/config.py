@@ -104,6 +104,8 @@ VALID_OPTS = {
     'ipc_mode': str,
     'ipv6': bool,
     'file_buffer_size': int,
+    'file_transfer_pipeline': int,
+    'file_cache_store': bool,
     'tcp_pub_port': int,
     'tcp_pull_port': int,
     'log_file': str,
@@ -115,6 +117,7 @@ VALID_OPTS = {
     'log_fmt_logfile': tuple,
     'log_granular_levels': dict,
     'max_event_size': int,
+    'max_event_pending': int,
     'test': bool,
     'cython_enable': bool,
     'show_timeout': bool,
@@ -123,6 +126,8 @@ VALID_OPTS = {
     'state_output': str,
     'state_auto_order': bool,
     'state_events': bool,
+    'state_parallel': bool,
+    'state_parallel_workers': int,
     'acceptance_wait_time': float,
     'acceptance_wait_time_max': float,
     'rejected_retry': bool,
@@ -139,8 +144,12 @@ VALID_OPTS = {
     'recon_randomize': float,
     'event_return': str,
     'event_return_queue': int,
+    'event_return_queue_max_seconds': int,
+    'event_return_backlog': int,
     'event_return_whitelist': list,
     'event_return_blacklist': list,
+    'returner_pool_size': int,
+    'returner_pool_idle': int,
     'win_repo_cachefile': str,
     'pidfile': str,
     'range_server': str,
@@ -153,6 +162,9 @@ VALID_OPTS = {
     'auth_mode': int,
     'pub_hwm': int,
     'worker_threads': int,
+    'worker_async': bool,
+    'worker_async_threads': int,
+    'worker_async_cmds': list,
     'ret_port': int,
     'keep_jobs': int,
     'master_roots': dict,
@@ -168,6 +180,9 @@ VALID_OPTS = {
     'gitfs_passphrase': str,
     'gitfs_env_whitelist': list,
     'gitfs_env_blacklist': list,
+    'gitfs_fetch_timeout': int,
+    'gitfs_fetch_workers': int,
+    'gitfs_index': bool,
     'hgfs_remotes': list,
     'hgfs_mountpoint': str,
     'hgfs_root': str,
@@ -188,10 +203,15 @@ VALID_OPTS = {
     'minionfs_whitelist': list,
     'minionfs_blacklist': list,
     'ext_pillar': list,
+    'ext_pillar_concurrency': int,
+    'ext_pillar_timeout': int,
     'pillar_version': int,
     'pillar_opts': bool,
     'pillar_safe_render_error': bool,
     'pillar_source_merging_strategy': str,
+    'pillar_cache': bool,
+    'pillar_cache_ttl': int,
+    'pillar_cache_shared_ext': list,
     'ping_on_rotate': bool,
     'peer': dict,
     'preserve_minion_cache': bool,
@@ -210,6 +230,7 @@ VALID_OPTS = {
     'fileserver_followsymlinks': bool,
     'fileserver_ignoresymlinks': bool,
     'fileserver_limit_traversal': bool,
+    'fileserver_hash_warm': bool,
     'max_open_files': int,
     'auto_accept': bool,
     'autosign_timeout': int,
@@ -219,6 +240,11 @@ VALID_OPTS = {
     'ext_job_cache': str,
     'master_job_cache': str,
     'minion_data_cache': bool,
+    'minion_data_index': bool,
+    'minion_data_index_refresh': int,
+    'minion_data_index_grains': list,
+    'minion_data_index_pillar': list,
+    'key_index': bool,
     'publish_session': int,
     'reactor': list,
     'reactor_refresh_interval': int,
@@ -234,10 +260,17 @@ VALID_OPTS = {
     'win_gitrepos': list,
     'modules_max_memory': int,
     'grains_refresh_every': int,
+    'grains_lazy': bool,
+    'grains_threads': int,
+    'grains_timeout': int,
+    'grains_timeouts': dict,
     'enable_lspci': bool,
     'syndic_wait': int,
     'jinja_lstrip_blocks': bool,
     'jinja_trim_blocks': bool,
+    'jinja_bytecode_cache': bool,
+    'loader_index': bool,
+    'loader_index_ttl': int,
     'minion_id_caching': bool,
     'sign_pub_messages': bool,
     'keysize': int,
@@ -276,7 +309,15 @@ VALID_OPTS = {
     'username': str,
     'password': str,
     'zmq_filtering': bool,
+    'zmq_filtering_groups': int,
+    'pub_batch_size': int,
     'con_cache': bool,
+    'pub_key_cache_size': int,
+    'pub_key_token_ttl': int,
+    'auth_max_concurrent': int,
+    'auth_rate': float,
+    'auth_burst': int,
+    'auth_retry_max': float,
     'rotate_aes_key': bool,
     'cache_sreqs': bool,
     'cmd_safe': bool,
@@ -301,12 +342,21 @@ DEFAULT_MINION_OPTS = {
     'id': None,
     'cachedir': os.path.join(salt.syspaths.CACHE_DIR, 'minion'),
     'cache_jobs': False,
+    'returner_pool_size': 4,
+    'returner_pool_idle': 300,
+    'loader_index': False,
+    'loader_index_ttl': 3600,
     'grains_cache': False,
     'grains_cache_expiration': 300,
+    'grains_lazy': False,
+    'grains_threads': 1,
+    'grains_timeout': 0,
+    'grains_timeouts': {},
     'conf_file': os.path.join(salt.syspaths.CONFIG_DIR, 'minion'),
     'sock_dir': os.path.join(salt.syspaths.SOCK_DIR, 'minion'),
     'backup_mode': '',
     'renderer': 'yaml_jinja',
+    'jinja_bytecode_cache': True,
     'failhard': False,
     'autoload_dynamic_modules': True,
     'environment': None,
@@ -316,11 +366,14 @@ DEFAULT_MINION_OPTS = {
     'sls_list': [],
     'top_file': '',
     'file_client': 'remote',
+    'file_transfer_pipeline': 4,
+    'file_cache_store': True,
     'use_master_when_local': False,
     'file_roots': {
         'base': [salt.syspaths.BASE_FILE_ROOTS_DIR],
     },
     'fileserver_limit_traversal': False,
+    'fileserver_hash_warm': True,
     'file_recv': False,
     'file_recv_max_size': 100,
     'file_ignore_regex': None,
@@ -343,6 +396,9 @@ DEFAULT_MINION_OPTS = {
     'gitfs_passphrase': '',
     'gitfs_env_whitelist': [],
     'gitfs_env_blacklist': [],
+    'gitfs_fetch_timeout': 300,
+    'gitfs_fetch_workers': 1,
+    'gitfs_index': False,
     'hash_type': 'md5',
     'disable_modules': [],
     'disable_returners': [],
@@ -375,6 +431,7 @@ DEFAULT_MINION_OPTS = {
     'log_fmt_logfile': _DFLT_LOG_FMT_LOGFILE,
     'log_granular_levels': {},
     'max_event_size': 1048576,
+    'max_event_pending': 10000,
     'test': False,
     'ext_job_cache': '',
     'cython_enable': False,
@@ -383,6 +440,8 @@ DEFAULT_MINION_OPTS = {
     'state_auto_order': True,
     'state_events': False,
     'state_aggregate': False,
+    'state_parallel': False,
+    'state_parallel_workers': 4,
     'acceptance_wait_time': 10,
     'acceptance_wait_time_max': 0,
     'rejected_retry': False,
@@ -429,6 +488,7 @@ DEFAULT_MINION_OPTS = {
     'username': None,
     'password': None,
     'zmq_filtering': False,
+    'zmq_filtering_groups': 0,
     'zmq_monitor': False,
     'cache_sreqs': True,
     'cmd_safe': True,
@@ -438,9 +498,13 @@ DEFAULT_MASTER_OPTS = {
     'interface': '0.0.0.0',
     'publish_port': '4505',
     'pub_hwm': 1000,
+    'pub_batch_size': 100,
     'auth_mode': 1,
     'user': 'root',
     'worker_threads': 5,
+    'worker_async': False,
+    'worker_async_threads': 4,
+    'worker_async_cmds': ['_pillar', '_serve_file', '_file_recv'],
     'sock_dir': os.path.join(salt.syspaths.SOCK_DIR, 'master'),
     'ret_port': '4506',
     'timeout': 5,
@@ -469,6 +533,9 @@ DEFAULT_MASTER_OPTS = {
     'gitfs_passphrase': '',
     'gitfs_env_whitelist': [],
     'gitfs_env_blacklist': [],
+    'gitfs_fetch_timeout': 300,
+    'gitfs_fetch_workers': 1,
+    'gitfs_index': False,
     'hgfs_remotes': [],
     'hgfs_mountpoint': '',
     'hgfs_root': '',
@@ -487,15 +554,21 @@ DEFAULT_MASTER_OPTS = {
     'svnfs_env_whitelist': [],
     'svnfs_env_blacklist': [],
     'max_event_size': 1048576,
+    'max_event_pending': 10000,
     'minionfs_env': 'base',
     'minionfs_mountpoint': '',
     'minionfs_whitelist': [],
     'minionfs_blacklist': [],
     'ext_pillar': [],
+    'ext_pillar_concurrency': 1,
+    'ext_pillar_timeout': 0,
     'pillar_version': 2,
     'pillar_opts': False,
     'pillar_safe_render_error': True,
     'pillar_source_merging_strategy': 'smart',
+    'pillar_cache': False,
+    'pillar_cache_ttl': 3600,
+    'pillar_cache_shared_ext': [],
     'ping_on_rotate': False,
     'peer': {},
     'preserve_minion_cache': False,
@@ -531,6 +604,12 @@ DEFAULT_MASTER_OPTS = {
     'ext_job_cache': '',
     'master_job_cache': 'local_cache',
     'minion_data_cache': True,
+    'minion_data_index': False,
+    'minion_data_index_refresh': 10,
+    'minion_data_index_grains': ['os', 'os_family', 'osfinger', 'role',
+                                 'roles', 'host', 'domain', 'virtual'],
+    'minion_data_index_pillar': [],
+    'key_index': False,
     'enforce_mine_cache': False,
     'ipv6': False,
     'log_file': os.path.join(salt.syspaths.LOGS_DIR, 'master'),
@@ -552,8 +631,14 @@ DEFAULT_MASTER_OPTS = {
     'reactor_worker_hwm': 10000,
     'event_return': '',
     'event_return_queue': 0,
+    'event_return_queue_max_seconds': 5,
+    'event_return_backlog': 100,
     'event_return_whitelist': [],
     'event_return_blacklist': [],
+    'returner_pool_size': 4,
+    'returner_pool_idle': 300,
+    'loader_index': False,
+    'loader_index_ttl': 3600,
     'serial': 'msgpack',
     'state_verbose': True,
     'state_output': 'full',
@@ -578,6 +663,7 @@ DEFAULT_MASTER_OPTS = {
     'syndic_wait': 5,
     'jinja_lstrip_blocks': False,
     'jinja_trim_blocks': False,
+    'jinja_bytecode_cache': True,
     'sign_pub_messages': False,
     'keysize': 2048,
     'transport': 'zeromq',
@@ -614,7 +700,14 @@ DEFAULT_MASTER_OPTS = {
     'master_pubkey_signature': 'master_pubkey_signature',
     'master_use_pubkey_signature': False,
     'zmq_filtering': False,
+    'zmq_filtering_groups': 0,
     'con_cache': False,
+    'pub_key_cache_size': 1000,
+    'pub_key_token_ttl': 60,
+    'auth_max_concurrent': 0,
+    'auth_rate': 0,
+    'auth_burst': 0,
+    'auth_retry_max': 120,
     'rotate_aes_key': True,
     'cache_sreqs': True,
 }
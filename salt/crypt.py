@@ -9,16 +9,18 @@ from __future__ import absolute_import, print_function
 import os
 import sys
 import time
+import random
 import hmac
 import hashlib
 import logging
 import traceback
 import binascii
+import threading
 from salt.ext.six.moves import zip  # pylint: disable=import-error,redefined-builtin
 
 # Import third party libs
 try:
-    from M2Crypto import RSA, EVP
+    from M2Crypto import RSA, EVP, BIO
     from Crypto.Cipher import AES
 except ImportError:
     # No need for crypt in local mode
@@ -30,12 +32,23 @@ import salt.utils
 import salt.payload
 import salt.utils.verify
 import salt.version
+from salt.utils.odict import OrderedDict
 from salt.exceptions import (
     AuthenticationError, SaltClientError, SaltReqTimeoutError
 )
 
 log = logging.getLogger(__name__)
 
+# The verified tokens kept for a single public key
+PUB_KEY_CACHE_TOKENS = 8
+
+# The share of the wait asked by a busy master added at random, so the minions
+# turned away together do not sign in again together
+AUTH_RETRY_JITTER = 0.25
+
+# The process wide PubKeyCache, see get_pub_key_cache
+_PUB_KEY_CACHE = None
+
 
 def dropfile(cachedir, user=None):
     '''
@@ -99,6 +112,138 @@ def gen_keys(keydir, keyname, keysize, user=None):
     return priv
 
 
+class PubKeyCache(object):
+    '''
+    A least recently used cache of the public keys read by the master,
+    keeping the key string, the parsed RSA key and the tokens verified with
+    it.
+
+    A cached key is only used while the stat of its file is unchanged, so a
+    key accepted, rejected, deleted or replaced by another process is read
+    again or dropped on its next use. Setting ``size`` to 0 disables the
+    cache.
+    '''
+    def __init__(self, size=1000, token_ttl=60):
+        self.size = size
+        self.token_ttl = token_ttl
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat(path):
+        '''
+        Return what identifies the current content of the file
+        '''
+        st_ = os.stat(path)
+        return (st_.st_ino, st_.st_size, st_.st_mtime, st_.st_ctime)
+
+    def _entry(self, path):
+        '''
+        Return the cache entry of the key file, reading the file if it is not
+        cached or has changed. Raises IOError or OSError if the file cannot be
+        read.
+        '''
+        try:
+            stat = self._stat(path)
+        except OSError:
+            self.forget(path)
+            raise
+        with self._lock:
+            entry = self._keys.pop(path, None)
+            if entry is not None and entry['stat'] == stat:
+                self._keys[path] = entry
+                return entry
+        with salt.utils.fopen(path, 'r') as fp_:
+            entry = {'stat': stat,
+                     'str': fp_.read(),
+                     'rsa': None,
+                     'tokens': {}}
+        if self.size > 0:
+            with self._lock:
+                while len(self._keys) >= self.size:
+                    self._keys.popitem(last=False)
+                self._keys[path] = entry
+        return entry
+
+    def get_str(self, path):
+        '''
+        Return the content of the public key file
+        '''
+        return self._entry(path)['str']
+
+    def get_key(self, path):
+        '''
+        Return the public key file loaded as an ``RSA.RSA_pub``, raises
+        ``RSA.RSAError`` if it is not a valid key
+        '''
+        return self._rsa(self._entry(path))
+
+    @staticmethod
+    def _rsa(entry):
+        '''
+        Return the parsed key of a cache entry
+        '''
+        if entry['rsa'] is None:
+            entry['rsa'] = RSA.load_pub_key_bio(BIO.MemoryBuffer(entry['str']))
+        return entry['rsa']
+
+    def verify_token(self, path, token, clear='salt'):
+        '''
+        Return True if the token decrypts to ``clear`` with the public key in
+        path. Verified tokens are remembered for ``token_ttl`` seconds.
+        '''
+        try:
+            entry = self._entry(path)
+        except (IOError, OSError) as exc:
+            log.error('Unable to read public key "{0}": {1}'.format(path, exc))
+            return False
+        now = time.time()
+        if entry['tokens'].get(token, 0) > now:
+            return True
+        try:
+            if self._rsa(entry).public_decrypt(token, 5) != clear:
+                return False
+        except RSA.RSAError as err:
+            log.error('Unable to decrypt token: {0}'.format(err))
+            return False
+        if self.token_ttl > 0:
+            tokens = entry['tokens']
+            if len(tokens) >= PUB_KEY_CACHE_TOKENS:
+                tokens.clear()
+            tokens[token] = now + self.token_ttl
+        return True
+
+    def forget(self, path=None):
+        '''
+        Drop the key file from the cache, or every key if path is None
+        '''
+        with self._lock:
+            if path is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(path, None)
+
+
+def get_pub_key_cache(opts):
+    '''
+    Return the PubKeyCache of this process, created with the
+    ``pub_key_cache_size`` and ``pub_key_token_ttl`` of the first opts passed
+    '''
+    global _PUB_KEY_CACHE
+    if _PUB_KEY_CACHE is None:
+        _PUB_KEY_CACHE = PubKeyCache(opts.get('pub_key_cache_size', 1000),
+                                     opts.get('pub_key_token_ttl', 60))
+    return _PUB_KEY_CACHE
+
+
+def forget_pub_key(path=None):
+    '''
+    Drop a public key file from the cache of this process, if any
+    '''
+    if _PUB_KEY_CACHE is not None:
+        _PUB_KEY_CACHE.forget(path)
+
+
 def sign_message(privkey_path, message):
     '''
     Use M2Crypto's EVP ("Envelope") functions to sign a message.  Returns the signature.
@@ -324,6 +469,12 @@ class SAuth(object):
 
         while True:
             creds = self.sign_in(timeout, safe)
+            if creds == 'busy':
+                wait = self.retry_after * random.uniform(1, 1 + AUTH_RETRY_JITTER)
+                log.info('The master is busy, waiting {0:.1f} seconds before '
+                         'retry.'.format(wait))
+                time.sleep(wait)
+                continue
             if creds == 'retry':
                 if self.opts.get('caller'):
                     print('Minion failed to authenticate with the master, '
@@ -655,7 +806,8 @@ class SAuth(object):
         :raises SaltReqTimeoutError: If the sign-in request has timed out and :param safe: is not set
 
         :return: Return a string on failure indicating the reason for failure. On success, return a dictionary
-        with the publication port and the shared AES key.
+        with the publication port and the shared AES key. A busy master returns 'busy' and the seconds to wait
+        before signing in again are set in retry_after.
 
         '''
         auth = {}
@@ -714,6 +866,11 @@ class SAuth(object):
                 # has the master returned that its maxed out with minions?
                 elif payload['load']['ret'] == 'full':
                     return 'full'
+                # has the master asked to sign in again later?
+                elif payload['load']['ret'] == 'busy':
+                    self.retry_after = payload['load'].get(
+                        'retry_after', self.opts['acceptance_wait_time'])
+                    return 'busy'
                 else:
                     log.error(
                         'The Salt Master has cached the public key for this '
@@ -146,6 +146,6 @@ class SaltRaetMaintBackendsUpdate(ioflo.base.deeding.Deed):
         '''
         Update!
         '''
-        for pillargit in self.pillargitfs.value:
-            pillargit.update()
+        salt.daemons.masterapi.update_git_pillar(self.pillargitfs.value,
+                                                 self.opts.value)
         salt.daemons.masterapi.fileserver_update(self.fileserver.value)
@@ -38,6 +38,7 @@ import salt.utils.atomicfile
 import salt.utils.event
 import salt.utils.verify
 import salt.utils.minions
+import salt.utils.process
 import salt.utils.gzip_util
 import salt.utils.jid
 from salt.pillar import git_pillar
@@ -81,6 +82,33 @@ def init_git_pillar(opts):
     return pillargitfs
 
 
+def update_git_pillar(pillargitfs, opts):
+    '''
+    Fetch the git_pillar remotes concurrently, return a dict mapping every
+    ``branch remote`` to the number of seconds its fetch took, None if it did
+    not finish within ``gitfs_fetch_timeout``
+    '''
+    ret = {}
+    funcs = [('{0} {1}'.format(pillargit.branch, pillargit.rp_location),
+              pillargit.update) for pillargit in pillargitfs]
+    for name, _, exc_info, duration in salt.utils.process.iter_threaded(
+            funcs,
+            opts.get('gitfs_fetch_workers', 1),
+            opts.get('gitfs_fetch_timeout', 0),
+            name='GitPillarFetch'):
+        if duration is None:
+            log.error('Fetching git_pillar remote {0} did not finish within '
+                      '{1} seconds'.format(name, opts['gitfs_fetch_timeout']))
+        elif exc_info is not None:
+            log.error('Exception {0} occurred in file server update '
+                      'for git_pillar module.'.format(exc_info[1]))
+        else:
+            log.debug('git_pillar fetched remote {0} in {1:.3f}s'
+                      .format(name, duration))
+        ret[name] = duration
+    return ret
+
+
 def clean_fsbackend(opts):
     '''
     Clean out the old fileserver backends
@@ -676,16 +704,26 @@ class RemoteFuncs(object):
         '''
         if any(key not in load for key in ('id', 'grains')):
             return False
-        pillar = salt.pillar.Pillar(
-                self.opts,
-                load['grains'],
-                load['id'],
-                load.get('saltenv', load.get('env')),
-                load.get('ext'),
-                self.mminion.functions,
-                pillar=load.get('pillar_override', {}))
-        pillar_dirs = {}
-        data = pillar.compile_pillar(pillar_dirs=pillar_dirs)
+        saltenv = load.get('saltenv', load.get('env'))
+        data = None
+        cache = salt.pillar.get_pillar_cache(self.opts)
+        if cache is not None:
+            key = cache.key(load['id'], load['grains'], saltenv,
+                            load.get('pillar_override'), load.get('ext'))
+            data = cache.get(load['id'], key)
+        if data is None:
+            pillar = salt.pillar.Pillar(
+                    self.opts,
+                    load['grains'],
+                    load['id'],
+                    saltenv,
+                    load.get('ext'),
+                    self.mminion.functions,
+                    pillar=load.get('pillar_override', {}))
+            pillar_dirs = {}
+            data = pillar.compile_pillar(pillar_dirs=pillar_dirs)
+            if cache is not None:
+                cache.set(load['id'], key, data)
         if self.opts.get('minion_data_cache', False):
             cdir = os.path.join(self.opts['cachedir'], 'minions', load['id'])
             if not os.path.isdir(cdir):
@@ -700,6 +738,9 @@ class RemoteFuncs(object):
                              'pillar': data})
                             )
             os.rename(tmpfname, datap)
+            index = salt.utils.minions.get_minion_data_index(self.opts)
+            if index is not None:
+                index.update(load['id'], load['grains'], data)
         return data
 
     def _minion_event(self, load):
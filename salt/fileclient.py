@@ -5,11 +5,14 @@ Classes that manage file clients
 from __future__ import absolute_import
 
 # Import python libs
+import binascii
 import contextlib
 import logging
 import hashlib
 import os
 import shutil
+import struct
+import time
 
 # Import salt libs
 from salt.exceptions import (
@@ -22,11 +25,23 @@ import salt.payload
 import salt.transport
 import salt.fileserver
 import salt.utils
+import salt.utils.atomicfile
 import salt.utils.templates
 import salt.utils.gzip_util
-import salt.utils.http
 from salt.utils.openstack.swift import SaltSwift
 
+# Import third party libs
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+try:
+    import zmq
+    HAS_ZMQ = True
+except ImportError:
+    HAS_ZMQ = False
+
 # pylint: disable=no-name-in-module,import-error
 import salt.ext.six.moves.BaseHTTPServer as BaseHTTPServer
 from salt.ext.six.moves.urllib.error import HTTPError, URLError
@@ -589,6 +604,8 @@ class Client(object):
             get_kwargs['auth'] = (url_data.username, url_data.password)
         else:
             fixed_url = url
+        # requests is slow to import, only load it to fetch a url
+        import salt.utils.http
         try:
             query = salt.utils.http.query(
                 fixed_url,
@@ -914,6 +931,241 @@ class LocalClient(Client):
         return {}
 
 
+class FileStore(object):
+    '''
+    Content addressed store for the files fetched from the master
+
+    Files are stored once per content under ``cachedir/file_store``, named
+    after the hash the master gave for them. The files cached for a saltenv
+    are hard links to the stored files, so the same file in several saltenvs
+    or paths is fetched and stored once.
+
+    The hashes of the stored and cached files are kept in an append-only
+    index along with their inode, size and mtime, so checking whether a
+    cached file is up to date only costs a stat.
+    '''
+    # Every index entry is prefixed with its length
+    _HEADER = struct.Struct('>I')
+    # Seconds between two sweeps of the stored files no longer linked
+    SWEEP_INTERVAL = 3600
+    # Stored files changed more recently may be about to be linked
+    ORPHAN_AGE = 60
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.root = os.path.join(opts['cachedir'], 'file_store')
+        self.index_path = os.path.join(self.root, 'index')
+        self.serial = salt.payload.Serial(opts)
+        # path -> [mtime, size, ino, hash_type, hsum]
+        self.entries = {}
+        self._index_ino = None
+        self._index_pos = 0
+        self._records = 0
+
+    def object_path(self, hash_type, hsum):
+        '''
+        Return the path of a stored file
+        '''
+        return os.path.join(self.root, hash_type, hsum[:2], hsum)
+
+    def _refresh(self):
+        '''
+        Read the entries appended to the index since it was last read
+        '''
+        try:
+            st_ = os.stat(self.index_path)
+        except OSError:
+            return
+        if st_.st_ino != self._index_ino or st_.st_size < self._index_pos:
+            # The index was compacted, read it again
+            self.entries = {}
+            self._index_ino = st_.st_ino
+            self._index_pos = 0
+            self._records = 0
+        if st_.st_size == self._index_pos:
+            return
+        with salt.utils.fopen(self.index_path, 'rb') as fp_:
+            fp_.seek(self._index_pos)
+            while True:
+                header = fp_.read(self._HEADER.size)
+                if len(header) < self._HEADER.size:
+                    break
+                length = self._HEADER.unpack(header)[0]
+                data = fp_.read(length)
+                if len(data) < length:
+                    break
+                entry = self.serial.loads(data)
+                self.entries[entry[0]] = entry[1:]
+                self._records += 1
+                self._index_pos = fp_.tell()
+
+    def _record(self, path, hash_type, hsum, st_=None):
+        '''
+        Append the hash of a file to the index
+        '''
+        if st_ is None:
+            st_ = os.stat(path)
+        entry = [path, st_.st_mtime, st_.st_size, st_.st_ino, hash_type, hsum]
+        self.entries[path] = entry[1:]
+        data = self.serial.dumps(entry)
+        if not os.path.isdir(self.root):
+            os.makedirs(self.root)
+        with salt.utils.fopen(self.index_path, 'ab') as fp_:
+            if HAS_FCNTL:
+                fcntl.flock(fp_.fileno(), fcntl.LOCK_EX)
+            fp_.write(self._HEADER.pack(len(data)) + data)
+            fp_.flush()
+            self._records += 1
+            if self._records > 1000 and self._records > 2 * len(self.entries):
+                self._compact()
+
+    def _compact(self):
+        '''
+        Rewrite the index without the superseded entries, while holding the
+        lock of the index. Entries appended concurrently to the old index are
+        lost, which only costs hashing these files again.
+        '''
+        self._refresh()
+        tmp = '{0}.{1}'.format(self.index_path, os.getpid())
+        with salt.utils.fopen(tmp, 'wb') as fp_:
+            for path, entry in self.entries.items():
+                if not os.path.exists(path):
+                    continue
+                data = self.serial.dumps([path] + list(entry))
+                fp_.write(self._HEADER.pack(len(data)) + data)
+        salt.utils.atomicfile.atomic_rename(tmp, self.index_path)
+        self._index_ino = None
+        self._refresh()
+
+    def hash(self, path, hash_type):
+        '''
+        Return the hash of a file, from the index if the file did not change
+        since it was hashed
+        '''
+        self._refresh()
+        try:
+            st_ = os.stat(path)
+        except OSError:
+            return ''
+        entry = self.entries.get(path)
+        if entry and entry[:4] == [st_.st_mtime, st_.st_size, st_.st_ino,
+                                   hash_type]:
+            return entry[4]
+        hsum = salt.utils.get_hash(path, hash_type)
+        self._record(path, hash_type, hsum, st_)
+        return hsum
+
+    def lookup(self, hash_type, hsum):
+        '''
+        Return the path of the stored file with the given hash, or None if
+        it is not in the store. A stored file which was modified through one
+        of its links is dropped.
+        '''
+        obj = self.object_path(hash_type, hsum)
+        if not os.path.isfile(obj):
+            return None
+        if self.hash(obj, hash_type) != hsum:
+            log.debug('Dropping modified file {0} from the file '
+                      'store'.format(obj))
+            os.remove(obj)
+            return None
+        return obj
+
+    def sweep(self):
+        '''
+        Remove the stored files no longer linked anywhere else, such as the
+        ones whose cached files were removed, and return how many were
+        removed
+        '''
+        now = time.time()
+        removed = 0
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root:
+                # The index
+                continue
+            for name in filenames:
+                obj = os.path.join(dirpath, name)
+                try:
+                    st_ = os.stat(obj)
+                    if st_.st_nlink == 1 and \
+                            now - st_.st_ctime > self.ORPHAN_AGE:
+                        os.remove(obj)
+                        removed += 1
+                except OSError:
+                    pass
+        if removed:
+            log.debug('Removed {0} unused files from the file '
+                      'store'.format(removed))
+        return removed
+
+    def _sweep_due(self):
+        '''
+        Return True if the store was not swept for SWEEP_INTERVAL seconds,
+        marking it as swept
+        '''
+        stamp = os.path.join(self.root, 'swept')
+        try:
+            if time.time() - os.path.getmtime(stamp) < self.SWEEP_INTERVAL:
+                return False
+        except OSError:
+            if not os.path.isdir(self.root):
+                os.makedirs(self.root)
+        with salt.utils.fopen(stamp, 'w'):
+            pass
+        return True
+
+    def add(self, path, hash_type, hsum):
+        '''
+        Move a verified download into the store and return its new path
+        '''
+        if self._sweep_due():
+            self.sweep()
+        obj = self.object_path(hash_type, hsum)
+        if not os.path.isdir(os.path.dirname(obj)):
+            os.makedirs(os.path.dirname(obj))
+        salt.utils.atomicfile.atomic_rename(path, obj)
+        self._record(obj, hash_type, hsum)
+        return obj
+
+    def place(self, obj, dest, hash_type, hsum, link=True):
+        '''
+        Put the content of a stored file at dest, as a hard link when link
+        is True and the file system supports it, otherwise as a copy.
+        Stored files no longer linked anywhere else, including the one
+        copied, are removed.
+        '''
+        old = self.entries.get(dest)
+        tmp = os.path.join(
+            os.path.dirname(dest),
+            '.{0}.{1}.part'.format(os.path.basename(dest),
+                                   binascii.hexlify(os.urandom(4))))
+        linked = False
+        if link and hasattr(os, 'link'):
+            try:
+                os.link(obj, tmp)
+                linked = True
+            except OSError:
+                pass
+        if not linked:
+            shutil.copyfile(obj, tmp)
+            if os.path.isfile(dest):
+                shutil.copymode(dest, tmp)
+        salt.utils.atomicfile.atomic_rename(tmp, dest)
+        self._record(dest, hash_type, hsum)
+        unused = []
+        if not linked:
+            unused.append(obj)
+        if old and old[4] != hsum:
+            unused.append(self.object_path(old[3], old[4]))
+        for unused_obj in unused:
+            try:
+                if os.stat(unused_obj).st_nlink == 1:
+                    os.remove(unused_obj)
+            except OSError:
+                pass
+        return dest
+
+
 class RemoteClient(Client):
     '''
     Interact with the salt master file server.
@@ -925,6 +1177,10 @@ class RemoteClient(Client):
             self.auth = self.channel.auth
         else:
             self.auth = ''
+        if self.opts.get('file_cache_store', True):
+            self.store = FileStore(self.opts)
+        else:
+            self.store = None
 
     def _refresh_channel(self):
         '''
@@ -977,7 +1233,12 @@ class RemoteClient(Client):
                 dest2check = cache_dest
 
         if dest2check and os.path.isfile(dest2check):
-            hash_local = self.hash_file(dest2check, saltenv)
+            if self.store is not None and hash_server:
+                hash_type = hash_server.get('hash_type', 'md5')
+                hash_local = {'hsum': self.store.hash(dest2check, hash_type),
+                              'hash_type': hash_type}
+            else:
+                hash_local = self.hash_file(dest2check, saltenv)
             if hash_local == hash_server:
                 log.info(
                     'Fetching file from saltenv {0!r}, ** skipped ** '
@@ -992,7 +1253,6 @@ class RemoteClient(Client):
                 saltenv, path
             )
         )
-        d_tries = 0
         path = self._check_proto(path)
         load = {'path': path,
                 'saltenv': saltenv,
@@ -1001,7 +1261,7 @@ class RemoteClient(Client):
             gzip = int(gzip)
             load['gzip'] = gzip
 
-        fn_ = None
+        cache = not dest
         if dest:
             destdir = os.path.dirname(dest)
             if not os.path.isdir(destdir):
@@ -1009,54 +1269,215 @@ class RemoteClient(Client):
                     os.makedirs(destdir)
                 else:
                     return False
-            fn_ = salt.utils.fopen(dest, 'wb+')
-        while True:
-            if not fn_:
-                load['loc'] = 0
+        else:
+            with self._cache_loc(path, saltenv) as cache_dest:
+                dest = cache_dest
+                # If a directory was formerly cached at this path, then
+                # remove it to avoid a traceback trying to write the file
+                if os.path.isdir(dest):
+                    salt.utils.rm_rf(dest)
+
+        hsum = hash_server.get('hsum', '')
+        hash_type = hash_server.get('hash_type', 'md5')
+        if self.store is not None and hsum:
+            obj = self.store.lookup(hash_type, hsum)
+            if obj is not None:
+                log.info(
+                    'Fetching file from saltenv {0!r}, ** skipped ** '
+                    'found in the file store {1!r}'.format(saltenv, path)
+                )
+                return self.store.place(obj, dest, hash_type, hsum, cache)
+        for d_tries in range(1, 4):
+            if cache:
+                with self._cache_loc(path, saltenv):
+                    # Create the file with the permissions of the cache
+                    fn_, loc, resumable = self._open_partial(dest, hsum)
             else:
-                load['loc'] = fn_.tell()
+                fn_, loc, resumable = self._open_partial(dest, hsum)
+            hasher = hashlib.new(hash_type)
+            try:
+                if loc:
+                    log.debug('Resuming download of {0!r} at {1}'.format(
+                        path, loc))
+                    fn_.seek(0)
+                    for data in iter(lambda: fn_.read(65536), b''):
+                        hasher.update(data)
+                for data in self._serve_chunks(load, loc):
+                    fn_.write(data)
+                    hasher.update(data)
+            except Exception:
+                if not resumable:
+                    fn_.close()
+                    os.remove(fn_.name)
+                raise
+            finally:
+                fn_.close()
+            if not hsum or hasher.hexdigest() == hsum or d_tries == 3:
+                break
+            log.warn('Bad download of file {0}, attempt {1} '
+                     'of 3'.format(path, d_tries))
+            os.remove(fn_.name)
+        if hsum and hasher.hexdigest() != hsum:
+            log.error('Download of file {0} does not match the hash on the '
+                      'master'.format(path))
+        elif self.store is not None and hsum and cache:
+            # Only the cached files are linked to the store, a download to
+            # another destination would leave its stored copy unused
+            obj = self.store.add(fn_.name, hash_type, hsum)
+            self.store.place(obj, dest, hash_type, hsum, cache)
+        if os.path.isfile(fn_.name):
+            if not cache and os.path.isfile(dest):
+                # Keep the permissions of the file being replaced
+                shutil.copymode(dest, fn_.name)
+            salt.utils.atomicfile.atomic_rename(fn_.name, dest)
+        self._clean_partials(dest)
+        log.info(
+            'Fetching file from saltenv {0!r}, ** done ** {1!r}'.format(
+                saltenv, path
+            )
+        )
+        return dest
+
+    def _open_partial(self, dest, hsum):
+        '''
+        Open the file to download dest to, it is moved in place once complete
+        so concurrent readers never see a partial file. The partial file left
+        by an interrupted download of the same version of the file is
+        resumed. Returns the file, the position to resume from and whether
+        the file would be resumed if the download was interrupted.
+        '''
+        partial = os.path.join(
+            os.path.dirname(dest),
+            '.{0}.{1}'.format(os.path.basename(dest), hsum[:16]))
+        if hsum and HAS_FCNTL:
+            fn_ = salt.utils.fopen(partial + '.part', 'ab+')
+            try:
+                fcntl.flock(fn_.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                # The partial file may have been completed and moved in
+                # place while waiting for the lock
+                if os.fstat(fn_.fileno()).st_ino != \
+                        os.stat(partial + '.part').st_ino:
+                    raise OSError
+            except (IOError, OSError):
+                # Being downloaded by another process
+                fn_.close()
+            else:
+                fn_.seek(0, os.SEEK_END)
+                return fn_, fn_.tell(), True
+        return salt.utils.fopen(
+            '{0}.{1}.part'.format(partial, binascii.hexlify(os.urandom(4))),
+            'wb+'), 0, False
+
+    def _clean_partials(self, dest):
+        '''
+        Remove the resumable partial files left next to dest by interrupted
+        downloads of other versions of the file
+        '''
+        if not HAS_FCNTL:
+            return
+        prefix = '.{0}.'.format(os.path.basename(dest))
+        destdir = os.path.dirname(dest)
+        for name in os.listdir(destdir):
+            if not name.startswith(prefix) or not name.endswith('.part') \
+                    or '.' in name[len(prefix):-len('.part')]:
+                continue
+            try:
+                with salt.utils.fopen(os.path.join(destdir, name), 'rb') as fp_:
+                    fcntl.flock(fp_.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    os.remove(fp_.name)
+            except (IOError, OSError):
+                # Being downloaded by another process
+                continue
+
+    def _serve_chunks(self, load, loc=0):
+        '''
+        Yield the chunks of a file served by the master from loc. Once the
+        master tells the size of the file, the rest of the file is requested
+        with several requests in flight.
+        '''
+        errors = 0
+        while True:
+            load['loc'] = loc
             data = self.channel.send(load)
             if 'data' not in data:
                 log.error('Data is {0}'.format(data))
                 self._refresh_channel()
-            if not data['data']:
-                if not fn_ and data['dest']:
-                    # This is a 0 byte file on the master
-                    with self._cache_loc(data['dest'], saltenv) as cache_dest:
-                        dest = cache_dest
-                        with salt.utils.fopen(cache_dest, 'wb+') as ofile:
-                            ofile.write(data['data'])
-                if 'hsum' in data and d_tries < 3:
-                    # Master has prompted a file verification, if the
-                    # verification fails, re-download the file. Try 3 times
-                    d_tries += 1
-                    hsum = salt.utils.get_hash(dest, data.get('hash_type', 'md5'))
-                    if hsum != data['hsum']:
-                        log.warn('Bad download of file {0}, attempt {1} '
-                                 'of 3'.format(path, d_tries))
-                        continue
-                break
-            if not fn_:
-                with self._cache_loc(data['dest'], saltenv) as cache_dest:
-                    dest = cache_dest
-                    # If a directory was formerly cached at this path, then
-                    # remove it to avoid a traceback trying to write the file
-                    if os.path.isdir(dest):
-                        salt.utils.rm_rf(dest)
-                    fn_ = salt.utils.fopen(dest, 'wb+')
-            if data.get('gzip', None):
-                data = salt.utils.gzip_util.uncompress(data['data'])
-            else:
-                data = data['data']
-            fn_.write(data)
-        if fn_:
-            fn_.close()
-            log.info(
-                'Fetching file from saltenv {0!r}, ** done ** {1!r}'.format(
-                    saltenv, path
-                )
-            )
-        return dest
+                errors += 1
+                if errors >= 3:
+                    return
+                continue
+            chunk = data['data']
+            if chunk and data.get('gzip', None):
+                chunk = salt.utils.gzip_util.uncompress(chunk)
+            if not chunk:
+                return
+            yield chunk
+            loc += len(chunk)
+            size = data.get('size', 0)
+            depth = self.opts.get('file_transfer_pipeline', 1)
+            if depth > 1 and HAS_ZMQ and size > loc + len(chunk) and \
+                    isinstance(self.channel, salt.transport.ZeroMQChannel) \
+                    and self.channel.crypt == 'aes':
+                for chunk in self._pipeline_chunks(
+                        load, loc, size, len(chunk), depth):
+                    yield chunk
+                    loc += len(chunk)
+
+    def _pipeline_chunks(self, load, loc, size, chunk_size, depth):
+        '''
+        Request the chunks of a file up to size with depth requests in
+        flight, each on its own connection, and yield them in order. Stops
+        early if the master answers unexpectedly, the caller carries on one
+        chunk at a time.
+        '''
+        auth = self.channel.auth
+        serial = salt.payload.Serial(self.opts)
+        sreqs = [salt.payload.SREQ(self.channel.master_uri, opts=self.opts)
+                 for _ in range(min(depth, (size - loc) // chunk_size + 1))]
+        poller = zmq.Poller()
+        inflight = {}
+        received = {}
+        next_loc = loc
+        idle = list(sreqs)
+        try:
+            while loc < size:
+                while idle and next_loc < size:
+                    sreq = idle.pop()
+                    sreq.socket.send(serial.dumps(
+                        {'enc': 'aes',
+                         'load': auth.crypticle.dumps(
+                             dict(load, loc=next_loc))}))
+                    poller.register(sreq.socket, zmq.POLLIN)
+                    inflight[sreq.socket] = (sreq, next_loc)
+                    next_loc += chunk_size
+                events = poller.poll(60000)
+                if not events:
+                    log.debug('Timed out waiting for the master, stopping '
+                              'the pipelined transfer')
+                    return
+                for sock, _ in events:
+                    sreq, offset = inflight.pop(sock)
+                    poller.unregister(sock)
+                    data = auth.crypticle.loads(serial.loads(sock.recv()))
+                    idle.append(sreq)
+                    chunk = data.get('data') if isinstance(data, dict) else None
+                    if chunk and data.get('gzip', None):
+                        chunk = salt.utils.gzip_util.uncompress(chunk)
+                    if not chunk or \
+                            len(chunk) != min(chunk_size, size - offset) or \
+                            data.get('size') != size:
+                        # The file changed on the master
+                        return
+                    received[offset] = chunk
+                while loc in received:
+                    chunk = received.pop(loc)
+                    yield chunk
+                    loc += len(chunk)
+        except (salt.crypt.AuthenticationError, zmq.ZMQError) as exc:
+            log.debug('Stopping the pipelined transfer: {0}'.format(exc))
+        finally:
+            for sreq in sreqs:
+                sreq.destroy()
 
     def file_list(self, saltenv='base', prefix='', env=None):
         '''
@@ -1214,6 +1635,9 @@ class FSClient(RemoteClient):
         self.opts = opts
         self.channel = salt.fileserver.FSChan(opts)
         self.auth = DumbAuth()
+        # The files are read from the local file_roots, there is nothing to
+        # save by storing them by content
+        self.store = None
 
 
 class DumbAuth(object):
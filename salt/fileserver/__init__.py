@@ -8,8 +8,10 @@ from __future__ import absolute_import
 import errno
 import fnmatch
 import logging
+import mmap
 import os
 import re
+import threading
 import time
 
 # Import salt libs
@@ -17,10 +19,24 @@ import salt.loader
 import salt.utils
 from salt.ext.six import string_types
 import salt.ext.six as six
+from salt.utils.odict import OrderedDict
 
 
 log = logging.getLogger(__name__)
 
+# Maximum number of files kept mapped by read_chunk in a process
+MMAP_CACHE_SIZE = 32
+
+# Files modified less than this many seconds ago may still be written to, so
+# read_chunk reads them instead of mapping them
+MMAP_MIN_AGE = 60
+
+# Files mapped by read_chunk, by path, least recently used first
+_MMAPS = OrderedDict()
+# Guards _MMAPS and the mappings in it, which the threads of an asynchronous
+# master worker share
+_MMAPS_LOCK = threading.Lock()
+
 
 def _unlock_cache(w_lock):
     '''
@@ -268,6 +284,76 @@ def is_file_ignored(opts, fname):
     return False
 
 
+def _close_mmap(path):
+    '''
+    Unmap a file mapped by read_chunk, _MMAPS_LOCK must be held
+    '''
+    entry = _MMAPS.pop(path, None)
+    if entry is not None:
+        entry[1].close()
+        entry[2].close()
+
+
+def _read_chunk(path, loc, size):
+    '''
+    Read a chunk of a file without mapping it
+    '''
+    with salt.utils.fopen(path, 'rb') as fp_:
+        fp_.seek(loc)
+        return fp_.read(size)
+
+
+def _stat_key(st_):
+    return (st_.st_ino, st_.st_dev, st_.st_size, st_.st_mtime)
+
+
+def read_chunk(path, loc, size):
+    '''
+    Return the chunk of a file starting at loc, at most size bytes long, and
+    the size of the file
+
+    Files larger than a chunk which were not modified for MMAP_MIN_AGE
+    seconds are mapped and kept mapped for the following chunks, so serving
+    a large file does not open and read it again for every chunk. A mapping
+    is dropped as soon as the file is replaced or changes size. Reading past
+    the end of a mapped file which was truncated would crash the process, so
+    the mapped file is checked again right before every chunk is copied out
+    of it, and recently modified files are read instead.
+    '''
+    path = os.path.normpath(path)
+    st_ = os.stat(path)
+    key = _stat_key(st_)
+    if st_.st_size <= size or time.time() - st_.st_mtime < MMAP_MIN_AGE:
+        if path in _MMAPS:
+            with _MMAPS_LOCK:
+                _close_mmap(path)
+        return _read_chunk(path, loc, size), st_.st_size
+    with _MMAPS_LOCK:
+        entry = _MMAPS.pop(path, None)
+        if entry is not None and entry[0] != key:
+            entry[1].close()
+            entry[2].close()
+            entry = None
+        if entry is None:
+            fp_ = salt.utils.fopen(path, 'rb')
+            try:
+                map_ = mmap.mmap(fp_.fileno(), 0, access=mmap.ACCESS_READ)
+            except (EnvironmentError, ValueError):
+                fp_.close()
+                return _read_chunk(path, loc, size), st_.st_size
+            entry = (key, map_, fp_)
+            while len(_MMAPS) >= MMAP_CACHE_SIZE:
+                _close_mmap(next(iter(_MMAPS)))
+        _MMAPS[path] = entry
+        if _stat_key(os.fstat(entry[2].fileno())) != key \
+                or len(entry[1]) != st_.st_size:
+            # Changed since it was checked above
+            _close_mmap(path)
+        else:
+            return entry[1][loc:loc + size], st_.st_size
+    return _read_chunk(path, loc, size), st_.st_size
+
+
 class Fileserver(object):
     '''
     Create a fileserver wrapper object that wraps the fileserver functions and
@@ -395,14 +481,20 @@ class Fileserver(object):
     def update(self, back=None):
         '''
         Update all of the enabled fileserver backends which support the update
-        function, or
+        function, or the named backend(s) only. Return what the backends which
+        report on their update returned, such as the fetch times of the gitfs
+        remotes.
         '''
         back = self._gen_back(back)
+        ret = {}
         for fsb in back:
             fstr = '{0}.update'.format(fsb)
             if fstr in self.servers:
                 log.debug('Updating {0} fileserver cache'.format(fsb))
-                self.servers[fstr]()
+                result = self.servers[fstr]()
+                if result is not None:
+                    ret[fsb] = result
+        return ret
 
     def envs(self, back=None, sources=False):
         '''
@@ -48,10 +48,12 @@ Walkthrough <tutorial-gitfs>`.
 from __future__ import absolute_import
 
 # Import python libs
+import binascii
 import copy
 import distutils.version  # pylint: disable=E0611
 import errno
 import fnmatch
+import functools
 import glob
 import hashlib
 import logging
@@ -65,8 +67,10 @@ from salt.ext.six import text_type as _text_type
 from salt._compat import StringIO
 
 VALID_PROVIDERS = ('gitpython', 'pygit2', 'dulwich')
-PER_REMOTE_PARAMS = ('base', 'mountpoint', 'root')
+PER_REMOTE_PARAMS = ('base', 'mountpoint', 'root', 'fetch_timeout')
 SYMLINK_RECURSE_DEPTH = 100
+# Bumped whenever the layout of the gitfs index changes
+INDEX_VERSION = 1
 
 # Auth support (auth params can be global or per-remote, too)
 AUTH_PROVIDERS = ('pygit2',)
@@ -100,6 +104,10 @@ _INVALID_REPO = (
 # Import salt libs
 import salt.utils
 import salt.fileserver
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.process
+import salt.ext.six as six
 from salt.ext.six import string_types
 from salt.exceptions import FileserverConfigError
 from salt.utils.event import tagify
@@ -970,7 +978,7 @@ def _clear_old_remotes():
             pass
     to_remove = []
     for item in cachedir_ls:
-        if item in ('hash', 'refs'):
+        if item in ('hash', 'refs', 'index'):
             continue
         path = os.path.join(bp_, item)
         if os.path.isdir(path):
@@ -1112,9 +1120,218 @@ def lock(remote=None):
     return locked, errors
 
 
+def _fetch(repo, provider):
+    '''
+    Fetch a remote, return whether it changed or None if the fetch failed
+    '''
+    changed = False
+    if provider == 'gitpython':
+        origin = repo['repo'].remotes[0]
+        try:
+            fetch_results = origin.fetch()
+        except AssertionError:
+            fetch_results = origin.fetch()
+        cleaned = _clean_stale(repo)
+        if fetch_results or cleaned:
+            changed = True
+    elif provider == 'pygit2':
+        origin = repo['repo'].remotes[0]
+        refs_pre = repo['repo'].listall_references()
+        try:
+            origin.credentials = repo['credentials']
+        except KeyError:
+            # No credentials configured for this repo
+            pass
+        try:
+            fetch = origin.fetch()
+        except pygit2.errors.GitError as exc:
+            # Using exc.__str__() here to avoid deprecation warning
+            # when referencing exc.message
+            if 'unsupported url protocol' in exc.__str__().lower() \
+                    and isinstance(repo.get('credentials'),
+                                   pygit2.Keypair):
+                log.error(
+                    'Unable to fetch SSH-based gitfs remote {0}. '
+                    'libgit2 must be compiled with libssh2 to support '
+                    'SSH authentication.'.format(repo['url'])
+                )
+                return None
+            raise
+        try:
+            # pygit2.Remote.fetch() returns a dict in pygit2 < 0.21.0
+            received_objects = fetch['received_objects']
+        except (AttributeError, TypeError):
+            # pygit2.Remote.fetch() returns a class instance in
+            # pygit2 >= 0.21.0
+            received_objects = fetch.received_objects
+        if received_objects != 0:
+            log.debug(
+                'gitfs received {0} objects for remote {1}'
+                .format(received_objects, repo['url'])
+            )
+        else:
+            log.debug(
+                'gitfs remote {0} is up-to-date'
+                .format(repo['url'])
+            )
+        # Clean up any stale refs
+        refs_post = repo['repo'].listall_references()
+        cleaned = _clean_stale(repo, refs_post)
+        if received_objects or refs_pre != refs_post or cleaned:
+            changed = True
+    elif provider == 'dulwich':
+        # origin is just a url here, there is no origin object
+        origin = repo['url']
+        client, path = \
+            dulwich.client.get_transport_and_path_from_url(
+                origin, thin_packs=True
+            )
+        refs_pre = repo['repo'].get_refs()
+        try:
+            refs_post = client.fetch(path, repo['repo'])
+        except dulwich.errors.NotGitRepository:
+            log.error(
+                'Dulwich does not recognize remote {0} as a valid '
+                'remote URL. Perhaps it is missing \'.git\' at the '
+                'end.'.format(repo['url'])
+            )
+            return None
+        except KeyError:
+            log.error(
+                'Local repository cachedir {0!r} (corresponding '
+                'remote: {1}) has been corrupted. Salt will now '
+                'attempt to remove the local checkout to allow it to '
+                'be re-initialized in the next fileserver cache '
+                'update.'
+                .format(repo['cachedir'], repo['url'])
+            )
+            try:
+                salt.utils.rm_rf(repo['cachedir'])
+            except OSError as exc:
+                log.error(
+                    'Unable to remove {0!r}: {1}'
+                    .format(repo['cachedir'], exc)
+                )
+            return None
+        if refs_post is None:
+            # Empty repository
+            log.warning(
+                'gitfs remote {0!r} is an empty repository and will '
+                'be skipped.'.format(origin)
+            )
+            return None
+        if refs_pre != refs_post:
+            changed = True
+            # Update local refs
+            for ref in _dulwich_env_refs(refs_post):
+                repo['repo'][ref] = refs_post[ref]
+            # Prune stale refs
+            for ref in repo['repo'].get_refs():
+                if ref not in refs_post:
+                    del repo['repo'][ref]
+    return changed
+
+
+def _clear_stale_lock(repo):
+    '''
+    Remove the update lock of a remote left by a process which exited during
+    the fetch, such as a salt-run which gave up on a fetch which timed out.
+    Return whether the lock was removed. Locks set with lock() hold no pid
+    and are never stale.
+    '''
+    try:
+        with salt.utils.fopen(repo['lockfile'], 'r') as fp_:
+            pid = int(fp_.read().strip())
+    except (IOError, OSError, ValueError):
+        return False
+    if pid == os.getpid() or salt.utils.process.os_is_running(pid):
+        return False
+    log.warning(
+        'Removing the update lock of gitfs remote {0} left by process {1}, '
+        'which is no longer running'.format(repo['url'], pid)
+    )
+    _, errors = clear_lock(repo)
+    return not errors
+
+
+def _lock_update(repo):
+    '''
+    Take the update lock of a remote, writing the pid of this process to it.
+    Return True if the lock was taken, False if it is held or could not be
+    set.
+    '''
+    for _ in range(2):
+        try:
+            fd_ = os.open(repo['lockfile'],
+                          os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                log.error('Unable to set update lock for gitfs remote {0}, '
+                          'skipping: {1}'.format(repo['url'], exc))
+                return False
+            if _clear_stale_lock(repo):
+                continue
+            log.warning(
+                'Update lockfile is present for gitfs remote {0}, skipping. '
+                'If this warning persists, it is possible that the update '
+                'process was interrupted. Removing {1} or running '
+                '\'salt-run fileserver.clear_lock gitfs\' will allow updates '
+                'to continue for this remote.'
+                .format(repo['url'], repo['lockfile'])
+            )
+            return False
+        with os.fdopen(fd_, 'w') as fp_:
+            fp_.write(str(os.getpid()))
+        return True
+    return False
+
+
+def _update_remote(repo, provider):
+    '''
+    Fetch a remote holding its update lock, return whether it changed or None
+    if it was not fetched
+    '''
+    if not _lock_update(repo):
+        return None
+    log.debug('gitfs is fetching from {0}'.format(repo['url']))
+    try:
+        return _fetch(repo, provider)
+    except Exception as exc:
+        # Do not use {0!r} in the error message, as exc is not a string
+        log.error(
+            'Exception \'{0}\' caught while fetching gitfs remote {1}'
+            .format(exc, repo['url']),
+            exc_info_on_loglevel=logging.DEBUG
+        )
+        return None
+    finally:
+        clear_lock(repo)
+
+
+def _fetch_timeout(repo):
+    '''
+    Return the number of seconds the fetch of a remote may take
+    '''
+    try:
+        return float(repo.get('fetch_timeout') or 0)
+    except ValueError:
+        log.error(
+            'Invalid fetch_timeout {0!r} for gitfs remote {1}, not limiting '
+            'the time it takes to fetch it'.format(repo['fetch_timeout'],
+                                                   repo['url'])
+        )
+        return 0
+
+
 def update():
     '''
     Execute a git fetch on all of the repos
+
+    The remotes are fetched concurrently by up to ``gitfs_fetch_workers``
+    threads. Returns a dict mapping the URL of every remote to whether it
+    changed, whether it was fetched and the number of seconds the update
+    took, ``None`` if the fetch did not finish within its ``fetch_timeout``.
+    A remote is not fetched while its update lock is held.
     '''
     # data for the fileserver event
     data = {'changed': False,
@@ -1123,137 +1340,29 @@ def update():
     # _clear_old_remotes runs init(), so use the value from there to avoid a
     # second init()
     data['changed'], repos = _clear_old_remotes()
-    for repo in repos:
-        if os.path.exists(repo['lockfile']):
-            log.warning(
-                'Update lockfile is present for gitfs remote {0}, skipping. '
-                'If this warning persists, it is possible that the update '
-                'process was interrupted. Removing {1} or running '
-                '\'salt-run fileserver.clear_lock gitfs\' will allow updates '
-                'to continue for this remote.'
-                .format(repo['url'], repo['lockfile'])
-            )
-            continue
-        _, errors = lock(repo)
-        if errors:
-            log.error('Unable to set update lock for gitfs remote {0}, '
-                      'skipping.'.format(repo['url']))
-            continue
-        log.debug('gitfs is fetching from {0}'.format(repo['url']))
-        try:
-            if provider == 'gitpython':
-                origin = repo['repo'].remotes[0]
-                try:
-                    fetch_results = origin.fetch()
-                except AssertionError:
-                    fetch_results = origin.fetch()
-                cleaned = _clean_stale(repo)
-                if fetch_results or cleaned:
-                    data['changed'] = True
-            elif provider == 'pygit2':
-                origin = repo['repo'].remotes[0]
-                refs_pre = repo['repo'].listall_references()
-                try:
-                    origin.credentials = repo['credentials']
-                except KeyError:
-                    # No credentials configured for this repo
-                    pass
-                try:
-                    fetch = origin.fetch()
-                except pygit2.errors.GitError as exc:
-                    # Using exc.__str__() here to avoid deprecation warning
-                    # when referencing exc.message
-                    if 'unsupported url protocol' in exc.__str__().lower() \
-                            and isinstance(repo.get('credentials'),
-                                           pygit2.Keypair):
-                        log.error(
-                            'Unable to fetch SSH-based gitfs remote {0}. '
-                            'libgit2 must be compiled with libssh2 to support '
-                            'SSH authentication.'.format(repo['url'])
-                        )
-                        continue
-                    raise
-                try:
-                    # pygit2.Remote.fetch() returns a dict in pygit2 < 0.21.0
-                    received_objects = fetch['received_objects']
-                except (AttributeError, TypeError):
-                    # pygit2.Remote.fetch() returns a class instance in
-                    # pygit2 >= 0.21.0
-                    received_objects = fetch.received_objects
-                if received_objects != 0:
-                    log.debug(
-                        'gitfs received {0} objects for remote {1}'
-                        .format(received_objects, repo['url'])
-                    )
-                else:
-                    log.debug(
-                        'gitfs remote {0} is up-to-date'
-                        .format(repo['url'])
-                    )
-                # Clean up any stale refs
-                refs_post = repo['repo'].listall_references()
-                cleaned = _clean_stale(repo, refs_post)
-                if received_objects or refs_pre != refs_post or cleaned:
-                    data['changed'] = True
-            elif provider == 'dulwich':
-                # origin is just a url here, there is no origin object
-                origin = repo['url']
-                client, path = \
-                    dulwich.client.get_transport_and_path_from_url(
-                        origin, thin_packs=True
-                    )
-                refs_pre = repo['repo'].get_refs()
-                try:
-                    refs_post = client.fetch(path, repo['repo'])
-                except dulwich.errors.NotGitRepository:
-                    log.error(
-                        'Dulwich does not recognize remote {0} as a valid '
-                        'remote URL. Perhaps it is missing \'.git\' at the '
-                        'end.'.format(repo['url'])
-                    )
-                    continue
-                except KeyError:
-                    log.error(
-                        'Local repository cachedir {0!r} (corresponding '
-                        'remote: {1}) has been corrupted. Salt will now '
-                        'attempt to remove the local checkout to allow it to '
-                        'be re-initialized in the next fileserver cache '
-                        'update.'
-                        .format(repo['cachedir'], repo['url'])
-                    )
-                    try:
-                        salt.utils.rm_rf(repo['cachedir'])
-                    except OSError as exc:
-                        log.error(
-                            'Unable to remove {0!r}: {1}'
-                            .format(repo['cachedir'], exc)
-                        )
-                    continue
-                if refs_post is None:
-                    # Empty repository
-                    log.warning(
-                        'gitfs remote {0!r} is an empty repository and will '
-                        'be skipped.'.format(origin)
-                    )
-                    continue
-                if refs_pre != refs_post:
-                    data['changed'] = True
-                    # Update local refs
-                    for ref in _dulwich_env_refs(refs_post):
-                        repo['repo'][ref] = refs_post[ref]
-                    # Prune stale refs
-                    for ref in repo['repo'].get_refs():
-                        if ref not in refs_post:
-                            del repo['repo'][ref]
-        except Exception as exc:
-            # Do not use {0!r} in the error message, as exc is not a string
+    by_url = dict((repo['url'], repo) for repo in repos)
+    ret = {}
+    for url, changed, _, duration in salt.utils.process.iter_threaded(
+            [(repo['url'], functools.partial(_update_remote, repo, provider))
+             for repo in repos],
+            __opts__.get('gitfs_fetch_workers', 1),
+            lambda url: _fetch_timeout(by_url[url]),
+            name='GitFSFetch'):
+        if duration is None:
             log.error(
-                'Exception \'{0}\' caught while fetching gitfs remote {1}'
-                .format(exc, repo['url']),
-                exc_info_on_loglevel=logging.DEBUG
+                'Fetching gitfs remote {0} did not finish within {1} '
+                'seconds, it will be skipped until the fetch finishes or '
+                'this process exits'.format(
+                    url, _fetch_timeout(by_url[url]))
             )
-        finally:
-            clear_lock(repo)
+        else:
+            log.debug('gitfs fetched remote {0} in {1:.3f}s'
+                      .format(url, duration))
+        ret[url] = {'changed': bool(changed),
+                    'fetched': changed is not None,
+                    'duration': duration}
+        if changed:
+            data['changed'] = True
 
     env_cache = os.path.join(__opts__['cachedir'], 'gitfs/envs.p')
     if data.get('changed', False) is True or not os.path.isfile(env_cache):
@@ -1266,6 +1375,9 @@ def update():
             fp_.write(serial.dumps(new_envs))
             log.trace('Wrote env cache data to {0}'.format(env_cache))
 
+    if __opts__.get('gitfs_index', False):
+        _write_index(repos)
+
     # if there is a change, fire an event
     if __opts__.get('fileserver_events', False):
         event = salt.utils.event.get_event(
@@ -1283,6 +1395,270 @@ def update():
     except (IOError, OSError):
         # Hash file won't exist if no files have yet been served up
         pass
+    return ret
+
+
+# The gitfs index, loaded once per process, maps the path of every index file
+# to its (mtime, inode) and contents
+_INDEX = {}
+
+
+def _index_dir():
+    return os.path.join(__opts__['cachedir'], 'gitfs', 'index')
+
+
+def _walk_tree_gitpython(repo, tree):
+    '''
+    Return the files and the directories of a GitPython tree
+    '''
+    files = {}
+    dirs = []
+    for item in tree.traverse():
+        if isinstance(item, git.Tree):
+            dirs.append(item.path)
+        elif isinstance(item, git.Blob):
+            link_tgt = None
+            if stat.S_ISLNK(item.mode):
+                stream = StringIO()
+                item.stream_data(stream)
+                link_tgt = stream.getvalue()
+                stream.close()
+            files[item.path] = (item.hexsha, item.mode, link_tgt)
+    return files, dirs
+
+
+def _walk_tree_pygit2(repo, tree):
+    '''
+    Return the files and the directories of a pygit2 tree
+    '''
+    files = {}
+    dirs = []
+
+    def _traverse(tree, prefix):
+        for entry in iter(tree):
+            path = os.path.join(prefix, entry.name)
+            obj = repo['repo'][entry.oid]
+            if isinstance(obj, pygit2.Tree):
+                dirs.append(path)
+                _traverse(obj, path)
+            elif isinstance(obj, pygit2.Blob):
+                link_tgt = None
+                if stat.S_ISLNK(entry.filemode):
+                    link_tgt = obj.data
+                files[path] = (obj.hex, entry.filemode, link_tgt)
+    _traverse(tree, '')
+    return files, dirs
+
+
+def _walk_tree_dulwich(repo, tree):
+    '''
+    Return the files and the directories of a dulwich tree
+    '''
+    files = {}
+    dirs = []
+
+    def _traverse(tree, prefix):
+        for item in tree.items():
+            path = os.path.join(prefix, item.path)
+            obj = repo['repo'].get_object(item.sha)
+            if isinstance(obj, dulwich.objects.Tree):
+                dirs.append(path)
+                _traverse(obj, path)
+            elif isinstance(obj, dulwich.objects.Blob):
+                link_tgt = None
+                if stat.S_ISLNK(item.mode):
+                    link_tgt = obj.as_raw_string()
+                files[path] = (item.sha, item.mode, link_tgt)
+    _traverse(tree, '')
+    return files, dirs
+
+
+def _tree_sha(tree):
+    '''
+    Return the SHA of a tree of any provider
+    '''
+    for attr in ('hexsha', 'hex', 'id'):
+        sha = getattr(tree, attr, None)
+        if isinstance(sha, string_types):
+            return sha
+    return str(tree.id)
+
+
+def _write_index(repos):
+    '''
+    Index the tree of every environment of the remotes, once per tree SHA.
+    The files, their blob SHA, mode and symlink target are written per tree,
+    the trees of the environments of every remote to remotes.p.
+    '''
+    provider = _get_provider()
+    if provider == 'gitpython':
+        envs_func, tree_func, walk_func = \
+            _envs_gitpython, _get_tree_gitpython, _walk_tree_gitpython
+    elif provider == 'pygit2':
+        envs_func, tree_func, walk_func = \
+            _envs_pygit2, _get_tree_pygit2, _walk_tree_pygit2
+    elif provider == 'dulwich':
+        envs_func, tree_func, walk_func = \
+            _envs_dulwich, _get_tree_dulwich, _walk_tree_dulwich
+    else:
+        return
+    serial = salt.payload.Serial(__opts__)
+    index_dir = _index_dir()
+    remotes = []
+    for repo in repos:
+        remote_dir = os.path.join(index_dir, repo['hash'])
+        trees = {}
+        try:
+            for tgt_env in envs_func(repo):
+                tree = tree_func(repo, tgt_env)
+                if not tree:
+                    continue
+                sha = _tree_sha(tree)
+                trees[tgt_env] = sha
+                index_file = os.path.join(remote_dir, '{0}.p'.format(sha))
+                if os.path.isfile(index_file):
+                    continue
+                files, dirs = walk_func(repo, tree)
+                if not os.path.isdir(remote_dir):
+                    os.makedirs(remote_dir)
+                with salt.utils.atomicfile.atomic_open(index_file, 'wb') as fp_:
+                    serial.dump({'files': files, 'dirs': dirs}, fp_)
+                log.debug('gitfs indexed tree {0} of remote {1}'
+                          .format(sha, repo['url']))
+        except Exception as exc:
+            log.error(
+                'Exception \'{0}\' caught while indexing gitfs remote {1}, '
+                'the gitfs index will not be used'.format(exc, repo['url']),
+                exc_info_on_loglevel=logging.DEBUG
+            )
+            _remove_index(os.path.join(index_dir, 'remotes.p'))
+            return
+        remotes.append({'hash': repo['hash'],
+                        'url': repo['url'],
+                        'root': repo['root'],
+                        'mountpoint': repo['mountpoint'],
+                        'envs': trees})
+        # Drop the trees no environment points to anymore
+        if os.path.isdir(remote_dir):
+            for fn_ in os.listdir(remote_dir):
+                if fn_[:-2] not in trees.values():
+                    _remove_index(os.path.join(remote_dir, fn_))
+    if not os.path.isdir(index_dir):
+        os.makedirs(index_dir)
+    with salt.utils.atomicfile.atomic_open(
+            os.path.join(index_dir, 'remotes.p'), 'wb') as fp_:
+        serial.dump({'version': INDEX_VERSION, 'remotes': remotes}, fp_)
+    # Drop the indexes of the remotes no longer configured
+    for item in os.listdir(index_dir):
+        path = os.path.join(index_dir, item)
+        if os.path.isdir(path) \
+                and item not in [remote['hash'] for remote in remotes]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _remove_index(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _read_index(path):
+    '''
+    Return the contents of an index file, read once per process and again
+    whenever it is replaced
+    '''
+    try:
+        stat_ = os.stat(path)
+    except OSError:
+        return None
+    key = (stat_.st_mtime, stat_.st_ino)
+    cached = _INDEX.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    try:
+        with salt.utils.fopen(path, 'rb') as fp_:
+            data = salt.payload.Serial(__opts__).load(fp_)
+    except Exception:
+        log.debug('Unable to read the gitfs index file {0}'.format(path))
+        return None
+    _INDEX[path] = (key, data)
+    return data
+
+
+def _get_index(tgt_env):
+    '''
+    Return a list of (remote, index) tuples for the remotes providing the
+    environment from the gitfs index, in the order of the remotes, or None
+    if the index is disabled or does not match the configured remotes
+    '''
+    if not __opts__.get('gitfs_index', False):
+        return None
+    data = _read_index(os.path.join(_index_dir(), 'remotes.p'))
+    if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+        return None
+    urls = [next(iter(remote)) if isinstance(remote, dict) else remote
+            for remote in __opts__['gitfs_remotes']]
+    if [remote['url'] for remote in data['remotes']] != urls:
+        return None
+    ret = []
+    for remote in data['remotes']:
+        sha = remote['envs'].get(tgt_env)
+        if sha is None:
+            continue
+        index = _read_index(
+            os.path.join(_index_dir(), remote['hash'], '{0}.p'.format(sha)))
+        if index is None:
+            return None
+        ret.append((remote, index))
+    return ret
+
+
+def _index_blob(index, repo_path):
+    '''
+    Return the SHA of the blob of a file in the index, following symlinks
+    '''
+    for _ in range(SYMLINK_RECURSE_DEPTH):
+        entry = index['files'].get(repo_path)
+        if entry is None:
+            return None
+        blob_sha, _, link_tgt = entry
+        if link_tgt is None:
+            return blob_sha
+        repo_path = os.path.normpath(
+            os.path.join(os.path.dirname(repo_path), link_tgt)
+        )
+    return None
+
+
+def _index_path(remote, repo_path):
+    '''
+    Return the fileserver path of a path in a remote, None if it is not
+    under the root of the remote
+    '''
+    if remote['root']:
+        if not repo_path.startswith(remote['root'] + os.path.sep):
+            return None
+        repo_path = os.path.relpath(repo_path, remote['root'])
+    return os.path.join(remote['mountpoint'], repo_path)
+
+
+def _write_blob(repo_hash, blob_sha, fp_):
+    '''
+    Write the contents of a blob of a remote to a file
+    '''
+    provider = _get_provider()
+    for repo in init():
+        if repo['hash'] != repo_hash:
+            continue
+        if provider == 'gitpython':
+            git.Blob(repo['repo'], binascii.unhexlify(blob_sha)).stream_data(fp_)
+        elif provider == 'pygit2':
+            fp_.write(repo['repo'][blob_sha].data)
+        elif provider == 'dulwich':
+            fp_.write(repo['repo'].get_object(blob_sha).as_raw_string())
+        return
+    raise KeyError(repo_hash)
 
 
 def _env_is_exposed(env):
@@ -1397,18 +1773,10 @@ def find_file(path, tgt_env='base', **kwargs):  # pylint: disable=W0613
 
     provider = _get_provider()
     dest = os.path.join(__opts__['cachedir'], 'gitfs/refs', tgt_env, path)
-    hashes_glob = os.path.join(__opts__['cachedir'],
-                               'gitfs/hash',
-                               tgt_env,
-                               '{0}.hash.*'.format(path))
     blobshadest = os.path.join(__opts__['cachedir'],
                                'gitfs/hash',
                                tgt_env,
                                '{0}.hash.blob_sha1'.format(path))
-    lk_fn = os.path.join(__opts__['cachedir'],
-                         'gitfs/hash',
-                         tgt_env,
-                         '{0}.lk'.format(path))
     destdir = os.path.dirname(dest)
     hashdir = os.path.dirname(blobshadest)
     if not os.path.isdir(destdir):
@@ -1426,6 +1794,24 @@ def find_file(path, tgt_env='base', **kwargs):  # pylint: disable=W0613
             os.remove(hashdir)
             os.makedirs(hashdir)
 
+    index = _get_index(tgt_env)
+    if index is not None:
+        # Only the blobs which are not cached yet are read out of git
+        for remote, tree_index in index:
+            if remote['mountpoint'] \
+                    and not path.startswith(remote['mountpoint'] + os.path.sep):
+                continue
+            repo_path = path[len(remote['mountpoint']):].lstrip(os.path.sep)
+            if remote['root']:
+                repo_path = os.path.join(remote['root'], repo_path)
+            blob_hexsha = _index_blob(tree_index, repo_path)
+            if blob_hexsha is None:
+                continue
+            return _cache_blob(
+                path, tgt_env, blob_hexsha,
+                functools.partial(_write_blob, remote['hash'], blob_hexsha))
+        return fnd
+
     for repo in init():
         if repo['mountpoint'] \
                 and not path.startswith(repo['mountpoint'] + os.path.sep):
@@ -1529,37 +1915,61 @@ def find_file(path, tgt_env='base', **kwargs):  # pylint: disable=W0613
                 continue
             blob_hexsha = blob.sha().hexdigest()
 
-        salt.fileserver.wait_lock(lk_fn, dest)
-        if os.path.isfile(blobshadest) and os.path.isfile(dest):
-            with salt.utils.fopen(blobshadest, 'r') as fp_:
-                sha = fp_.read()
-                if sha == blob_hexsha:
-                    fnd['rel'] = path
-                    fnd['path'] = dest
-                    return fnd
-        with salt.utils.fopen(lk_fn, 'w+') as fp_:
-            fp_.write('')
-        for filename in glob.glob(hashes_glob):
-            try:
-                os.remove(filename)
-            except Exception:
-                pass
-        with salt.utils.fopen(dest, 'w+') as fp_:
-            if provider == 'gitpython':
-                blob.stream_data(fp_)
-            elif provider == 'pygit2':
-                fp_.write(blob.data)
-            elif provider == 'dulwich':
-                fp_.write(blob.as_raw_string())
-        with salt.utils.fopen(blobshadest, 'w+') as fp_:
-            fp_.write(blob_hexsha)
+        if provider == 'gitpython':
+            write = blob.stream_data
+        elif provider == 'pygit2':
+            write = lambda fp_: fp_.write(blob.data)
+        elif provider == 'dulwich':
+            write = lambda fp_: fp_.write(blob.as_raw_string())
+        return _cache_blob(path, tgt_env, blob_hexsha, write)
+    return fnd
+
+
+def _cache_blob(path, tgt_env, blob_hexsha, write):
+    '''
+    Make sure the cached copy of a file holds the blob, calling write with the
+    open cache file if it does not
+    '''
+    fnd = {'path': '',
+           'rel': ''}
+    dest = os.path.join(__opts__['cachedir'], 'gitfs/refs', tgt_env, path)
+    hashes_glob = os.path.join(__opts__['cachedir'],
+                               'gitfs/hash',
+                               tgt_env,
+                               '{0}.hash.*'.format(path))
+    blobshadest = os.path.join(__opts__['cachedir'],
+                               'gitfs/hash',
+                               tgt_env,
+                               '{0}.hash.blob_sha1'.format(path))
+    lk_fn = os.path.join(__opts__['cachedir'],
+                         'gitfs/hash',
+                         tgt_env,
+                         '{0}.lk'.format(path))
+    salt.fileserver.wait_lock(lk_fn, dest)
+    if os.path.isfile(blobshadest) and os.path.isfile(dest):
+        with salt.utils.fopen(blobshadest, 'r') as fp_:
+            sha = fp_.read()
+            if sha == blob_hexsha:
+                fnd['rel'] = path
+                fnd['path'] = dest
+                return fnd
+    with salt.utils.fopen(lk_fn, 'w+') as fp_:
+        fp_.write('')
+    for filename in glob.glob(hashes_glob):
         try:
-            os.remove(lk_fn)
-        except OSError:
+            os.remove(filename)
+        except Exception:
             pass
-        fnd['rel'] = path
-        fnd['path'] = dest
-        return fnd
+    with salt.utils.fopen(dest, 'w+') as fp_:
+        write(fp_)
+    with salt.utils.fopen(blobshadest, 'w+') as fp_:
+        fp_.write(blob_hexsha)
+    try:
+        os.remove(lk_fn)
+    except OSError:
+        pass
+    fnd['rel'] = path
+    fnd['path'] = dest
     return fnd
 
 
@@ -1590,13 +2000,12 @@ def serve_file(load, fnd):
         return ret
     ret['dest'] = fnd['rel']
     gzip = load.get('gzip', None)
-    with salt.utils.fopen(fnd['path'], 'rb') as fp_:
-        fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
-        if gzip and data:
-            data = salt.utils.gzip_util.compress(data, gzip)
-            ret['gzip'] = gzip
-        ret['data'] = data
+    data, ret['size'] = salt.fileserver.read_chunk(
+        fnd['path'], load['loc'], __opts__['file_buffer_size'])
+    if gzip and data:
+        data = salt.utils.gzip_util.compress(data, gzip)
+        ret['gzip'] = gzip
+    ret['data'] = data
     return ret
 
 
@@ -1710,6 +2119,18 @@ def _get_file_list(load):
         return [], {}
     files = set()
     symlinks = {}
+    index = _get_index(load['saltenv'])
+    if index is not None:
+        for remote, tree_index in index:
+            for repo_path, (_, _, link_tgt) \
+                    in six.iteritems(tree_index['files']):
+                file_path = _index_path(remote, repo_path)
+                if file_path is None:
+                    continue
+                files.add(file_path)
+                if link_tgt is not None:
+                    symlinks[file_path] = link_tgt
+        return sorted(files), symlinks
     for repo in init():
         fl_func = None
         if provider == 'gitpython':
@@ -1895,6 +2316,16 @@ def _get_dir_list(load):
     if 'saltenv' not in load or load['saltenv'] not in envs():
         return []
     ret = set()
+    index = _get_index(load['saltenv'])
+    if index is not None:
+        for remote, tree_index in index:
+            for repo_path in tree_index['dirs']:
+                dir_path = _index_path(remote, repo_path)
+                if dir_path is not None:
+                    ret.add(dir_path)
+            if remote['mountpoint']:
+                ret.add(remote['mountpoint'])
+        return sorted(ret)
     for repo in init():
         if provider == 'gitpython':
             ret.update(
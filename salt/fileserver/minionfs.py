@@ -123,13 +123,12 @@ def serve_file(load, fnd):
     # AP
     # May I sleep here to slow down serving of big files?
     # How many threads are serving files?
-    with salt.utils.fopen(fnd['path'], 'rb') as fp_:
-        fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
-        if gzip and data:
-            data = salt.utils.gzip_util.compress(data, gzip)
-            ret['gzip'] = gzip
-        ret['data'] = data
+    data, ret['size'] = salt.fileserver.read_chunk(
+        fnd['path'], load['loc'], __opts__['file_buffer_size'])
+    if gzip and data:
+        data = salt.utils.gzip_util.compress(data, gzip)
+        ret['gzip'] = gzip
+    ret['data'] = data
     return ret
 
 
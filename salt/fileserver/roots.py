@@ -19,16 +19,25 @@ from __future__ import absolute_import
 
 # Import python libs
 import os
+import shutil
 import logging
+import tempfile
 
 # Import salt libs
 import salt.fileserver
+import salt.payload
 import salt.utils
 from salt.utils.event import tagify
 import salt.ext.six as six
 
 log = logging.getLogger(__name__)
 
+# File hashes by saltenv and relative path, each entry holding the path,
+# mtime, size and inode the hash was computed for, followed by the hash
+_HASH_INDEX = {}
+# The mtime of the shared hash index when it was last loaded
+_HASH_INDEX_MTIME = {}
+
 
 def find_file(path, saltenv='base', env=None, **kwargs):
     '''
@@ -100,13 +109,12 @@ def serve_file(load, fnd):
         return ret
     ret['dest'] = fnd['rel']
     gzip = load.get('gzip', None)
-    with salt.utils.fopen(os.path.normpath(fnd['path']), 'rb') as fp_:
-        fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
-        if gzip and data:
-            data = salt.utils.gzip_util.compress(data, gzip)
-            ret['gzip'] = gzip
-        ret['data'] = data
+    data, ret['size'] = salt.fileserver.read_chunk(
+        fnd['path'], load['loc'], __opts__['file_buffer_size'])
+    if gzip and data:
+        data = salt.utils.gzip_util.compress(data, gzip)
+        ret['gzip'] = gzip
+    ret['data'] = data
     return ret
 
 
@@ -114,14 +122,18 @@ def update():
     '''
     When we are asked to update (regular interval) lets reap the cache
     '''
-    try:
-        salt.fileserver.reap_fileserver_cache_dir(
-            os.path.join(__opts__['cachedir'], 'roots/hash'),
-            find_file
-        )
-    except (IOError, OSError):
-        # Hash file won't exist if no files have yet been served up
-        pass
+    # File hashes used to be cached in one file per served file, they are now
+    # kept in a single hash index
+    shutil.rmtree(os.path.join(__opts__['cachedir'], 'roots/hash'),
+                  ignore_errors=True)
+    # Only the master shares the hash index between its processes, a
+    # masterless minion hashes the files it is asked for
+    if __opts__.get('__role') == 'master' \
+            and __opts__.get('fileserver_hash_warm', True):
+        try:
+            _warm_hash_index()
+        except (IOError, OSError):
+            log.error('Failed to update the roots hash index', exc_info=True)
 
     mtime_map_path = os.path.join(__opts__['cachedir'], 'roots/mtime_map')
     # data to send on event
@@ -167,6 +179,119 @@ def update():
         event.fire_event(data, tagify(['roots', 'update'], prefix='fileserver'))
 
 
+def _hash_index_path():
+    '''
+    Return the path of the hash index shared by the master processes
+    '''
+    return os.path.join(__opts__['cachedir'],
+                        'roots',
+                        'hash_index.{0}.p'.format(__opts__['hash_type']))
+
+
+def _load_hash_index():
+    '''
+    Replace the in-memory hash index of every saltenv in the shared one if it
+    was rewritten since it was last loaded
+    '''
+    index_path = _hash_index_path()
+    try:
+        mtime = os.path.getmtime(index_path)
+    except OSError:
+        return
+    if _HASH_INDEX_MTIME.get(index_path) == mtime:
+        return
+    serial = salt.payload.Serial(__opts__)
+    try:
+        with salt.utils.fopen(index_path, 'rb') as fp_:
+            data = serial.load(fp_)
+    except Exception:
+        log.debug('Failed to load the roots hash index', exc_info=True)
+        return
+    _HASH_INDEX_MTIME[index_path] = mtime
+    # Replace rather than merge, files removed from the index are gone
+    for saltenv, entries in six.iteritems(data):
+        _HASH_INDEX[saltenv] = entries
+
+
+def _write_hash_index():
+    '''
+    Atomically write the in-memory hash index for the other master processes
+    '''
+    index_path = _hash_index_path()
+    index_dir = os.path.dirname(index_path)
+    if not os.path.isdir(index_dir):
+        os.makedirs(index_dir)
+    serial = salt.payload.Serial(__opts__)
+    tmpfh, tmpfname = tempfile.mkstemp(dir=index_dir)
+    os.close(tmpfh)
+    with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+        fp_.write(serial.dumps(_HASH_INDEX))
+    os.rename(tmpfname, index_path)
+    _HASH_INDEX_MTIME[index_path] = os.path.getmtime(index_path)
+
+
+def _cached_hash(saltenv, rel, path, stat):
+    '''
+    Return the indexed hash of a file if it is still valid
+    '''
+    entry = _HASH_INDEX.get(saltenv, {}).get(rel)
+    if entry and entry[:4] == [path, stat.st_mtime, stat.st_size, stat.st_ino]:
+        return entry[4]
+    return None
+
+
+def _get_hash(saltenv, rel, path, stat=None):
+    '''
+    Return the hash of a file, only reading the file when its indexed hash was
+    invalidated by a change of its path, mtime, size or inode
+    '''
+    if stat is None:
+        stat = os.stat(path)
+    hsum = _cached_hash(saltenv, rel, path, stat)
+    if hsum is None:
+        _load_hash_index()
+        hsum = _cached_hash(saltenv, rel, path, stat)
+    if hsum is None:
+        hsum = salt.utils.get_hash(path, __opts__['hash_type'])
+        _HASH_INDEX.setdefault(saltenv, {})[rel] = [
+            path, stat.st_mtime, stat.st_size, stat.st_ino, hsum]
+    return hsum
+
+
+def _warm_hash_index():
+    '''
+    Hash every changed file in the file_roots and publish the hash index to
+    the other master processes
+    '''
+    _load_hash_index()
+    fresh = {}
+    for saltenv, roots in six.iteritems(__opts__['file_roots']):
+        entries = fresh.setdefault(saltenv, {})
+        for root in roots:
+            for dirpath, dirnames, filenames in os.walk(
+                    root,
+                    followlinks=__opts__.get('fileserver_followsymlinks',
+                                             True)):
+                for fname in filenames:
+                    path = os.path.join(dirpath, fname)
+                    rel = os.path.relpath(path, root)
+                    # The first root holding a file is the one serving it
+                    if rel in entries:
+                        continue
+                    if salt.fileserver.is_file_ignored(__opts__, path):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                        _get_hash(saltenv, rel, path, stat)
+                    except (IOError, OSError):
+                        # Dangling symlink or file removed while walking
+                        continue
+                    entries[rel] = _HASH_INDEX[saltenv][rel]
+    _HASH_INDEX.clear()
+    _HASH_INDEX.update(fresh)
+    _write_hash_index()
+
+
 def file_hash(load, fnd):
     '''
     Return a file hash, the hash type is set in the master config file
@@ -190,51 +315,7 @@ def file_hash(load, fnd):
 
     # set the hash_type as it is determined by config-- so mechanism won't change that
     ret['hash_type'] = __opts__['hash_type']
-
-    # check if the hash is cached
-    # cache file's contents should be "hash:mtime"
-    cache_path = os.path.join(__opts__['cachedir'],
-                              'roots/hash',
-                              load['saltenv'],
-                              u'{0}.hash.{1}'.format(fnd['rel'],
-                              __opts__['hash_type']))
-    # if we have a cache, serve that if the mtime hasn't changed
-    if os.path.exists(cache_path):
-        try:
-            with salt.utils.fopen(cache_path, 'rb') as fp_:
-                try:
-                    hsum, mtime = fp_.read().split(':')
-                except ValueError:
-                    log.debug('Fileserver attempted to read incomplete cache file. Retrying.')
-                    # Delete the file since its incomplete (either corrupted or incomplete)
-                    try:
-                        os.unlink(cache_path)
-                    except OSError:
-                        pass
-                    return file_hash(load, fnd)
-                if os.path.getmtime(path) == mtime:
-                    # check if mtime changed
-                    ret['hsum'] = hsum
-                    return ret
-        except (os.error, IOError):  # Can't use Python select() because we need Windows support
-            log.debug("Fileserver encountered lock when reading cache file. Retrying.")
-            # Delete the file since its incomplete (either corrupted or incomplete)
-            try:
-                os.unlink(cache_path)
-            except OSError:
-                pass
-            return file_hash(load, fnd)
-
-    # if we don't have a cache entry-- lets make one
-    ret['hsum'] = salt.utils.get_hash(path, __opts__['hash_type'])
-    cache_dir = os.path.dirname(cache_path)
-    # make cache directory if it doesn't exist
-    if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
-    # save the cache object "hash:mtime"
-    cache_object = '{0}:{1}'.format(ret['hsum'], os.path.getmtime(path))
-    with salt.utils.flopen(cache_path, 'w') as fp_:
-        fp_.write(cache_object)
+    ret['hsum'] = _get_hash(load['saltenv'], fnd['rel'], path)
     return ret
 
 
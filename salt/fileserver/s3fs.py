@@ -224,13 +224,12 @@ def serve_file(load, fnd):
 
     ret['dest'] = _trim_env_off_path([fnd['path']], load['saltenv'])[0]
 
-    with salt.utils.fopen(cached_file_path, 'rb') as fp_:
-        fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
-        if gzip and data:
-            data = salt.utils.gzip_util.compress(data, gzip)
-            ret['gzip'] = gzip
-        ret['data'] = data
+    data, ret['size'] = fs.read_chunk(
+        cached_file_path, load['loc'], __opts__['file_buffer_size'])
+    if gzip and data:
+        data = salt.utils.gzip_util.compress(data, gzip)
+        ret['gzip'] = gzip
+    ret['data'] = data
     return ret
 
 
@@ -20,6 +20,7 @@ from salt.ext.six.moves import input
 import salt.crypt
 import salt.utils
 import salt.utils.event
+import salt.utils.minions
 import salt.daemons.masterapi
 from salt.utils import kinds
 from salt.utils.event import tagify
@@ -451,6 +452,7 @@ class Key(object):
                 opts['transport'],
                 opts=opts,
                 listen=False)
+        self.index = salt.utils.minions.get_key_index(opts)
 
     def _check_minions_directories(self):
         '''
@@ -524,13 +526,15 @@ class Key(object):
         '''
         Accept a glob which to match the of a key and return the key's location
         '''
+        if ',' in match and isinstance(match, str):
+            match = match.split(',')
         if full:
             matches = self.all_keys()
+        elif self.index is not None:
+            matches = self._index_match(match)
         else:
             matches = self.list_keys()
         ret = {}
-        if ',' in match and isinstance(match, str):
-            match = match.split(',')
         for status, keys in matches.items():
             for key in salt.utils.isorted(keys):
                 if isinstance(match, list):
@@ -546,6 +550,41 @@ class Key(object):
                         ret[status].append(key)
         return ret
 
+    def _index_match(self, match):
+        '''
+        Return the keys in every key directory matching the glob or list of
+        globs from the key index
+        '''
+        ret = {}
+        for dir_ in self._check_minions_directories():
+            status = os.path.basename(dir_)
+            if isinstance(match, list):
+                found = set()
+                for match_item in match:
+                    found.update(self.index.glob(status, match_item))
+                ret[status] = list(found)
+            else:
+                ret[status] = self.index.glob(status, match)
+        return ret
+
+    def _refresh_index(self):
+        '''
+        Bring the key index up to date after keys were moved or removed
+        '''
+        if self.index is not None:
+            self.index.refresh(
+                [os.path.basename(dir_)
+                 for dir_ in self._check_minions_directories()])
+
+    def _list_dir(self, dir_):
+        '''
+        Return the sorted names of the keys in a key directory
+        '''
+        if self.index is not None:
+            return list(self.index.keys(os.path.basename(dir_)))
+        return [fn_ for fn_ in salt.utils.isorted(os.listdir(dir_))
+                if os.path.isfile(os.path.join(dir_, fn_))]
+
     def dict_match(self, match_dict):
         '''
         Accept a dictionary of keys and return the current state of the
@@ -592,9 +631,7 @@ class Key(object):
         for dir_ in key_dirs:
             ret[os.path.basename(dir_)] = []
             try:
-                for fn_ in salt.utils.isorted(os.listdir(dir_)):
-                    if os.path.isfile(os.path.join(dir_, fn_)):
-                        ret[os.path.basename(dir_)].append(fn_)
+                ret[os.path.basename(dir_)] = self._list_dir(dir_)
             except (OSError, IOError):
                 # key dir kind is not created yet, just skip
                 continue
@@ -615,25 +652,13 @@ class Key(object):
         acc, pre, rej, den = self._check_minions_directories()
         ret = {}
         if match.startswith('acc'):
-            ret[os.path.basename(acc)] = []
-            for fn_ in salt.utils.isorted(os.listdir(acc)):
-                if os.path.isfile(os.path.join(acc, fn_)):
-                    ret[os.path.basename(acc)].append(fn_)
+            ret[os.path.basename(acc)] = self._list_dir(acc)
         elif match.startswith('pre') or match.startswith('un'):
-            ret[os.path.basename(pre)] = []
-            for fn_ in salt.utils.isorted(os.listdir(pre)):
-                if os.path.isfile(os.path.join(pre, fn_)):
-                    ret[os.path.basename(pre)].append(fn_)
+            ret[os.path.basename(pre)] = self._list_dir(pre)
         elif match.startswith('rej'):
-            ret[os.path.basename(rej)] = []
-            for fn_ in salt.utils.isorted(os.listdir(rej)):
-                if os.path.isfile(os.path.join(rej, fn_)):
-                    ret[os.path.basename(rej)].append(fn_)
+            ret[os.path.basename(rej)] = self._list_dir(rej)
         elif match.startswith('den'):
-            ret[os.path.basename(den)] = []
-            for fn_ in salt.utils.isorted(os.listdir(den)):
-                if os.path.isfile(os.path.join(den, fn_)):
-                    ret[os.path.basename(den)].append(fn_)
+            ret[os.path.basename(den)] = self._list_dir(den)
         elif match.startswith('all'):
             return self.all_keys()
         return ret
@@ -664,6 +689,14 @@ class Key(object):
                     ret[status][key] = fp_.read()
         return ret
 
+    def _forget_key(self, key):
+        '''
+        Drop the accepted key of a minion from the public key cache of this
+        process, the other processes notice the change of the key file
+        '''
+        salt.crypt.forget_pub_key(
+            os.path.join(self.opts['pki_dir'], self.ACC, key))
+
     def accept(self, match=None, match_dict=None, include_rejected=False):
         '''
         Accept public keys. If "match" is passed, it is evaluated as a glob.
@@ -691,12 +724,14 @@ class Key(object):
                                 self.ACC,
                                 key)
                             )
+                    self._forget_key(key)
                     eload = {'result': True,
                              'act': 'accept',
                              'id': key}
                     self.event.fire_event(eload, tagify(prefix='key'))
                 except (IOError, OSError):
                     pass
+        self._refresh_index()
         return (
             self.name_match(match) if match is not None
             else self.dict_match(matches)
@@ -719,12 +754,14 @@ class Key(object):
                             self.ACC,
                             key)
                         )
+                self._forget_key(key)
                 eload = {'result': True,
                          'act': 'accept',
                          'id': key}
                 self.event.fire_event(eload, tagify(prefix='key'))
             except (IOError, OSError):
                 pass
+        self._refresh_index()
         return self.list_keys()
 
     def delete_key(self, match=None, match_dict=None, preserve_minions=False):
@@ -744,12 +781,14 @@ class Key(object):
             for key in keys:
                 try:
                     os.remove(os.path.join(self.opts['pki_dir'], status, key))
+                    self._forget_key(key)
                     eload = {'result': True,
                              'act': 'delete',
                              'id': key}
                     self.event.fire_event(eload, tagify(prefix='key'))
                 except (OSError, IOError):
                     pass
+        self._refresh_index()
         self.check_minion_cache(preserve_minions=matches.get('minions', []))
         if self.opts.get('rotate_aes_key'):
             salt.crypt.dropfile(self.opts['cachedir'], self.opts['user'])
@@ -766,12 +805,14 @@ class Key(object):
             for key in keys:
                 try:
                     os.remove(os.path.join(self.opts['pki_dir'], status, key))
+                    self._forget_key(key)
                     eload = {'result': True,
                              'act': 'delete',
                              'id': key}
                     self.event.fire_event(eload, tagify(prefix='key'))
                 except (OSError, IOError):
                     pass
+        self._refresh_index()
         self.check_minion_cache()
         if self.opts.get('rotate_aes_key'):
             salt.crypt.dropfile(self.opts['cachedir'], self.opts['user'])
@@ -804,12 +845,14 @@ class Key(object):
                                 self.REJ,
                                 key)
                             )
+                    self._forget_key(key)
                     eload = {'result': True,
                             'act': 'reject',
                             'id': key}
                     self.event.fire_event(eload, tagify(prefix='key'))
                 except (IOError, OSError):
                     pass
+        self._refresh_index()
         self.check_minion_cache()
         if self.opts.get('rotate_aes_key'):
             salt.crypt.dropfile(self.opts['cachedir'], self.opts['user'])
@@ -835,12 +878,14 @@ class Key(object):
                             self.REJ,
                             key)
                         )
+                self._forget_key(key)
                 eload = {'result': True,
                          'act': 'reject',
                          'id': key}
                 self.event.fire_event(eload, tagify(prefix='key'))
             except (IOError, OSError):
                 pass
+        self._refresh_index()
         self.check_minion_cache()
         if self.opts.get('rotate_aes_key'):
             salt.crypt.dropfile(self.opts['cachedir'], self.opts['user'])
@@ -10,10 +10,13 @@ import os
 import imp
 import sys
 import salt
+import json
+import hashlib
 import logging
 import inspect
 import tempfile
 import time
+import functools
 
 from collections import MutableMapping
 
@@ -21,8 +24,11 @@ from collections import MutableMapping
 from salt.exceptions import LoaderError
 from salt.template import check_render_pipe_str
 from salt.utils.decorators import Depends
+import salt.payload
+import salt.utils.atomicfile
 import salt.utils.lazy
 import salt.utils.odict
+import salt.utils.process
 
 # Solve the Chicken and egg problem where grains need to run before any
 # of the modules are loaded and are generally available for any usage.
@@ -39,6 +45,11 @@ log = logging.getLogger(__name__)
 SALT_BASE_PATH = os.path.abspath(os.path.dirname(salt.__file__))
 LOADED_BASE_NAME = 'salt.loaded'
 
+# Bumped whenever the layout of the persistent loader index changes
+LOADER_INDEX_VERSION = 1
+# Bumped whenever the layout of the grains cache changes
+GRAINS_CACHE_VERSION = 2
+
 # Because on the cloud drivers we do `from salt.cloud.libcloudfuncs import *`
 # which simplifies code readability, it adds some unsupported functions into
 # the driver's module scope.
@@ -423,11 +434,401 @@ def render(opts, functions, states=None):
     return rend
 
 
-def grains(opts, force_refresh=False):
+def _grains_cache_path(opts):
+    return os.path.join(opts['cachedir'], 'grains.cache.p')
+
+
+def _read_grains_cache(opts):
+    '''
+    Return the grains cached per grain function and the order the grain
+    functions are merged in, the cache used to hold the merged grains
+    '''
+    try:
+        with salt.utils.fopen(_grains_cache_path(opts), 'rb') as fp_:
+            cache = salt.payload.Serial(opts).load(fp_)
+    except (IOError, OSError):
+        log.debug('Grains cache file does not exist.')
+        return {}, []
+    except Exception:
+        log.debug('Discarding the corrupted grains cache')
+        return {}, []
+    if not isinstance(cache, dict) or cache.get('version') != GRAINS_CACHE_VERSION:
+        return {}, []
+    return cache.get('funcs', {}), cache.get('order', [])
+
+
+def _cached_grains(funcs, order, expiration):
+    '''
+    Return the grains merged from the grains cache, or None unless the grains
+    of every grain function were cached less than expiration seconds ago
+    '''
+    if not order:
+        return None
+    now = time.time()
+    merged = {}
+    for name in order:
+        entry = funcs.get(name)
+        if entry is None or now - entry['time'] > expiration:
+            return None
+        merged.update(entry['grains'])
+    return merged
+
+
+def _write_grains_cache(opts, funcs, order=None):
+    '''
+    Write the grains returned by every grain function, and the order they are
+    merged in, to the grains cache
+    '''
+    cfn = _grains_cache_path(opts)
+    cumask = os.umask(0o77)
+    try:
+        if salt.utils.is_windows():
+            # Make sure cache file isn't read-only
+            __salt__['cmd.run']('attrib -R "{0}"'.format(cfn))
+        with salt.utils.fopen(cfn, 'w+b') as fp_:
+            try:
+                serial = salt.payload.Serial(opts)
+                serial.dump({'version': GRAINS_CACHE_VERSION,
+                             'funcs': funcs,
+                             'order': order or []}, fp_)
+            except TypeError:
+                # Can't serialize pydsl
+                pass
+    except (IOError, OSError):
+        msg = 'Unable to write to grains cache file {0}'
+        log.error(msg.format(cfn))
+    os.umask(cumask)
+
+
+class LazyGrains(dict):
+    '''
+    The grains of a minion, running the grain functions which provide a grain
+    when it is first looked up
+
+    Which grains every function provides is learned from the grains cache, a
+    grain no function is known to provide runs all of them. Anything looking
+    at all the grains at once, such as iterating, copying or serializing them,
+    runs the remaining functions first. ``dict(grains)`` and ``**grains`` read
+    the dict directly and only see the grains looked up so far, use
+    ``grains.copy()`` instead.
+
+    The grain functions needed at once are run by up to ``threads`` threads,
+    their grains are still merged in the order of the functions. A function
+    which does not return within its timeout is left running in the
+    background, the grains it returned last time, if cached, are used instead.
+    '''
+    def __init__(self, funcs, overrides=None, cache=None, expiration=None,
+                 save=None, threads=1, timeout=0, timeouts=None):
+        '''
+        funcs is the list of (name, function) tuples of the grain functions
+        in the order their grains are merged, overrides the grains set in the
+        config. The grains cached for less than expiration seconds are used
+        rather than running the function again, save is called with the
+        updated cache.
+
+        timeout is the number of seconds a grain function may run, timeouts
+        overrides it per function or per grain module, such as
+        ``core.hostname`` or ``core``. 0 means no limit.
+        '''
+        super(LazyGrains, self).__init__()
+        self._funcs = funcs
+        self._overrides = overrides or {}
+        self._cache = cache if cache is not None else {}
+        self._expiration = expiration
+        self._save = save
+        self._threads = threads
+        self._timeout = timeout
+        self._timeouts = timeouts or {}
+        self._dirty = False
+        self._results = {}
+        # seconds every grain function ran for
+        self._timings = {}
+        # grains which were looked up, set or deleted
+        self._done = set()
+        self._complete = False
+        self._providers = {}
+        for name, _ in funcs:
+            for grain in self._cache.get(name, {}).get('grains', {}):
+                self._providers.setdefault(grain, []).append(name)
+
+    def _cached(self, name):
+        '''
+        Return the cached grains of a grain function if they did not expire
+        '''
+        entry = self._cache.get(name)
+        if self._expiration is not None and entry is not None \
+                and time.time() - entry['time'] <= self._expiration:
+            return entry['grains']
+        return None
+
+    def _get_timeout(self, name):
+        if name in self._timeouts:
+            return self._timeouts[name]
+        return self._timeouts.get(name.split('.')[0], self._timeout)
+
+    def _call(self, name, fun):
+        '''
+        Run a grain function, return its grains and the exc_info of the error
+        it raised
+        '''
+        start = time.time()
+        try:
+            return fun(), None
+        except Exception:
+            return None, sys.exc_info()
+        finally:
+            self._timings[name] = time.time() - start
+
+    def _store(self, name, fun, ret, exc_info):
+        '''
+        Store the result of a grain function
+        '''
+        log.debug('Grain function {0} ran in {1:.3f}s'.format(
+            name, self._timings.get(name, 0)))
+        if exc_info is not None:
+            if name.startswith('core.'):
+                six.reraise(*exc_info)
+            log.critical(
+                'Failed to load grains defined in grain file {0} in '
+                'function {1}, error:\n'.format(
+                    name, fun
+                ),
+                exc_info=exc_info
+            )
+            ret = {}
+        if not isinstance(ret, dict):
+            ret = {}
+        self._cache[name] = {'time': time.time(), 'grains': ret}
+        self._dirty = True
+        self._results[name] = ret
+
+    def _timed_out(self, name):
+        '''
+        Fall back to the cached grains of a grain function which timed out
+        '''
+        entry = self._cache.get(name)
+        log.warning(
+            'Grain function {0} did not return within {1} seconds, {2}'.format(
+                name,
+                self._get_timeout(name),
+                'using the grains it returned last' if entry is not None
+                else 'skipping its grains'))
+        self._results[name] = entry['grains'] if entry is not None else {}
+
+    def _run(self, name, fun):
+        '''
+        Return the grains of a grain function
+        '''
+        if name in self._results:
+            return self._results[name]
+        ret = self._cached(name)
+        if ret is not None:
+            self._results[name] = ret
+            return ret
+        if self._get_timeout(name):
+            self._run_threaded([(name, fun)])
+        else:
+            self._store(name, fun, *self._call(name, fun))
+        return self._results[name]
+
+    def _prefetch(self, funcs):
+        '''
+        Run the grain functions in threads when there is more than one to run
+        '''
+        pending = [(name, fun) for name, fun in funcs
+                   if name not in self._results and self._cached(name) is None]
+        if len(pending) > 1 and self._threads > 1:
+            self._run_threaded(pending)
+
+    def _run_threaded(self, funcs):
+        '''
+        Run the grain functions in worker threads, giving up on a function
+        once it ran for longer than its timeout
+        '''
+        by_name = dict(funcs)
+        for name, ret, exc_info, duration in salt.utils.process.iter_threaded(
+                funcs, self._threads, self._get_timeout, name='GrainsWorker'):
+            if duration is None:
+                self._timed_out(name)
+                continue
+            self._timings[name] = duration
+            self._store(name, by_name[name], ret, exc_info)
+
+    def _flush(self):
+        if self._dirty and self._save is not None:
+            self._save(self._cache)
+        self._dirty = False
+
+    def _resolve(self, grain):
+        '''
+        Run the grain functions providing the grain
+        '''
+        if self._complete or grain in self._done:
+            return
+        if grain in self._overrides:
+            super(LazyGrains, self).__setitem__(grain, self._overrides[grain])
+            self._done.add(grain)
+            return
+        providers = self._providers.get(grain)
+        if not providers:
+            self._load_all()
+            return
+        self._prefetch([(name, fun) for name, fun in self._funcs
+                        if name in providers])
+        found = False
+        for name, fun in self._funcs:
+            if name in providers and grain in self._run(name, fun):
+                super(LazyGrains, self).__setitem__(
+                    grain, self._results[name][grain])
+                found = True
+        self._flush()
+        if found:
+            self._done.add(grain)
+        else:
+            # the grain was cached but is gone
+            self._load_all()
+
+    def _load_all(self):
+        '''
+        Run the remaining grain functions
+        '''
+        if self._complete:
+            return
+        start = time.time()
+        self._prefetch(self._funcs)
+        merged = {}
+        for name, fun in self._funcs:
+            merged.update(self._run(name, fun))
+        if self._timings:
+            slowest = max(self._timings, key=self._timings.get)
+            log.debug(
+                'Ran {0} grain functions in {1:.3f}s, the slowest was {2} '
+                'with {3:.3f}s'.format(len(self._timings),
+                                       time.time() - start,
+                                       slowest,
+                                       self._timings[slowest]))
+        merged.update(self._overrides)
+        for grain, val in six.iteritems(merged):
+            if grain not in self._done:
+                super(LazyGrains, self).__setitem__(grain, val)
+        self._complete = True
+        self._flush()
+
+    def __missing__(self, key):
+        self._resolve(key)
+        if super(LazyGrains, self).__contains__(key):
+            return super(LazyGrains, self).__getitem__(key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        self._resolve(key)
+        return super(LazyGrains, self).__contains__(key)
+
+    has_key = __contains__
+
+    def get(self, key, default=None):
+        self._resolve(key)
+        return super(LazyGrains, self).get(key, default)
+
+    def __setitem__(self, key, val):
+        self._done.add(key)
+        super(LazyGrains, self).__setitem__(key, val)
+
+    def __delitem__(self, key):
+        self._resolve(key)
+        self._done.add(key)
+        super(LazyGrains, self).__delitem__(key)
+
+    def setdefault(self, key, default=None):
+        self._resolve(key)
+        self._done.add(key)
+        return super(LazyGrains, self).setdefault(key, default)
+
+    def pop(self, key, *args):
+        self._resolve(key)
+        self._done.add(key)
+        return super(LazyGrains, self).pop(key, *args)
+
+    def update(self, *args, **kwargs):
+        for key, val in six.iteritems(dict(*args, **kwargs)):
+            self[key] = val
+
+    def __nonzero__(self):
+        if self._complete:
+            return super(LazyGrains, self).__len__() > 0
+        return True
+
+    __bool__ = __nonzero__
+
+    def __reduce__(self):
+        # copies and pickles are plain dicts
+        return (dict, (self.copy(),))
+
+    def keys(self):
+        self._load_all()
+        return super(LazyGrains, self).keys()
+
+    def values(self):
+        self._load_all()
+        return super(LazyGrains, self).values()
+
+    def items(self):
+        self._load_all()
+        return super(LazyGrains, self).items()
+
+    def iterkeys(self):
+        self._load_all()
+        return super(LazyGrains, self).iterkeys()
+
+    def itervalues(self):
+        self._load_all()
+        return super(LazyGrains, self).itervalues()
+
+    def iteritems(self):
+        self._load_all()
+        return super(LazyGrains, self).iteritems()
+
+    def __iter__(self):
+        self._load_all()
+        return super(LazyGrains, self).__iter__()
+
+    def __len__(self):
+        self._load_all()
+        return super(LazyGrains, self).__len__()
+
+    def __repr__(self):
+        self._load_all()
+        return super(LazyGrains, self).__repr__()
+
+    def __eq__(self, other):
+        self._load_all()
+        return super(LazyGrains, self).__eq__(other)
+
+    def __ne__(self, other):
+        self._load_all()
+        return super(LazyGrains, self).__ne__(other)
+
+    def popitem(self):
+        self._load_all()
+        return super(LazyGrains, self).popitem()
+
+    def clear(self):
+        self._complete = True
+        return super(LazyGrains, self).clear()
+
+    def copy(self):
+        self._load_all()
+        return dict(super(LazyGrains, self).items())
+
+
+def grains(opts, force_refresh=False, lazy=False):
     '''
     Return the functions for the dynamic grains and the values for the static
     grains.
 
+    With ``lazy`` a :class:`LazyGrains` mapping is returned, which only runs
+    the grain functions providing the grains looked up.
+
     .. code-block:: python
 
         import salt.config
@@ -437,37 +838,18 @@ def grains(opts, force_refresh=False):
         __grains__ = salt.loader.grains(__opts__)
         print __grains__['id']
     '''
+    cache = {}
+    order = []
+    expiration = None
     # if we hae no grains, lets try loading from disk (TODO: move to decorator?)
-    if not force_refresh:
-        if opts.get('grains_cache', False):
-            cfn = os.path.join(
-                opts['cachedir'],
-                'grains.cache.p'
-            )
-            if os.path.isfile(cfn):
-                grains_cache_age = int(time.time() - os.path.getmtime(cfn))
-                if opts.get('grains_cache_expiration', 300) >= grains_cache_age and not \
-                        opts.get('refresh_grains_cache', False) and not force_refresh:
-                    log.debug('Retrieving grains from cache')
-                    try:
-                        serial = salt.payload.Serial(opts)
-                        with salt.utils.fopen(cfn, 'rb') as fp_:
-                            cached_grains = serial.load(fp_)
-                        return cached_grains
-                    except (IOError, OSError):
-                        pass
-                else:
-                    if force_refresh:
-                        log.debug('Grains refresh requested. Refreshing grains.')
-                    else:
-                        log.debug('Grains cache last modified {0} seconds ago and '
-                                  'cache expiration is set to {1}. '
-                                  'Grains cache expired. Refreshing.'.format(
-                                      grains_cache_age,
-                                      opts.get('grains_cache_expiration', 300)
-                                  ))
-            else:
-                log.debug('Grains cache file does not exist.')
+    if opts.get('grains_cache', False) or lazy:
+        cache, order = _read_grains_cache(opts)
+    if opts.get('grains_cache', False) and not force_refresh:
+        if opts.get('refresh_grains_cache', False):
+            log.debug('Grains refresh requested. Refreshing grains.')
+        else:
+            # the grains of every function are refreshed once they expire
+            expiration = opts.get('grains_cache_expiration', 300)
 
     if opts.get('skip_grains', False):
         return {}
@@ -494,62 +876,45 @@ def grains(opts, force_refresh=False):
     else:
         opts['grains'] = {}
 
-    grains_data = {}
+    if expiration is not None:
+        # Do not load the grain modules when none of their grains expired
+        cached = _cached_grains(cache, order, expiration)
+        if cached is not None:
+            log.debug('Retrieving grains from cache')
+            cached.update(opts['grains'])
+            return cached
+
     funcs = LazyLoader(_module_dirs(opts, 'grains', 'grain', ext_type_dirs='grains_dirs'),
                      opts,
                      tag='grains',
                      )
     if force_refresh:  # if we refresh, lets reload grain modules
         funcs.clear()
-    # Run core grains
+    # Run core grains first, then the rest of the grains
+    ordered = []
     for key, fun in six.iteritems(funcs):
-        if not key.startswith('core.'):
-            continue
-        ret = fun()
-        if not isinstance(ret, dict):
-            continue
-        grains_data.update(ret)
-
-    # Run the rest of the grains
+        if key.startswith('core.'):
+            ordered.append((key, fun))
     for key, fun in six.iteritems(funcs):
         if key.startswith('core.') or key == '_errors':
             continue
-        try:
-            ret = fun()
-        except Exception:
-            log.critical(
-                'Failed to load grains defined in grain file {0} in '
-                'function {1}, error:\n'.format(
-                    key, fun
-                ),
-                exc_info=True
-            )
-            continue
-        if not isinstance(ret, dict):
-            continue
-        grains_data.update(ret)
-
-    # Write cache if enabled
-    if opts.get('grains_cache', False):
-        cumask = os.umask(0o77)
-        try:
-            if salt.utils.is_windows():
-                # Make sure cache file isn't read-only
-                __salt__['cmd.run']('attrib -R "{0}"'.format(cfn))
-            with salt.utils.fopen(cfn, 'w+b') as fp_:
-                try:
-                    serial = salt.payload.Serial(opts)
-                    serial.dump(grains_data, fp_)
-                except TypeError:
-                    # Can't serialize pydsl
-                    pass
-        except (IOError, OSError):
-            msg = 'Unable to write to grains cache file {0}'
-            log.error(msg.format(cfn))
-        os.umask(cumask)
-
-    grains_data.update(opts['grains'])
-    return grains_data
+        ordered.append((key, fun))
+
+    save = None
+    if opts.get('grains_cache', False) or lazy:
+        save = functools.partial(_write_grains_cache, opts,
+                                 order=[name for name, _ in ordered])
+    grains_data = LazyGrains(ordered,
+                             overrides=opts['grains'],
+                             cache=cache,
+                             expiration=expiration,
+                             save=save,
+                             threads=opts.get('grains_threads', 1),
+                             timeout=opts.get('grains_timeout', 0),
+                             timeouts=opts.get('grains_timeouts'))
+    if lazy:
+        return grains_data
+    return grains_data.copy()
 
 
 # TODO: get rid of? Does anyone use this? You should use raw() instead
@@ -726,9 +1091,22 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         self.missing_modules = {}  # mapping of name -> error
         self.loaded_modules = {}  # mapping of module_name -> dict_of_functions
         self.loaded_files = set()  # TODO: just remove them from file_mapping?
+        # keys which could not be loaded -> mtimes of the module_dirs then
+        self.missing_keys = {}
 
         self.disabled = set(self.opts.get('disable_{0}s'.format(self.tag), []))
 
+        self.index = None
+        self.index_path = None
+        self.index_dirty = False
+        if self.opts.get('loader_index', False) and self.opts.get('cachedir'):
+            self.index_path = os.path.join(
+                self.opts['cachedir'],
+                'loader',
+                '{0}-{1}.p'.format(
+                    tag,
+                    hashlib.md5('\0'.join(module_dirs)).hexdigest()))
+
         self.refresh_file_mapping()
 
         super(LazyLoader, self).__init__()  # late init the lazy loader
@@ -779,6 +1157,111 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             else:
                 return '\'{0}\' is not available.'.format(function_name)
 
+    def _dir_mtimes(self):
+        '''
+        Return the mtimes of the module_dirs, which change whenever a module
+        is added to or removed from them
+        '''
+        mtimes = []
+        for mod_dir in self.module_dirs:
+            try:
+                mtimes.append(os.path.getmtime(mod_dir))
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def _index_settings(self):
+        '''
+        Return what, besides the module_dirs, the file mapping and the
+        __virtual__ results of the index depend on
+        '''
+        grains = hashlib.md5(
+            json.dumps(self._grains, sort_keys=True, default=repr)).hexdigest()
+        return {'version': LOADER_INDEX_VERSION,
+                'disabled': sorted(self.disabled),
+                'suffixes': sorted(self.suffix_map),
+                'virtual_enable': self.virtual_enable,
+                'grains': grains}
+
+    def _load_index(self, dir_mtimes):
+        '''
+        Load the persistent index of the module_dirs, return the cached file
+        mapping if none of the module_dirs changed since it was written
+        '''
+        settings = self._index_settings()
+        if self.index is None:
+            try:
+                with salt.utils.fopen(self.index_path, 'rb') as fp_:
+                    self.index = salt.payload.Serial(self.opts).load(fp_)
+            except (IOError, OSError):
+                pass
+            except Exception:
+                log.debug('Discarding the corrupted loader index {0}'.format(
+                    self.index_path))
+            if not isinstance(self.index, dict):
+                self.index = {}
+        ttl = self.opts.get('loader_index_ttl', 0)
+        if self.index.get('settings') != settings or \
+                (ttl and time.time() - self.index.get('time', 0) > ttl):
+            # cached __virtual__ results only hold for the same grains
+            self.index = {'settings': settings,
+                          'time': time.time(),
+                          'virtual': {}}
+            self.index_dirty = True
+        if self.index.get('dirs') == dir_mtimes:
+            return dict((name, tuple(path))
+                        for name, path in six.iteritems(self.index['files']))
+        return None
+
+    def _save_index(self):
+        '''
+        Write the index back to the cachedir if it changed
+        '''
+        if not self.index_dirty:
+            return
+        self.index_dirty = False
+        try:
+            index_dir = os.path.dirname(self.index_path)
+            if not os.path.isdir(index_dir):
+                os.makedirs(index_dir)
+            with salt.utils.atomicfile.atomic_open(self.index_path, 'wb') as fp_:
+                salt.payload.Serial(self.opts).dump(self.index, fp_)
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write the loader index {0}: {1}'.format(
+                self.index_path, exc))
+
+    def _index_virtual(self, name):
+        '''
+        Return the name the module of the file was loaded as the last time
+        it was loaded with the same grains, False if it did not load, or None
+        if the module changed since or was never indexed
+        '''
+        if self.index is None or not self.virtual_enable:
+            return None
+        entry = self.index['virtual'].get(name)
+        if entry is None:
+            return None
+        try:
+            if os.path.getmtime(self.file_mapping[name][0]) != entry[0]:
+                return None
+        except (KeyError, OSError):
+            return None
+        return entry[1]
+
+    def _index_module(self, name, module_name):
+        '''
+        Record the name the module of the file was loaded as, or False
+        '''
+        if self.index is None or not self.virtual_enable:
+            return
+        try:
+            entry = [os.path.getmtime(self.file_mapping[name][0]), module_name]
+        except (KeyError, OSError):
+            return
+        if self.index['virtual'].get(name) != entry:
+            self.index['virtual'][name] = entry
+            self.index_dirty = True
+
     def refresh_file_mapping(self):
         '''
         refresh the mapping of the FS on disk
@@ -802,6 +1285,13 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         # allow for module dirs
         self.suffix_map[''] = ('', '', imp.PKG_DIRECTORY)
 
+        dir_mtimes = self._dir_mtimes()
+        if self.index_path is not None:
+            file_mapping = self._load_index(dir_mtimes)
+            if file_mapping is not None:
+                self.file_mapping = file_mapping
+                return
+
         # create mapping of filename (without suffix) to (path, suffix)
         self.file_mapping = {}
 
@@ -853,6 +1343,12 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 except OSError:
                     continue
 
+        if self.index is not None:
+            self.index['dirs'] = dir_mtimes
+            self.index['files'] = self.file_mapping
+            self.index_dirty = True
+            self._save_index()
+
     def clear(self):
         '''
         Clear the dict
@@ -860,10 +1356,18 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         super(LazyLoader, self).clear()  # clear the lazy loader
         self.loaded_files = set()
         self.missing_modules = {}
+        self.missing_keys = {}
         self.loaded_modules = {}
         # if we have been loaded before, lets clear the file mapping since
-        # we obviously want a re-do
-        if hasattr(self, 'opts'):
+        # we obviously want a re-do. The file mapping was just made if we are
+        # being initialized.
+        if hasattr(self, 'opts') and not self.initial_load:
+            if self.index is not None:
+                # a refresh asks for __virtual__ to be run again, the
+                # environment of the modules may have changed
+                self.index['virtual'] = {}
+                self.index['time'] = time.time()
+                self.index_dirty = True
             self.refresh_file_mapping()
         self.initial_load = False
 
@@ -890,19 +1394,28 @@ class LazyLoader(salt.utils.lazy.LazyDict):
     def _iter_files(self, mod_name):
         '''
         Iterate over all file_mapping files in order of closeness to mod_name
+
+        With the loader index, files known to load as mod_name come first and
+        files known to load as another name, or not to load, are skipped.
         '''
+        if self.index is not None and self.virtual_enable:
+            for k, entry in list(six.iteritems(self.index['virtual'])):
+                if entry[1] == mod_name and self._index_virtual(k) == mod_name:
+                    yield k
+
         # do we have an exact match?
-        if mod_name in self.file_mapping:
+        if mod_name in self.file_mapping \
+                and self._index_virtual(mod_name) is None:
             yield mod_name
 
         # do we have a partial match?
         for k in self.file_mapping:
-            if mod_name in k:
+            if mod_name in k and self._index_virtual(k) is None:
                 yield k
 
         # anyone else? Bueller?
         for k in self.file_mapping:
-            if mod_name not in k:
+            if mod_name not in k and self._index_virtual(k) is None:
                 yield k
 
     def _reload_submodules(self, mod):
@@ -959,6 +1472,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 ),
                 exc_info=True
             )
+            self._index_module(name, False)
             return mod
         except Exception:
             log.error(
@@ -1020,7 +1534,9 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 # If a module has information about why it could not be loaded, record it
                 self.missing_modules[module_name] = virtual_err
                 self.missing_modules[name] = virtual_err
+                self._index_module(name, False)
                 return False
+            self._index_module(name, module_name)
 
         # If this is a proxy minion then MOST modules cannot work. Therefore, require that
         # any module that does work with salt-proxy-minion define __proxyenabled__ as a list
@@ -1111,8 +1627,31 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     reloaded = True
                 continue
 
+        if ret is not True:
+            # don't search for it again until a module_dir changes
+            self.missing_keys[key] = self._dir_mtimes()
+        if self.index is not None:
+            self._save_index()
         return ret
 
+    def _missing(self, key):
+        '''
+        Whether the key is known to be missing, the search for a key which
+        could not be loaded is only repeated once a module is added to or
+        removed from the module_dirs. A key assigned directly, such as a
+        provider override, is not missing.
+        '''
+        if not isinstance(key, six.string_types) \
+                or key not in self.missing_keys:
+            return False
+        if key in self._dict:
+            del self.missing_keys[key]
+            return False
+        if self.missing_keys[key] == self._dir_mtimes():
+            return True
+        del self.missing_keys[key]
+        return False
+
     def _load_all(self):
         '''
         Load all of them
@@ -1122,6 +1661,8 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 continue
             self._load_module(name)
 
+        if self.index is not None:
+            self._save_index()
         self.loaded = True
 
     def _apply_outputter(self, func, mod):
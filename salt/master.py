@@ -20,6 +20,7 @@ import resource
 import multiprocessing
 import sys
 import tempfile
+import threading
 
 # Import third party libs
 import zmq
@@ -60,7 +61,8 @@ from salt.utils.event import tagify
 import binascii
 from salt.utils.master import ConnectedCache
 from salt.utils.cache import CacheCli
-from salt.ext.six.moves import range
+from salt.utils.odict import OrderedDict
+from salt.ext.six.moves import queue, range  # pylint: disable=import-error,redefined-builtin
 
 # Import halite libs
 try:
@@ -72,12 +74,17 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+# Seconds after which the slot of a sign-in which was not released, such as
+# one served by an MWorker which died, is taken back
+AUTH_SLOT_LEASE = 60
+
 
 class SMaster(object):
     '''
     Create a simple salt-master, this will generate the top-level master
     '''
     aes = None
+    auth_admission = None
 
     def __init__(self, opts):
         '''
@@ -87,6 +94,8 @@ class SMaster(object):
         '''
         self.opts = opts
         SMaster.aes = multiprocessing.Array(ctypes.c_char, salt.crypt.Crypticle.generate_key_string())
+        if opts.get('auth_max_concurrent') or opts.get('auth_rate'):
+            SMaster.auth_admission = AuthAdmission(opts)
         self.master_key = salt.crypt.MasterKeys(self.opts)
         self.key = self.__prep_key()
         self.crypticle = self.__prep_crypticle()
@@ -105,6 +114,136 @@ class SMaster(object):
         return salt.daemons.masterapi.access_keys(self.opts)
 
 
+class AuthAdmission(object):
+    '''
+    Admission control for the minion sign-ins, shared by all of the MWorkers
+
+    At most ``auth_max_concurrent`` sign-ins are served at once, and they are
+    admitted at ``auth_rate`` per second with bursts of ``auth_burst``. A
+    sign-in which is not admitted is answered right away with a ``busy``
+    reply telling the minion how many seconds to wait before signing in
+    again. The waits handed out are spread at the admitted rate, so the
+    minions turned away come back as the master is able to serve them
+    instead of all at once. The slot of a sign-in is leased for
+    ``AUTH_SLOT_LEASE`` seconds, so the slots of the MWorkers killed while
+    serving a sign-in are not lost.
+    '''
+    def __init__(self, opts):
+        '''
+        Create the admission control, before the MWorkers are forked
+
+        :param dict opts: The salt options
+        '''
+        self.max_concurrent = int(opts.get('auth_max_concurrent', 0))
+        self.rate = float(opts.get('auth_rate', 0))
+        self.burst = max(1, int(opts.get('auth_burst', 0)) or
+                         int(self.rate))
+        self.retry_max = max(1.0, float(opts.get('auth_retry_max', 120)))
+        if self.max_concurrent > 0:
+            # The time the lease of every slot expires, 0 if it is free
+            self.slots = multiprocessing.Array(ctypes.c_double,
+                                               self.max_concurrent)
+        else:
+            self.slots = None
+        # The theoretical arrival time of the next sign-in admitted at the
+        # configured rate and the time handed to the next minion turned away
+        self.times = multiprocessing.Array(ctypes.c_double, 2)
+
+    def _retry_after(self, now, start):
+        '''
+        Return the seconds the next minion turned away has to wait, the
+        shared lock must be held
+        '''
+        if self.rate <= 0:
+            # Only the concurrency is limited, there is no rate to spread the
+            # minions at
+            return 1.0
+        interval = 1.0 / self.rate
+        slot = max(self.times[1], start)
+        if slot - now >= self.retry_max:
+            # The backlog is longer than the minions are asked to wait, let
+            # the jitter of the minions spread them
+            return self.retry_max
+        self.times[1] = slot + interval
+        return max(slot - now, interval)
+
+    def _lease(self, now):
+        '''
+        Return the index and the expiry of a slot leased for a sign-in, or
+        None if every slot is in use
+        '''
+        with self.slots.get_lock():
+            for ind, expiry in enumerate(self.slots):
+                if expiry <= now:
+                    if expiry:
+                        log.warning(
+                            'Taking back a sign-in slot which was not '
+                            'released within {0} seconds'.format(
+                                AUTH_SLOT_LEASE)
+                        )
+                    self.slots[ind] = now + AUTH_SLOT_LEASE
+                    return ind, self.slots[ind]
+        return None
+
+    def admit(self):
+        '''
+        Return the seconds the minion has to wait and the lease of the
+        sign-in. A sign-in is admitted when it does not have to wait, its
+        lease then has to be released.
+        '''
+        now = time.time()
+        lease = None
+        if self.slots is not None:
+            lease = self._lease(now)
+            if lease is None:
+                with self.times.get_lock():
+                    return self._retry_after(now, max(self.times[0], now)), None
+        if self.rate <= 0:
+            return 0, lease
+        interval = 1.0 / self.rate
+        with self.times.get_lock():
+            tat = max(self.times[0], now)
+            # Half an interval of slack absorbs the rounding of the times
+            if tat - now < (self.burst - 0.5) * interval:
+                self.times[0] = tat + interval
+                return 0, lease
+            retry_after = self._retry_after(now, tat)
+        self.release(lease)
+        return retry_after, None
+
+    def release(self, lease):
+        '''
+        Release the lease of an admitted sign-in, unless it expired and the
+        slot was leased again
+        '''
+        if lease is None:
+            return
+        ind, expiry = lease
+        with self.slots.get_lock():
+            if self.slots[ind] == expiry:
+                self.slots[ind] = 0
+
+    def run(self, func, load):
+        '''
+        Run the sign-in if it is admitted, otherwise return the busy reply
+
+        :param func: The function serving the sign-in, ClearFuncs._auth
+        :param dict load: The sign-in request
+        '''
+        retry_after, lease = self.admit()
+        if retry_after:
+            log.debug(
+                'Authentication request from {0} throttled, retry after '
+                '{1:.2f} seconds'.format(load.get('id'), retry_after)
+            )
+            return {'enc': 'clear',
+                    'load': {'ret': 'busy', 'retry_after': retry_after}}
+        try:
+            return func(load)
+        finally:
+            self.release(lease)
+
+
 class Maintenance(multiprocessing.Process):
     '''
     A generalized maintenance process which performances maintenance
@@ -236,8 +375,8 @@ class Maintenance(multiprocessing.Process):
         Update git pillar
         '''
         try:
-            for pillargit in self.pillargitfs:
-                pillargit.update()
+            salt.daemons.masterapi.update_git_pillar(self.pillargitfs,
+                                                     self.opts)
         except Exception as exc:
             log.error('Exception {0} occurred in file server update '
                       'for git_pillar module.'.format(exc))
@@ -484,6 +623,53 @@ class Publisher(multiprocessing.Process):
         super(Publisher, self).__init__()
         self.opts = opts
 
+    def _publish(self, pub_sock, package):
+        '''
+        Send a single package received on the pull socket to the minions
+
+        The payload is wrapped in a single zeromq frame which is handed to
+        every send without copying, so a publication sent on many topics
+        costs one payload copy.
+
+        :param pub_sock: The bound zeromq PUB socket
+        :param str package: The packaged publication from the pull socket
+        '''
+        unpacked_package = salt.payload.unpackage(package)
+        try:
+            payload = unpacked_package['payload']
+        except (KeyError,) as exc:
+            # somehow not packaged !?
+            if 'enc' in unpacked_package and 'load' in unpacked_package:
+                payload = package
+            else:
+                try:
+                    log.error(
+                        "Invalid payload: {0}".format(
+                            pformat(unpacked_package), exc_info=True))
+                except Exception:
+                    # dont fail on a format error here !
+                    # but log something as it is hard to track down
+                    log.error("Received invalid payload", exc_info=True)
+                raise exc
+
+        frame = zmq.Frame(payload)
+        if self.opts['zmq_filtering']:
+            # if you have a specific topic list, use that
+            if 'topic_lst' in unpacked_package:
+                topics = salt.utils.zeromq.publish_topics(
+                    unpacked_package['topic_lst'],
+                    self.opts.get('zmq_filtering_groups', 0))
+                for topic in topics:
+                    pub_sock.send(topic, flags=zmq.SNDMORE)
+                    pub_sock.send(frame, copy=False)
+            # otherwise its a broadcast
+            else:
+                # TODO: constants file for "broadcast"
+                pub_sock.send('broadcast', flags=zmq.SNDMORE)
+                pub_sock.send(frame, copy=False)
+        else:
+            pub_sock.send(frame, copy=False)
+
     def run(self):
         '''
         Bind to the interface specified in the configuration file
@@ -525,46 +711,24 @@ class Publisher(multiprocessing.Process):
         finally:
             os.umask(old_umask)
 
+        batch_size = max(1, self.opts.get('pub_batch_size', 1))
         try:
             while True:
                 # Catch and handle EINTR from when this process is sent
                 # SIGUSR1 gracefully so we don't choke and die horribly
                 try:
-                    package = pull_sock.recv()
-                    unpacked_package = salt.payload.unpackage(package)
-                    try:
-                        payload = unpacked_package['payload']
-                    except (KeyError,) as exc:
-                        # somehow not packaged !?
-                        if 'enc' in payload and 'load' in payload:
-                            payload = package
-                        else:
-                            try:
-                                log.error(
-                                    "Invalid payload: {0}".format(
-                                        pformat(unpacked_package), exc_info=True))
-                            except Exception:
-                                # dont fail on a format error here !
-                                # but log something as it is hard to track down
-                                log.error("Received invalid payload", exc_info=True)
-                            raise exc
-
-                    if self.opts['zmq_filtering']:
-                        # if you have a specific topic list, use that
-                        if 'topic_lst' in unpacked_package:
-                            for topic in unpacked_package['topic_lst']:
-                                # zmq filters are substring match, hash the topic
-                                # to avoid collisions
-                                htopic = hashlib.sha1(topic).hexdigest()
-                                pub_sock.send(htopic, flags=zmq.SNDMORE)
-                                pub_sock.send(payload)
-                                # otherwise its a broadcast
-                        else:
-                            # TODO: constants file for "broadcast"
-                            pub_sock.send('broadcast', flags=zmq.SNDMORE)
-                            pub_sock.send(payload)
-                    else:
-                        pub_sock.send(payload)
+                    packages = [pull_sock.recv()]
+                    # Drain whatever else is already queued so a burst of
+                    # publications is handled in a single wakeup
+                    while len(packages) < batch_size:
+                        try:
+                            packages.append(pull_sock.recv(zmq.NOBLOCK))
+                        except zmq.ZMQError as exc:
+                            if exc.errno == zmq.EAGAIN:
+                                break
+                            raise
+                    for package in packages:
+                        self._publish(pub_sock, package)
                 except zmq.ZMQError as exc:
                     if exc.errno == errno.EINTR:
                         continue
@@ -647,8 +811,12 @@ class ReqServer(object):
                 pass
         self.process_manager = salt.utils.process.ProcessManager(name='ReqServer_ProcessManager')
 
+        if self.opts.get('worker_async', False):
+            worker = AsyncMWorker
+        else:
+            worker = MWorker
         for ind in range(int(self.opts['worker_threads'])):
-            self.process_manager.add_process(MWorker,
+            self.process_manager.add_process(worker,
                                              args=(self.opts,
                                                    self.master_key,
                                                    self.key,
@@ -680,7 +848,8 @@ class ReqServer(object):
         if hasattr(self, 'context') and self.context.closed is False:
             self.context.term()
         # Also stop the workers
-        self.process_manager.kill_children()
+        if hasattr(self, 'process_manager'):
+            self.process_manager.kill_children()
 
     def __del__(self):
         self.destroy()
@@ -803,6 +972,8 @@ class MWorker(multiprocessing.Process):
         log.info('Clear payload received with command {cmd}'.format(**load))
         if load['cmd'].startswith('__'):
             return False
+        if load['cmd'] == '_auth' and SMaster.auth_admission is not None:
+            return SMaster.auth_admission.run(self.clear_funcs._auth, load)
         return getattr(self.clear_funcs, load['cmd'])(load)
 
     def _handle_aes(self, load):
@@ -819,6 +990,16 @@ class MWorker(multiprocessing.Process):
             # return something not encrypted so the minions know that they aren't
             # encrypting correctly.
             return 'bad load'
+        return self._handle_aes_data(data)
+
+    def _handle_aes_data(self, data):
+        '''
+        Process a decrypted AES command
+
+        :param dict data: Decrypted payload
+        :return: The result of passing the load to a function in AESFuncs corresponding to
+                 the command specified in the load's 'cmd' key.
+        '''
         if 'cmd' not in data:
             log.error('Received malformed command {0}'.format(data))
             return {}
@@ -837,20 +1018,218 @@ class MWorker(multiprocessing.Process):
             self.clear_funcs.crypticle = self.crypticle
             self.aes_funcs.crypticle = self.crypticle
 
-    def run(self):
+    def _setup_funcs(self):
         '''
-        Start a Master Worker
+        Create the ClearFuncs and AESFuncs instances serving the requests
         '''
-        salt.utils.appendproctitle(self.__class__.__name__)
         self.clear_funcs = ClearFuncs(
             self.opts,
             self.key,
             self.mkey,
             self.crypticle)
         self.aes_funcs = AESFuncs(self.opts, self.crypticle)
+
+    def run(self):
+        '''
+        Start a Master Worker
+        '''
+        salt.utils.appendproctitle(self.__class__.__name__)
+        self._setup_funcs()
         self.__bind()
 
 
+class AsyncMWorker(MWorker):
+    '''
+    A master worker which serves several minion requests at once
+
+    The worker connects a DEALER socket to the worker queue instead of a REP
+    socket, so it is not bound to a strict receive/reply sequence. Cheap
+    requests such as ``_return`` and ``_minion_event`` are served directly
+    from the worker's event loop, while the commands listed in
+    ``worker_async_cmds`` are handed to a bounded pool of threads. Replies
+    from the pool are passed back to the event loop, which owns the DEALER
+    socket, through an inproc socket. Every thread serves its requests with
+    its own ClearFuncs and AESFuncs, so they never share a Fileserver or the
+    other state of these objects.
+    '''
+    def __init__(self,
+                 opts,
+                 mkey,
+                 key,
+                 crypticle):
+        '''
+        Create an asynchronous salt master worker process
+
+        :param dict opts: The salt options
+        :param dict mkey: The user running the salt master and the AES key
+        :param dict key: The user running the salt master and the RSA key
+        :param salt.crypt.Crypticle crypticle: Encryption crypticle
+
+        :rtype: AsyncMWorker
+        :return: Asynchronous master worker
+        '''
+        super(AsyncMWorker, self).__init__(opts, mkey, key, crypticle)
+        self.async_cmds = set(opts.get('worker_async_cmds', []))
+        self.async_threads = max(1, int(opts.get('worker_async_threads', 4)))
+        self._funcs = threading.local()
+
+    @property
+    def clear_funcs(self):
+        '''
+        The ClearFuncs of the calling thread
+        '''
+        return self._funcs.clear_funcs
+
+    @clear_funcs.setter
+    def clear_funcs(self, value):
+        self._funcs.clear_funcs = value
+
+    @property
+    def aes_funcs(self):
+        '''
+        The AESFuncs of the calling thread
+        '''
+        return self._funcs.aes_funcs
+
+    @aes_funcs.setter
+    def aes_funcs(self, value):
+        self._funcs.aes_funcs = value
+
+    def _sync_funcs(self):
+        '''
+        Hand the current crypticle of the worker to the functions of the
+        calling thread
+        '''
+        if self.aes_funcs.crypticle is not self.crypticle:
+            self.clear_funcs.crypticle = self.crypticle
+            self.aes_funcs.crypticle = self.crypticle
+
+    def _prepare(self, payload):
+        '''
+        Work out which command a payload runs without running it
+
+        :param dict payload: The deserialized request
+        :return: A tuple of the command name, or None if it can not be
+                 determined, and a callable returning the reply
+        '''
+        try:
+            key = payload['enc']
+            load = payload['load']
+        except (KeyError, TypeError):
+            return None, lambda: ''
+        if key == 'aes':
+            try:
+                data = self.crypticle.loads(load)
+            except Exception:
+                # return something not encrypted so the minions know that
+                # they aren't encrypting correctly.
+                return None, lambda: 'bad load'
+            cmd = data.get('cmd') if isinstance(data, dict) else None
+            return cmd, lambda: self._handle_aes_data(data)
+        if key == 'clear':
+            return load.get('cmd'), lambda: self._handle_clear(load)
+        return None, lambda: self._handle_payload(payload)
+
+    def _reply(self, func):
+        '''
+        Run a request and serialize its reply
+        '''
+        try:
+            return self.serial.dumps(func())
+        except Exception:
+            log.critical('Unexpected Error in Mworker', exc_info=True)
+            return 'Unexpected Error in Mworker'
+
+    def _pool_worker(self, context, jobs, r_uri, funcs):
+        '''
+        Serve the expensive requests queued by the event loop
+        '''
+        self.clear_funcs, self.aes_funcs = funcs
+        results = context.socket(zmq.PUSH)
+        results.connect(r_uri)
+        while True:
+            envelope, func = jobs.get()
+            self._sync_funcs()
+            results.send_multipart(envelope + [self._reply(func)])
+
+    def _bind_async(self):
+        '''
+        Connect to the worker queue and run the event loop
+        '''
+        context = zmq.Context(1)
+        socket = context.socket(zmq.DEALER)
+        w_uri = 'ipc://{0}'.format(
+            os.path.join(self.opts['sock_dir'], 'workers.ipc')
+            )
+        r_uri = 'inproc://mworker_results'
+        results = context.socket(zmq.PULL)
+        results.bind(r_uri)
+        jobs = queue.Queue(maxsize=self.async_threads * 2)
+        # The functions of the pool threads are set up here, one after the
+        # other, the ones set up last serve the event loop
+        pool_funcs = []
+        for ind in range(self.async_threads):
+            self._setup_funcs()
+            pool_funcs.append((self.clear_funcs, self.aes_funcs))
+        self._setup_funcs()
+        for funcs in pool_funcs:
+            thread = threading.Thread(
+                target=self._pool_worker,
+                args=(context, jobs, r_uri, funcs))
+            thread.daemon = True
+            thread.start()
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+        poller.register(results, zmq.POLLIN)
+        log.info('Asynchronous worker binding to socket {0}'.format(w_uri))
+        try:
+            socket.connect(w_uri)
+            while True:
+                try:
+                    socks = dict(poller.poll())
+                    if socks.get(results) == zmq.POLLIN:
+                        socket.send_multipart(results.recv_multipart())
+                    if socks.get(socket) != zmq.POLLIN:
+                        continue
+                    frames = socket.recv_multipart()
+                    # The routing envelope ends with the empty delimiter
+                    # frame added by the requesting REQ socket
+                    envelope, package = frames[:-1], frames[-1]
+                    self._update_aes()
+                    try:
+                        payload = self.serial.loads(package)
+                        cmd, func = self._prepare(payload)
+                    except Exception:
+                        log.critical('Unexpected Error in Mworker',
+                                     exc_info=True)
+                        socket.send_multipart(
+                            envelope + ['Unexpected Error in Mworker'])
+                        continue
+                    if cmd in self.async_cmds:
+                        try:
+                            jobs.put_nowait((envelope, func))
+                            continue
+                        except queue.Full:
+                            # The pool is saturated, serve it in the loop
+                            # rather than buffering unbounded work
+                            pass
+                    socket.send_multipart(envelope + [self._reply(func)])
+                except zmq.ZMQError as exc:
+                    # Properly handle EINTR from SIGUSR1
+                    if exc.errno == errno.EINTR:
+                        continue
+                    raise
+        except KeyboardInterrupt:
+            socket.close()
+
+    def run(self):
+        '''
+        Start an asynchronous Master Worker
+        '''
+        salt.utils.appendproctitle(self.__class__.__name__)
+        self._bind_async()
+
+
 class AESFuncs(object):
     '''
     Set up functions that are available when the load is encrypted with AES
@@ -872,6 +1251,7 @@ class AESFuncs(object):
         self.serial = salt.payload.Serial(opts)
         self.crypticle = crypticle
         self.ckminions = salt.utils.minions.CkMinions(opts)
+        self.pub_keys = salt.crypt.get_pub_key_cache(opts)
         # Make a client
         self.local = salt.client.get_local_client(self.opts['conf_file'])
         # Create the master minion to access the external job cache
@@ -909,24 +1289,8 @@ class AESFuncs(object):
         if not salt.utils.verify.valid_id(self.opts, id_):
             return False
         pub_path = os.path.join(self.opts['pki_dir'], 'minions', id_)
-        with salt.utils.fopen(pub_path, 'r') as fp_:
-            minion_pub = fp_.read()
-        tmp_pub = salt.utils.mkstemp()
-        with salt.utils.fopen(tmp_pub, 'w+') as fp_:
-            fp_.write(minion_pub)
-
-        pub = None
-        try:
-            pub = RSA.load_pub_key(tmp_pub)
-        except RSA.RSAError as err:
-            log.error('Unable to load temporary public key "{0}": {1}'
-                      .format(tmp_pub, err))
-        try:
-            os.remove(tmp_pub)
-            if pub.public_decrypt(token, 5) == 'salt':
-                return True
-        except RSA.RSAError as err:
-            log.error('Unable to decrypt token: {0}'.format(err))
+        if self.pub_keys.verify_token(pub_path, token):
+            return True
 
         log.error('Salt minion claiming to be {0} has attempted to'
                   'communicate with the master and could not be verified'
@@ -1208,15 +1572,25 @@ class AESFuncs(object):
             return False
         load['grains']['id'] = load['id']
 
-        pillar_dirs = {}
-        pillar = salt.pillar.Pillar(
-            self.opts,
-            load['grains'],
-            load['id'],
-            load.get('saltenv', load.get('env')),
-            ext=load.get('ext'),
-            pillar=load.get('pillar_override', {}))
-        data = pillar.compile_pillar(pillar_dirs=pillar_dirs)
+        saltenv = load.get('saltenv', load.get('env'))
+        data = None
+        cache = salt.pillar.get_pillar_cache(self.opts)
+        if cache is not None:
+            key = cache.key(load['id'], load['grains'], saltenv,
+                            load.get('pillar_override'), load.get('ext'))
+            data = cache.get(load['id'], key)
+        if data is None:
+            pillar_dirs = {}
+            pillar = salt.pillar.Pillar(
+                self.opts,
+                load['grains'],
+                load['id'],
+                saltenv,
+                ext=load.get('ext'),
+                pillar=load.get('pillar_override', {}))
+            data = pillar.compile_pillar(pillar_dirs=pillar_dirs)
+            if cache is not None:
+                cache.set(load['id'], key, data)
         self.fs_.update_opts()
         if self.opts.get('minion_data_cache', False):
             cdir = os.path.join(self.opts['cachedir'], 'minions', load['id'])
@@ -1232,6 +1606,9 @@ class AESFuncs(object):
                          'pillar': data})
                     )
             os.rename(tmpfname, datap)
+            index = salt.utils.minions.get_minion_data_index(self.opts)
+            if index is not None:
+                index.update(load['id'], load['grains'], data)
         return data
 
     def _minion_event(self, load):
@@ -1490,8 +1867,8 @@ class AESFuncs(object):
                 self.opts,
                 key)
             try:
-                pub = RSA.load_pub_key(pubfn)
-            except RSA.RSAError:
+                pub = self.pub_keys.get_key(pubfn)
+            except (IOError, OSError, RSA.RSAError):
                 return self.crypticle.dumps({})
 
             pret = {}
@@ -1525,6 +1902,9 @@ class ClearFuncs(object):
         self.local = salt.client.get_local_client(self.opts['conf_file'])
         # Make an minion checker object
         self.ckminions = salt.utils.minions.CkMinions(opts)
+        self.pub_keys = salt.crypt.get_pub_key_cache(opts)
+        # The sign-in replies kept per minion id, see __auth_blob
+        self.auth_blobs = OrderedDict()
         # Make an Auth object
         self.loadauth = salt.auth.LoadAuth(opts)
         # Stand up the master Minion to access returner data
@@ -1630,7 +2010,7 @@ class ClearFuncs(object):
 
         elif os.path.isfile(pubfn):
             # The key has been accepted, check it
-            if salt.utils.fopen(pubfn, 'r').read().strip() != load['pub'].strip():
+            if self.pub_keys.get_str(pubfn).strip() != load['pub'].strip():
                 log.error(
                     'Authentication attempt from {id} failed, the public '
                     'keys did not match. This may be an attempt to compromise '
@@ -1785,15 +2165,16 @@ class ClearFuncs(object):
         if not os.path.isfile(pubfn) and not self.opts['open_mode']:
             with salt.utils.fopen(pubfn, 'w+') as fp_:
                 fp_.write(load['pub'])
+            self.pub_keys.forget(pubfn)
         elif self.opts['open_mode']:
             disk_key = ''
             if os.path.isfile(pubfn):
-                with salt.utils.fopen(pubfn, 'r') as fp_:
-                    disk_key = fp_.read()
+                disk_key = self.pub_keys.get_str(pubfn)
             if load['pub'] and load['pub'] != disk_key:
                 log.debug('Host key change detected in open mode.')
                 with salt.utils.fopen(pubfn, 'w+') as fp_:
                     fp_.write(load['pub'])
+                self.pub_keys.forget(pubfn)
 
         pub = None
 
@@ -1804,7 +2185,7 @@ class ClearFuncs(object):
         # The key payload may sometimes be corrupt when using auto-accept
         # and an empty request comes in
         try:
-            pub = RSA.load_pub_key(pubfn)
+            pub = self.pub_keys.get_key(pubfn)
         except RSA.RSAError as err:
             log.error('Corrupt public key "{0}": {1}'.format(pubfn, err))
             return {'enc': 'clear',
@@ -1830,42 +2211,63 @@ class ClearFuncs(object):
                                                    ret['pub_key'])
                 ret.update({'pub_sig': binascii.b2a_base64(pub_sign)})
 
+        ret.update(self.__auth_blob(load, pub))
+        eload = {'result': True,
+                 'act': 'accept',
+                 'id': load['id'],
+                 'pub': load['pub']}
+        self.event.fire_event(eload, tagify(prefix='auth'))
+        return ret
+
+    def __auth_blob(self, load, pub):
+        '''
+        Return the encrypted AES key, token and signature of a sign-in reply.
+        They are kept per minion until the AES key is rotated, the minion
+        sends another token or its public key changes, so a minion signing
+        in again only costs the decryption of its token.
+        '''
+        mtoken = None
+        if 'token' in load:
+            try:
+                mtoken = self.master_key.key.private_decrypt(load['token'], 4)
+            except Exception:
+                # Token failed to decrypt, send back the salty bacon to
+                # support older minions
+                pass
+        # The minions encrypt their token with OAEP padding, which is
+        # randomized, so the replies are kept per decrypted token
+        blob_key = (SMaster.aes.value, mtoken)
+        cached = self.auth_blobs.pop(load['id'], None)
+        if cached is not None and cached[0] == blob_key and cached[1] is pub:
+            self.auth_blobs[load['id']] = cached
+            return cached[2]
+
+        blob = {}
         if self.opts['auth_mode'] >= 2:
-            if 'token' in load:
-                try:
-                    mtoken = self.master_key.key.private_decrypt(load['token'], 4)
-                    aes = '{0}_|-{1}'.format(SMaster.aes.value, mtoken)
-                except Exception:
-                    # Token failed to decrypt, send back the salty bacon to
-                    # support older minions
-                    pass
+            if mtoken is not None:
+                aes = '{0}_|-{1}'.format(SMaster.aes.value, mtoken)
             else:
                 aes = SMaster.aes.value
 
-            ret['aes'] = pub.public_encrypt(aes, 4)
+            blob['aes'] = pub.public_encrypt(aes, 4)
         else:
-            if 'token' in load:
-                try:
-                    mtoken = self.master_key.key.private_decrypt(
-                        load['token'], 4
-                    )
-                    ret['token'] = pub.public_encrypt(mtoken, 4)
-                except Exception:
-                    # Token failed to decrypt, send back the salty bacon to
-                    # support older minions
-                    pass
+            if mtoken is not None:
+                blob['token'] = pub.public_encrypt(mtoken, 4)
 
             aes = SMaster.aes.value
-            ret['aes'] = pub.public_encrypt(SMaster.aes.value, 4)
+            blob['aes'] = pub.public_encrypt(SMaster.aes.value, 4)
         # Be aggressive about the signature
         digest = hashlib.sha256(aes).hexdigest()
-        ret['sig'] = self.master_key.key.private_encrypt(digest, 5)
-        eload = {'result': True,
-                 'act': 'accept',
-                 'id': load['id'],
-                 'pub': load['pub']}
-        self.event.fire_event(eload, tagify(prefix='auth'))
-        return ret
+        blob['sig'] = self.master_key.key.private_encrypt(digest, 5)
+
+        if self.pub_keys.size > 0:
+            while len(self.auth_blobs) >= self.pub_keys.size:
+                try:
+                    self.auth_blobs.popitem(last=False)
+                except KeyError:
+                    break
+            self.auth_blobs[load['id']] = (blob_key, pub, blob)
+        return blob
 
     def process_token(self, tok, fun, auth_type):
         '''
@@ -40,13 +40,6 @@ try:
 except ImportError:
     pass
 
-HAS_PSUTIL = False
-try:
-    import psutil
-    HAS_PSUTIL = True
-except ImportError:
-    pass
-
 HAS_RESOURCE = False
 try:
     import resource
@@ -78,6 +71,7 @@ import salt.pillar
 import salt.utils.args
 import salt.utils.event
 import salt.utils.minion
+import salt.utils.minions
 import salt.utils.schedule
 import salt.utils.error
 import salt.utils.zeromq
@@ -295,7 +289,8 @@ class SMinion(object):
     '''
     def __init__(self, opts):
         # Late setup of the opts grains, so we can log from the grains module
-        opts['grains'] = salt.loader.grains(opts)
+        opts['grains'] = salt.loader.grains(
+            opts, lazy=opts.get('grains_lazy', False))
         self.opts = opts
 
         # Clean out the proc directory (default /var/cache/salt/minion/proc)
@@ -916,7 +911,15 @@ class Minion(MinionBase):
         # a memory limit on module imports
         # this feature ONLY works on *nix like OSs (resource module doesn't work on windows)
         modules_max_memory = False
-        if self.opts.get('modules_max_memory', -1) > 0 and HAS_PSUTIL and HAS_RESOURCE:
+        has_psutil = False
+        if self.opts.get('modules_max_memory', -1) > 0:
+            # psutil is slow to import, only load it when needed
+            try:
+                import psutil
+                has_psutil = True
+            except ImportError:
+                pass
+        if self.opts.get('modules_max_memory', -1) > 0 and has_psutil and HAS_RESOURCE:
             log.debug('modules_max_memory set, enforcing a maximum of {0}'.format(self.opts['modules_max_memory']))
             modules_max_memory = True
             old_mem_limit = resource.getrlimit(resource.RLIMIT_AS)
@@ -924,7 +927,7 @@ class Minion(MinionBase):
             mem_limit = rss + vms + self.opts['modules_max_memory']
             resource.setrlimit(resource.RLIMIT_AS, (mem_limit, mem_limit))
         elif self.opts.get('modules_max_memory', -1) > 0:
-            if not HAS_PSUTIL:
+            if not has_psutil:
                 log.error('Unable to enforce modules_max_memory because psutil is missing')
             if not HAS_RESOURCE:
                 log.error('Unable to enforce modules_max_memory because resource is missing')
@@ -1500,6 +1503,12 @@ class Minion(MinionBase):
             # TODO: constants file for "broadcast"
             self.socket.setsockopt(zmq.SUBSCRIBE, 'broadcast')
             self.socket.setsockopt(zmq.SUBSCRIBE, self.hexid)
+            if self.opts.get('zmq_filtering_groups'):
+                self.socket.setsockopt(
+                    zmq.SUBSCRIBE,
+                    salt.utils.zeromq.group_topic(
+                        self.opts['id'],
+                        self.opts['zmq_filtering_groups']))
         else:
             self.socket.setsockopt(zmq.SUBSCRIBE, '')
 
@@ -2801,60 +2810,20 @@ class Matcher(object):
         if not isinstance(tgt, string_types):
             log.debug('Compound target received that is not a string')
             return False
-        ref = {'G': 'grain',
-               'P': 'grain_pcre',
-               'I': 'pillar',
-               'J': 'pillar_pcre',
-               'L': 'list',
-               'S': 'ipcidr',
-               'E': 'pcre'}
-        if HAS_RANGE:
-            ref['R'] = 'range'
-        results = []
-        opers = ['and', 'or', 'not', '(', ')']
-        tokens = tgt.split()
-        for match in tokens:
-            # Try to match tokens from the compound target, first by using
-            # the 'G, X, I, L, S, E' matcher types, then by hostname glob.
-            if '@' in match and match[1] == '@':
-                comps = match.split('@')
-                matcher = ref.get(comps[0])
-                if not matcher:
-                    # If an unknown matcher is called at any time, fail out
-                    return False
-                results.append(
-                    str(
-                        getattr(self, '{0}_match'.format(matcher))(
-                            '@'.join(comps[1:])
-                        )
-                    )
-                )
-            elif match in opers:
-                # We didn't match a target, so append a boolean operator or
-                # subexpression
-                if results or match in ['(', ')']:
-                    if match == 'not':
-                        if results[-1] == 'and':
-                            pass
-                        elif results[-1] == 'or':
-                            pass
-                        else:
-                            results.append('and')
-                    results.append(match)
-                else:
-                    # seq start with oper, fail
-                    if match not in ['(', ')']:
-                        return False
-            else:
-                # The match is not explicitly defined, evaluate it as a glob
-                results.append(str(self.glob_match(match)))
-        results = ' '.join(results)
-        try:
-            return eval(results)  # pylint: disable=W0123
-        except Exception:
-            log.error('Invalid compound target: {0} for results: {1}'.format(tgt, results))
+        target = salt.utils.minions.compile_compound(tgt)
+        if target is None:
             return False
-        return False
+        ref = {'G': self.grain_match,
+               'P': self.grain_pcre_match,
+               'I': self.pillar_match,
+               'J': self.pillar_pcre_match,
+               'L': self.list_match,
+               'S': self.ipcidr_match,
+               'E': self.pcre_match,
+               None: self.glob_match}
+        if HAS_RANGE:
+            ref['R'] = self.range_match
+        return target.match(ref)
 
     def nodegroup_match(self, tgt, nodegroups):
         '''
@@ -130,13 +130,14 @@ def items(sanitize=False):
         salt '*' grains.items sanitize=True
     '''
     if salt.utils.is_true(sanitize):
-        out = dict(__grains__)
+        out = __grains__.copy()
         for key, func in _SANITIZERS.items():
             if key in out:
                 out[key] = func(out[key])
         return out
     else:
-        return __grains__
+        # a copy, lazily computed grains are not a plain dict
+        return __grains__.copy()
 
 
 def item(*args, **kwargs):
@@ -262,7 +262,7 @@ class EventListener(object):
         self.event.subscribe()  # start listening for events immediately
 
         # tag -> list of futures
-        self.tag_map = defaultdict(list)
+        self.tag_map = salt.utils.event.TagTrie()
 
         # request_obj -> list of (tag, future)
         self.request_map = defaultdict(list)
@@ -297,7 +297,7 @@ class EventListener(object):
                 tornado.ioloop.IOLoop.current().add_callback(callback, future)
             future.add_done_callback(handle_future)
         # add this tag and future to the callbacks
-        self.tag_map[tag].append(future)
+        self.tag_map.setdefault(tag, []).append(future)
         self.request_map[request].append((tag, future))
 
         if timeout:
@@ -324,16 +324,17 @@ class EventListener(object):
         '''
         mtag, data = self.event.unpack(raw[0], self.event.serial)
         # see if we have any futures that need this info:
-        for tag_prefix, futures in self.tag_map.items():
-            if mtag.startswith(tag_prefix):
-                for future in futures:
-                    if future.done():
-                        continue
-                    future.set_result({'data': data, 'tag': mtag})
-                    self.tag_map[tag_prefix].remove(future)
-                    if future in self.timeout_map:
-                        tornado.ioloop.IOLoop.current().remove_timeout(self.timeout_map[future])
-                        del self.timeout_map[future]
+        for tag_prefix, futures in self.tag_map.matches(mtag):
+            for future in list(futures):
+                if future.done():
+                    continue
+                future.set_result({'data': data, 'tag': mtag})
+                futures.remove(future)
+                if future in self.timeout_map:
+                    tornado.ioloop.IOLoop.current().remove_timeout(self.timeout_map[future])
+                    del self.timeout_map[future]
+            if not futures:
+                del self.tag_map[tag_prefix]
 
 
 # TODO: move to a utils function within salt-- the batching stuff is a bit tied together
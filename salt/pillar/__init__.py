@@ -6,9 +6,14 @@ from __future__ import absolute_import
 
 # Import python libs
 import copy
+import fnmatch
+import hashlib
+import json
 import os
 import collections
 import logging
+import threading
+import time
 
 # Import salt libs
 import salt.loader
@@ -16,6 +21,9 @@ import salt.fileclient
 import salt.minion
 import salt.crypt
 import salt.transport
+import salt.payload
+import salt.utils
+import salt.utils.atomicfile
 from salt.ext.six import string_types
 from salt.template import compile_template
 from salt.utils.dictupdate import merge
@@ -26,6 +34,293 @@ import salt.ext.six as six
 
 log = logging.getLogger(__name__)
 
+# Seconds during which the state of the pillar_roots is not checked again
+ROOTS_CHECK_INTERVAL = 1
+# Seconds between two writes of the statistics of a PillarCache
+STATS_INTERVAL = 10
+# The number of cached pillars kept for each minion, for different saltenvs
+# or overrides
+ENTRIES_PER_MINION = 4
+# The renderers which output a template free of template markup unchanged
+STATIC_RENDERERS = ('yaml', 'yaml_jinja', 'jinja|yaml')
+# Template markup of the static renderers
+TEMPLATE_MARKUP = ('{{', '{%', '{#')
+
+# Process wide pillar caches, keyed by the master cachedir
+_PILLAR_CACHES = {}
+
+
+def get_pillar_cache(opts):
+    '''
+    Return the process wide :py:class:`PillarCache` for the given master
+    opts, or None if the pillar cache is disabled
+    '''
+    if not opts.get('pillar_cache', False):
+        return None
+    cachedir = opts['cachedir']
+    if cachedir not in _PILLAR_CACHES:
+        _PILLAR_CACHES[cachedir] = PillarCache(opts)
+    return _PILLAR_CACHES[cachedir]
+
+
+class PillarCache(object):
+    '''
+    Cache the pillars compiled by the master
+
+    Compiled pillars are stored under ``cachedir/pillar_cache``, so they are
+    shared by the worker processes and survive a restart of the master. A
+    pillar is keyed by the grains, saltenv, pillar override and on demand
+    ext_pillar it was compiled with, and is valid for ``pillar_cache_ttl``
+    seconds as long as nothing changed in the ``pillar_roots`` or in the
+    pillar settings of the master.
+
+    The merged top file is also kept in memory when it is free of templating,
+    and so the same for every minion, as are the results of the ext_pillars
+    listed in ``pillar_cache_shared_ext``, whose data does not depend on the
+    minion. The cache may be used by several threads of a worker at once.
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.cdir = os.path.join(opts['cachedir'], 'pillar_cache')
+        self.ttl = opts.get('pillar_cache_ttl', 3600)
+        self.shared_ext = set(opts.get('pillar_cache_shared_ext', []))
+        self.hash_type = getattr(hashlib, opts.get('hash_type', 'md5'))
+        self.stats = dict.fromkeys(
+            ('hits', 'misses', 'expired', 'top_hits', 'top_misses',
+             'ext_hits', 'ext_misses'),
+            0)
+        self._settings = self.hash(
+            [opts.get(key) for key in ('ext_pillar',
+                                       'ext_pillar_first',
+                                       'pillar_opts',
+                                       'pillar_source_merging_strategy',
+                                       'pillar_safe_render_error',
+                                       'renderer',
+                                       'state_top')])
+        self._roots = None
+        self._roots_checked = 0
+        self._tops = {}
+        self._ext = {}
+        self._stats_written = 0
+        self._lock = threading.Lock()
+
+    def hash(self, data):
+        '''
+        Return a stable hash of serializable data
+        '''
+        return self.hash_type(
+            json.dumps(data, sort_keys=True, default=repr)).hexdigest()
+
+    def fingerprint(self):
+        '''
+        Return a hash of the pillar settings and of the path, mtime and size
+        of every file in the pillar_roots
+        '''
+        now = time.time()
+        if self._roots is not None \
+                and now - self._roots_checked < ROOTS_CHECK_INTERVAL:
+            return self._roots
+        hsum = self.hash_type(self._settings)
+        roots = self.opts.get('pillar_roots', {})
+        for saltenv in sorted(roots):
+            for root in roots[saltenv]:
+                hsum.update('{0}\0{1}\n'.format(saltenv, root))
+                for dirpath, dirnames, filenames in os.walk(root, followlinks=True):
+                    dirnames.sort()
+                    for name in sorted(filenames):
+                        path = os.path.join(dirpath, name)
+                        try:
+                            stat = os.stat(path)
+                        except OSError:
+                            continue
+                        hsum.update('{0}\0{1}\0{2}\n'.format(
+                            path, stat.st_mtime, stat.st_size))
+        self._roots = hsum.hexdigest()
+        self._roots_checked = now
+        return self._roots
+
+    def shared_fingerprint(self):
+        '''
+        Return the fingerprint of the data shared by the minions, which is
+        also invalidated by clearing the cache
+        '''
+        try:
+            cleared = os.path.getmtime(os.path.join(self.cdir, 'cleared'))
+        except OSError:
+            cleared = 0
+        return '{0}-{1}'.format(self.fingerprint(), cleared)
+
+    def _path(self, minion_id):
+        return os.path.join(self.cdir, 'minions', '{0}.p'.format(minion_id))
+
+    def _load(self, minion_id):
+        try:
+            with salt.utils.fopen(self._path(minion_id), 'rb') as fp_:
+                entries = self.serial.load(fp_)
+        except (IOError, OSError):
+            return {}
+        except Exception:
+            log.debug('Discarding the corrupted pillar cache of {0}'.format(minion_id))
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        return entries
+
+    def key(self, minion_id, grains, saltenv, pillar_override=None, ext=None):
+        '''
+        Return the key of a compiled pillar
+        '''
+        return self.hash([minion_id, grains, saltenv, pillar_override or {}, ext])
+
+    def get(self, minion_id, key):
+        '''
+        Return the cached pillar of a minion, or None
+        '''
+        entry = self._load(minion_id).get(key)
+        if entry is None:
+            self._count('misses')
+            return None
+        if entry['fingerprint'] != self.fingerprint() or \
+                (self.ttl and time.time() - entry['time'] > self.ttl):
+            self._count('expired')
+            return None
+        self._count('hits')
+        return entry['pillar']
+
+    def set(self, minion_id, key, pillar):
+        '''
+        Store the compiled pillar of a minion, pillars with render errors are
+        not cached
+        '''
+        if '_errors' in pillar:
+            return
+        fingerprint = self.fingerprint()
+        path = self._path(minion_id)
+        # Do not lose the entry of another thread writing the same minion
+        with self._lock:
+            entries = self._load(minion_id)
+            entries[key] = {'time': time.time(),
+                            'fingerprint': fingerprint,
+                            'pillar': pillar}
+            if len(entries) > ENTRIES_PER_MINION:
+                for old in sorted(entries, key=lambda k: entries[k]['time'])[:-ENTRIES_PER_MINION]:
+                    del entries[old]
+            try:
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+                    self.serial.dump(entries, fp_)
+            except (IOError, OSError) as exc:
+                log.error('Unable to write the pillar cache of {0}: {1}'.format(minion_id, exc))
+
+    def clear(self, tgt='*'):
+        '''
+        Remove the cached pillars of the minions matching the glob, return the
+        list of these minions
+        '''
+        self._tops.clear()
+        self._ext.clear()
+        # Invalidate the shared data of the other master processes
+        try:
+            if not os.path.isdir(self.cdir):
+                os.makedirs(self.cdir)
+            with salt.utils.fopen(os.path.join(self.cdir, 'cleared'), 'w') as fp_:
+                fp_.write(str(time.time()))
+        except (IOError, OSError) as exc:
+            log.error('Unable to clear the shared pillar cache: {0}'.format(exc))
+        mdir = os.path.join(self.cdir, 'minions')
+        try:
+            names = os.listdir(mdir)
+        except OSError:
+            return []
+        ret = []
+        for name in names:
+            minion_id = name[:-2]
+            if name.endswith('.p') and fnmatch.fnmatch(minion_id, tgt):
+                try:
+                    os.remove(os.path.join(mdir, name))
+                except OSError:
+                    continue
+                ret.append(minion_id)
+        return sorted(ret)
+
+    def get_top(self, saltenv):
+        '''
+        Return the merged top file of a saltenv, if it is shared by the
+        minions
+        '''
+        entry = self._tops.get(saltenv)
+        if entry is not None and entry[0] == self.shared_fingerprint() and \
+                (not self.ttl or time.time() - entry[1] <= self.ttl):
+            self._count('top_hits')
+            return entry[2]
+        self._count('top_misses')
+        return None
+
+    def set_top(self, saltenv, top):
+        '''
+        Keep the merged top file of a saltenv, free of templating
+        '''
+        self._tops[saltenv] = (self.shared_fingerprint(), time.time(), top)
+
+    def ext_pillar(self, key, val, compile_ext):
+        '''
+        Return the result of a shared ext_pillar, calling compile_ext on a
+        miss
+        '''
+        ckey = (key, self.hash(val))
+        entry = self._ext.get(ckey)
+        if entry is not None and entry[0] == self.shared_fingerprint() and \
+                (not self.ttl or time.time() - entry[1] <= self.ttl):
+            self._count('ext_hits')
+            return copy.deepcopy(entry[2])
+        self._count('ext_misses')
+        ext = compile_ext()
+        self._ext[ckey] = (self.shared_fingerprint(), time.time(), copy.deepcopy(ext))
+        return ext
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+            now = time.time()
+            if now - self._stats_written < STATS_INTERVAL:
+                return
+            self._stats_written = now
+            stats = self.stats.copy()
+        path = os.path.join(self.cdir, 'stats', str(os.getpid()))
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+                self.serial.dump(stats, fp_)
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write the pillar cache statistics: {0}'.format(exc))
+
+
+def cache_stats(opts):
+    '''
+    Return the statistics written by the pillar caches of the master
+    processes, summed up
+    '''
+    sdir = os.path.join(opts['cachedir'], 'pillar_cache', 'stats')
+    serial = salt.payload.Serial(opts)
+    ret = {}
+    try:
+        pids = os.listdir(sdir)
+    except OSError:
+        return ret
+    for pid in pids:
+        path = os.path.join(sdir, pid)
+        try:
+            with salt.utils.fopen(path, 'rb') as fp_:
+                stats = serial.load(fp_)
+        except Exception:
+            continue
+        for stat, count in stats.items():
+            ret[stat] = ret.get(stat, 0) + count
+    return ret
+
 
 def get_pillar(opts, grains, id_, saltenv=None, ext=None, env=None, funcs=None,
                pillar=None):
@@ -127,6 +422,9 @@ class Pillar(object):
             self.merge_strategy = opts['pillar_source_merging_strategy']
 
         self.ext_pillars = salt.loader.pillars(ext_pillar_opts, self.functions)
+        self.cache = get_pillar_cache(opts)
+        # Whether the top files gathered last were free of templating
+        self._static_tops = False
         self.pillar_override = {}
         if pillar is not None:
             if isinstance(pillar, dict):
@@ -190,6 +488,26 @@ class Pillar(object):
             envs.update(list(self.opts['file_roots']))
         return envs
 
+    def _top_file(self, path):
+        '''
+        Pass through the path of a top file, recording whether its rendering
+        can depend on the minion
+        '''
+        if self.cache is None or not self._static_tops:
+            return path
+        if self.opts['renderer'] not in STATIC_RENDERERS or not path:
+            self._static_tops = False
+            return path
+        try:
+            with salt.utils.fopen(path, 'r') as fp_:
+                data = fp_.read()
+        except (IOError, OSError):
+            self._static_tops = False
+            return path
+        if data.startswith('#!') or any(tok in data for tok in TEMPLATE_MARKUP):
+            self._static_tops = False
+        return path
+
     def get_tops(self):
         '''
         Gather the top files
@@ -198,14 +516,17 @@ class Pillar(object):
         include = collections.defaultdict(list)
         done = collections.defaultdict(list)
         errors = []
+        self._static_tops = True
         # Gather initial top files
         try:
             if self.opts['environment']:
                 tops[self.opts['environment']] = [
                         compile_template(
-                            self.client.cache_file(
-                                self.opts['state_top'],
-                                self.opts['environment']
+                            self._top_file(
+                                self.client.cache_file(
+                                    self.opts['state_top'],
+                                    self.opts['environment']
+                                    )
                                 ),
                             self.rend,
                             self.opts['renderer'],
@@ -216,9 +537,11 @@ class Pillar(object):
                 for saltenv in self._get_envs():
                     tops[saltenv].append(
                             compile_template(
-                                self.client.cache_file(
-                                    self.opts['state_top'],
-                                    saltenv
+                                self._top_file(
+                                    self.client.cache_file(
+                                        self.opts['state_top'],
+                                        saltenv
+                                        )
                                     ),
                                 self.rend,
                                 self.opts['renderer'],
@@ -251,10 +574,12 @@ class Pillar(object):
                     try:
                         tops[saltenv].append(
                                 compile_template(
-                                    self.client.get_state(
-                                        sls,
-                                        saltenv
-                                        ).get('dest', False),
+                                    self._top_file(
+                                        self.client.get_state(
+                                            sls,
+                                            saltenv
+                                            ).get('dest', False)
+                                        ),
                                     self.rend,
                                     self.opts['renderer'],
                                     saltenv=saltenv
@@ -322,12 +647,19 @@ class Pillar(object):
         '''
         Returns the high data derived from the top file
         '''
+        if self.cache is not None:
+            merged_tops = self.cache.get_top(self.opts['environment'])
+            if merged_tops is not None:
+                return copy.deepcopy(merged_tops), []
         tops, errors = self.get_tops()
         try:
             merged_tops = self.merge_tops(tops)
         except TypeError as err:
             merged_tops = OrderedDict()
             errors.append('Error encountered while render pillar top file.')
+        if self.cache is not None and self._static_tops and not errors:
+            self.cache.set_top(self.opts['environment'],
+                               copy.deepcopy(merged_tops))
         return merged_tops, errors
 
     def top_matches(self, top):
@@ -482,6 +814,18 @@ class Pillar(object):
         the variable ``pillar``
         '''
 
+        if self.cache is not None and key in self.cache.shared_ext:
+            # The data of a shared ext_pillar does not depend on the minion
+            return self.cache.ext_pillar(
+                key,
+                val,
+                lambda: self._compile_ext(pillar, val, pillar_dirs, key))
+        return self._compile_ext(pillar, val, pillar_dirs, key)
+
+    def _compile_ext(self, pillar, val, pillar_dirs, key):
+        '''
+        Call an ext_pillar
+        '''
         ext = None
 
         # try the new interface, which includes the minion ID
@@ -501,7 +845,37 @@ class Pillar(object):
                                             val)
         return ext
 
-    def ext_pillar(self, pillar, pillar_dirs):
+    def _call_ext_pillar(self, pillar, val, pillar_dirs, key):
+        '''
+        Call an ext_pillar, return its data or None if it failed
+        '''
+        try:
+            try:
+                return self._external_pillar_data(pillar,
+                                                  val,
+                                                  pillar_dirs,
+                                                  key)
+            except TypeError as exc:
+                if str(exc).startswith('ext_pillar() takes exactly '):
+                    log.warning('Deprecation warning: ext_pillar "{0}"'
+                                ' needs to accept minion_id as first'
+                                ' argument'.format(key))
+                else:
+                    raise
+
+                return self._external_pillar_data(pillar,
+                                                  val,
+                                                  pillar_dirs,
+                                                  key)
+        except Exception as exc:
+            log.exception(
+                    'Failed to load ext_pillar {0}: {1}'.format(
+                        key,
+                        exc
+                        )
+                    )
+
+    def ext_pillar(self, pillar, pillar_dirs, errors=None):
         '''
         Render the external pillar data
         '''
@@ -513,6 +887,8 @@ class Pillar(object):
         ext = None
         # Bring in CLI pillar data
         pillar.update(self.pillar_override)
+        if self.opts.get('ext_pillar_concurrency', 1) > 1:
+            return self._concurrent_ext_pillar(pillar, pillar_dirs, errors)
         for run in self.opts['ext_pillar']:
             if not isinstance(run, dict):
                 log.critical('The "ext_pillar" option is malformed')
@@ -523,31 +899,10 @@ class Pillar(object):
                            'unavailable').format(key)
                     log.critical(err)
                     continue
-                try:
-                    try:
-                        ext = self._external_pillar_data(pillar,
-                                                         val,
-                                                         pillar_dirs,
-                                                         key)
-                    except TypeError as exc:
-                        if str(exc).startswith('ext_pillar() takes exactly '):
-                            log.warning('Deprecation warning: ext_pillar "{0}"'
-                                        ' needs to accept minion_id as first'
-                                        ' argument'.format(key))
-                        else:
-                            raise
-
-                        ext = self._external_pillar_data(pillar,
-                                                         val,
-                                                         pillar_dirs,
-                                                         key)
-                except Exception as exc:
-                    log.exception(
-                            'Failed to load ext_pillar {0}: {1}'.format(
-                                key,
-                                exc
-                                )
-                            )
+                start = time.time()
+                ext = self._call_ext_pillar(pillar, val, pillar_dirs, key)
+                log.debug('ext_pillar {0} took {1:.3f}s'.format(
+                    key, time.time() - start))
             if ext:
                 pillar = merge(
                     pillar,
@@ -557,6 +912,115 @@ class Pillar(object):
                 ext = None
         return pillar
 
+    def _concurrent_ext_pillar(self, pillar, pillar_dirs, errors=None):
+        '''
+        Call the ext_pillars on threads and merge their data in the
+        configured order
+
+        Every ext_pillar is passed the pillar data compiled before the
+        ext_pillars were called. The sources using the same ext_pillar module
+        are called one after the other, on the same thread, since the modules
+        may not be thread safe. A source which does not return within
+        ``ext_pillar_timeout`` seconds of being called is left running and its
+        data is ignored.
+        '''
+        sources = []
+        for run in self.opts['ext_pillar']:
+            if not isinstance(run, dict):
+                log.critical('The "ext_pillar" option is malformed')
+                return {}
+            for key, val in run.items():
+                if key not in self.ext_pillars:
+                    err = ('Specified ext_pillar interface {0} is '
+                           'unavailable').format(key)
+                    log.critical(err)
+                    continue
+                sources.append((key, val))
+        # Sources left running past the timeout must not see the pillar
+        # being merged
+        pillars = [copy.deepcopy(pillar) for _ in sources]
+        results = {}
+        started = {}
+        done = threading.Condition()
+        concurrency = self.opts['ext_pillar_concurrency']
+        slots = threading.BoundedSemaphore(concurrency)
+
+        def call(key, indexes):
+            with slots:
+                for ind in indexes:
+                    # The timeout of a source starts when it is called, not
+                    # while it waits for a slot
+                    with done:
+                        started[ind] = time.time()
+                        done.notify()
+                    ext = self._call_ext_pillar(
+                        pillars[ind], sources[ind][1], pillar_dirs, key)
+                    with done:
+                        results[ind] = (ext, time.time() - started[ind])
+                        done.notify()
+
+        groups = OrderedDict()
+        group_of = {}
+        for ind, (key, val) in enumerate(sources):
+            groups.setdefault(key, []).append(ind)
+            group_of[ind] = key
+        threads = []
+        for key, indexes in six.iteritems(groups):
+            thread = threading.Thread(target=call, args=(key, indexes))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        timeout = self.opts.get('ext_pillar_timeout', 0)
+        if timeout:
+            with done:
+                while True:
+                    now = time.time()
+                    late = set(ind for ind in started if ind not in results
+                               and now - started[ind] >= timeout)
+                    # A source which has not started waits behind a late
+                    # source of its module, or for a slot which every late
+                    # source keeps
+                    blocked = set(group_of[ind] for ind in late)
+                    waiting = [
+                        ind for ind in range(len(sources))
+                        if ind not in results and ind not in late and
+                        (ind in started or (group_of[ind] not in blocked and
+                                            len(late) < concurrency))]
+                    if not waiting:
+                        break
+                    left = [started[ind] + timeout - now
+                            for ind in waiting if ind in started]
+                    done.wait(min(left) if left else None)
+                # Snapshot the results, late sources must not change them
+                results = dict(results)
+                started = dict(started)
+        else:
+            for thread in threads:
+                thread.join()
+
+        for ind, (key, val) in enumerate(sources):
+            if ind not in results:
+                if ind in started:
+                    err = ('ext_pillar {0} did not return within {1}s'
+                           .format(key, timeout))
+                else:
+                    err = ('ext_pillar {0} did not start, the ext_pillars '
+                           'before it did not return within {1}s'
+                           .format(key, timeout))
+                log.error(err)
+                if errors is not None:
+                    errors.append(err)
+                continue
+            ext, elapsed = results[ind]
+            log.debug('ext_pillar {0} took {1:.3f}s'.format(key, elapsed))
+            if ext:
+                pillar = merge(
+                    pillar,
+                    ext,
+                    self.merge_strategy,
+                    self.opts.get('renderer', 'yaml'))
+        return pillar
+
     def compile_pillar(self, ext=True, pillar_dirs=None):
         '''
         Render the pillar data and return
@@ -564,9 +1028,11 @@ class Pillar(object):
         top, top_errors = self.get_top()
         if ext:
             if self.opts.get('ext_pillar_first', False):
-                self.opts['pillar'] = self.ext_pillar({}, pillar_dirs)
+                ext_errors = []
+                self.opts['pillar'] = self.ext_pillar({}, pillar_dirs, ext_errors)
                 matches = self.top_matches(top)
                 pillar, errors = self.render_pillar(matches)
+                errors.extend(ext_errors)
                 pillar = merge(pillar,
                                self.opts['pillar'],
                                self.merge_strategy,
@@ -574,7 +1040,7 @@ class Pillar(object):
             else:
                 matches = self.top_matches(top)
                 pillar, errors = self.render_pillar(matches)
-                pillar = self.ext_pillar(pillar, pillar_dirs)
+                pillar = self.ext_pillar(pillar, pillar_dirs, errors)
         else:
             matches = self.top_matches(top)
             pillar, errors = self.render_pillar(matches)
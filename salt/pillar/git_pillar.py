@@ -85,6 +85,7 @@ from copy import deepcopy
 import logging
 import hashlib
 import os
+import threading
 
 # Import third party libs
 HAS_GIT = False
@@ -135,6 +136,8 @@ class GitPillar(object):
         self._envs = set()
         self.working_dir = ''
         self.repo = None
+        # held while fetching, a fetch which timed out may still be running
+        self._update_lock = threading.Lock()
 
         hash_type = getattr(hashlib, opts.get('hash_type', 'md5'))
         hash_str = '{0} {1}'.format(self.branch, self.rp_location)
@@ -190,22 +193,29 @@ class GitPillar(object):
 
         Return boolean whether it worked
         '''
-        try:
-            log.debug('Updating fileserver for git_pillar module')
-            self.repo.git.fetch()
-        except git.exc.GitCommandError as exc:
-            log.error('Unable to fetch the latest changes from remote '
-                      '{0}: {1}'.format(self.rp_location, exc))
+        if not self._update_lock.acquire(False):
+            log.warning('git_pillar remote {0} is still being fetched, '
+                        'skipping'.format(self.rp_location))
             return False
-
         try:
-            self.repo.git.checkout('origin/{0}'.format(self.branch))
-        except git.exc.GitCommandError as exc:
-            logging.error('Unable to checkout branch '
-                          '{0}: {1}'.format(self.branch, exc))
-            return False
-
-        return True
+            try:
+                log.debug('Updating fileserver for git_pillar module')
+                self.repo.git.fetch()
+            except git.exc.GitCommandError as exc:
+                log.error('Unable to fetch the latest changes from remote '
+                          '{0}: {1}'.format(self.rp_location, exc))
+                return False
+
+            try:
+                self.repo.git.checkout('origin/{0}'.format(self.branch))
+            except git.exc.GitCommandError as exc:
+                logging.error('Unable to checkout branch '
+                              '{0}: {1}'.format(self.branch, exc))
+                return False
+
+            return True
+        finally:
+            self._update_lock.release()
 
     def envs(self):
         '''
@@ -3,14 +3,178 @@
 Returners Directory
 
 :func:`get_returner_options` is a general purpose function that returners may
-use to fetch their configuration options.
+use to fetch their configuration options, and :func:`get_connection_pool`
+keeps the connections of a returner open between calls.
 '''
 from __future__ import absolute_import
 
+import contextlib
 import logging
+import os
+import threading
+import time
 
 log = logging.getLogger(__name__)
 
+# The connection pools of the returners, keyed by returner name and options
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+class ConnectionPool(object):
+    '''
+    Keep up to ``size`` idle connections of a returner open for reuse
+
+    ``connect`` is called without arguments to open a new connection and
+    ``close`` to close one. Connections idle for more than ``max_idle``
+    seconds, or for which the optional ``check`` returns False, are closed
+    instead of being reused. The pool belongs to the
+    process which created it, a forked child opens its own connections.
+    '''
+    def __init__(self, connect, close, size=4, max_idle=300, check=None):
+        self.connect = connect
+        self.close = close
+        self.check = check
+        self.size = size
+        self.max_idle = max_idle
+        self.pid = os.getpid()
+        self._idle = []
+        self._lock = threading.Lock()
+        self.metrics = {'created': 0,
+                        'reused': 0,
+                        'closed': 0,
+                        'discarded': 0,
+                        'in_use': 0}
+
+    def _check_pid(self):
+        if self.pid != os.getpid():
+            # The connections of the parent process must not be used, nor
+            # closed, they are still used by the parent
+            self.pid = os.getpid()
+            self._idle = []
+            self.metrics['in_use'] = 0
+
+    def acquire(self):
+        '''
+        Return an idle connection, or a new one
+        '''
+        while True:
+            with self._lock:
+                self._check_pid()
+                if not self._idle:
+                    break
+                conn, last = self._idle.pop()
+            if time.time() - last <= self.max_idle and self._alive(conn):
+                with self._lock:
+                    self.metrics['reused'] += 1
+                    self.metrics['in_use'] += 1
+                return conn
+            self._close(conn)
+        conn = self.connect()
+        with self._lock:
+            self.metrics['created'] += 1
+            self.metrics['in_use'] += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        '''
+        Give a connection back to the pool, discard it if it may be broken
+        '''
+        with self._lock:
+            self._check_pid()
+            self.metrics['in_use'] = max(0, self.metrics['in_use'] - 1)
+            if discard:
+                self.metrics['discarded'] += 1
+            elif len(self._idle) < self.size:
+                self._idle.append((conn, time.time()))
+                return
+        self._close(conn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        '''
+        Borrow a connection for the duration of a with block. The connection
+        is discarded if the block raises an exception.
+        '''
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def clear(self):
+        '''
+        Close the idle connections
+        '''
+        with self._lock:
+            self._check_pid()
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+    def _alive(self, conn):
+        if self.check is None:
+            return True
+        try:
+            return self.check(conn)
+        except Exception:
+            return False
+
+    def _close(self, conn):
+        self.metrics['closed'] += 1
+        try:
+            self.close(conn)
+        except Exception as exc:
+            log.debug('Error closing a returner connection: {0}'.format(exc))
+
+    def stats(self):
+        '''
+        Return the metrics of the pool
+        '''
+        ret = dict(self.metrics)
+        ret['idle'] = len(self._idle)
+        ret['size'] = self.size
+        return ret
+
+
+def get_connection_pool(name, options, connect, close, check=None, opts=None):
+    '''
+    Return the process wide connection pool of a returner for the given
+    connection options, creating it with ``connect``, ``close`` and ``check``
+    as described in :py:class:`ConnectionPool`
+
+    The size of the pools is set by the ``returner_pool_size`` option, a size
+    of 0 closes the connections after every use. Connections idle for more
+    than ``returner_pool_idle`` seconds are reopened.
+    '''
+    opts = opts or {}
+    key = (name, tuple(sorted((k, repr(v)) for k, v in options.items())))
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = ConnectionPool(
+                connect,
+                close,
+                size=opts.get('returner_pool_size', 4),
+                max_idle=opts.get('returner_pool_idle', 300),
+                check=check)
+        return _POOLS[key]
+
+
+def pool_stats():
+    '''
+    Return the metrics of the returner connection pools of this process,
+    keyed by returner name
+    '''
+    ret = {}
+    for (name, _), pool in list(_POOLS.items()):
+        stats = ret.setdefault(name, {})
+        for metric, value in pool.stats().items():
+            stats[metric] = stats.get(metric, 0) + value
+    return ret
+
 
 def get_returner_options(virtualname=None,
                          ret=None,
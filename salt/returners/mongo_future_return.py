@@ -51,6 +51,11 @@ To use the alternative configuration, append '--return_config alternative' to th
 .. code-block:: bash
 
     salt '*' test.ping --return mongo --return_config alternative
+
+The connection to the server is kept open and reused, see
+:conf_master:`returner_pool_size`. The events of the master can be stored in
+the ``events`` collection by setting ``event_return: mongo`` in the master
+config.
 '''
 from __future__ import absolute_import
 
@@ -118,26 +123,39 @@ def _get_conn(ret):
     '''
     _options = _get_options(ret)
 
-    host = _options.get('host')
-    port = _options.get('port')
-    db_ = _options.get('db')
-    user = _options.get('user')
-    password = _options.get('password')
-    indexes = _options.get('indexes', False)
+    def connect():
+        host = _options.get('host')
+        port = _options.get('port')
+        db_ = _options.get('db')
+        user = _options.get('user')
+        password = _options.get('password')
+        indexes = _options.get('indexes', False)
+
+        conn = pymongo.Connection(host, port)
+        mdb = conn[db_]
 
-    conn = pymongo.Connection(host, port)
-    mdb = conn[db_]
+        if user and password:
+            mdb.authenticate(user, password)
 
-    if user and password:
-        mdb.authenticate(user, password)
+        if indexes:
+            mdb.saltReturns.ensure_index('minion')
+            mdb.saltReturns.ensure_index('jid')
 
-    if indexes:
-        mdb.saltReturns.ensure_index('minion')
-        mdb.saltReturns.ensure_index('jid')
+            mdb.jobs.ensure_index('jid')
 
-        mdb.jobs.ensure_index('jid')
+        return conn, mdb
 
-    return conn, mdb
+    pool = salt.returners.get_connection_pool(
+            __virtualname__,
+            _options,
+            connect,
+            lambda conn: conn[0].disconnect(),
+            opts=__opts__)
+    # A pymongo connection is thread safe and handles its sockets itself, the
+    # pool only keeps the authenticated connection open between returns
+    conn = pool.acquire()
+    pool.release(conn)
+    return conn
 
 
 def returner(ret):
@@ -159,6 +177,27 @@ def returner(ret):
     col.insert(sdata)
 
 
+def event_return(events):
+    '''
+    Return events to a mongodb server, in a single batched insert
+
+    Requires that configuration be enabled via 'event_return'
+    option in master config.
+    '''
+    if not events:
+        return
+    conn, mdb = _get_conn(events)
+    docs = []
+    for event in events:
+        data = event.get('data', '')
+        if isinstance(data, dict):
+            data = _remove_dots(data)
+        docs.append({'tag': event.get('tag', ''),
+                     'data': data,
+                     'master_id': __opts__['id']})
+    mdb.events.insert(docs)
+
+
 def save_load(jid, load):
     '''
     Save the load for a given job id
@@ -113,6 +113,9 @@ To use the alternative configuration, append '--return_config alternative' to th
 .. code-block:: bash
 
     salt '*' test.ping --return mysql --return_config alternative
+
+The connections to the server are kept open and reused, see
+:conf_master:`returner_pool_size`.
 '''
 from __future__ import absolute_import
 # Let's not allow PyLint complain about string substitution
@@ -182,47 +185,71 @@ def _get_options(ret=None):
     return _options
 
 
+def _ping(conn):
+    '''
+    Check that a pooled connection is still open
+    '''
+    conn.ping()
+    return True
+
+
+def _get_pool(ret=None):
+    '''
+    Return the mysql connection pool for the options of the return
+    '''
+    _options = _get_options(ret)
+
+    def connect():
+        try:
+            # An empty ssl_options dictionary passed to MySQLdb.connect will
+            # effectively connect w/o SSL.
+            ssl_options = {}
+            if _options.get('ssl_ca'):
+                ssl_options['ca'] = _options.get('ssl_ca')
+            if _options.get('ssl_cert'):
+                ssl_options['cert'] = _options.get('ssl_cert')
+            if _options.get('ssl_key'):
+                ssl_options['key'] = _options.get('ssl_key')
+            return MySQLdb.connect(host=_options.get('host'),
+                                   user=_options.get('user'),
+                                   passwd=_options.get('pass'),
+                                   db=_options.get('db'),
+                                   port=_options.get('port'),
+                                   ssl=ssl_options)
+        except MySQLdb.connections.OperationalError as exc:
+            raise salt.exceptions.SaltMasterError('MySQL returner could not connect to database: {exc}'.format(exc=exc))
+
+    return salt.returners.get_connection_pool(
+            __virtualname__,
+            _options,
+            connect,
+            lambda conn: conn.close(),
+            check=_ping,
+            opts=__opts__)
+
+
 @contextmanager
 def _get_serv(ret=None, commit=False):
     '''
-    Return a mysql cursor
+    Return a mysql cursor, on a pooled connection
     '''
-    _options = _get_options(ret)
-    try:
-        # An empty ssl_options dictionary passed to MySQLdb.connect will
-        # effectively connect w/o SSL.
-        ssl_options = {}
-        if _options.get('ssl_ca'):
-            ssl_options['ca'] = _options.get('ssl_ca')
-        if _options.get('ssl_cert'):
-            ssl_options['cert'] = _options.get('ssl_cert')
-        if _options.get('ssl_key'):
-            ssl_options['key'] = _options.get('ssl_key')
-        conn = MySQLdb.connect(host=_options.get('host'),
-                               user=_options.get('user'),
-                               passwd=_options.get('pass'),
-                               db=_options.get('db'),
-                               port=_options.get('port'),
-                               ssl=ssl_options)
-    except MySQLdb.connections.OperationalError as exc:
-        raise salt.exceptions.SaltMasterError('MySQL returner could not connect to database: {exc}'.format(exc=exc))
-
-    cursor = conn.cursor()
+    with _get_pool(ret).connection() as conn:
+        cursor = conn.cursor()
 
-    try:
-        yield cursor
-    except MySQLdb.DatabaseError as err:
-        error = err.args
-        sys.stderr.write(str(error))
-        cursor.execute("ROLLBACK")
-        raise err
-    else:
-        if commit:
-            cursor.execute("COMMIT")
-        else:
+        try:
+            yield cursor
+        except MySQLdb.DatabaseError as err:
+            error = err.args
+            sys.stderr.write(str(error))
             cursor.execute("ROLLBACK")
-    finally:
-        conn.close()
+            raise err
+        else:
+            if commit:
+                cursor.execute("COMMIT")
+            else:
+                cursor.execute("ROLLBACK")
+        finally:
+            cursor.close()
 
 
 def returner(ret):
@@ -251,13 +278,16 @@ def event_return(events):
     Requires that configuration be enabled via 'event_return'
     option in master config.
     '''
+    if not events:
+        return
     with _get_serv(events, commit=True) as cur:
-        for event in events:
-            tag = event.get('tag', '')
-            data = event.get('data', '')
-            sql = '''INSERT INTO `salt_events` (`tag`, `data`, `master_id` )
-                     VALUES (%s, %s, %s)'''
-            cur.execute(sql, (tag, json.dumps(data), __opts__['id']))
+        sql = '''INSERT INTO `salt_events` (`tag`, `data`, `master_id` )
+                 VALUES (%s, %s, %s)'''
+        # executemany sends the events as a single multi-row insert
+        cur.executemany(sql, [(event.get('tag', ''),
+                               json.dumps(event.get('data', '')),
+                               __opts__['id'])
+                              for event in events])
 
 
 def save_load(jid, load):
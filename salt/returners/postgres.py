@@ -68,6 +68,20 @@ correctly:
     CREATE INDEX ON salt_returns (id);
     CREATE INDEX ON salt_returns (jid);
     CREATE INDEX ON salt_returns (fun);
+
+    --
+    -- Table structure for table 'salt_events'
+    --
+
+    DROP TABLE IF EXISTS salt_events;
+    CREATE TABLE salt_events (
+      id        serial PRIMARY KEY,
+      tag       varchar(255) NOT NULL,
+      data      text NOT NULL,
+      alter_time TIMESTAMP WITH TIME ZONE DEFAULT now(),
+      master_id varchar(255) NOT NULL
+    );
+    CREATE INDEX ON salt_events (tag);
     EOF
 
 Required python modules: psycopg2
@@ -85,12 +99,18 @@ To use the alternative configuration, append '--return_config alternative' to th
 .. code-block:: bash
 
     salt '*' test.ping --return postgres --return_config alternative
+
+The connections to the server are kept open and reused, see
+:conf_master:`returner_pool_size`. The events of the master can be stored in
+the ``salt_events`` table by setting ``event_return: postgres`` in the master
+config.
 '''
 from __future__ import absolute_import
 # Let's not allow PyLint complain about string substitution
 # pylint: disable=W1321,E1321
 
 # Import python libs
+from contextlib import contextmanager
 import json
 
 # Import Salt libs
@@ -132,157 +152,178 @@ def _get_options(ret=None):
     return _options
 
 
-def _get_conn(ret=None):
+def _get_pool(ret=None):
     '''
-    Return a postgres connection.
+    Return the postgres connection pool for the options of the return
     '''
     _options = _get_options(ret)
 
-    host = _options.get('host')
-    user = _options.get('user')
-    passwd = _options.get('passwd')
-    db = _options.get('db')
-    port = _options.get('port')
-
-    return psycopg2.connect(
-            host=host,
-            user=user,
-            password=passwd,
-            database=db,
-            port=port)
-
-
-def _close_conn(conn):
+    def connect():
+        return psycopg2.connect(
+                host=_options.get('host'),
+                user=_options.get('user'),
+                password=_options.get('passwd'),
+                database=_options.get('db'),
+                port=_options.get('port'))
+
+    return salt.returners.get_connection_pool(
+            __virtualname__,
+            _options,
+            connect,
+            lambda conn: conn.close(),
+            check=lambda conn: not conn.closed,
+            opts=__opts__)
+
+
+@contextmanager
+def _get_serv(ret=None, commit=False):
     '''
-    Close the Postgres connection
+    Return a postgres cursor, on a pooled connection
     '''
-    conn.commit()
-    conn.close()
+    with _get_pool(ret).connection() as conn:
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        except psycopg2.DatabaseError:
+            conn.rollback()
+            raise
+        else:
+            if commit:
+                conn.commit()
+            else:
+                conn.rollback()
+        finally:
+            cursor.close()
 
 
 def returner(ret):
     '''
     Return data to a postgres server
     '''
-    conn = _get_conn(ret)
-    cur = conn.cursor()
-    sql = '''INSERT INTO salt_returns
-            (fun, jid, return, id, success)
-            VALUES (%s, %s, %s, %s, %s)'''
-    cur.execute(
-        sql, (
-            ret['fun'],
-            ret['jid'],
-            json.dumps(ret['return']),
-            ret['id'],
-            ret['success']
+    with _get_serv(ret, commit=True) as cur:
+        sql = '''INSERT INTO salt_returns
+                (fun, jid, return, id, success)
+                VALUES (%s, %s, %s, %s, %s)'''
+        cur.execute(
+            sql, (
+                ret['fun'],
+                ret['jid'],
+                json.dumps(ret['return']),
+                ret['id'],
+                ret['success']
+            )
         )
-    )
-    _close_conn(conn)
+
+
+def event_return(events):
+    '''
+    Return events to a postgres server, in a single multi-row insert
+
+    Requires that configuration be enabled via 'event_return'
+    option in master config.
+    '''
+    if not events:
+        return
+    with _get_serv(events, commit=True) as cur:
+        rows = [cur.mogrify('(%s, %s, %s)',
+                            (event.get('tag', ''),
+                             json.dumps(event.get('data', '')),
+                             __opts__['id']))
+                for event in events]
+        cur.execute('''INSERT INTO salt_events (tag, data, master_id)
+                       VALUES ''' + ', '.join(rows))
 
 
 def save_load(jid, load):
     '''
     Save the load to the specified jid id
     '''
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = '''INSERT INTO jids (jid, load) VALUES (%s, %s)'''
+    with _get_serv(commit=True) as cur:
+        sql = '''INSERT INTO jids (jid, load) VALUES (%s, %s)'''
 
-    cur.execute(sql, (jid, json.dumps(load)))
-    _close_conn(conn)
+        cur.execute(sql, (jid, json.dumps(load)))
 
 
 def get_load(jid):
     '''
     Return the load data that marks a specified jid
     '''
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = '''SELECT load FROM jids WHERE jid = %s;'''
+    with _get_serv(ret=None) as cur:
+        sql = '''SELECT load FROM jids WHERE jid = %s;'''
 
-    cur.execute(sql, (jid,))
-    data = cur.fetchone()
-    if data:
-        return json.loads(data)
-    _close_conn(conn)
-    return {}
+        cur.execute(sql, (jid,))
+        data = cur.fetchone()
+        if data:
+            return json.loads(data[0])
+        return {}
 
 
 def get_jid(jid):
     '''
     Return the information returned when the specified job id was executed
     '''
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = '''SELECT id, full_ret FROM salt_returns WHERE jid = %s'''
+    with _get_serv(ret=None) as cur:
+        sql = '''SELECT id, full_ret FROM salt_returns WHERE jid = %s'''
 
-    cur.execute(sql, (jid,))
-    data = cur.fetchall()
-    ret = {}
-    if data:
-        for minion, full_ret in data:
-            ret[minion] = json.loads(full_ret)
-    _close_conn(conn)
-    return ret
+        cur.execute(sql, (jid,))
+        data = cur.fetchall()
+        ret = {}
+        if data:
+            for minion, full_ret in data:
+                ret[minion] = json.loads(full_ret)
+        return ret
 
 
 def get_fun(fun):
     '''
     Return a dict of the last function called for all minions
     '''
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = '''SELECT s.id,s.jid, s.full_ret
-            FROM salt_returns s
-            JOIN ( SELECT MAX(jid) AS jid FROM salt_returns GROUP BY fun, id) max
-            ON s.jid = max.jid
-            WHERE s.fun = %s
-            '''
-
-    cur.execute(sql, (fun,))
-    data = cur.fetchall()
-
-    ret = {}
-    if data:
-        for minion, _, full_ret in data:
-            ret[minion] = json.loads(full_ret)
-    _close_conn(conn)
-    return ret
+    with _get_serv(ret=None) as cur:
+        sql = '''SELECT s.id,s.jid, s.full_ret
+                FROM salt_returns s
+                JOIN ( SELECT MAX(jid) AS jid FROM salt_returns GROUP BY fun, id) max
+                ON s.jid = max.jid
+                WHERE s.fun = %s
+                '''
+
+        cur.execute(sql, (fun,))
+        data = cur.fetchall()
+
+        ret = {}
+        if data:
+            for minion, _, full_ret in data:
+                ret[minion] = json.loads(full_ret)
+        return ret
 
 
 def get_jids():
     '''
     Return a list of all job ids
     '''
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = '''SELECT jid FROM jids'''
+    with _get_serv(ret=None) as cur:
+        sql = '''SELECT jid FROM jids'''
 
-    cur.execute(sql)
-    data = cur.fetchall()
-    ret = []
-    for jid in data:
-        ret.append(jid[0])
-    _close_conn(conn)
-    return ret
+        cur.execute(sql)
+        data = cur.fetchall()
+        ret = []
+        for jid in data:
+            ret.append(jid[0])
+        return ret
 
 
 def get_minions():
     '''
     Return a list of minions
     '''
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = '''SELECT DISTINCT id FROM salt_returns'''
-
-    cur.execute(sql)
-    data = cur.fetchall()
-    ret = []
-    for minion in data:
-        ret.append(minion[0])
-    _close_conn(conn)
-    return ret
+    with _get_serv(ret=None) as cur:
+        sql = '''SELECT DISTINCT id FROM salt_returns'''
+
+        cur.execute(sql)
+        data = cur.fetchall()
+        ret = []
+        for minion in data:
+            ret.append(minion[0])
+        return ret
 
 
 def prep_jid(nocache=False, passed_jid=None):  # pylint: disable=unused-argument
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+'''
+Return data to an append-only, time-segmented local job cache
+
+.. versionadded:: 2015.8.0
+
+The :mod:`local_cache <salt.returners.local_cache>` job cache creates a
+directory for every job and for every minion returning to it, so large jobs
+cost tens of thousands of inodes and cleaning the cache has to walk all of
+them. This job cache appends the loads and returns of all the jobs started
+within the same hour to a single log file, next to a compact index mapping
+job ids to the offsets of their records. Old jobs are expired by removing
+whole segments.
+
+To use it as the master job cache, set the following in the master config:
+
+.. code-block:: yaml
+
+    master_job_cache: segment_cache
+
+The cache is stored under ``cachedir/segment_jobs``. Lookups through the
+``jobs`` runner and the local client work the same as with ``local_cache``.
+'''
+from __future__ import absolute_import
+
+# Import python libs
+import datetime
+import logging
+import os
+import shutil
+import struct
+import time
+
+# Import salt libs
+import salt.payload
+import salt.utils
+import salt.utils.jid
+import salt.utils.minions
+
+# Import third party libs
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+log = logging.getLogger(__name__)
+
+__virtualname__ = 'segment_cache'
+
+# The append-only file holding the serialized records of a segment
+LOG_FILE = 'log'
+# The append-only file mapping job ids to records in the log
+INDEX_FILE = 'index'
+# Segment for job ids which do not carry a timestamp
+MISC_SEGMENT = 'misc'
+
+# Every record and index entry is prefixed with its length
+_HEADER = struct.Struct('>I')
+
+# Parsed segment indexes, keyed by segment path
+_INDEXES = {}
+# The leading bytes of an index file compared to tell a segment which was
+# removed and created again from one which was appended to
+_HEAD_SIZE = 64
+
+
+def __virtual__():
+    if not HAS_FCNTL:
+        return False
+    return __virtualname__
+
+
+def _job_dir():
+    '''
+    Return root of the segmented jobs cache directory
+    '''
+    return os.path.join(__opts__['cachedir'], 'segment_jobs')
+
+
+def _segment_name(jid):
+    '''
+    Return the name of the segment holding a job, one segment per hour
+    '''
+    jid = str(jid)
+    try:
+        datetime.datetime.strptime(jid[:10], '%Y%m%d%H')
+    except ValueError:
+        return MISC_SEGMENT
+    return jid[:10]
+
+
+def _segment_dir(jid):
+    '''
+    Return the directory of the segment holding a job
+    '''
+    return os.path.join(_job_dir(), _segment_name(jid))
+
+
+def _read_entries(fp_):
+    '''
+    Yield the length-prefixed entries of a file, along with the position
+    following each of them. A partially written trailing entry is ignored.
+    '''
+    while True:
+        start = fp_.tell()
+        header = fp_.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            fp_.seek(start)
+            return
+        length = _HEADER.unpack(header)[0]
+        data = fp_.read(length)
+        if len(data) < length:
+            fp_.seek(start)
+            return
+        yield data, fp_.tell()
+
+
+def _index(segment):
+    '''
+    Return the parsed index of a segment. Only the index entries appended
+    since the previous call are read.
+    '''
+    index_path = os.path.join(segment, INDEX_FILE)
+    try:
+        stat = os.stat(index_path)
+    except OSError:
+        _INDEXES.pop(segment, None)
+        return {}
+    cached = _INDEXES.get(segment)
+    if cached is not None and \
+            cached['stat'] == (stat.st_ino, stat.st_mtime, stat.st_size):
+        return cached['jids']
+    serial = salt.payload.Serial(__opts__)
+    with salt.utils.fopen(index_path, 'rb') as fp_:
+        head = fp_.read(_HEAD_SIZE)
+        if cached is None or cached['stat'][0] != stat.st_ino \
+                or cached['pos'] > stat.st_size \
+                or not head.startswith(cached['head']):
+            # New segment, or one which was removed and created again
+            cached = {'pos': 0, 'head': '', 'jids': {}}
+            _INDEXES[segment] = cached
+        cached['head'] = head
+        cached['stat'] = (stat.st_ino, stat.st_mtime, stat.st_size)
+        fp_.seek(cached['pos'])
+        for data, pos in _read_entries(fp_):
+            jid, kind, minion, offset, length = serial.loads(data)
+            job = cached['jids'].setdefault(jid, {'ret': {}})
+            if kind == 'ret':
+                job['ret'][minion] = (offset, length)
+            else:
+                job[kind] = (offset, length)
+            cached['pos'] = pos
+    return cached['jids']
+
+
+def _job(jid):
+    '''
+    Return the index entry of a job, or None if the job is unknown
+    '''
+    return _index(_segment_dir(jid)).get(str(jid))
+
+
+def _append(jid, kind, data, minion=''):
+    '''
+    Append a record to the segment of a job and index it
+
+    The segment is locked while writing so concurrent master processes do not
+    interleave their records. Returns False when the record is refused
+    because it is already present.
+    '''
+    jid = str(jid)
+    segment = _segment_dir(jid)
+    if not os.path.isdir(segment):
+        try:
+            os.makedirs(segment)
+        except OSError:
+            if not os.path.isdir(segment):
+                raise
+    serial = salt.payload.Serial(__opts__)
+    record = serial.dumps(data)
+    with salt.utils.fopen(os.path.join(segment, LOG_FILE), 'ab') as log_fp:
+        fcntl.flock(log_fp.fileno(), fcntl.LOCK_EX)
+        try:
+            job = _index(segment).get(jid)
+            if kind == 'jid' and job and 'jid' in job:
+                return False
+            if kind == 'ret' and job and minion in job['ret']:
+                return False
+            log_fp.seek(0, os.SEEK_END)
+            offset = log_fp.tell() + _HEADER.size
+            log_fp.write(_HEADER.pack(len(record)) + record)
+            log_fp.flush()
+            entry = serial.dumps([jid, kind, minion, offset, len(record)])
+            with salt.utils.fopen(os.path.join(segment, INDEX_FILE), 'ab') as idx_fp:
+                idx_fp.write(_HEADER.pack(len(entry)) + entry)
+        finally:
+            fcntl.flock(log_fp.fileno(), fcntl.LOCK_UN)
+    return True
+
+
+def _load_record(jid, location, log_fp=None):
+    '''
+    Read a single record of a job from its segment log
+    '''
+    offset, length = location
+    serial = salt.payload.Serial(__opts__)
+    if log_fp is None:
+        with salt.utils.fopen(os.path.join(_segment_dir(jid), LOG_FILE), 'rb') as fp_:
+            fp_.seek(offset)
+            return serial.loads(fp_.read(length))
+    log_fp.seek(offset)
+    return serial.loads(log_fp.read(length))
+
+
+def _format_job_instance(job):
+    '''
+    Format the job instance correctly
+    '''
+    ret = {'Function': job.get('fun', 'unknown-function'),
+           'Arguments': list(job.get('arg', [])),
+           # unlikely but safeguard from invalid returns
+           'Target': job.get('tgt', 'unknown-target'),
+           'Target-type': job.get('tgt_type', []),
+           'User': job.get('user', 'root')}
+
+    if 'metadata' in job:
+        ret['Metadata'] = job.get('metadata', {})
+    else:
+        if 'kwargs' in job:
+            if 'metadata' in job['kwargs']:
+                ret['Metadata'] = job['kwargs'].get('metadata', {})
+    return ret
+
+
+def _format_jid_instance(jid, job):
+    '''
+    Format the jid correctly
+    '''
+    ret = _format_job_instance(job)
+    ret.update({'StartTime': salt.utils.jid.jid_to_time(jid)})
+    return ret
+
+
+def prep_jid(nocache=False, passed_jid=None):
+    '''
+    Return a job id and record it in its segment, making sure generated job
+    ids do not collide
+    '''
+    if passed_jid is None:  # this can be a None of an empty string
+        jid = salt.utils.jid.gen_jid()
+    else:
+        jid = passed_jid
+
+    if not _append(jid, 'jid', {'nocache': nocache}) and passed_jid is None:
+        # Someone else is using this jid, get a new one
+        return prep_jid(nocache=nocache)
+    return jid
+
+
+def returner(load):
+    '''
+    Return data to the segmented job cache
+    '''
+    # if a minion is returning a standalone job, get a jobid
+    if load['jid'] == 'req':
+        load['jid'] = prep_jid(nocache=load.get('nocache', False))
+
+    job = _job(load['jid'])
+    if job is None or 'jid' not in job:
+        log.error(
+            'An inconsistency occurred, a job was received with a job id '
+            'that is not present in the local cache: {jid}'.format(**load)
+        )
+        return False
+    if _load_record(load['jid'], job['jid']).get('nocache'):
+        return
+
+    data = {'return': load['return']}
+    if 'out' in load:
+        data['out'] = load['out']
+    if not _append(load['jid'], 'ret', data, minion=load['id']):
+        # Minion has already returned this jid and it should be dropped
+        log.error(
+            'An extra return was detected from minion {0}, please verify '
+            'the minion, this could be a replay attack'.format(
+                load['id']
+            )
+        )
+        return False
+
+
+def save_load(jid, clear_load):
+    '''
+    Save the load to the specified jid
+    '''
+    # if you have a tgt, save that for the UI etc
+    if 'tgt' in clear_load:
+        ckminions = salt.utils.minions.CkMinions(__opts__)
+        # Retrieve the minions list
+        minions = ckminions.check_minions(
+                clear_load['tgt'],
+                clear_load.get('tgt_type', 'glob')
+                )
+        # save the minions to a cache so we can see in the UI
+        _append(jid, 'minions', minions)
+
+    # Save the invocation information
+    _append(jid, 'load', clear_load)
+
+
+def get_load(jid):
+    '''
+    Return the load data that marks a specified jid
+    '''
+    job = _job(jid)
+    if not job or 'load' not in job:
+        return {}
+    ret = _load_record(jid, job['load'])
+    if 'minions' in job:
+        ret['Minions'] = _load_record(jid, job['minions'])
+    return ret
+
+
+def get_jid(jid):
+    '''
+    Return the information returned when the specified job id was executed
+    '''
+    ret = {}
+    job = _job(jid)
+    # Check to see if the jid is real, if not return the empty dict
+    if not job or not job['ret']:
+        return ret
+    with salt.utils.fopen(os.path.join(_segment_dir(jid), LOG_FILE), 'rb') as fp_:
+        for minion, location in job['ret'].items():
+            ret[minion] = _load_record(jid, location, fp_)
+    return ret
+
+
+def get_jids():
+    '''
+    Return a list of all job ids
+    '''
+    ret = {}
+    job_dir = _job_dir()
+    if not os.path.isdir(job_dir):
+        return ret
+    for name in os.listdir(job_dir):
+        segment = os.path.join(job_dir, name)
+        jobs = _index(segment)
+        if not jobs:
+            continue
+        with salt.utils.fopen(os.path.join(segment, LOG_FILE), 'rb') as fp_:
+            for jid, job in jobs.items():
+                if 'load' not in job:
+                    continue
+                ret[jid] = _format_jid_instance(
+                    jid, _load_record(jid, job['load'], fp_))
+    return ret
+
+
+def clean_old_jobs():
+    '''
+    Clean out the old jobs from the job cache by removing whole segments
+    '''
+    if __opts__['keep_jobs'] == 0:
+        return
+    job_dir = _job_dir()
+    if not os.path.isdir(job_dir):
+        return
+    keep = __opts__['keep_jobs'] * 3600
+    now = time.time()
+    cur = datetime.datetime.now()
+    for name in os.listdir(job_dir):
+        segment = os.path.join(job_dir, name)
+        if name == MISC_SEGMENT:
+            # No timestamp in the jids, go by the last write instead
+            try:
+                mtime = os.path.getmtime(os.path.join(segment, LOG_FILE))
+                expired = now - mtime > keep
+            except OSError:
+                continue
+        else:
+            try:
+                start = datetime.datetime.strptime(name, '%Y%m%d%H')
+            except ValueError:
+                # Not a segment, scrub it
+                expired = True
+            else:
+                # A segment holds jobs started within an hour of its name
+                end = start + datetime.timedelta(hours=1)
+                expired = salt.utils.total_seconds(cur - end) > keep
+        if expired:
+            shutil.rmtree(segment, ignore_errors=True)
+            _INDEXES.pop(segment, None)
@@ -233,6 +233,12 @@ def update(backend=None):
     Update the fileserver cache. If no backend is provided, then the cache for
     all configured backends will be updated.
 
+    .. versionchanged:: 2015.8.0
+        Backends reporting on their update, such as :mod:`git
+        <salt.fileserver.gitfs>`, have their report returned: whether every
+        remote was fetched and changed, and how many seconds its update took.
+        ``True`` is returned if no backend reported on its update.
+
     backend
         Narrow fileserver backends to a subset of the enabled ones.
 
@@ -255,8 +261,7 @@ def update(backend=None):
         salt-run fileserver.update backend=roots,git
     '''
     fileserver = salt.fileserver.Fileserver(__opts__)
-    fileserver.update(back=backend)
-    return True
+    return fileserver.update(back=backend) or True
 
 
 def clear_cache(backend=None):
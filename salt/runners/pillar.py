@@ -93,3 +93,39 @@ def show_pillar(minion='*', **kwargs):
 
     compiled_pillar = pillar.compile_pillar()
     return compiled_pillar
+
+
+def clear_cache(minion='*'):
+    '''
+    .. versionadded:: 2015.8.0
+
+    Remove the compiled pillars of the minions matching a glob from the
+    pillar cache, so they are compiled again on their next request. The
+    pillar cache is only used when ``pillar_cache`` is enabled.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run pillar.clear_cache
+        salt-run pillar.clear_cache 'web*'
+    '''
+    cache = salt.pillar.PillarCache(__opts__)
+    return cache.clear(minion)
+
+
+def cache_stats():
+    '''
+    .. versionadded:: 2015.8.0
+
+    Return the hits and misses of the pillar cache of the master, summed over
+    its worker processes. The statistics are written by every process at most
+    every 10 seconds.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run pillar.cache_stats
+    '''
+    return salt.pillar.cache_stats(__opts__)
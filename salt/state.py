@@ -16,13 +16,16 @@ from __future__ import absolute_import
 
 # Import python libs
 import os
+import re
 import sys
 import copy
+import bisect
 import site
 import fnmatch
 import logging
 import traceback
 import datetime
+import multiprocessing
 
 # Import salt libs
 import salt.utils
@@ -34,12 +37,13 @@ import salt.utils.event
 import salt.syspaths as syspaths
 from salt.utils import context, immutabletypes
 from salt.ext.six import string_types
+import salt.ext.six as six
 from salt.template import compile_template, compile_template_str
 from salt.exceptions import SaltRenderError, SaltReqTimeoutError, SaltException
 from salt.utils.odict import OrderedDict, DefaultOrderedDict
 
 # Import third party libs
-from salt.ext.six.moves import range
+from salt.ext.six.moves import queue, range  # pylint: disable=import-error,redefined-builtin
 
 log = logging.getLogger(__name__)
 
@@ -91,6 +95,11 @@ STATE_RUNTIME_KEYWORDS = frozenset([
     ])
 STATE_INTERNAL_KEYWORDS = STATE_REQUISITE_KEYWORDS.union(STATE_REQUISITE_IN_KEYWORDS).union(STATE_RUNTIME_KEYWORDS)
 
+# The order given to the first state by state_auto_order, explicit orders
+# below it and the orders of states ordered last are kept in parallel runs
+AUTO_ORDER_START = 10000
+LAST_ORDER_START = 1000000
+
 
 def _odict_hashable(self):
     return id(self)
@@ -178,6 +187,251 @@ def find_name(name, state, high):
     return ext_id
 
 
+def _find_name_index(high):
+    '''
+    Return a function with the same results as find_name for the given high
+    data, answering from a map of every name built in a single pass
+    '''
+    names = {}
+    for nid in high:
+        if not isinstance(high[nid], dict):
+            continue
+        for state, args in six.iteritems(high[nid]):
+            if not isinstance(args, list):
+                continue
+            for arg in args:
+                if not isinstance(arg, dict):
+                    continue
+                if len(arg) != 1:
+                    continue
+                try:
+                    # The last match wins, as with find_name
+                    names[(state, arg[next(iter(arg))])] = nid
+                except TypeError:
+                    # Unhashable argument value, it can not be a name
+                    continue
+
+    def _find(name, state):
+        try:
+            if name in high:
+                return name
+            return names.get((state, name), '')
+        except TypeError:
+            return find_name(name, state, high)
+    return _find
+
+
+# Characters making fnmatch treat a requisite as a pattern
+_GLOB_CHARS = frozenset('*?[')
+# fnmatch compares case insensitively where the platform paths are
+_CASE_SENSITIVE = os.path.normcase('A') == 'A'
+
+
+class RequisiteIndex(object):
+    '''
+    Index the low chunks of a run by the fields requisites match against
+
+    Requisites naming a state by an exact name, id or sls are resolved with
+    dictionary lookups. Requisites using globs are only matched against the
+    chunks of the requisite's state module. Matches are returned in the
+    order of the chunks, as a scan of the chunks would.
+    '''
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.size = len(chunks)
+        self.position = {}
+        self.by_state = {}
+        self.by_name = {}
+        self.by_id = {}
+        self.by_sls = {}
+        self._sorted = {}
+        for pos, chunk in enumerate(chunks):
+            self.position[id(chunk)] = pos
+            state = chunk['state']
+            self.by_state.setdefault(state, []).append(chunk)
+            for key, table in (('name', self.by_name), ('__id__', self.by_id)):
+                try:
+                    table.setdefault((state, chunk[key]), []).append(chunk)
+                except TypeError:
+                    continue
+            try:
+                self.by_sls.setdefault(chunk['__sls__'], []).append(chunk)
+            except TypeError:
+                continue
+
+    def _literal(self, val):
+        '''
+        Return True if fnmatch would only match the value itself
+        '''
+        return (_CASE_SENSITIVE and
+                isinstance(val, string_types) and
+                not _GLOB_CHARS.intersection(val))
+
+    def _merge(self, first, second):
+        '''
+        Merge two lists of chunks, dropping duplicates, in the order of the run
+        '''
+        if not second:
+            return list(first)
+        if not first:
+            return list(second)
+        merged = dict((id(chunk), chunk) for chunk in first)
+        merged.update((id(chunk), chunk) for chunk in second)
+        return [merged[key] for key in
+                sorted(merged, key=self.position.__getitem__)]
+
+    def find(self, req_key, req_val):
+        '''
+        Return the chunks matched by a single requisite
+        '''
+        if req_key == 'sls':
+            # Allow requisite tracking of entire sls files
+            if self._literal(req_val):
+                return list(self.by_sls.get(req_val, ()))
+            return [chunk for chunk in self.chunks
+                    if fnmatch.fnmatch(chunk['__sls__'], req_val)]
+        if self._literal(req_val):
+            return self._merge(self.by_name.get((req_key, req_val), ()),
+                               self.by_id.get((req_key, req_val), ()))
+        prefix = self._prefix(req_val)
+        if prefix:
+            return self._find_prefixed(req_key, req_val, prefix)
+        return [chunk for chunk in self.by_state.get(req_key, ())
+                if (fnmatch.fnmatch(chunk['name'], req_val) or
+                    fnmatch.fnmatch(chunk['__id__'], req_val))]
+
+    def _prefix(self, pattern):
+        '''
+        Return the literal leading part of a glob, or an empty string if it
+        can not be used to narrow down the candidates
+        '''
+        if not _CASE_SENSITIVE or not isinstance(pattern, string_types):
+            return ''
+        for pos, char in enumerate(pattern):
+            if char in _GLOB_CHARS:
+                return pattern[:pos]
+        return pattern
+
+    def _find_prefixed(self, state, pattern, prefix):
+        '''
+        Match a glob against the names and ids of a state module starting
+        with its literal prefix, found by bisecting their sorted list
+        '''
+        if state not in self._sorted:
+            keys = []
+            for chunk in self.by_state.get(state, ()):
+                pos = self.position[id(chunk)]
+                for key in ('name', '__id__'):
+                    if isinstance(chunk[key], string_types):
+                        keys.append((chunk[key], pos))
+            keys.sort()
+            self._sorted[state] = ([key[0] for key in keys], keys)
+        names, keys = self._sorted[state]
+        regex = re.compile(fnmatch.translate(pattern))
+        found = set()
+        for ind in range(bisect.bisect_left(names, prefix), len(names)):
+            if not names[ind].startswith(prefix):
+                break
+            if regex.match(names[ind]):
+                found.add(keys[ind][1])
+        return [self.chunks[found_pos] for found_pos in sorted(found)]
+
+
+def order_stage(chunk):
+    '''
+    Return the stage of a chunk in a parallel run. All the chunks ordered by
+    state_auto_order share a stage, chunks with an explicit order before them
+    or ordered last get a stage per order.
+    '''
+    order = chunk.get('order')
+    if not isinstance(order, (int, float)):
+        return AUTO_ORDER_START
+    if order < AUTO_ORDER_START or order >= LAST_ORDER_START:
+        return int(order)
+    return AUTO_ORDER_START
+
+
+def parallel_blocks(chunks, index, aggregate=()):
+    '''
+    Split ordered chunks into blocks of groups which can be run concurrently
+
+    Chunks related by any requisite, chunks of the same aggregated state
+    module and all the ``file.accumulated`` chunks end up in the same group,
+    in the order of the chunks. Blocks are run one after the other and are
+    returned as ``(parallel, groups)`` tuples. A block is run serially,
+    as a single group, if a group spans several order stages or if one of
+    its chunks is failhard.
+    '''
+    parent = list(range(len(chunks)))
+
+    def _root(pos):
+        while parent[pos] != pos:
+            parent[pos] = parent[parent[pos]]
+            pos = parent[pos]
+        return pos
+
+    def _union(first, second):
+        first, second = _root(first), _root(second)
+        if first != second:
+            parent[max(first, second)] = min(first, second)
+
+    shared = {}
+    for pos, low in enumerate(chunks):
+        for req_type in ('require', 'watch', 'prereq', 'prerequired',
+                         'onfail', 'onchanges'):
+            for req in low.get(req_type) or ():
+                req = trim_req(req)
+                if not isinstance(req, dict) or not req:
+                    continue
+                req_key = next(iter(req))
+                if req[req_key] is None:
+                    continue
+                for chunk in index.find(req_key, req[req_key]):
+                    _union(pos, index.position[id(chunk)])
+        if low['state'] in aggregate or low.get('aggregate') is True:
+            key = ('aggregate', low['state'])
+        elif low['state'] == 'file' and low.get('fun') == 'accumulated':
+            key = ('accumulated',)
+        else:
+            continue
+        _union(pos, shared.setdefault(key, pos))
+
+    groups = OrderedDict()
+    for pos in range(len(chunks)):
+        groups.setdefault(_root(pos), []).append(chunks[pos])
+
+    # Merge the stages spanned by a group, a block is a run of stages
+    spans = []
+    for lows in groups.values():
+        stages = [order_stage(low) for low in lows]
+        spans.append((min(stages), max(stages), lows))
+    spans.sort(key=lambda span: span[0])
+    blocks = []
+    for start, end, lows in spans:
+        if blocks and start <= blocks[-1]['end']:
+            block = blocks[-1]
+            block['end'] = max(block['end'], end)
+            block['merged'] = block['merged'] or start != end \
+                    or start != block['start']
+        else:
+            block = {'start': start, 'end': end, 'merged': start != end,
+                     'groups': []}
+            blocks.append(block)
+        block['groups'].append(lows)
+
+    ret = []
+    for block in blocks:
+        lows = [low for group in block['groups'] for low in group]
+        if block['merged'] or any(low.get('failhard') for low in lows):
+            lows.sort(key=lambda low: index.position[id(low)])
+            ret.append((False, [lows]))
+        else:
+            block['groups'].sort(
+                key=lambda group: index.position[id(group[0])])
+            ret.append((len(block['groups']) > 1, block['groups']))
+    return ret
+
+
 def format_log(ret):
     '''
     Format the state into a log message
@@ -582,6 +836,8 @@ class State(object):
         self.active = set()
         self.mod_init = set()
         self.pre = {}
+        self._req_index = None
+        self._refreshes = 0
         self.__run_num = 0
         self.jid = jid
         self.instance_id = str(id(self))
@@ -733,6 +989,7 @@ class State(object):
         Refresh all the modules
         '''
         log.debug('Refreshing modules...')
+        self._refreshes += 1
         if self.opts['grains'].get('os') != 'MacOS':
             # In case a package has been installed into the current python
             # process 'site-packages', the 'site' module needs to be reloaded in
@@ -1282,6 +1539,7 @@ class State(object):
                     ]))
         extend = {}
         errors = []
+        find = _find_name_index(high)
         for id_, body in high.items():
             if not isinstance(body, dict):
                 continue
@@ -1378,7 +1636,7 @@ class State(object):
                                             )
                                 if key == 'prereq':
                                     # Add prerequired to prereqs
-                                    ext_id = find_name(name, _state, high)
+                                    ext_id = find(name, _state)
                                     if not ext_id:
                                         continue
                                     if ext_id not in extend:
@@ -1392,7 +1650,7 @@ class State(object):
                                 if key == 'use_in':
                                     # Add the running states args to the
                                     # use_in states
-                                    ext_id = find_name(name, _state, high)
+                                    ext_id = find(name, _state)
                                     if not ext_id:
                                         continue
                                     ext_args = state_args(ext_id, _state, high)
@@ -1418,7 +1676,7 @@ class State(object):
                                 if key == 'use':
                                     # Add the use state's args to the
                                     # running state
-                                    ext_id = find_name(name, _state, high)
+                                    ext_id = find(name, _state)
                                     if not ext_id:
                                         continue
                                     loc_args = state_args(id_, state, high)
@@ -1616,8 +1874,22 @@ class State(object):
         '''
         Iterate over a list of chunks and call them, checking for requires.
         '''
-        running = {}
-        for low in chunks:
+        self._req_index = RequisiteIndex(chunks)
+        if self.opts.get('state_parallel') and len(chunks) > 1:
+            if self.opts['failhard']:
+                log.debug('failhard is set, running the states serially')
+            elif not hasattr(os, 'fork'):
+                log.debug('Parallel state runs need fork, running the '
+                          'states serially')
+            else:
+                return self.call_chunks_parallel(chunks)
+        return self._call_lows(chunks, chunks, {})
+
+    def _call_lows(self, lows, chunks, running):
+        '''
+        Call the given chunks of the run in order, checking for requires
+        '''
+        for low in lows:
             if '__FAILHARD__' in running:
                 running.pop('__FAILHARD__')
                 return running
@@ -1629,6 +1901,145 @@ class State(object):
             self.active = set()
         return running
 
+    def call_chunks_parallel(self, chunks):
+        '''
+        Call the chunks, running the groups of chunks which do not depend on
+        each other concurrently in forked processes
+
+        Each group is run through the same code path as a serial run, so the
+        requisites between the chunks of a group behave the same. The
+        returns are numbered group by group in the order of the chunks.
+        '''
+        running = {}
+        agg_opt = self.functions['config.option']('state_aggregate')
+        if agg_opt is True:
+            aggregate = set(low['state'] for low in chunks)
+        elif isinstance(agg_opt, list):
+            aggregate = set(agg_opt)
+        else:
+            aggregate = set()
+        for parallel, groups in parallel_blocks(
+                chunks, self._req_index, aggregate):
+            if not parallel:
+                for lows in groups:
+                    running = self._call_lows(lows, chunks, running)
+                    if self._failed_hard(lows, running):
+                        return running
+                continue
+            for lows in groups:
+                for low in lows:
+                    # Run the module initializations once for all the groups
+                    self._mod_init(low)
+            running.update(self._call_groups(groups, chunks))
+            if self._failed_hard(
+                    [low for lows in groups for low in lows], running):
+                return running
+        return running
+
+    def _failed_hard(self, lows, running):
+        '''
+        Return True if the run has to stop after the given chunks because one
+        of them failed hard, the failhard signal is popped from running
+        '''
+        if running.pop('__FAILHARD__', False):
+            return True
+        for low in lows:
+            if _gen_tag(low) in running and self.check_failhard(low, running):
+                return True
+        return False
+
+    def _call_group(self, results, ind, lows, chunks):
+        '''
+        Run a group of chunks in a forked process and send back the returns
+        '''
+        refreshes = self._refreshes
+        running = {}
+        try:
+            running = self._call_lows(lows, chunks, running)
+        except Exception:  # pylint: disable=broad-except
+            log.error('Parallel state run failed', exc_info=True)
+        results.put((ind, running, self._refreshes != refreshes))
+
+    def _call_groups(self, groups, chunks):
+        '''
+        Run the groups of chunks on at most state_parallel_workers processes
+        and merge their returns
+        '''
+        workers = max(int(self.opts.get('state_parallel_workers', 4)), 1)
+        results = multiprocessing.Queue()
+        pending = list(enumerate(groups))
+        procs = {}
+        rets = {}
+        refresh = False
+        while pending or procs:
+            while pending and len(procs) < workers:
+                ind, lows = pending.pop(0)
+                proc = multiprocessing.Process(
+                        target=self._call_group,
+                        args=(results, ind, lows, chunks))
+                proc.start()
+                procs[ind] = proc
+            received = []
+            try:
+                received.append(results.get(timeout=1))
+            except queue.Empty:
+                # Returns of the processes which exited are in the queue
+                dead = [num for num, child in procs.items()
+                        if not child.is_alive()]
+                while True:
+                    try:
+                        received.append(results.get_nowait())
+                    except queue.Empty:
+                        break
+                for ind in dead:
+                    if ind not in [item[0] for item in received]:
+                        log.error('Parallel state run process exited '
+                                  'with code {0}'.format(
+                                      procs[ind].exitcode))
+                        received.append((ind, None, False))
+            for ind, ret, refreshed in received:
+                procs.pop(ind).join()
+                rets[ind] = ret
+                refresh = refresh or refreshed
+        running = {}
+        failhard = False
+        for ind, lows in enumerate(groups):
+            ret = rets[ind]
+            if ret is not None:
+                failhard = ret.pop('__FAILHARD__', False) or failhard
+                for tag in sorted(ret,
+                                  key=lambda tag: ret[tag]['__run_num__']):
+                    ret[tag]['__run_num__'] = self.__run_num
+                    self.__run_num += 1
+                    running[tag] = ret[tag]
+                continue
+            for low in lows:
+                tag = _gen_tag(low)
+                if tag in running:
+                    continue
+                running[tag] = {
+                    'changes': {},
+                    'result': False,
+                    'comment': 'The process running this state exited '
+                               'without returning',
+                    '__run_num__': self.__run_num,
+                    '__sls__': low['__sls__']}
+                self.__run_num += 1
+        if refresh:
+            # The modules were refreshed in a group, do it here as well so
+            # the following states use them
+            lows = [low for group in groups for low in group]
+            self.check_refresh(
+                    {'reload_modules': True,
+                     'reload_grains': any(
+                         low.get('reload_grains') for low in lows),
+                     'reload_pillar': any(
+                         low.get('reload_pillar') for low in lows)},
+                    {})
+        if failhard:
+            running['__FAILHARD__'] = True
+        return running
+
     def check_failhard(self, low, running):
         '''
         Check if the low data chunk should send a failhard signal
@@ -1639,6 +2050,17 @@ class State(object):
             return not running[tag]['result']
         return False
 
+    def _requisite_index(self, chunks):
+        '''
+        Return the requisite index of the given chunks, building it only if
+        the chunks changed since it was last built
+        '''
+        index = self._req_index
+        if index is None or index.chunks is not chunks \
+                or index.size != len(chunks):
+            index = self._req_index = RequisiteIndex(chunks)
+        return index
+
     def check_requisite(self, low, running, chunks, pre=False):
         '''
         Look into the running data to check the status of all requisite
@@ -1674,29 +2096,19 @@ class State(object):
                 'onchanges': []}
         if pre:
             reqs['prerequired'] = []
+        index = self._requisite_index(chunks)
         for r_state in reqs:
             if r_state in low and low[r_state] is not None:
                 for req in low[r_state]:
                     req = trim_req(req)
-                    found = False
-                    for chunk in chunks:
-                        req_key = next(iter(req))
-                        req_val = req[req_key]
-                        if req_val is None:
-                            continue
-                        if req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                found = True
-                                reqs[r_state].append(chunk)
-                            continue
-                        if (fnmatch.fnmatch(chunk['name'], req_val) or
-                            fnmatch.fnmatch(chunk['__id__'], req_val)):
-                            if chunk['state'] == req_key:
-                                found = True
-                                reqs[r_state].append(chunk)
+                    req_key = next(iter(req))
+                    req_val = req[req_key]
+                    if req_val is None:
+                        return 'unmet', ()
+                    found = index.find(req_key, req_val)
                     if not found:
                         return 'unmet', ()
+                    reqs[r_state].extend(found)
         fun_stats = set()
         for r_state, chunks in reqs.items():
             if r_state == 'prereq':
@@ -1786,33 +2198,23 @@ class State(object):
                 lost[requisite] = []
                 if requisite not in low:
                     continue
+                index = self._requisite_index(chunks)
                 for req in low[requisite]:
                     req = trim_req(req)
-                    found = False
-                    for chunk in chunks:
-                        req_key = next(iter(req))
-                        req_val = req[req_key]
-                        if req_val is None:
-                            continue
-                        if req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                reqs.append(chunk)
-                                found = True
-                            continue
-                        if (fnmatch.fnmatch(chunk['name'], req_val) or
-                            fnmatch.fnmatch(chunk['__id__'], req_val)):
-                            if chunk['state'] == req_key:
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                elif requisite == 'prerequired':
-                                    chunk['__prerequired__'] = True
-                                reqs.append(chunk)
-                                found = True
+                    req_key = next(iter(req))
+                    req_val = req[req_key]
+                    if req_val is None:
+                        lost[requisite].append(req)
+                        continue
+                    found = index.find(req_key, req_val)
+                    for chunk in found:
+                        if requisite == 'prereq':
+                            chunk['__prereq__'] = True
+                        elif requisite == 'prerequired' and req_key != 'sls':
+                            chunk['__prerequired__'] = True
                     if not found:
                         lost[requisite].append(req)
+                    reqs.extend(found)
             if lost['require'] or lost['watch'] or lost['prereq'] or lost['onfail'] or lost['onchanges'] or lost.get('prerequired'):
                 comment = 'The following requisites were not found:\n'
                 for requisite, lreqs in lost.items():
@@ -2204,7 +2606,7 @@ class BaseHighState(object):
     '''
     def __init__(self, opts):
         self.opts = self.__gen_opts(opts)
-        self.iorder = 10000
+        self.iorder = AUTO_ORDER_START
         self.avail = self.__gather_avail()
         self.serial = salt.payload.Serial(self.opts)
         self.building_highstate = {}
@@ -53,13 +53,17 @@ from __future__ import absolute_import
 
 # Import python libs
 import os
+import fnmatch
 import hashlib
 import errno
 import logging
+import re
+import threading
 import time
 import datetime
+import itertools
 import multiprocessing
-from collections import MutableMapping
+from collections import MutableMapping, deque
 
 # Import third party libs
 try:
@@ -76,6 +80,8 @@ import salt.utils.cache
 import salt.utils.dicttrim
 import salt.utils.process
 import salt.utils.zeromq
+from salt.ext.six import string_types
+from salt.ext.six.moves import queue  # pylint: disable=import-error
 log = logging.getLogger(__name__)
 
 # The SUB_EVENT set is for functions that require events fired based on
@@ -102,6 +108,9 @@ TAGS = {
     'queue': 'queue',  # prefix for all salt/queue events
 }
 
+# The default number of events kept pending for each pending tag
+MAX_EVENT_PENDING = 10000
+
 
 def get_event(node, sock_dir=None, transport='zeromq', opts=None, listen=True):
     '''
@@ -150,6 +159,177 @@ def tagify(suffix='', prefix='', base=SALT):
     return TAGPARTER.join([part for part in parts if part])
 
 
+class TagTrie(MutableMapping):
+    '''
+    Map tag prefixes to values
+
+    Every prefix of a tag which is in the mapping is found by walking the
+    characters of the tag once, instead of comparing the tag against each
+    prefix in turn.
+    '''
+    def __init__(self):
+        self._data = {}
+        # Nested dicts keyed by characters, the None key of a node holding
+        # the prefix which ends there
+        self._root = {}
+
+    def __getitem__(self, prefix):
+        return self._data[prefix]
+
+    def __setitem__(self, prefix, value):
+        if prefix not in self._data:
+            node = self._root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[None] = prefix
+        self._data[prefix] = value
+
+    def __delitem__(self, prefix):
+        del self._data[prefix]
+        path = [self._root]
+        for char in prefix:
+            path.append(path[-1][char])
+        del path[-1][None]
+        # Prune the nodes left empty
+        for char in reversed(prefix):
+            if path.pop():
+                break
+            del path[-1][char]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def matches(self, tag):
+        '''
+        Return the (prefix, value) pairs of the prefixes of the tag, shortest
+        first
+        '''
+        ret = []
+        node = self._root
+        if None in node:
+            ret.append(('', self._data['']))
+        for char in tag:
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                ret.append((node[None], self._data[node[None]]))
+        return ret
+
+
+class PendingEvents(object):
+    '''
+    The events received by a SaltEvent and kept for a later get_event call
+
+    Each pending tag has its own queue, holding at most ``maxlen`` events,
+    the oldest events being dropped when it overflows. An event is routed to
+    the queues of all the pending tags it matches when it is received, and
+    consuming it removes it from all of them.
+    '''
+    def __init__(self, maxlen=MAX_EVENT_PENDING):
+        self.maxlen = maxlen
+        self.queues = TagTrie()
+        # seq -> [event, number of queues holding it]
+        self.events = {}
+        self.seq = itertools.count()
+        self.dropped = 0
+        self.tags = frozenset()
+
+    def __len__(self):
+        return len(self.events)
+
+    def subscribe(self, tags):
+        '''
+        Set the tags to keep events for, dropping the events which do not
+        match any of them anymore
+        '''
+        tags = frozenset(tags)
+        if tags == self.tags:
+            return
+        self.tags = tags
+        new = [tag for tag in tags if tag not in self.queues]
+        if new:
+            kept = sorted(self.events)
+        for tag in new:
+            pending = {'seqs': deque(), 'dropped': 0}
+            self.queues[tag] = pending
+            # Pick up the events already kept for another tag
+            for seq in kept:
+                if self.events[seq][0]['tag'].startswith(tag):
+                    self._push(pending, seq)
+        for tag in [tag for tag in self.queues if tag not in tags]:
+            for seq in self.queues.pop(tag)['seqs']:
+                self._release(seq)
+
+    def add(self, evt):
+        '''
+        Queue an event for every pending tag it matches, return False if it
+        matches none of them
+        '''
+        matches = self.queues.matches(evt['tag'])
+        if not matches:
+            return False
+        seq = next(self.seq)
+        self.events[seq] = [evt, 0]
+        for _, pending in matches:
+            self._push(pending, seq)
+        return True
+
+    def pop(self, tag):
+        '''
+        Remove and return the oldest pending event matching the tag, or None
+        '''
+        pending = self.queues.get(tag)
+        if pending is None:
+            for seq in sorted(self.events):
+                if self.events[seq][0]['tag'].startswith(tag):
+                    return self.events.pop(seq)[0]
+            return None
+        while pending['seqs']:
+            entry = self.events.pop(pending['seqs'].popleft(), None)
+            if entry is not None:
+                return entry[0]
+        return None
+
+    def stats(self):
+        '''
+        Return the number of events queued and dropped for each pending tag
+        '''
+        ret = {}
+        for tag, pending in self.queues.items():
+            ret[tag] = {
+                'queued': len([seq for seq in pending['seqs']
+                               if seq in self.events]),
+                'dropped': pending['dropped'],
+            }
+        return ret
+
+    def _push(self, pending, seq):
+        seqs = pending['seqs']
+        if len(seqs) >= self.maxlen:
+            # Forget the events already consumed through another tag first
+            while seqs and seqs[0] not in self.events:
+                seqs.popleft()
+        if len(seqs) >= self.maxlen:
+            self._release(seqs.popleft())
+            pending['dropped'] += 1
+            self.dropped += 1
+            log.trace('Pending event queue full, dropped the oldest event')
+        seqs.append(seq)
+        self.events[seq][1] += 1
+
+    def _release(self, seq):
+        entry = self.events.get(seq)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self.events[seq]
+
+
 class SaltEvent(object):
     '''
     Warning! Use the get_event function or the code will not be
@@ -169,7 +349,9 @@ class SaltEvent(object):
             sock_dir = opts.get('sock_dir', None)
         self.puburi, self.pulluri = self.__load_uri(sock_dir, node)
         self.subscribe()
-        self.pending_events = []
+        self.pending_events = PendingEvents(
+            opts.get('max_event_pending', MAX_EVENT_PENDING)
+        )
         # since ZMQ connect()  has no guarantees about the socket actually being
         # connected this is a hack to attempt to do so.
         self.fire_event({}, tagify('event/new_client'), 0)
@@ -276,7 +458,9 @@ class SaltEvent(object):
         return mtag, data
 
     def _check_pending(self, tag, pending_tags):
-        """Check the pending_events list for events that match the tag
+        """Check the pending events for an event that matches the tag
+
+        Events which match neither the tag nor the pending tags are dropped.
 
         :param tag: The tag to search for
         :type tag: str
@@ -284,20 +468,10 @@ class SaltEvent(object):
         :type pending_tags: list[str]
         :return:
         """
-        old_events = self.pending_events
-        self.pending_events = []
-        ret = None
-        for evt in old_events:
-            if evt['tag'].startswith(tag):
-                if ret is None:
-                    ret = evt
-                else:
-                    self.pending_events.append(evt)
-            elif any(evt['tag'].startswith(ptag) for ptag in pending_tags):
-                self.pending_events.append(evt)
-        return ret
+        self.pending_events.subscribe([tag] + list(pending_tags))
+        return self.pending_events.pop(tag)
 
-    def _get_event(self, wait, tag, pending_tags):
+    def _get_event(self, wait, tag):
         start = time.time()
         timeout_at = start + wait
         while not wait or time.time() <= timeout_at:
@@ -317,8 +491,7 @@ class SaltEvent(object):
                     raise
 
             if not ret['tag'].startswith(tag):  # tag not match
-                if any(ret['tag'].startswith(ptag) for ptag in pending_tags):
-                    self.pending_events.append(ret)
+                self.pending_events.add(ret)
                 if wait:  # only update the wait timeout if we had one
                     wait = timeout_at - time.time()
                 continue
@@ -339,14 +512,13 @@ class SaltEvent(object):
         New in Boron always checks the list of pending events
 
         use_pending
-            Defines whether to keep all unconsumed events in a pending_events
-            list, or to discard events that don't match the requested tag.  If
-            set to True, MAY CAUSE MEMORY LEAKS.
+            Defines whether to keep all unconsumed events pending, or to
+            discard events that don't match the requested tag. At most
+            ``max_event_pending`` events are kept for each pending tag, the
+            oldest ones being dropped first.
 
         pending_tags
             Add any events matching the listed tags to the pending queue.
-            Still MAY CAUSE MEMORY LEAKS but less likely than use_pending
-            assuming you later get_event for the tags you've listed here
 
             New in Boron
         '''
@@ -358,7 +530,7 @@ class SaltEvent(object):
 
         ret = self._check_pending(tag, pending_tags)
         if ret is None:
-            ret = self._get_event(wait, tag, pending_tags)
+            ret = self._get_event(wait, tag)
 
         if ret is None or full:
             return ret
@@ -609,10 +781,67 @@ class EventPublisher(multiprocessing.Process):
                 self.context.term()
 
 
+def compile_tag_filter(patterns):
+    '''
+    Compile a list of tag globs into a single regular expression, return None
+    if the list is empty. A tag without glob characters only matches itself.
+    '''
+    if not patterns:
+        return None
+    return re.compile('|'.join('(?:{0})'.format(fnmatch.translate(str(pat)))
+                               for pat in patterns))
+
+
+class EventReturnWriter(threading.Thread):
+    '''
+    A thread passing the batches of events queued for it to a returner, so a
+    slow returner does not hold up the others nor the reading of the bus
+    '''
+    def __init__(self, name, func, backlog):
+        threading.Thread.__init__(self, name='EventReturnWriter-{0}'.format(name))
+        self.daemon = True
+        self.returner = name
+        self.func = func
+        self.batches = queue.Queue(max(1, backlog))
+        self.written = 0
+        self.dropped = 0
+
+    def put(self, batch):
+        '''
+        Queue a batch of events, return False and count the events as dropped
+        if the backlog of the returner is full
+        '''
+        try:
+            self.batches.put_nowait(batch)
+        except queue.Full:
+            self.dropped += len(batch)
+            return False
+        return True
+
+    def run(self):
+        while True:
+            batch = self.batches.get()
+            try:
+                self.func(batch)
+                self.written += len(batch)
+            except Exception as exc:
+                log.error(
+                    'Could not store events with returner \'{0}\': {1}'
+                    .format(self.returner, exc),
+                    exc_info_on_loglevel=logging.DEBUG
+                )
+
+
 class EventReturn(multiprocessing.Process):
     '''
     A dedicated process which listens to the master event bus and queues
-    and forwards events to the specified returner.
+    and forwards events to the specified returners.
+
+    Events matching the tag filters are buffered and handed over in batches
+    of ``event_return_queue`` events, or after ``event_return_queue_max_seconds``
+    if fewer events came in. Every returner is called on its own
+    :py:class:`EventReturnWriter` thread, and the batches which would exceed
+    its ``event_return_backlog`` are dropped rather than blocking the bus.
     '''
     def __init__(self, opts):
         '''
@@ -624,35 +853,88 @@ class EventReturn(multiprocessing.Process):
 
         self.opts = opts
         self.event_return_queue = self.opts['event_return_queue']
+        self.max_age = self.opts.get('event_return_queue_max_seconds', 5)
+        self.backlog = self.opts.get('event_return_backlog', 100)
+        self.whitelist = compile_tag_filter(
+            self.opts.get('event_return_whitelist', []))
+        self.blacklist = compile_tag_filter(
+            self.opts.get('event_return_blacklist', []))
         local_minion_opts = self.opts.copy()
         local_minion_opts['file_client'] = 'local'
         self.minion = salt.minion.MasterMinion(local_minion_opts)
+        self.writers = []
+
+    def _returners(self):
+        '''
+        Return the names of the configured returners, ``event_return`` being
+        a list or a comma separated string
+        '''
+        names = self.opts['event_return']
+        if isinstance(names, string_types):
+            names = names.split(',')
+        return [name.strip() for name in names if name.strip()]
+
+    def _start_writers(self):
+        for name in self._returners():
+            event_return = '{0}.event_return'.format(name)
+            if event_return not in self.minion.returners:
+                log.error(
+                    'Could not store events with returner \'{0}\', it was '
+                    'not found or has no event_return function'.format(name)
+                )
+                continue
+            writer = EventReturnWriter(
+                name, self.minion.returners[event_return], self.backlog)
+            writer.start()
+            self.writers.append(writer)
 
     def run(self):
         '''
         Spin up the multiprocess event returner
         '''
         salt.utils.appendproctitle(self.__class__.__name__)
+        self._start_writers()
         self.event = get_event('master', opts=self.opts)
-        events = self.event.iter_events(full=True)
         self.event.fire_event({}, 'salt/event_listen/start')
         event_queue = []
-        for event in events:
-            if self._filter(event):
+        oldest = None
+        while True:
+            wait = 0
+            if event_queue and self.max_age:
+                # Wake up in time to flush the oldest event
+                wait = max(0.01, oldest + self.max_age - time.time())
+            event = self.event.get_event(wait=wait or 5, full=True)
+            if event is not None and self._filter(event):
+                if not event_queue:
+                    oldest = time.time()
                 event_queue.append(event)
-            if len(event_queue) >= self.event_return_queue:
-                event_return = '{0}.event_return'.format(
-                    self.opts['event_return']
+            if not event_queue:
+                continue
+            if len(event_queue) >= self.event_return_queue or \
+                    (self.max_age and time.time() - oldest >= self.max_age):
+                self.flush_events(event_queue)
+                event_queue = []
+
+    def flush_events(self, event_queue):
+        '''
+        Hand a batch of events over to the writer of every returner
+        '''
+        for writer in self.writers:
+            if not writer.put(event_queue):
+                log.warning(
+                    'The returner \'{0}\' is falling behind, {1} events '
+                    'were dropped so far'.format(writer.returner, writer.dropped)
                 )
-                if event_return in self.minion.returners:
-                    self.minion.returners[event_return](event_queue)
-                    event_queue = []
-                else:
-                    log.error(
-                        'Could not store return for event(s) {0}. Returner '
-                        '\'{1}\' not found.'
-                        .format(event_queue, self.opts['event_return'])
-                    )
+
+    def stats(self):
+        '''
+        Return the number of events written and dropped for each returner
+        '''
+        return dict((writer.returner,
+                     {'written': writer.written,
+                      'dropped': writer.dropped,
+                      'backlog': writer.batches.qsize()})
+                    for writer in self.writers)
 
     def _filter(self, event):
         '''
@@ -661,12 +943,9 @@ class EventReturn(multiprocessing.Process):
         Returns True if event should be stored, else False
         '''
         tag = event['tag']
-        if tag in self.opts['event_return_whitelist']:
-            if tag not in self.opts['event_return_blacklist']:
-                return True
-            else:
-                return False  # Event was whitelisted and blacklisted
-        elif tag in self.opts['event_return_blacklist']:
+        if self.whitelist is not None and not self.whitelist.match(tag):
+            return False
+        if self.blacklist is not None and self.blacklist.match(tag):
             return False
         return True
 
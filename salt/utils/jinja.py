@@ -7,12 +7,14 @@ from __future__ import absolute_import
 # Import python libs
 from os import path
 import logging
+import os
 import json
 import pprint
 from functools import wraps
 
 # Import third party libs
-from jinja2 import BaseLoader, Markup, TemplateNotFound, nodes
+from jinja2 import BaseLoader, BytecodeCache, Markup, TemplateNotFound, nodes
+from jinja2.bccache import Bucket
 from jinja2.environment import TemplateModule
 from jinja2.ext import Extension
 from jinja2.exceptions import TemplateRuntimeError
@@ -22,6 +24,7 @@ import yaml
 # Import salt libs
 import salt
 import salt.utils
+import salt.utils.atomicfile
 import salt.fileclient
 from salt.utils.odict import OrderedDict
 from salt.ext.six import string_types
@@ -30,9 +33,13 @@ log = logging.getLogger(__name__)
 
 __all__ = [
     'SaltCacheLoader',
+    'SaltBytecodeCache',
     'SerializerExtension'
 ]
 
+# The number of compiled templates kept in memory by a SaltBytecodeCache
+BYTECODE_CACHE_SIZE = 512
+
 
 # To dump OrderedDict objects as regular dicts. Used by the yaml
 # template filter.
@@ -143,6 +150,97 @@ class SaltCacheLoader(BaseLoader):
         raise TemplateNotFound(template)
 
 
+class SaltBytecodeCache(BytecodeCache):
+    '''
+    Keep the code of the compiled templates across renders
+
+    The most recently used templates are kept in memory and, if a directory
+    is given, every template loaded from a file is also written there so the
+    next processes do not compile it again. Jinja checks the checksum of the
+    source of the template against the cached code, so a template is compiled
+    again as soon as it, or one of the templates it imports, changes.
+    '''
+    def __init__(self, directory=None, size=BYTECODE_CACHE_SIZE):
+        self.directory = directory
+        self.size = size
+        # key -> (checksum, code)
+        self.memory = OrderedDict()
+
+    def _path(self, bucket):
+        return path.join(self.directory, '{0}.cache'.format(bucket.key))
+
+    def _remember(self, bucket):
+        self.memory.pop(bucket.key, None)
+        self.memory[bucket.key] = (bucket.checksum, bucket.code)
+        while len(self.memory) > self.size:
+            try:
+                self.memory.popitem(last=False)
+            except KeyError:
+                # Emptied by another thread
+                break
+
+    def load_bytecode(self, bucket):
+        entry = self.memory.pop(bucket.key, None)
+        if entry is not None:
+            self.memory[bucket.key] = entry
+            if entry[0] == bucket.checksum:
+                bucket.code = entry[1]
+                return
+        if self.directory is None:
+            return
+        try:
+            with salt.utils.fopen(self._path(bucket), 'rb') as fp_:
+                bucket.load_bytecode(fp_)
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            bucket.reset()
+            return
+        if bucket.code is not None:
+            self._remember(bucket)
+
+    def dump_bytecode(self, bucket):
+        self._remember(bucket)
+        if self.directory is None:
+            return
+        try:
+            if not path.isdir(self.directory):
+                os.makedirs(self.directory)
+            with salt.utils.atomicfile.atomic_open(self._path(bucket), 'wb') as fp_:
+                bucket.write_bytecode(fp_)
+        except (IOError, OSError) as exc:
+            log.debug(
+                'Unable to write the Jinja bytecode cache to {0}: {1}'.format(
+                    self.directory, exc
+                )
+            )
+
+    def clear(self):
+        self.memory.clear()
+
+    def get_code(self, environment, source, name=None):
+        '''
+        Return the code of a template which is not loaded through the
+        environment's loader, compiling it unless it is cached. Only the
+        templates read from a file, whose name is given, are written to disk,
+        the others are kept in memory and keyed by their checksum.
+        '''
+        if name is None:
+            checksum = self.get_source_checksum(source)
+            bucket = Bucket(environment, checksum, checksum)
+            entry = self.memory.get(bucket.key)
+            if entry is not None:
+                bucket.code = entry[1]
+        else:
+            bucket = self.get_bucket(environment, name, None, source)
+        if bucket.code is None:
+            # Keep the default name, Jinja errors are reported against it
+            bucket.code = environment.compile(source)
+            if name is None:
+                self._remember(bucket)
+            else:
+                self.set_bucket(bucket)
+        return bucket.code
+
+
 class PrintableDict(OrderedDict):
     '''
     Ensures that dict str() and repr() are YAML friendly.
@@ -10,13 +10,19 @@ from __future__ import absolute_import
 import os
 import fnmatch
 import re
+import time
 import logging
+import itertools
+import bisect
+import threading
 
 # Import salt libs
 import salt.payload
 import salt.utils
+import salt.utils.atomicfile
 from salt.defaults import DEFAULT_TARGET_DELIM
 from salt.exceptions import CommandExecutionError
+from salt.utils.odict import OrderedDict
 from salt._compat import string_types
 
 HAS_RANGE = False
@@ -28,6 +34,390 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+# Characters which make a target a glob rather than a literal value
+GLOB_CHARS = frozenset('*?[')
+
+# Process wide minion data indexes, keyed by the master cachedir
+_MINION_DATA_INDEXES = {}
+
+# Process wide key indexes, keyed by the pki_dir
+_KEY_INDEXES = {}
+# The version of the format of the key index file
+KEY_INDEX_VERSION = 1
+# A key directory scanned within this many seconds of its last change is
+# scanned again, its mtime may not show a change made during the scan
+KEY_INDEX_RACY = 1
+# Characters which end the literal prefix of a regular expression
+PCRE_CHARS = frozenset('.^$*+?{}[]\\|()')
+
+# The number of parsed compound targets kept
+COMPOUND_CACHE_SIZE = 256
+# The boolean operators and parentheses of compound targets
+COMPOUND_OPERS = ('and', 'or', 'not', '(', ')')
+
+# Parsed compound targets, keyed by expression, least recently used first
+_COMPOUND_TARGETS = OrderedDict()
+
+
+class CompoundTarget(object):
+    '''
+    A compound target parsed into a tree of operators and matches
+
+    The nodes are tuples: ``('and', left, right)``, ``('or', left, right)``,
+    ``('not', operand)`` and ``('match', engine, value)``, the engine being
+    the letter preceding the ``@`` of the target, or None for a glob on the
+    minion id. :py:func:`compile_compound` returns the cached instance for an
+    expression so the parsing is done once.
+    '''
+    def __init__(self, expr, tree):
+        self.expr = expr
+        self.tree = tree
+        self.engines = set()
+        self._collect(tree)
+
+    def _collect(self, node):
+        if node[0] == 'match':
+            self.engines.add(node[1])
+        else:
+            for child in node[1:]:
+                self._collect(child)
+
+    def match(self, matchers):
+        '''
+        Return whether the target matches, ``matchers`` mapping every engine
+        to a function returning whether a value matches. Only the matches
+        needed to decide the result are evaluated, and an engine missing from
+        ``matchers`` makes the whole target fail.
+        '''
+        if not self.engines.issubset(matchers):
+            return False
+        return self._match(self.tree, matchers)
+
+    def _match(self, node, matchers):
+        if node[0] == 'match':
+            return bool(matchers[node[1]](node[2]))
+        if node[0] == 'not':
+            return not self._match(node[1], matchers)
+        if node[0] == 'and':
+            return self._match(node[1], matchers) and self._match(node[2], matchers)
+        return self._match(node[1], matchers) or self._match(node[2], matchers)
+
+    def minions(self, matchers, all_minions):
+        '''
+        Return the set of minions matching the target, ``matchers`` mapping
+        every engine to a function returning the minions matching a value.
+        The matches are combined with set operations, each distinct match
+        being evaluated at most once.
+        '''
+        if not self.engines.issubset(matchers):
+            return set()
+        return self._minions(self.tree, matchers, set(all_minions), {})
+
+    def _minions(self, node, matchers, all_minions, done):
+        if node[0] == 'match':
+            if node not in done:
+                done[node] = set(matchers[node[1]](node[2]))
+            return done[node]
+        if node[0] == 'not':
+            return all_minions - self._minions(node[1], matchers, all_minions, done)
+        left = self._minions(node[1], matchers, all_minions, done)
+        if node[0] == 'and':
+            if not left:
+                return left
+            return left & self._minions(node[2], matchers, all_minions, done)
+        return left | self._minions(node[2], matchers, all_minions, done)
+
+
+def _parse_compound(tokens, pos):
+    '''
+    Parse an ``or`` expression, the loosest binding operator
+    '''
+    left, pos = _parse_compound_and(tokens, pos)
+    while pos < len(tokens) and tokens[pos] == 'or':
+        right, pos = _parse_compound_and(tokens, pos + 1)
+        left = ('or', left, right)
+    return left, pos
+
+
+def _parse_compound_and(tokens, pos):
+    '''
+    Parse an ``and`` expression, ``not`` following an operand implying it
+    '''
+    left, pos = _parse_compound_not(tokens, pos)
+    while pos < len(tokens) and tokens[pos] in ('and', 'not'):
+        if tokens[pos] == 'and':
+            pos += 1
+        right, pos = _parse_compound_not(tokens, pos)
+        left = ('and', left, right)
+    return left, pos
+
+
+def _parse_compound_not(tokens, pos):
+    '''
+    Parse a negation, a parenthesized expression or a single match
+    '''
+    if pos >= len(tokens):
+        raise ValueError('unexpected end of expression')
+    token = tokens[pos]
+    if token == 'not':
+        operand, pos = _parse_compound_not(tokens, pos + 1)
+        return ('not', operand), pos
+    if token == '(':
+        node, pos = _parse_compound(tokens, pos + 1)
+        if pos >= len(tokens) or tokens[pos] != ')':
+            raise ValueError('missing right parenthesis')
+        return node, pos + 1
+    if token in COMPOUND_OPERS:
+        raise ValueError('unexpected {0!r}'.format(token))
+    if len(token) > 1 and token[1] == '@':
+        return ('match', token[0], token[2:]), pos + 1
+    return ('match', None, token), pos + 1
+
+
+def compile_compound(expr):
+    '''
+    Return the :py:class:`CompoundTarget` for a compound expression, or None
+    if the expression is invalid. The parsed targets are kept in a least
+    recently used cache of ``COMPOUND_CACHE_SIZE`` expressions.
+    '''
+    try:
+        target = _COMPOUND_TARGETS.pop(expr)
+    except KeyError:
+        tokens = expr.split()
+        try:
+            tree, pos = _parse_compound(tokens, 0)
+            if pos != len(tokens):
+                raise ValueError('unexpected {0!r}'.format(tokens[pos]))
+            target = CompoundTarget(expr, tree)
+        except ValueError as exc:
+            log.error('Invalid compound target {0}: {1}'.format(expr, exc))
+            target = None
+        while len(_COMPOUND_TARGETS) >= COMPOUND_CACHE_SIZE:
+            try:
+                _COMPOUND_TARGETS.popitem(last=False)
+            except KeyError:
+                break
+    _COMPOUND_TARGETS[expr] = target
+    return target
+
+
+class MinionDataIndex(object):
+    '''
+    In-memory view of the grains and pillar stored in the minion data cache
+
+    The index is loaded from ``cachedir/minions/<id>/data.p`` and kept fresh
+    by comparing the mtime of each data file, so a data file is only
+    unserialized again after it has been rewritten. Top-level grain and
+    pillar keys listed in ``minion_data_index_grains`` and
+    ``minion_data_index_pillar`` are additionally kept in inverted indexes
+    so that literal targets such as ``G@role:web`` resolve with a single
+    dictionary lookup. The index may be shared by the threads of a worker.
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.cdir = os.path.join(opts['cachedir'], 'minions')
+        self.refresh_interval = opts.get('minion_data_index_refresh', 10)
+        self.index_keys = {
+            'grains': set(opts.get('minion_data_index_grains', [])),
+            'pillar': set(opts.get('minion_data_index_pillar', [])),
+        }
+        self.data = {}
+        self._mtimes = {}
+        self._inverted = {}
+        self._unindexable = {}
+        self._last_refresh = 0
+        self._lock = threading.RLock()
+
+    def _index_values(self, value):
+        '''
+        Return the lowercased string forms under which a value is indexed, or
+        None if the value cannot be indexed
+        '''
+        if isinstance(value, dict):
+            return None
+        if isinstance(value, (list, tuple)):
+            ret = set()
+            for member in value:
+                if isinstance(member, (dict, list, tuple)):
+                    return None
+                ret.add(str(member).lower())
+            return ret
+        return set([str(value).lower()])
+
+    def _drop(self, minion_id):
+        '''
+        Remove a minion from the inverted indexes
+        '''
+        old = self.data.pop(minion_id, None)
+        self._mtimes.pop(minion_id, None)
+        for ids in self._unindexable.values():
+            ids.discard(minion_id)
+        if not old:
+            return
+        for search_type, keys in self.index_keys.items():
+            section = old.get(search_type) or {}
+            for key in keys:
+                if key not in section:
+                    continue
+                values = self._index_values(section[key]) or ()
+                table = self._inverted.get((search_type, key), {})
+                for value in values:
+                    ids = table.get(value)
+                    if ids is None:
+                        continue
+                    ids.discard(minion_id)
+                    if not ids:
+                        del table[value]
+
+    def _add(self, minion_id, data, mtime):
+        '''
+        Add a minion to the data store and the inverted indexes
+        '''
+        self.data[minion_id] = data
+        self._mtimes[minion_id] = mtime
+        for search_type, keys in self.index_keys.items():
+            section = data.get(search_type) or {}
+            if not isinstance(section, dict):
+                continue
+            for key in keys:
+                if key not in section:
+                    continue
+                values = self._index_values(section[key])
+                if values is None:
+                    self._unindexable.setdefault(
+                        (search_type, key), set()).add(minion_id)
+                    continue
+                table = self._inverted.setdefault((search_type, key), {})
+                for value in values:
+                    table.setdefault(value, set()).add(minion_id)
+
+    def update(self, minion_id, grains, pillar, mtime=None):
+        '''
+        Store fresh grains and pillar for a minion, used by the master when
+        it writes the minion data cache
+        '''
+        if mtime is None:
+            try:
+                mtime = os.path.getmtime(
+                    os.path.join(self.cdir, minion_id, 'data.p'))
+            except OSError:
+                mtime = None
+        with self._lock:
+            self._drop(minion_id)
+            self._add(minion_id, {'grains': grains, 'pillar': pillar}, mtime)
+
+    def refresh(self, force=False):
+        '''
+        Synchronize the index with the data files in the cachedir. Only data
+        files which changed since the last refresh are loaded.
+        '''
+        with self._lock:
+            self._refresh(force)
+
+    def _refresh(self, force):
+        '''
+        Refresh the index, the lock must be held
+        '''
+        now = time.time()
+        if not force and self._last_refresh and \
+                now - self._last_refresh < self.refresh_interval:
+            return
+        self._last_refresh = now
+        try:
+            present = set(os.listdir(self.cdir))
+        except OSError:
+            present = set()
+        for minion_id in set(self.data) - present:
+            self._drop(minion_id)
+        for minion_id in present:
+            datap = os.path.join(self.cdir, minion_id, 'data.p')
+            try:
+                mtime = os.path.getmtime(datap)
+            except OSError:
+                self._drop(minion_id)
+                continue
+            if minion_id in self.data and self._mtimes.get(minion_id) == mtime:
+                continue
+            try:
+                with salt.utils.fopen(datap, 'rb') as fp_:
+                    data = self.serial.load(fp_)
+            except Exception:
+                log.debug(
+                    'Failed to load minion data for {0}'.format(minion_id)
+                )
+                self._drop(minion_id)
+                continue
+            if not isinstance(data, dict):
+                self._drop(minion_id)
+                continue
+            self._drop(minion_id)
+            self._add(minion_id, data, mtime)
+
+    def ids(self):
+        '''
+        Return the set of minion ids with cached data
+        '''
+        with self._lock:
+            self._refresh(False)
+            return set(self.data)
+
+    def get(self, minion_id):
+        '''
+        Return the cached data dict for a minion, or None
+        '''
+        with self._lock:
+            self._refresh(False)
+            return self.data.get(minion_id)
+
+    def search(self,
+               search_type,
+               expr,
+               delimiter=DEFAULT_TARGET_DELIM,
+               regex_match=False,
+               exact_match=False):
+        '''
+        Return the set of minion ids whose grains or pillar match ``expr``,
+        with the same semantics as :py:func:`salt.utils.subdict_match`
+        '''
+        with self._lock:
+            self._refresh(False)
+            if not regex_match and expr.count(delimiter) == 1:
+                key, value = expr.split(delimiter)
+                table = self._inverted.get((search_type, key))
+                if key in self.index_keys.get(search_type, ()) \
+                        and not GLOB_CHARS.intersection(value) \
+                        and not self._unindexable.get((search_type, key)):
+                    if table is None:
+                        return set()
+                    return set(table.get(value.lower(), ()))
+            # The data of a minion is replaced and never changed in place, so
+            # the scan can run on a copy without holding the lock
+            items = list(self.data.items())
+        ret = set()
+        for minion_id, data in items:
+            if salt.utils.subdict_match(data.get(search_type) or {},
+                                        expr,
+                                        delimiter=delimiter,
+                                        regex_match=regex_match,
+                                        exact_match=exact_match):
+                ret.add(minion_id)
+        return ret
+
+
+def get_minion_data_index(opts):
+    '''
+    Return the process wide :py:class:`MinionDataIndex` for the given master
+    opts, or None if the index is disabled
+    '''
+    if not opts.get('minion_data_cache', False) \
+            or not opts.get('minion_data_index', False):
+        return None
+    cachedir = opts['cachedir']
+    if cachedir not in _MINION_DATA_INDEXES:
+        _MINION_DATA_INDEXES[cachedir] = MinionDataIndex(opts)
+    return _MINION_DATA_INDEXES[cachedir]
+
 
 def get_minion_data(minion, opts):
     '''
@@ -36,6 +426,17 @@ def get_minion_data(minion, opts):
 
     Return value is a tuple of the minion ID, grains, and pillar
     '''
+    index = get_minion_data_index(opts)
+    if index is not None:
+        if minion is None:
+            for id_ in sorted(index.ids()):
+                data = index.get(id_)
+                return id_, data.get('grains'), data.get('pillar')
+            return None, None, None
+        data = index.get(minion)
+        if data is None:
+            return minion, None, None
+        return minion, data.get('grains'), data.get('pillar')
     if opts.get('minion_data_cache', False):
         serial = salt.payload.Serial(opts)
         cdir = os.path.join(opts['cachedir'], 'minions')
@@ -69,6 +470,199 @@ def get_minion_data(minion, opts):
     return minion if minion else None, None, None
 
 
+def _glob_prefix(expr):
+    '''
+    Return the literal prefix of a glob
+    '''
+    return ''.join(itertools.takewhile(lambda char: char not in GLOB_CHARS,
+                                       expr))
+
+
+def _pcre_prefix(expr):
+    '''
+    Return a literal prefix every string matched by the regular expression
+    starts with, the regular expression being matched from the start
+    '''
+    if '|' in expr:
+        return ''
+    prefix = []
+    for char in expr:
+        if char in PCRE_CHARS:
+            if char in '*?{' and prefix:
+                # The last literal character may not be there
+                prefix.pop()
+            break
+        prefix.append(char)
+    return ''.join(prefix)
+
+
+class KeyIndex(object):
+    '''
+    An index of the minion keys in the key directories of the pki_dir
+
+    The ids in every key directory are kept sorted as ``salt-key`` lists
+    them, in the ``.key_index.p`` file of the pki_dir, so listing the keys
+    does not read the directories and a glob or regular expression with a
+    literal prefix only looks at the ids starting with it. The directories
+    remain the source of truth: a directory is scanned again as soon as its
+    mtime differs from the one recorded in the index, so keys added or
+    removed by hand or by older tools are picked up and removing the index
+    file is always safe. :py:class:`salt.key.Key` refreshes the index after
+    accepting, rejecting or deleting keys.
+    '''
+    def __init__(self, opts):
+        self.pki_dir = opts['pki_dir']
+        self.path = os.path.join(self.pki_dir, '.key_index.p')
+        self.serial = salt.payload.Serial(opts)
+        self.dirs = {}
+        self._stat = None
+
+    def _load(self):
+        '''
+        Load the index file if it was written since it was last loaded
+        '''
+        try:
+            st_ = os.stat(self.path)
+        except OSError:
+            return
+        stat = (st_.st_ino, st_.st_size, st_.st_mtime)
+        if stat == self._stat:
+            return
+        try:
+            with salt.utils.fopen(self.path, 'rb') as fp_:
+                data = self.serial.load(fp_)
+        except Exception as exc:
+            log.debug('Failed to load the key index: {0}'.format(exc))
+            return
+        self._stat = stat
+        if not isinstance(data, dict) \
+                or data.get('version') != KEY_INDEX_VERSION:
+            return
+        for name, entry in data['dirs'].items():
+            current = self.dirs.get(name)
+            if current is None or current['scanned'] < entry['scanned']:
+                self.dirs[name] = entry
+
+    def _write(self):
+        '''
+        Write the index file, the entries of every directory are checked
+        when the index is loaded so a failed write only costs a scan
+        '''
+        data = {'version': KEY_INDEX_VERSION,
+                'dirs': dict(
+                    (name, {'mtime': entry['mtime'],
+                            'scanned': entry['scanned'],
+                            'keys': entry['keys']})
+                    for name, entry in self.dirs.items())}
+        try:
+            with salt.utils.atomicfile.atomic_open(self.path, 'w+b') as fp_:
+                self.serial.dump(data, fp_)
+        except (IOError, OSError) as exc:
+            log.debug('Failed to write the key index: {0}'.format(exc))
+            return
+        try:
+            st_ = os.stat(self.path)
+            self._stat = (st_.st_ino, st_.st_size, st_.st_mtime)
+        except OSError:
+            pass
+
+    def _entry(self, name):
+        '''
+        Return the up to date entry of a key directory, or None if the
+        directory does not exist
+        '''
+        path = os.path.join(self.pki_dir, name)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            self.dirs.pop(name, None)
+            return None
+        entry = self.dirs.get(name)
+        if entry is None or entry['mtime'] != mtime \
+                or entry['scanned'] - mtime <= KEY_INDEX_RACY:
+            self._load()
+            entry = self.dirs.get(name)
+        if entry is None or entry['mtime'] != mtime \
+                or entry['scanned'] - mtime <= KEY_INDEX_RACY:
+            scanned = time.time()
+            try:
+                keys = [fn_ for fn_ in os.listdir(path)
+                        if os.path.isfile(os.path.join(path, fn_))]
+            except OSError:
+                return None
+            entry = {'mtime': mtime,
+                     'scanned': scanned,
+                     'keys': salt.utils.isorted(keys)}
+            self.dirs[name] = entry
+            self._write()
+        return entry
+
+    def refresh(self, names):
+        '''
+        Bring the index of the named key directories up to date
+        '''
+        for name in names:
+            self._entry(name)
+
+    def keys(self, name):
+        '''
+        Return the sorted ids of the keys in a key directory, the list must
+        not be modified
+        '''
+        entry = self._entry(name)
+        if entry is None:
+            return []
+        return entry['keys']
+
+    def _prefixed(self, name, prefix):
+        '''
+        Return the ids in a key directory starting with prefix, ignoring the
+        case
+        '''
+        entry = self._entry(name)
+        if entry is None:
+            return []
+        if not prefix:
+            return entry['keys']
+        if 'lower' not in entry:
+            entry['lower'] = [key.lower() for key in entry['keys']]
+        prefix = prefix.lower()
+        start = end = bisect.bisect_left(entry['lower'], prefix)
+        while end < len(entry['lower']) and \
+                entry['lower'][end].startswith(prefix):
+            end += 1
+        return entry['keys'][start:end]
+
+    def glob(self, name, expr):
+        '''
+        Return the ids in a key directory matching a glob
+        '''
+        return fnmatch.filter(self._prefixed(name, _glob_prefix(expr)), expr)
+
+    def pcre(self, name, expr):
+        '''
+        Return the ids in a key directory matching a regular expression
+        '''
+        reg = re.compile(expr)
+        if expr.startswith('^'):
+            expr = expr[1:]
+        return [key for key in self._prefixed(name, _pcre_prefix(expr))
+                if reg.match(key)]
+
+
+def get_key_index(opts):
+    '''
+    Return the process wide :py:class:`KeyIndex` for the given master opts,
+    or None if the index is disabled
+    '''
+    if not opts.get('key_index', False):
+        return None
+    pki_dir = opts['pki_dir']
+    if pki_dir not in _KEY_INDEXES:
+        _KEY_INDEXES[pki_dir] = KeyIndex(opts)
+    return _KEY_INDEXES[pki_dir]
+
+
 def nodegroup_comp(nodegroup, nodegroups, skip=None):
     '''
     Recursively expand ``nodegroup`` from ``nodegroups``; ignore nodegroups in ``skip``
@@ -121,11 +715,22 @@ class CkMinions(object):
             self.acc = 'minions'
         else:
             self.acc = 'accepted'
+        self.key_index = get_key_index(opts)
+
+    def _pki_minions(self):
+        '''
+        Return the ids of the accepted minion keys
+        '''
+        if self.key_index is not None:
+            return list(self.key_index.keys(self.acc))
+        return os.listdir(os.path.join(self.opts['pki_dir'], self.acc))
 
     def _check_glob_minions(self, expr, greedy):  # pylint: disable=unused-argument
         '''
         Return the minions found by looking via globs
         '''
+        if self.key_index is not None:
+            return self.key_index.glob(self.acc, expr)
         pki_dir = os.path.join(self.opts['pki_dir'], self.acc)
         try:
             files = os.listdir(pki_dir)
@@ -149,6 +754,8 @@ class CkMinions(object):
         '''
         Return the minions found by looking via regular expressions
         '''
+        if self.key_index is not None:
+            return self.key_index.pcre(self.acc, expr)
         try:
             minions = os.listdir(os.path.join(self.opts['pki_dir'], self.acc))
             reg = re.compile(expr)
@@ -168,10 +775,21 @@ class CkMinions(object):
         '''
         cache_enabled = self.opts.get('minion_data_cache', False)
 
+        index = get_minion_data_index(self.opts)
+        if index is not None:
+            matched = index.search(search_type,
+                                   expr,
+                                   delimiter=delimiter,
+                                   regex_match=regex_match,
+                                   exact_match=exact_match)
+            if not greedy:
+                return list(matched)
+            # Minions without cached data can not be ruled out
+            minions = set(self._pki_minions())
+            return list(minions.difference(index.ids().difference(matched)))
+
         if greedy:
-            minions = set(
-                os.listdir(os.path.join(self.opts['pki_dir'], self.acc))
-            )
+            minions = set(self._pki_minions())
         elif cache_enabled:
             minions = os.listdir(os.path.join(self.opts['cachedir'], 'minions'))
         else:
@@ -248,9 +866,7 @@ class CkMinions(object):
         cache_enabled = self.opts.get('minion_data_cache', False)
 
         if greedy:
-            minions = set(
-                os.listdir(os.path.join(self.opts['pki_dir'], self.acc))
-            )
+            minions = set(self._pki_minions())
         elif cache_enabled:
             minions = os.listdir(os.path.join(self.opts['cachedir'], 'minions'))
         else:
@@ -315,7 +931,7 @@ class CkMinions(object):
             )
             cache_enabled = self.opts.get('minion_data_cache', False)
             if greedy:
-                return os.listdir(os.path.join(self.opts['pki_dir'], self.acc))
+                return self._pki_minions()
             elif cache_enabled:
                 return os.listdir(os.path.join(self.opts['cachedir'], 'minions'))
             else:
@@ -340,10 +956,11 @@ class CkMinions(object):
         '''
         Return the minions found by looking via compound matcher
         '''
-        minions = set(
-            os.listdir(os.path.join(self.opts['pki_dir'], self.acc))
-        )
+        minions = set(self._pki_minions())
         if self.opts.get('minion_data_cache', False):
+            target = compile_compound(expr)
+            if target is None:
+                return []
             ref = {'G': self._check_grain_minions,
                    'P': self._check_grain_pcre_minions,
                    'I': self._check_pillar_minions,
@@ -351,99 +968,22 @@ class CkMinions(object):
                    'L': self._check_list_minions,
                    'S': self._check_ipcidr_minions,
                    'E': self._check_pcre_minions,
-                   'R': self._all_minions}
+                   'R': self._all_minions,
+                   None: self._check_glob_minions}
             if pillar_exact:
                 ref['I'] = self._check_pillar_exact_minions
                 ref['J'] = self._check_pillar_exact_minions
-            results = []
-            unmatched = []
-            opers = ['and', 'or', 'not', '(', ')']
-            tokens = expr.split()
-            for match in tokens:
-                # Try to match tokens from the compound target, first by using
-                # the 'G, X, I, J, L, S, E' matcher types, then by hostname glob.
-                if '@' in match and match[1] == '@':
-                    comps = match.split('@')
-                    matcher = ref.get(comps[0])
-
-                    matcher_args = ['@'.join(comps[1:])]
-                    if comps[0] in ('G', 'P', 'I', 'J'):
-                        matcher_args.append(delimiter)
-                    matcher_args.append(True)
-
-                    if not matcher:
-                        # If an unknown matcher is called at any time, fail out
-                        return []
-                    if unmatched and unmatched[-1] == '-':
-                        results.append(str(set(matcher(*matcher_args))))
-                        results.append(')')
-                        unmatched.pop()
-                    else:
-                        results.append(str(set(matcher(*matcher_args))))
-                elif match in opers:
-                    # We didn't match a target, so append a boolean operator or
-                    # subexpression
-                    if results:
-                        if match == 'not':
-                            if results[-1] == '&':
-                                pass
-                            elif results[-1] == '|':
-                                pass
-                            else:
-                                results.append('&')
-                            results.append('(')
-                            results.append(str(set(minions)))
-                            results.append('-')
-                            unmatched.append('-')
-                        elif match == 'and':
-                            results.append('&')
-                        elif match == 'or':
-                            results.append('|')
-                        elif match == '(':
-                            results.append(match)
-                            unmatched.append(match)
-                        elif match == ')':
-                            if not unmatched or unmatched[-1] != '(':
-                                log.error('Invalid compound expr (unexpected '
-                                          'right parenthesis): {0}'
-                                          .format(expr))
-                                return []
-                            results.append(match)
-                            unmatched.pop()
-                            if unmatched and unmatched[-1] == '-':
-                                results.append(')')
-                                unmatched.pop()
-                        else:  # Won't get here, unless oper is added
-                            log.error('Unhandled oper in compound expr: {0}'
-                                      .format(expr))
-                            return []
-                    else:
-                        # seq start with oper, fail
-                        if match == '(':
-                            results.append(match)
-                            unmatched.append(match)
-                        else:
-                            return []
-                else:
-                    # The match is not explicitly defined, evaluate as a glob
-                    if unmatched and unmatched[-1] == '-':
-                        results.append(
-                                str(set(self._check_glob_minions(match, True))))
-                        results.append(')')
-                        unmatched.pop()
-                    else:
-                        results.append(
-                                str(set(self._check_glob_minions(match, True))))
-            for token in unmatched:
-                results.append(')')
-            results = ' '.join(results)
-            log.debug('Evaluating final compound matching expr: {0}'
-                      .format(results))
-            try:
-                return list(eval(results))  # pylint: disable=W0123
-            except Exception:
-                log.error('Invalid compound target: {0}'.format(expr))
-                return []
+
+            def matcher(func, delim):
+                if delim:
+                    return lambda value: func(value, delimiter, True)
+                return lambda value: func(value, True)
+
+            matchers = dict(
+                (engine, matcher(func, engine in ('G', 'P', 'I', 'J')))
+                for engine, func in ref.items())
+            log.debug('Evaluating compound target: {0}'.format(expr))
+            return list(target.minions(matchers, minions))
         return list(minions)
 
     def connected_ids(self, subset=None, show_ipv4=False):
@@ -482,7 +1022,7 @@ class CkMinions(object):
         '''
         Return a list of all minions that have auth'd
         '''
-        return os.listdir(os.path.join(self.opts['pki_dir'], self.acc))
+        return self._pki_minions()
 
     def check_minions(self,
                       expr,
@@ -20,13 +20,6 @@ from salt.ext.six.moves import queue, range  # pylint: disable=import-error,rede
 
 log = logging.getLogger(__name__)
 
-HAS_PSUTIL = False
-try:
-    import psutil
-    HAS_PSUTIL = True
-except ImportError:
-    pass
-
 
 def notify_systemd():
     '''
@@ -126,9 +119,11 @@ def os_is_running(pid):
     '''
     Use OS facilities to determine if a process is running
     '''
-    if HAS_PSUTIL:
+    # psutil is slow to import, only load it when needed
+    try:
+        import psutil
         return psutil.pid_exists(pid)
-    else:
+    except ImportError:
         try:
             os.kill(pid, 0)  # SIG 0 is the "are you alive?" signal
             return True
@@ -199,6 +194,74 @@ class ThreadPool(object):
                 log.debug(err, exc_info=True)
 
 
+def iter_threaded(funcs, num_threads, timeout=0, name='Worker'):
+    '''
+    Run the (key, function) pairs of funcs in up to num_threads daemon
+    threads, yield a (key, return, exc_info, duration) tuple for every one of
+    them in the order of funcs, as soon as it returned.
+
+    timeout is the number of seconds a function may run, or a function
+    returning it for a key, 0 meaning no limit. A function which runs for
+    longer is left running in its thread, a new thread takes its place and
+    its duration is None.
+    '''
+    if not callable(timeout):
+        timeout = (lambda secs: lambda key: secs)(timeout)
+    jobs = queue.Queue()
+    for item in funcs:
+        jobs.put(item)
+    cond = threading.Condition()
+    started = {}
+    finished = {}
+
+    def _worker():
+        while True:
+            item = jobs.get()
+            if item is None:
+                return
+            key, func = item
+            with cond:
+                started[key] = time.time()
+            ret, exc_info = None, None
+            try:
+                ret = func()
+            except Exception:
+                exc_info = sys.exc_info()
+            with cond:
+                finished[key] = (ret, exc_info, time.time() - started[key])
+                cond.notify_all()
+
+    def _start_worker():
+        # every worker stops at its own None
+        jobs.put(None)
+        thread = threading.Thread(target=_worker, name=name)
+        thread.daemon = True
+        thread.start()
+
+    for _ in range(min(max(num_threads, 1), len(funcs))):
+        _start_worker()
+    for key, _ in funcs:
+        secs = timeout(key)
+        with cond:
+            while key not in finished:
+                if not secs:
+                    # a wait with a timeout polls on python 2
+                    cond.wait()
+                    continue
+                wait = 1
+                if key in started:
+                    wait = started[key] + secs - time.time()
+                    if wait <= 0:
+                        break
+                cond.wait(min(wait, 1))
+            ret = finished.get(key)
+        if ret is None:
+            _start_worker()
+            yield key, None, None, None
+        else:
+            yield (key,) + ret
+
+
 class ProcessManager(object):
     '''
     A class which will manage processes that should be running
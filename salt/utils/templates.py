@@ -26,6 +26,7 @@ from salt.exceptions import (
 )
 from salt.utils.jinja import ensure_sequence_filter, show_full_context
 from salt.utils.jinja import SaltCacheLoader as JinjaSaltCacheLoader
+from salt.utils.jinja import SaltBytecodeCache as JinjaBytecodeCache
 from salt.utils.jinja import SerializerExtension as JinjaSerializerExtension
 from salt.utils.odict import OrderedDict
 from salt import __path__ as saltpath
@@ -230,33 +231,35 @@ def _get_jinja_error(trace, context=None):
     return line, out
 
 
-def render_jinja_tmpl(tmplstr, context, tmplpath=None):
-    opts = context['opts']
-    saltenv = context['saltenv']
-    loader = None
-    newline = False
+# Jinja environments shared by the renders of the process, keyed by their
+# settings
+_JINJA_ENVS = {}
 
-    if tmplstr and not isinstance(tmplstr, six.text_type):
-        # http://jinja.pocoo.org/docs/api/#unicode
-        tmplstr = tmplstr.decode(SLS_ENCODING)
 
-    if tmplstr.endswith('\n'):
-        newline = True
-
-    if not saltenv:
-        if tmplpath:
-            # i.e., the template is from a file outside the state tree
-            #
-            # XXX: FileSystemLoader is not being properly instantiated here is
-            # it? At least it ain't according to:
-            #
-            #   http://jinja.pocoo.org/docs/api/#jinja2.FileSystemLoader
-            loader = jinja2.FileSystemLoader(
-                context, os.path.dirname(tmplpath))
-    else:
-        loader = JinjaSaltCacheLoader(opts, saltenv, pillar_rend=context.get('_pillar_rend', False))
-
-    env_args = {'extensions': [], 'loader': loader}
+def _jinja_env(opts):
+    '''
+    Return the Jinja environment shared by the renders using the same
+    settings, along with its bytecode cache. Renders must work on an overlay
+    of it, so their loader and globals are their own.
+    '''
+    trim_blocks = opts.get('jinja_trim_blocks', False)
+    lstrip_blocks = opts.get('jinja_lstrip_blocks', False)
+    allow_undefined = opts.get('allow_undefined', False)
+    bytecode_dir = None
+    if opts.get('jinja_bytecode_cache', True) and opts.get('cachedir'):
+        # Compiled templates depend on the Jinja version and the settings
+        # changing the syntax
+        bytecode_dir = os.path.join(
+            opts['cachedir'],
+            'jinja',
+            '{0}-{1:d}{2:d}'.format(jinja2.__version__,
+                                    trim_blocks,
+                                    lstrip_blocks))
+    key = (trim_blocks, lstrip_blocks, allow_undefined, bytecode_dir)
+    if key in _JINJA_ENVS:
+        return _JINJA_ENVS[key]
+
+    env_args = {'extensions': []}
 
     if hasattr(jinja2.ext, 'with_'):
         env_args['extensions'].append('jinja2.ext.with_')
@@ -270,14 +273,17 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
     # trim_blocks removes newlines around Jinja blocks
     # lstrip_blocks strips tabs and spaces from the beginning of
     # line to the start of a block.
-    if opts.get('jinja_trim_blocks', False):
+    if trim_blocks:
         log.debug('Jinja2 trim_blocks is enabled')
         env_args['trim_blocks'] = True
-    if opts.get('jinja_lstrip_blocks', False):
+    if lstrip_blocks:
         log.debug('Jinja2 lstrip_blocks is enabled')
         env_args['lstrip_blocks'] = True
 
-    if opts.get('allow_undefined', False):
+    if opts.get('jinja_bytecode_cache', True):
+        env_args['bytecode_cache'] = JinjaBytecodeCache(bytecode_dir)
+
+    if allow_undefined:
         jinja_env = jinja2.Environment(**env_args)
     else:
         jinja_env = jinja2.Environment(undefined=jinja2.StrictUndefined,
@@ -292,6 +298,44 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
     jinja_env.globals['odict'] = OrderedDict
     jinja_env.globals['show_full_context'] = show_full_context
 
+    _JINJA_ENVS[key] = jinja_env
+    return jinja_env
+
+
+def render_jinja_tmpl(tmplstr, context, tmplpath=None):
+    opts = context['opts']
+    saltenv = context['saltenv']
+    loader = None
+    newline = False
+
+    if tmplstr and not isinstance(tmplstr, six.text_type):
+        # http://jinja.pocoo.org/docs/api/#unicode
+        tmplstr = tmplstr.decode(SLS_ENCODING)
+
+    if tmplstr.endswith('\n'):
+        newline = True
+
+    if not saltenv:
+        if tmplpath:
+            # i.e., the template is from a file outside the state tree
+            #
+            # XXX: FileSystemLoader is not being properly instantiated here is
+            # it? At least it ain't according to:
+            #
+            #   http://jinja.pocoo.org/docs/api/#jinja2.FileSystemLoader
+            loader = jinja2.FileSystemLoader(
+                context, os.path.dirname(tmplpath))
+    else:
+        loader = JinjaSaltCacheLoader(opts, saltenv, pillar_rend=context.get('_pillar_rend', False))
+
+    # Every render gets its own loader, so the templates are fetched again,
+    # and its own globals, since the context is added to them. The template
+    # cache is disabled as the loaded templates hold these globals, unchanged
+    # templates reuse their code from the bytecode cache instead.
+    shared_env = _jinja_env(opts)
+    jinja_env = shared_env.overlay(loader=loader, cache_size=0)
+    jinja_env.globals = dict(shared_env.globals)
+
     decoded_context = {}
     for key, value in six.iteritems(context):
         if not isinstance(value, string_types):
@@ -301,7 +345,13 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
         decoded_context[key] = salt.utils.sdecode(value)
 
     try:
-        template = jinja_env.from_string(tmplstr)
+        if jinja_env.bytecode_cache is None:
+            template = jinja_env.from_string(tmplstr)
+        else:
+            code = jinja_env.bytecode_cache.get_code(jinja_env, tmplstr,
+                                                     tmplpath)
+            template = jinja_env.template_class.from_code(
+                jinja_env, code, jinja_env.globals, None)
         template.globals.update(decoded_context)
         output = template.render(**decoded_context)
     except jinja2.exceptions.TemplateSyntaxError as exc:
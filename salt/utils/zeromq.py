@@ -1,4 +1,11 @@
 # -*- coding: utf-8 -*-
+'''
+ZeroMQ helpers shared by the master and the minion
+'''
+# Import python libs
+import hashlib
+
+# Import third party libs
 try:
     import zmq
     HAS_ZMQ = True
@@ -24,3 +31,37 @@ def check_ipc_path_max_len(uri):
                 uri, ipc_path_max_len
             )
         )
+
+
+def id_topic(minion_id):
+    '''
+    Return the publish topic a minion subscribes to when ``zmq_filtering`` is
+    on. ZeroMQ filters are prefix matches, so the id is hashed to avoid
+    collisions between ids sharing a prefix.
+    '''
+    return hashlib.sha1(minion_id).hexdigest()
+
+
+def group_topic(minion_id, groups):
+    '''
+    Return the topic of the publish group a minion belongs to when
+    ``zmq_filtering_groups`` is set. The trailing delimiter keeps the topic of
+    group 1 from being a prefix of the topic of group 12.
+    '''
+    group = int(id_topic(minion_id)[:8], 16) % groups
+    return 'group{0}|'.format(group)
+
+
+def publish_topics(topic_lst, groups=0):
+    '''
+    Return the list of topics a targeted publish has to be sent on so that
+    every minion in ``topic_lst`` receives it exactly once.
+
+    Without groups every targeted minion gets its own copy. With groups, a
+    publication to more minions than there are groups is sent once per group
+    holding at least one target instead, and the minions drop publications
+    which are not meant for them when they match the target.
+    '''
+    if groups and len(topic_lst) > groups:
+        return sorted(set(group_topic(tgt, groups) for tgt in topic_lst))
+    return [id_topic(tgt) for tgt in topic_lst]
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+'''
+Simulate a fleet of minions signing in to a restarted master
+
+Times ``ClearFuncs._auth`` on keys generated in a throwaway pki dir, with the
+public key and sign-in reply caches disabled, for the first and for a repeated
+sign-in of a minion with the caches, and for a sign-in turned away by
+``AuthAdmission``. A repeated sign-in sends the same token encrypted anew, as a
+minion does, and still costs the decryption of the token. These costs drive a simulation of the minions reconnecting
+within ``--spread`` seconds to ``--workers`` MWorkers. A minion whose reply
+takes longer than ``--timeout`` seconds sends its request again, while the
+master still serves the abandoned one. Prints the time until the whole fleet
+is authenticated, or how much of it is after ``--limit`` seconds, without the
+caches, without admission control and with it at ``--rate`` sign-ins per
+second.
+
+    python tests/bench/auth_storm.py --minions 20000 --workers 5 --spread 10
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import collections
+import heapq
+import itertools
+import multiprocessing
+import optparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.crypt
+import salt.daemons.masterapi
+import salt.master
+from salt.utils.odict import OrderedDict
+
+# Import third party libs
+from M2Crypto import RSA
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('--minions', dest='minions', default=20000, type='int',
+                      help='The number of minions reconnecting')
+    parser.add_option('--workers', dest='workers', default=5, type='int',
+                      help='The number of MWorkers')
+    parser.add_option('--spread', dest='spread', default=10, type='float',
+                      help='The seconds over which the minions reconnect')
+    parser.add_option('--timeout', dest='timeout', default=60, type='float',
+                      help='The auth_timeout of the minions')
+    parser.add_option('--rate', dest='rate', default=0, type='float',
+                      help='The auth_rate, defaults to 90% of what the '
+                           'workers can serve')
+    parser.add_option('--extra', dest='extra', default=0, type='float',
+                      help='Seconds added to every sign-in served, standing '
+                           'in for the max_minions checks or a slow disk')
+    parser.add_option('--limit', dest='limit', default=3600, type='float',
+                      help='The simulated seconds after which to give up')
+    parser.add_option('--samples', dest='samples', default=200, type='int',
+                      help='The number of sign-ins timed for every cost')
+    parser.add_option('--seed', dest='seed', default=0, type='int',
+                      help='The seed of the simulated reconnects')
+    options, args = parser.parse_args()
+    return options.__dict__
+
+
+class Event(object):
+    '''
+    Drop the events fired by ClearFuncs
+    '''
+    def fire_event(self, data, tag):
+        pass
+
+
+def make_clear_funcs(opts, cache_size):
+    '''
+    Return a ClearFuncs serving _auth without a running master
+    '''
+    clear_funcs = salt.master.ClearFuncs.__new__(salt.master.ClearFuncs)
+    clear_funcs.opts = opts
+    clear_funcs.master_key = salt.crypt.MasterKeys(opts)
+    clear_funcs.auto_key = salt.daemons.masterapi.AutoKey(opts)
+    clear_funcs.event = Event()
+    clear_funcs.cache_cli = False
+    clear_funcs.pub_keys = salt.crypt.PubKeyCache(size=cache_size)
+    clear_funcs.auth_blobs = OrderedDict()
+    return clear_funcs
+
+
+def timed(func, loads):
+    '''
+    Return the mean seconds of a call of func on every load
+    '''
+    start = time.time()
+    for load in loads:
+        func(load)
+    return (time.time() - start) / len(loads)
+
+
+def measure(opts):
+    '''
+    Time the sign-ins, return the mean seconds of an uncached, a first, a
+    repeated and a throttled sign-in
+    '''
+    root = tempfile.mkdtemp()
+    try:
+        mopts = dict(salt.config.DEFAULT_MASTER_OPTS)
+        for key in ('pki_dir', 'cachedir', 'sock_dir'):
+            mopts[key] = os.path.join(root, key)
+        for name in ('minions', 'minions_pre', 'minions_rejected'):
+            os.makedirs(os.path.join(mopts['pki_dir'], name))
+        salt.master.SMaster.aes = multiprocessing.Array(
+            'c', salt.crypt.Crypticle.generate_key_string())
+        uncached = make_clear_funcs(mopts, 0)
+        cached = make_clear_funcs(mopts, opts['samples'])
+
+        salt.crypt.gen_keys(root, 'minion', salt.config.DEFAULT_MINION_OPTS['keysize'])
+        with salt.utils.fopen(os.path.join(root, 'minion.pub')) as fp_:
+            pub = fp_.read()
+        master_pub = RSA.load_pub_key(cached.master_key.pub_path)
+        tokens = []
+        for ind in range(opts['samples']):
+            id_ = 'minion{0}'.format(ind)
+            with salt.utils.fopen(
+                    os.path.join(mopts['pki_dir'], 'minions', id_), 'w') as fp_:
+                fp_.write(pub)
+            tokens.append((id_, salt.crypt.Crypticle.generate_key_string()))
+
+        def make_loads():
+            # Like a minion signing in again, every token is encrypted anew,
+            # OAEP padding makes every ciphertext differ
+            return [{'cmd': '_auth', 'id': id_, 'pub': pub,
+                     'token': master_pub.public_encrypt(
+                         token, RSA.pkcs1_oaep_padding)}
+                    for id_, token in tokens]
+
+        loads = make_loads()
+        costs = {'uncached': timed(uncached._auth, loads),
+                 'cold': timed(cached._auth, make_loads()),
+                 'warm': timed(cached._auth, make_loads())}
+        admission = salt.master.AuthAdmission({'auth_rate': 1e-9})
+        admission.admit()
+        costs['busy'] = timed(
+            lambda load: admission.run(cached._auth, load), loads)
+        for key in ('uncached', 'cold', 'warm'):
+            costs[key] += opts['extra']
+        return costs
+    finally:
+        shutil.rmtree(root)
+
+
+def simulate(opts, costs, rate=0, cached=True):
+    '''
+    Simulate the reconnect of the fleet, return the seconds until every
+    minion is authenticated or the limit is reached, and the numbers of
+    minions authenticated and of sign-ins served, abandoned by their minion
+    and turned away
+    '''
+    rand = random.Random(opts['seed'])
+    clock = [0.0]
+    now_ = time.time
+    admission = None
+    if rate:
+        time.time = lambda: clock[0]
+        admission = salt.master.AuthAdmission({'auth_rate': rate})
+    try:
+        events = []
+        seq = itertools.count()
+
+        def push(when, kind, *args):
+            heapq.heappush(events, (when, next(seq), kind, args))
+
+        for minion in range(opts['minions']):
+            push(rand.uniform(0, opts['spread']), 'send', minion)
+        queue = collections.deque()
+        idle = list(range(opts['workers']))
+        warm = [set() for _ in idle]
+        sent = {}
+        authed = served = wasted = busy = 0
+        while authed < opts['minions']:
+            now, _, kind, args = heapq.heappop(events)
+            if now > opts['limit']:
+                break
+            clock[0] = now
+            if kind == 'send':
+                minion = args[0]
+                sent[minion] = now
+                queue.append((minion, now))
+                push(now + opts['timeout'], 'timeout', minion, now)
+            elif kind == 'timeout':
+                minion, when = args
+                if sent.get(minion) == when:
+                    # The minion gives up and sends the request again
+                    push(now, 'send', minion)
+            elif kind == 'reply':
+                worker, minion, when, retry_after = args
+                idle.append(worker)
+                if sent.get(minion) != when:
+                    wasted += not retry_after
+                elif retry_after:
+                    del sent[minion]
+                    push(now + retry_after * rand.uniform(
+                        1, 1 + salt.crypt.AUTH_RETRY_JITTER), 'send', minion)
+                else:
+                    del sent[minion]
+                    authed += 1
+            while idle and queue:
+                minion, when = queue.popleft()
+                worker = idle.pop()
+                retry_after = admission.admit()[0] if admission else 0
+                if retry_after:
+                    busy += 1
+                    cost = costs['busy']
+                else:
+                    served += 1
+                    if not cached:
+                        cost = costs['uncached']
+                    elif minion in warm[worker]:
+                        cost = costs['warm']
+                    else:
+                        cost = costs['cold']
+                        warm[worker].add(minion)
+                push(now + cost, 'reply', worker, minion, when, retry_after)
+        return clock[0], authed, served, wasted, busy
+    finally:
+        time.time = now_
+
+
+def main():
+    '''
+    Measure the sign-ins and simulate the reconnect storm
+    '''
+    opts = parse()
+    costs = measure(opts)
+    print('sign-in: uncached {uncached:.4f}s  first {cold:.4f}s  '
+          'repeated {warm:.4f}s  turned away {busy:.6f}s'.format(**costs))
+    rate = opts['rate'] or 0.9 * opts['workers'] / costs['cold']
+    runs = [('uncached, no admission', 0, False),
+            ('no admission', 0, True),
+            ('auth_rate {0:.0f}'.format(rate), rate, True)]
+    for name, run_rate, cached in runs:
+        total, authed, served, wasted, busy = simulate(
+            opts, costs, run_rate, cached)
+        print('{0:<24} {1} minions authenticated in {2:8.1f}s  served {3}  '
+              'abandoned {4}  turned away {5}'.format(
+                  name, authed, total, served, wasted, busy))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+'''
+Benchmark fetching a large file from the master over a slow link
+
+Starts a synthetic master answering ``_file_hash`` and ``_serve_file``
+requests from a temporary file, adding a fixed latency to every reply, and
+times ``RemoteClient.get_file`` for each ``file_transfer_pipeline`` depth.
+
+    python tests/bench/get_file.py --size 64 --latency 0.02 --depths 1,4,8
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import hashlib
+import heapq
+import optparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Import salt libs
+import salt.crypt
+import salt.fileclient
+import salt.fileserver
+import salt.payload
+import salt.transport
+
+# Import third party libs
+import zmq
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('--size', dest='size', default=64, type='int',
+                      help='The size of the file to fetch, in MB')
+    parser.add_option('--buffer', dest='buffer', default=1048576, type='int',
+                      help='The file_buffer_size of the master')
+    parser.add_option('--latency', dest='latency', default=0.02,
+                      type='float',
+                      help='Seconds added to every reply of the master')
+    parser.add_option('--depths', dest='depths', default='1,4,8',
+                      help='Comma separated pipeline depths to test')
+    parser.add_option('--port', dest='port', default=44507, type='int',
+                      help='The port to bind the synthetic master to')
+    options, args = parser.parse_args()
+    return options.__dict__
+
+
+def _master(opts, crypticle, path, stop):
+    '''
+    Answer the file requests, each reply being sent after the latency
+    '''
+    serial = salt.payload.Serial(opts)
+    context = zmq.Context()
+    sock = context.socket(zmq.ROUTER)
+    sock.setsockopt(zmq.LINGER, 0)
+    sock.bind(opts['master_uri'])
+    with open(path, 'rb') as fp_:
+        hsum = hashlib.md5(fp_.read()).hexdigest()
+    replies = []
+    while not stop.is_set():
+        timeout = 100
+        if replies:
+            timeout = max(0, (replies[0][0] - time.time()) * 1000)
+        if sock.poll(timeout):
+            frames = sock.recv_multipart()
+            load = crypticle.loads(serial.loads(frames[-1])['load'])
+            if load['cmd'] == '_file_hash':
+                ret = {'hsum': hsum, 'hash_type': 'md5'}
+            else:
+                data, size = salt.fileserver.read_chunk(
+                    path, load['loc'], opts['buffer'])
+                ret = {'data': data, 'dest': load['path'], 'size': size}
+            heapq.heappush(replies, (time.time() + opts['latency'],
+                                     frames[:-1], ret))
+        while replies and replies[0][0] <= time.time():
+            _, envelope, ret = heapq.heappop(replies)
+            sock.send_multipart(
+                envelope + [serial.dumps(crypticle.dumps(ret))])
+    sock.close()
+    context.term()
+
+
+class _Auth(object):
+    '''
+    Stand in for the minion authentication, sharing the master's key
+    '''
+    def __init__(self, crypticle):
+        self.crypticle = crypticle
+
+    def authenticate(self):
+        pass
+
+
+def _client(opts, crypticle):
+    '''
+    Return a RemoteClient talking to the synthetic master
+    '''
+    client = salt.fileclient.RemoteClient.__new__(
+        salt.fileclient.RemoteClient)
+    salt.fileclient.Client.__init__(client, opts)
+    channel = salt.transport.ZeroMQChannel.__new__(
+        salt.transport.ZeroMQChannel)
+    channel.opts = opts
+    channel.ttype = 'zeromq'
+    channel.crypt = 'aes'
+    channel.master_uri = opts['master_uri']
+    channel.auth = _Auth(crypticle)
+    client.channel = channel
+    client.auth = channel.auth
+    return client
+
+
+def run(opts):
+    '''
+    Time fetching the file at every pipeline depth
+    '''
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'large')
+        with open(path, 'wb') as fp_:
+            for _ in range(opts['size']):
+                fp_.write(os.urandom(1048576))
+        opts.update({'master_uri': 'tcp://127.0.0.1:{0}'.format(opts['port']),
+                     'cachedir': os.path.join(tmp, 'cache'),
+                     'cache_sreqs': True,
+                     'multiprocessing': True})
+        crypticle = salt.crypt.Crypticle(
+            opts, salt.crypt.Crypticle.generate_key_string())
+        stop = threading.Event()
+        master = threading.Thread(target=_master,
+                                  args=(opts, crypticle, path, stop))
+        master.start()
+        try:
+            for depth in opts['depths'].split(','):
+                opts['file_transfer_pipeline'] = int(depth)
+                client = _client(opts, crypticle)
+                dest = os.path.join(tmp, 'dest')
+                start = time.time()
+                client.get_file('salt://large', dest)
+                elapsed = time.time() - start
+                os.remove(dest)
+                print('pipeline {0:>2}: {1:7.2f}s {2:8.1f} MB/s'.format(
+                    depth, elapsed, opts['size'] / elapsed))
+        finally:
+            stop.set()
+            master.join()
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    run(parse())
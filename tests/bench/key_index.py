@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+'''
+Benchmark listing and matching minion keys with and without the key index
+
+Writes ``--keys`` accepted keys to a throwaway pki dir, then times
+``Key.list_keys``, ``Key.name_match`` and the glob and PCRE checks of
+``CkMinions`` with ``key_index`` disabled and enabled. The first call with the
+index writes it and is not counted.
+
+    python tests/bench/key_index.py --keys 30000 --runs 20
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import optparse
+import os
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.key
+import salt.utils.minions
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('--keys', dest='keys', default=30000, type='int',
+                      help='The number of accepted keys')
+    parser.add_option('--runs', dest='runs', default=20, type='int',
+                      help='The number of timed calls of every operation')
+    options, args = parser.parse_args()
+    return options.__dict__
+
+
+def make_opts(root, index):
+    '''
+    Return master opts keeping everything under root
+    '''
+    opts = dict(salt.config.DEFAULT_MASTER_OPTS)
+    for key in ('pki_dir', 'cachedir', 'sock_dir'):
+        opts[key] = os.path.join(root, key)
+    opts['__role'] = 'master'
+    opts['key_index'] = index
+    return opts
+
+
+def write_keys(opts, count):
+    '''
+    Write empty keys named web0 to web<count>
+    '''
+    for name in ('minions', 'minions_pre', 'minions_rejected'):
+        os.makedirs(os.path.join(opts['pki_dir'], name))
+    os.makedirs(opts['sock_dir'])
+    for ind in range(count):
+        open(os.path.join(opts['pki_dir'], 'minions',
+                          'web{0}'.format(ind)), 'w').close()
+    # Keep the directories from looking just modified to the index
+    past = time.time() - 10
+    for name in ('minions', 'minions_pre', 'minions_rejected'):
+        os.utime(os.path.join(opts['pki_dir'], name), (past, past))
+
+
+def median(func, runs):
+    '''
+    Return the median seconds of a call of func
+    '''
+    times = []
+    for _ in range(runs):
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def run(opts):
+    '''
+    Time the key operations without and with the key index
+    '''
+    root = tempfile.mkdtemp()
+    try:
+        write_keys(make_opts(root, False), opts['keys'])
+        target = 'web{0}*'.format(opts['keys'] // 2)
+        results = {}
+        for index in (False, True):
+            salt.utils.minions._KEY_INDEXES.clear()
+            mopts = make_opts(root, index)
+            key = salt.key.Key(mopts)
+            ckminions = salt.utils.minions.CkMinions(mopts)
+            ops = [('Key.list_keys', key.list_keys),
+                   ('Key.name_match', lambda: key.name_match(target)),
+                   ('CkMinions glob', lambda: ckminions.check_minions(target)),
+                   ('CkMinions pcre', lambda: ckminions.check_minions(
+                       target.replace('*', r'\d*'), 'pcre'))]
+            for name, func in ops:
+                # warm the index and the page cache
+                func()
+                results.setdefault(name, []).append(median(func, opts['runs']))
+        for name in ('Key.list_keys', 'Key.name_match', 'CkMinions glob',
+                     'CkMinions pcre'):
+            print('{0:<16} without index {1:8.4f}s  with index {2:8.4f}s'.format(
+                name, *results[name]))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    run(parse())
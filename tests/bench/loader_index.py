@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+'''
+Benchmark the startup of ``salt-call --local`` with and without the loader
+index
+
+Runs ``salt-call`` from this tree against a throwaway minion config, once
+with ``loader_index`` disabled and once enabled, and prints the median wall
+time of every command. The first run with the index writes it and is not
+counted.
+
+    python tests/bench/loader_index.py --runs 5 \
+        --commands 'test.ping;state.single test.succeed_without_changes name=foo'
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import optparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SALT_CALL = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'scripts', 'salt-call')
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('--runs', dest='runs', default=5, type='int',
+                      help='The number of timed runs of every command')
+    parser.add_option('--commands', dest='commands',
+                      default='test.ping;'
+                              'state.single test.succeed_without_changes name=foo',
+                      help='Semicolon separated salt-call commands')
+    options, args = parser.parse_args()
+    return options.__dict__
+
+
+def write_config(root, index):
+    '''
+    Write a minion config keeping everything under root
+    '''
+    conf_dir = os.path.join(root, 'etc')
+    if not os.path.isdir(conf_dir):
+        os.makedirs(conf_dir)
+    with open(os.path.join(conf_dir, 'minion'), 'w') as fp_:
+        for key in ('cachedir', 'pki_dir', 'sock_dir'):
+            fp_.write('{0}: {1}\n'.format(key, os.path.join(root, key)))
+        fp_.write('log_file: {0}\n'.format(os.path.join(root, 'minion.log')))
+        fp_.write('id: bench\nfile_client: local\n')
+        fp_.write('loader_index: {0}\n'.format(index))
+    return conf_dir
+
+
+def timed(conf_dir, command):
+    '''
+    Return the wall time of a salt-call run
+    '''
+    start = time.time()
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call(
+            [sys.executable, SALT_CALL, '-c', conf_dir, '--local',
+             '--log-level', 'quiet'] + command.split(),
+            stdout=devnull, stderr=devnull)
+    return time.time() - start
+
+
+def median(times):
+    return sorted(times)[len(times) // 2]
+
+
+def run(opts):
+    '''
+    Time every command without and with the loader index
+    '''
+    root = tempfile.mkdtemp()
+    try:
+        for command in opts['commands'].split(';'):
+            results = []
+            for index in (False, True):
+                conf_dir = write_config(root, index)
+                # warm the loader index and the page cache
+                timed(conf_dir, command)
+                results.append(median([timed(conf_dir, command)
+                                       for _ in range(opts['runs'])]))
+            print('{0:<52} without index {1:6.2f}s  with index {2:6.2f}s'.format(
+                command, *results))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    run(parse())
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+'''
+Load benchmark for the master request server workers
+
+Starts the master worker queue and a set of workers with a synthetic request
+handler, then drives them with concurrent REQ clients sending a mix of cheap
+``_return`` and slow ``_pillar`` requests. The requests/sec of the classic REP
+workers and of the asynchronous workers (``worker_async``) are reported side
+by side.
+
+    python tests/bench/mworker.py --workers 2 --clients 50 --slow-ratio 0.05
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import multiprocessing
+import optparse
+import shutil
+import tempfile
+import threading
+import time
+
+# Import salt libs
+import salt.master
+import salt.payload
+
+# Import third party libs
+import zmq
+
+
+class _BenchMixin(object):
+    '''
+    Replace the master functions with a synthetic workload
+    '''
+    def _setup_funcs(self):
+        self.clear_funcs = self.aes_funcs = None
+
+    def _update_aes(self):
+        pass
+
+    def _sync_funcs(self):
+        pass
+
+    def _handle_clear(self, load):
+        if load['cmd'] == '_pillar':
+            time.sleep(self.opts['bench_slow'])
+        return {'cmd': load['cmd']}
+
+
+class BenchMWorker(_BenchMixin, salt.master.MWorker):
+    pass
+
+
+class BenchAsyncMWorker(_BenchMixin, salt.master.AsyncMWorker):
+    pass
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('--workers', dest='workers', default=2, type='int',
+                      help='The number of worker processes')
+    parser.add_option('--clients', dest='clients', default=50, type='int',
+                      help='The number of concurrent clients')
+    parser.add_option('--duration', dest='duration', default=10, type='float',
+                      help='Seconds to run each benchmark for')
+    parser.add_option('--slow', dest='slow', default=0.2, type='float',
+                      help='Seconds a slow (_pillar) request takes')
+    parser.add_option('--slow-ratio', dest='slow_ratio', default=0.05,
+                      type='float',
+                      help='The share of requests which are slow')
+    parser.add_option('--port', dest='port', default=44506, type='int',
+                      help='The ret_port to bind the worker queue to')
+    options, args = parser.parse_args()
+    return options.__dict__
+
+
+def _client(opts, stop, counts, index):
+    '''
+    Send requests until told to stop, counting the replies
+    '''
+    serial = salt.payload.Serial(opts)
+    context = zmq.Context()
+    sock = context.socket(zmq.REQ)
+    sock.setsockopt(zmq.LINGER, 0)
+    sock.connect('tcp://127.0.0.1:{0}'.format(opts['ret_port']))
+    every = int(1 / opts['slow_ratio']) if opts['slow_ratio'] else 0
+    sent = 0
+    while not stop.is_set():
+        cmd = '_pillar' if every and sent % every == index % every else '_return'
+        sock.send(serial.dumps({'enc': 'clear', 'load': {'cmd': cmd}}))
+        if not sock.poll(30000):
+            break
+        sock.recv()
+        sent += 1
+    counts[index] = sent
+    sock.close()
+    context.term()
+
+
+def run_bench(opts, worker):
+    '''
+    Run a single benchmark with the given worker class, return requests/sec
+    '''
+    reqserv = salt.master.ReqServer(opts, None, None, None)
+    procs = [multiprocessing.Process(target=reqserv.zmq_device)]
+    for ind in range(opts['workers']):
+        procs.append(worker(opts, None, None, None))
+    for proc in procs:
+        proc.start()
+    time.sleep(1)
+    stop = threading.Event()
+    counts = [0] * opts['clients']
+    threads = [threading.Thread(target=_client, args=(opts, stop, counts, ind))
+               for ind in range(opts['clients'])]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    time.sleep(opts['duration'])
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    for proc in procs:
+        proc.terminate()
+        proc.join()
+    return sum(counts) / elapsed
+
+
+def main():
+    '''
+    Compare the REP workers with the asynchronous workers
+    '''
+    options = parse()
+    sock_dir = tempfile.mkdtemp()
+    opts = {'sock_dir': sock_dir,
+            'interface': '127.0.0.1',
+            'ret_port': options['port'],
+            'ipv6': False,
+            'serial': 'msgpack',
+            'worker_threads': options['workers'],
+            'worker_async_threads': 4,
+            'worker_async_cmds': ['_pillar'],
+            'workers': options['workers'],
+            'clients': options['clients'],
+            'duration': options['duration'],
+            'slow_ratio': options['slow_ratio'],
+            'bench_slow': options['slow']}
+    try:
+        for name, worker in (('rep', BenchMWorker),
+                             ('async', BenchAsyncMWorker)):
+            rate = run_bench(opts, worker)
+            print('{0:>6}: {1:10.1f} requests/sec'.format(name, rate))
+    finally:
+        shutil.rmtree(sock_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+'''
+Benchmark requisite resolution on synthetic highstates
+
+Builds lowstates of 1k, 5k and 20k chunks where every chunk requires the
+previous one by id and every tenth chunk also requires a glob, then times
+``State.check_requisite`` over all chunks against a plain scan of the
+chunks, the way requisites were resolved before the requisite index.
+
+    python tests/bench/requisites.py --sizes 1000,5000,20000
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import fnmatch
+import optparse
+import time
+
+# Import salt libs
+import salt.state
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('--sizes', dest='sizes', default='1000,5000,20000',
+                      help='Comma separated numbers of chunks to test')
+    options, args = parser.parse_args()
+    return [int(size) for size in options.sizes.split(',')]
+
+
+def make_chunks(size):
+    '''
+    Generate a lowstate with a chain of requisites
+    '''
+    chunks = []
+    for ind in range(size):
+        chunk = {'state': 'file',
+                 '__id__': 'file_{0}'.format(ind),
+                 'name': '/srv/app/{0}.conf'.format(ind),
+                 '__sls__': 'app.part{0}'.format(ind // 100),
+                 'fun': 'managed',
+                 'order': ind}
+        if ind:
+            chunk['require'] = [{'file': 'file_{0}'.format(ind - 1)}]
+        if ind and ind % 10 == 0:
+            chunk['require'].append({'file': 'file_{0}*'.format(ind - 1)})
+        chunks.append(chunk)
+    return chunks
+
+
+def scan(low, chunks):
+    '''
+    Resolve the requisites of a chunk by scanning every chunk
+    '''
+    found = []
+    for req in low.get('require', []):
+        req_key = next(iter(req))
+        req_val = req[req_key]
+        for chunk in chunks:
+            if (fnmatch.fnmatch(chunk['name'], req_val) or
+                    fnmatch.fnmatch(chunk['__id__'], req_val)):
+                if chunk['state'] == req_key:
+                    found.append(chunk)
+    return found
+
+
+def main():
+    '''
+    Time the requisite index and the plain scan
+    '''
+    state = salt.state.State.__new__(salt.state.State)
+    state.states = {}
+    state.pre = {}
+    state._req_index = None
+    for size in parse():
+        chunks = make_chunks(size)
+        running = dict((salt.state._gen_tag(chunk),
+                        {'result': True, 'changes': {}})
+                       for chunk in chunks)
+        start = time.time()
+        for low in chunks:
+            state.check_requisite(low, running, chunks)
+        indexed = time.time() - start
+        # The plain scan is quadratic, only time a sample of the chunks
+        sample = chunks[::max(1, size // 200)]
+        start = time.time()
+        for low in sample:
+            scan(low, chunks)
+        scanned = (time.time() - start) * len(chunks) / len(sample)
+        print('{0:>6} chunks: index {1:8.3f}s  scan {2:8.3f}s (estimated)'
+              .format(size, indexed, scanned))
+
+
+if __name__ == '__main__':
+    main()
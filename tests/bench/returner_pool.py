@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+'''
+Benchmark the returner connection pool on a local sqlite database
+
+Stores job returns the way the SQL returners do, once opening a connection
+per return and once borrowing it from a ``ConnectionPool``, and stores events
+row by row and as a single multi-row insert. Opening a connection sleeps for
+``--latency`` seconds to stand in for the TCP and authentication handshake of
+a database server.
+
+    python tests/bench/returner_pool.py --returns 2000 --latency 0.002
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import json
+import optparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+# Import salt libs
+import salt.returners
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('--returns', dest='returns', default=2000, type='int',
+                      help='The number of returns to store')
+    parser.add_option('--events', dest='events', default=100, type='int',
+                      help='The number of events per event_return call')
+    parser.add_option('--latency', dest='latency', default=0.002,
+                      type='float',
+                      help='Seconds spent opening a connection')
+    options, args = parser.parse_args()
+    return options.__dict__
+
+
+def make_connect(path, latency):
+    '''
+    Return a function opening a connection to the database
+    '''
+    def connect():
+        time.sleep(latency)
+        return sqlite3.connect(path)
+    return connect
+
+
+def store(conn, ind):
+    '''
+    Store a single return and commit it
+    '''
+    conn.execute('INSERT INTO salt_returns (jid, id, ret) VALUES (?, ?, ?)',
+                 (str(ind), 'minion{0}'.format(ind),
+                  json.dumps({'return': True})))
+    conn.commit()
+
+
+def run(opts):
+    '''
+    Time the returns and events with and without pooling
+    '''
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'salt.db')
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE salt_returns (jid text, id text, ret text)')
+        conn.execute('CREATE TABLE salt_events (tag text, data text)')
+        conn.close()
+        connect = make_connect(path, opts['latency'])
+
+        start = time.time()
+        for ind in range(opts['returns']):
+            conn = connect()
+            store(conn, ind)
+            conn.close()
+        unpooled = time.time() - start
+
+        pool = salt.returners.ConnectionPool(connect, lambda conn: conn.close())
+        start = time.time()
+        for ind in range(opts['returns']):
+            with pool.connection() as conn:
+                store(conn, ind)
+        pooled = time.time() - start
+        print('returns: unpooled {0:8.0f}/s  pooled {1:8.0f}/s'.format(
+            opts['returns'] / unpooled, opts['returns'] / pooled))
+        print('pool: {0}'.format(pool.stats()))
+
+        events = [('salt/job/{0}/ret/minion'.format(ind), json.dumps({}))
+                  for ind in range(opts['events'])]
+        calls = max(1, opts['returns'] // opts['events'])
+        start = time.time()
+        for _ in range(calls):
+            with pool.connection() as conn:
+                for event in events:
+                    conn.execute('INSERT INTO salt_events VALUES (?, ?)', event)
+                conn.commit()
+        rows = time.time() - start
+        start = time.time()
+        for _ in range(calls):
+            with pool.connection() as conn:
+                conn.execute(
+                    'INSERT INTO salt_events VALUES ' +
+                    ', '.join(['(?, ?)'] * len(events)),
+                    [field for event in events for field in event])
+                conn.commit()
+        batched = time.time() - start
+        total = calls * len(events)
+        print('events:  per row  {0:8.0f}/s  batched {1:8.0f}/s'.format(
+            total / rows, total / batched))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    run(parse())
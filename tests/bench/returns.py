@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+'''
+Benchmark the accounting of job returns on synthetic return events
+
+Feeds ``LocalClient.get_iter_returns`` the return events of jobs targeting
+1k, 10k and 50k minions, a few returns per poll of the event bus, and times
+it against the accounting done before the return tracker, which compared the
+returned minions with the targeted ones after every poll. The pause between
+polls is skipped so only the accounting is timed.
+
+    python tests/bench/returns.py --sizes 1000,10000,50000 --batch 10
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import itertools
+import optparse
+import time
+
+# Import salt libs
+import salt.client
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('--sizes', dest='sizes', default='1000,10000,50000',
+                      help='Comma separated numbers of minions to test')
+    parser.add_option('--batch', dest='batch', default=10, type='int',
+                      help='The number of returns received per poll')
+    options, args = parser.parse_args()
+    return options.__dict__
+
+
+def make_events(minions, batch):
+    '''
+    Generate the return events of a job, polls without any event yielding
+    None
+    '''
+    events = []
+    for ind, id_ in enumerate(minions):
+        events.append({'tag': 'salt/job/1/ret/{0}'.format(id_),
+                       'data': {'id': id_, 'return': True}})
+        if ind % batch == batch - 1:
+            events.append(None)
+    return events
+
+
+def make_client():
+    '''
+    Return a LocalClient which does not need a running master
+    '''
+    local = salt.client.LocalClient.__new__(salt.client.LocalClient)
+    local.opts = {'timeout': 60,
+                  'order_masters': False,
+                  'syndic_wait': 5,
+                  'gather_job_timeout': 5,
+                  'master_job_cache': 'local_cache'}
+    local.returners = {'local_cache.get_load': lambda jid: {'jid': jid}}
+    return local
+
+
+def tracked(local, minions, events):
+    '''
+    Collect the returns through get_iter_returns
+    '''
+    local.get_returns_no_block = lambda *args, **kwargs: itertools.chain(
+        events, itertools.repeat(None))
+    count = 0
+    for _ in local.get_iter_returns('1', minions, timeout=60):
+        count += 1
+    return count
+
+
+def scanned(minions, events, polls):
+    '''
+    Run the accounting of the first polls the way it was done before the
+    return tracker
+    '''
+    minions = set(minions)
+    found = set()
+    minion_timeouts = {}
+    events = iter(events)
+    for _ in range(polls):
+        for raw in events:
+            if raw is None:
+                break
+            found.add(raw['data']['id'])
+        if len(found.intersection(minions)) >= len(minions):
+            break
+        for id_ in minions - found:
+            if id_ not in minion_timeouts:
+                minion_timeouts[id_] = time.time() + 60
+
+
+def main():
+    '''
+    Time the return tracker and the former accounting
+    '''
+    opts = parse()
+    local = make_client()
+    sleep = time.sleep
+    time.sleep = lambda secs: None
+    try:
+        for size in [int(size) for size in opts['sizes'].split(',')]:
+            minions = ['minion{0}'.format(ind) for ind in range(size)]
+            events = make_events(minions, opts['batch'])
+            polls = size // opts['batch']
+            start = time.time()
+            count = tracked(local, minions, events)
+            tracker = time.time() - start
+            # The former accounting is quadratic, only time a sample of the
+            # polls
+            sample = max(1, min(polls, 200))
+            start = time.time()
+            scanned(minions, events, sample)
+            scan = (time.time() - start) * polls / sample
+            print('{0:>6} minions ({1} returns): tracker {2:8.3f}s  '
+                  'scan {3:8.3f}s (estimated)'.format(size, count, tracker, scan))
+    finally:
+        time.sleep = sleep
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+'''
+Profile the imports of ``salt-call`` and time its startup
+
+Prints the tree of the modules imported by ``salt.cli.caller`` with the time
+spent importing each of them, then times ``salt-call --local test.ping`` with
+``grains_lazy`` disabled and enabled against a throwaway minion config. Every
+import profile and run happens in a fresh interpreter.
+
+    python tests/bench/salt_call_startup.py --runs 5 --threshold 0.005
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import optparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+SALT_CALL = os.path.join(ROOT, 'scripts', 'salt-call')
+
+# Run in a fresh interpreter, prints "depth seconds name" for every import
+# which added modules, in the order the imports started
+PROFILE = '''
+import sys, time
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+_import = builtins.__import__
+depth = [0]
+lines = []
+
+
+def _profile(name, *args, **kwargs):
+    count = len(sys.modules)
+    line = [depth[0], 0, name]
+    lines.append(line)
+    depth[0] += 1
+    start = time.time()
+    try:
+        return _import(name, *args, **kwargs)
+    finally:
+        line[1] = time.time() - start
+        depth[0] -= 1
+        if len(sys.modules) == count:
+            lines.remove(line)
+builtins.__import__ = _profile
+_profile({0!r})
+builtins.__import__ = _import
+for line in lines:
+    print('{{0}} {{1:.6f}} {{2}}'.format(*line))
+'''
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('--runs', dest='runs', default=5, type='int',
+                      help='The number of timed salt-call runs')
+    parser.add_option('--module', dest='module', default='salt.cli.caller',
+                      help='The module to profile the imports of')
+    parser.add_option('--threshold', dest='threshold', default=0.005,
+                      type='float',
+                      help='Only show the imports taking longer, in seconds')
+    options, args = parser.parse_args()
+    return options.__dict__
+
+
+def profile_imports(opts):
+    '''
+    Print the import tree of the module
+    '''
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.check_output(
+        [sys.executable, '-c', PROFILE.format(opts['module'])], env=env)
+    lines = [line.split(' ', 2) for line in out.decode().splitlines()]
+    total = sum(float(secs) for depth, secs, name in lines if depth == '0')
+    print('importing {0}: {1:.3f}s'.format(opts['module'], total))
+    for depth, secs, name in lines:
+        if float(secs) >= opts['threshold']:
+            print('{0}{1:.3f} {2}'.format('  ' * int(depth), float(secs), name))
+
+
+def write_config(root, lazy):
+    '''
+    Write a minion config keeping everything under root
+    '''
+    conf_dir = os.path.join(root, 'etc')
+    if not os.path.isdir(conf_dir):
+        os.makedirs(conf_dir)
+    with open(os.path.join(conf_dir, 'minion'), 'w') as fp_:
+        for key in ('cachedir', 'pki_dir', 'sock_dir'):
+            fp_.write('{0}: {1}\n'.format(key, os.path.join(root, key)))
+        fp_.write('log_file: {0}\n'.format(os.path.join(root, 'minion.log')))
+        fp_.write('id: bench\nfile_client: local\n')
+        fp_.write('grains_lazy: {0}\n'.format(lazy))
+    return conf_dir
+
+
+def timed(conf_dir):
+    '''
+    Return the wall time of a salt-call run
+    '''
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.time()
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call(
+            [sys.executable, SALT_CALL, '-c', conf_dir, '--local',
+             '--log-level', 'quiet', 'test.ping'],
+            stdout=devnull, stderr=devnull, env=env)
+    return time.time() - start
+
+
+def time_startup(opts):
+    '''
+    Time salt-call test.ping with and without lazy grains
+    '''
+    root = tempfile.mkdtemp()
+    try:
+        for lazy in (False, True):
+            conf_dir = write_config(root, lazy)
+            # warm the page cache and the grains cache
+            timed(conf_dir)
+            times = sorted(timed(conf_dir) for _ in range(opts['runs']))
+            print('salt-call test.ping, grains_lazy {0!s:<5}: median {1:.3f}s  '
+                  'min {2:.3f}s'.format(lazy, times[len(times) // 2], times[0]))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    OPTS = parse()
+    profile_imports(OPTS)
+    time_startup(OPTS)
@@ -18,6 +18,7 @@ import shutil
 
 # Import salt libs
 import integration
+import salt.utils
 from salt.fileserver import gitfs
 
 gitfs.__opts__ = {'gitfs_remotes': [''],
@@ -34,7 +35,9 @@ gitfs.__opts__ = {'gitfs_remotes': [''],
                   'gitfs_insecure_auth': False,
                   'gitfs_privkey': '',
                   'gitfs_pubkey': '',
-                  'gitfs_passphrase': ''
+                  'gitfs_passphrase': '',
+                  'gitfs_fetch_timeout': 300,
+                  'gitfs_fetch_workers': 4
 }
 
 LOAD = {'saltenv': 'base'}
@@ -126,5 +129,46 @@ class GitFSTest(integration.ModuleCase):
             ret = gitfs.envs()
             self.assertIn('base', ret)
 
+    def test_index(self):
+        repo = git.Repo(self.tmp_repo_dir)
+        os.symlink('testfile', os.path.join(self.tmp_repo_dir, 'testlink'))
+        repo.index.add(['testlink'])
+        repo.index.commit('Link')
+        index_dir = os.path.join(self.master_opts['cachedir'], 'gitfs', 'index')
+        opts = {'cachedir': self.master_opts['cachedir'],
+                'gitfs_remotes': ['file://' + self.tmp_repo_dir],
+                'sock_dir': self.master_opts['sock_dir']}
+        with patch.dict(gitfs.__opts__, opts):
+            gitfs.update()
+            files, symlinks = gitfs._get_file_list(LOAD)
+            dirs = gitfs._get_dir_list(LOAD)
+            fnd = gitfs.find_file('testlink')
+            self.assertFalse(os.path.isdir(index_dir))
+
+        opts['gitfs_index'] = True
+        with patch.dict(gitfs.__opts__, opts):
+            gitfs.update()
+            self.assertTrue(os.path.isfile(os.path.join(index_dir, 'remotes.p')))
+            # the lookups do not touch the repos
+            with patch.object(gitfs, 'init', side_effect=AssertionError):
+                self.assertEqual(gitfs._get_file_list(LOAD), (files, symlinks))
+                self.assertEqual(symlinks, {'testlink': 'testfile'})
+                self.assertEqual(gitfs._get_dir_list(LOAD), dirs)
+                self.assertEqual(gitfs.find_file('testlink'), fnd)
+                self.assertEqual(gitfs.find_file('missing')['path'], '')
+
+            # blobs which are not cached are read out of the repo
+            os.remove(fnd['path'])
+            self.assertEqual(gitfs.find_file('testlink'), fnd)
+            with salt.utils.fopen(fnd['path']) as fp_:
+                with salt.utils.fopen(
+                        os.path.join(self.tmp_repo_dir, 'testfile')) as orig:
+                    self.assertEqual(fp_.read(), orig.read())
+
+        # an index written for other remotes is not used
+        opts['gitfs_remotes'] = ['file://' + self.tmp_repo_dir, 'file:///tmp']
+        with patch.dict(gitfs.__opts__, opts):
+            self.assertIsNone(gitfs._get_index('base'))
+
 if __name__ == '__main__':
     integration.run_tests(GitFSTest)
@@ -18,6 +18,8 @@ roots.__opts__ = {}
 
 # Import Python libs
 import os
+import shutil
+import tempfile
 
 
 @skipIf(NO_MOCK, NO_MOCK_REASON)
@@ -80,7 +82,8 @@ class RootsTest(integration.ModuleCase):
                          'OLD MAN:  Seek you the Bridge of Death.\n  ARTHUR:  '
                          'The Bridge of Death, which leads to the Grail?\n  '
                          'OLD MAN:  Hee hee ha ha!\n\n',
-                 'dest': 'testfile'})
+                 'dest': 'testfile',
+                 'size': 615})
 
     @skipIf(True, "Update test not yet implemented")
     def test_update(self):
@@ -105,6 +108,45 @@ class RootsTest(integration.ModuleCase):
             ret = roots.file_hash(load, fnd)
             self.assertDictEqual(ret, {'hsum': '98aa509006628302ce38ce521a7f805f', 'hash_type': 'md5'})
 
+            # The second lookup is served from the hash index
+            roots._HASH_INDEX['base']['testfile'][4] = 'indexed'
+            ret = roots.file_hash(load, fnd)
+            self.assertDictEqual(ret, {'hsum': 'indexed', 'hash_type': 'md5'})
+            roots._HASH_INDEX.clear()
+
+    def test_hash_index(self):
+        cachedir = tempfile.mkdtemp()
+        opts = {'file_roots': self.master_opts['file_roots'],
+                'fileserver_ignoresymlinks': False,
+                'file_ignore_regex': False,
+                'file_ignore_glob': False,
+                'hash_type': self.master_opts['hash_type'],
+                'cachedir': cachedir,
+                '__role': 'minion'}
+        try:
+            with patch.dict(roots.__opts__, opts):
+                index_path = roots._hash_index_path()
+                # A masterless minion does not hash all of its file_roots
+                roots.update()
+                self.assertFalse(os.path.exists(index_path))
+                self.assertEqual(roots._HASH_INDEX, {})
+
+                roots.__opts__['__role'] = 'master'
+                roots.update()
+                self.assertTrue(os.path.isfile(index_path))
+                self.assertIn('testfile', roots._HASH_INDEX['base'])
+
+                # Files removed from the shared index are dropped on reload
+                roots._HASH_INDEX['base']['removed'] = ['removed', 0, 0, 0, '']
+                roots._HASH_INDEX_MTIME.clear()
+                roots._load_hash_index()
+                self.assertNotIn('removed', roots._HASH_INDEX['base'])
+                self.assertIn('testfile', roots._HASH_INDEX['base'])
+        finally:
+            roots._HASH_INDEX.clear()
+            roots._HASH_INDEX_MTIME.clear()
+            shutil.rmtree(cachedir)
+
     def test_file_list_emptydirs(self):
         if integration.TMP_STATE_TREE not in self.master_opts['file_roots']['base']:
             self.skipTest('This test fails when using tests/runtests.py. salt-runtests will be available soon.')
@@ -8,15 +8,20 @@
 
 # Import Python libs
 from __future__ import absolute_import
+import copy
 import inspect
+import json
 import tempfile
 import shutil
+import threading
 import os
+import time
 import collections
 
 # Import Salt Testing libs
 from salttesting import TestCase
 from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import Mock, patch
 
 import integration
 
@@ -26,7 +31,8 @@ ensure_in_syspath('../../')
 import salt.ext.six as six
 from salt.config import minion_config
 
-from salt.loader import LazyLoader, _module_dirs
+from salt.loader import (LazyGrains, LazyLoader, _module_dirs, grains,
+                         _read_grains_cache, _write_grains_cache)
 
 
 class LazyLoaderVirtualEnabledTest(TestCase):
@@ -519,3 +525,254 @@ class LazyLoaderDeepSubmodReloadingTest(TestCase):
                 self.update_lib(lib)
                 self.loader.clear()
                 self._verify_libs()
+
+
+index_modules = {
+    'alpha': '''
+__virtualname__ = 'renamed'
+
+def __virtual__():
+    return __virtualname__
+
+def test():
+    return True
+''',
+    'beta': '''
+def __virtual__():
+    return False
+
+def test():
+    return True
+''',
+    'gamma': '''
+def test():
+    return True
+''',
+}
+
+
+class LazyLoaderIndexTest(TestCase):
+    '''
+    Test the negative lookup cache and the persistent index of the loader
+    '''
+    def setUp(self):
+        self.opts = minion_config(None)
+        self.tmp_dir = tempfile.mkdtemp(dir=integration.TMP)
+        self.module_dir = os.path.join(self.tmp_dir, 'modules')
+        os.makedirs(self.module_dir)
+        for name in index_modules:
+            self.update_module(name)
+        self.opts['cachedir'] = os.path.join(self.tmp_dir, 'cache')
+        self.opts['loader_index'] = True
+        self.opts['grains'] = {'os': 'Linux'}
+        self.loader = self.new_loader()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def new_loader(self):
+        loader = LazyLoader([self.module_dir], self.opts, tag='module')
+        loaded = []
+        load_module = loader._load_module
+
+        def _load_module(name):
+            loaded.append(name)
+            return load_module(name)
+        loader._load_module = _load_module
+        return loader, loaded
+
+    def update_module(self, name, source=None):
+        path = os.path.join(self.module_dir, '{0}.py'.format(name))
+        with open(path, 'w') as fh:
+            fh.write(source or index_modules[name])
+        # make the change visible despite a coarse mtime granularity
+        mtime = os.path.getmtime(path) + 2
+        os.utime(path, (mtime, mtime))
+        try:
+            os.unlink(path + 'c')
+        except OSError:
+            pass
+
+    def test_missing_keys(self):
+        loader, loaded = self.loader
+        self.assertNotIn('missing.test', loader)
+        self.assertEqual(sorted(loaded), ['alpha', 'beta', 'gamma'])
+        self.assertIn('missing.test', loader.missing_keys)
+        del loaded[:]
+        with patch.object(loader, 'refresh_file_mapping') as refresh:
+            self.assertNotIn('missing.test', loader)
+            self.assertFalse(refresh.called)
+
+        # a new module is found without clearing the loader
+        self.update_module('missing', index_modules['gamma'])
+        os.utime(self.module_dir, (time.time() + 4, time.time() + 4))
+        self.assertIn('missing.test', loader)
+        self.assertNotIn('missing.test', loader.missing_keys)
+
+    def test_assign_missing_key(self):
+        loader, loaded = self.loader
+        self.assertNotIn('missing.test', loader)
+        # such as the provider overrides of the states
+        func = lambda: True
+        loader['missing.test'] = func
+        self.assertIs(loader['missing.test'], func)
+        self.assertIn('missing.test', loader)
+        self.assertNotIn('missing.test', loader.missing_keys)
+
+    def test_index(self):
+        loader, loaded = self.loader
+        self.assertIn('renamed.test', loader)
+        self.assertNotIn('missing.test', loader)
+
+        # the next loaders only import the modules they need
+        loader, loaded = self.new_loader()
+        with patch('os.listdir') as listdir:
+            loader.refresh_file_mapping()
+            self.assertFalse(listdir.called)
+        self.assertIn('renamed.test', loader)
+        self.assertEqual(loaded, ['alpha'])
+        self.assertNotIn('missing.test', loader)
+        self.assertNotIn('beta.test', loader)
+        self.assertEqual(loaded, ['alpha'])
+
+        # a changed module is imported again
+        self.update_module('beta', index_modules['beta'].replace('False', 'True'))
+        loader, loaded = self.new_loader()
+        self.assertIn('beta.test', loader)
+        self.assertEqual(loaded, ['beta'])
+
+    def test_index_invalidation(self):
+        loader, loaded = self.loader
+        self.assertNotIn('missing.test', loader)
+
+        self.opts['grains'] = {'os': 'Windows'}
+        loader, loaded = self.new_loader()
+        self.assertNotIn('missing.test', loader)
+        self.assertEqual(sorted(loaded), ['alpha', 'beta', 'gamma'])
+
+        # clearing the loader runs __virtual__ again
+        del loaded[:]
+        loader.clear()
+        self.assertNotIn('missing.test', loader)
+        self.assertEqual(sorted(loaded), ['alpha', 'beta', 'gamma'])
+
+        self.opts['loader_index_ttl'] = 1
+        with patch('time.time', return_value=time.time() + 2):
+            loader, loaded = self.new_loader()
+            self.assertNotIn('missing.test', loader)
+        self.assertEqual(sorted(loaded), ['alpha', 'beta', 'gamma'])
+
+
+class LazyGrainsTest(TestCase):
+    '''
+    Test running the grain functions on demand
+    '''
+    def setUp(self):
+        self.funcs = [('core.first', Mock(return_value={'a': 1, 'x': 1})),
+                      ('core.second', Mock(return_value={'b': 2, 'x': 2})),
+                      ('custom.third', Mock(return_value={'c': 3}))]
+        self.cache = {}
+
+        grains = LazyGrains(self.funcs, save=self.cache.update)
+        self.assertEqual(grains['a'], 1)
+        self.assertEqual(grains, {'a': 1, 'b': 2, 'c': 3, 'x': 2})
+        for _, fun in self.funcs:
+            fun.reset_mock()
+
+    def called(self):
+        return [name for name, fun in self.funcs if fun.called]
+
+    def test_lookup(self):
+        grains = LazyGrains(self.funcs, overrides={'a': 'config'},
+                            cache=self.cache)
+        self.assertEqual(grains['b'], 2)
+        self.assertEqual(self.called(), ['core.second'])
+        self.assertEqual(grains['x'], 2)
+        self.assertEqual(grains.get('a'), 'config')
+        self.assertEqual(self.called(), ['core.first', 'core.second'])
+
+        # grains not cached run every function
+        self.assertNotIn('missing', grains)
+        self.assertEqual(len(self.called()), 3)
+        self.assertEqual(grains.copy(),
+                         {'a': 'config', 'b': 2, 'c': 3, 'x': 2})
+
+    def test_expiration(self):
+        grains = LazyGrains(self.funcs, cache=self.cache, expiration=300)
+        self.assertEqual(grains['x'], 2)
+        self.assertEqual(self.called(), [])
+        self.cache['core.second']['time'] -= 600
+        grains = LazyGrains(self.funcs, cache=self.cache, expiration=300)
+        self.assertEqual(grains['x'], 2)
+        self.assertEqual(self.called(), ['core.second'])
+
+    def test_set(self):
+        grains = LazyGrains(self.funcs, cache=self.cache)
+        grains['b'] = 'set'
+        del grains['c']
+        self.assertEqual(self.called(), ['custom.third'])
+        # the grains set or deleted are kept when the rest is computed
+        self.assertEqual(json.loads(json.dumps(grains)),
+                         {'a': 1, 'b': 'set', 'x': 2})
+        self.assertEqual(copy.deepcopy(grains), {'a': 1, 'b': 'set', 'x': 2})
+        self.assertIs(type(copy.deepcopy(grains)), dict)
+
+    def test_grains(self):
+        opts = minion_config(None)
+        lazy = grains(opts, lazy=True)
+        self.assertIsInstance(lazy, LazyGrains)
+        self.assertEqual(lazy.copy(), grains(opts))
+
+    def test_grains_cache(self):
+        opts = minion_config(None)
+        opts['cachedir'] = tempfile.mkdtemp(dir=integration.TMP)
+        opts['grains_cache'] = True
+        try:
+            # the cached tuples are lists
+            computed = json.loads(json.dumps(grains(opts)))
+            # the grain modules are not loaded while the cache is fresh
+            with patch('salt.loader.LazyLoader',
+                       side_effect=AssertionError) as loader:
+                self.assertEqual(grains(opts), computed)
+                self.assertFalse(loader.called)
+
+            cache, order = _read_grains_cache(opts)
+            self.assertEqual(order[0].split('.')[0], 'core')
+            expired = cache[order[-1]]['time'] - 600
+            cache[order[-1]]['time'] = expired
+            _write_grains_cache(opts, cache, order=order)
+            self.assertEqual(json.loads(json.dumps(grains(opts))), computed)
+            # only the expired grain function ran again
+            new_cache, _ = _read_grains_cache(opts)
+            self.assertGreater(new_cache[order[-1]]['time'], expired + 600)
+            self.assertEqual(new_cache[order[0]], cache[order[0]])
+        finally:
+            shutil.rmtree(opts['cachedir'])
+
+    def test_threads(self):
+        release = threading.Event()
+
+        def second():
+            release.wait()
+            return {'b': 2, 'x': 2}
+        self.funcs[1] = ('core.second', Mock(side_effect=second))
+        # the slow function times out, its cached grains are used
+        grains = LazyGrains(self.funcs, cache=self.cache, threads=2,
+                            timeouts={'core.second': 0.2})
+        self.assertEqual(grains.copy(), {'a': 1, 'b': 2, 'c': 3, 'x': 2})
+        self.assertEqual(len(self.called()), 3)
+        release.set()
+
+        # the grains are merged in order whichever function returns first
+        self.funcs[0] = ('core.first', Mock(side_effect=lambda: time.sleep(0.2)
+                                            or {'a': 1, 'x': 1}))
+        grains = LazyGrains(self.funcs, threads=3)
+        self.assertEqual(grains['x'], 2)
+        self.assertGreaterEqual(grains._timings['core.first'], 0.2)
+
+        # errors of core grains are raised, the others are logged
+        self.funcs[2][1].side_effect = ValueError
+        self.assertEqual(LazyGrains(self.funcs, threads=3).copy(),
+                         {'a': 1, 'b': 2, 'x': 2})
+        self.funcs[1][1].side_effect = ValueError
+        self.assertRaises(ValueError, LazyGrains(self.funcs, threads=3).copy)
@@ -33,6 +33,41 @@ class CPModuleTest(integration.ModuleCase):
             self.assertIn('KNIGHT:  They\'re nervous, sire.', data)
             self.assertNotIn('bacon', data)
 
+    def test_get_file_large(self):
+        '''
+        cp.get_file with a file served in many chunks, resuming a partial
+        download
+        '''
+        src = os.path.join(integration.TMP_STATE_TREE, 'large_file')
+        data = ''.join(str(num) for num in range(40000))
+        with salt.utils.fopen(src, 'w') as fp_:
+            fp_.write(data)
+        tgt = os.path.join(integration.TMP, 'large_file')
+        partial = None
+        try:
+            self.run_function('cp.get_file', ['salt://large_file', tgt])
+            with salt.utils.fopen(tgt, 'r') as fp_:
+                self.assertEqual(fp_.read(), data)
+
+            # A new version of the file, partially downloaded
+            data = data[::-1]
+            with salt.utils.fopen(src, 'w') as fp_:
+                fp_.write(data)
+            partial = os.path.join(
+                integration.TMP,
+                '.large_file.{0}.part'.format(
+                    hashlib.md5(data).hexdigest()[:16]))
+            with salt.utils.fopen(partial, 'w') as fp_:
+                fp_.write(data[:50000])
+            self.run_function('cp.get_file', ['salt://large_file', tgt])
+            with salt.utils.fopen(tgt, 'r') as fp_:
+                self.assertEqual(fp_.read(), data)
+            self.assertFalse(os.path.exists(partial))
+        finally:
+            for path in (src, tgt, partial):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
     def test_get_file_templated_paths(self):
         '''
         cp.get_file
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+'''
+Tests for running independent states in parallel
+'''
+
+# Import Salt Testing libs
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+import integration
+import salt.loader
+import salt.state
+
+
+class ParallelStateTest(integration.ModuleCase):
+    '''
+    Run a high state through the parallel code path of the state compiler
+    '''
+    def _high(self, id_, state, fun, *args):
+        return {id_: {state: [fun] + list(args),
+                      '__sls__': 'parallel',
+                      '__env__': 'base'}}
+
+    def test_call_high(self):
+        opts = self.get_config('minion', from_scratch=True)
+        opts['state_parallel'] = True
+        opts['state_parallel_workers'] = 2
+        opts['file_client'] = 'local'
+        opts['grains'] = salt.loader.grains(opts)
+        state = salt.state.State(opts)
+
+        high = {}
+        high.update(self._high('first', 'test', 'succeed_with_changes'))
+        high.update(self._high('echo one', 'cmd', 'run'))
+        high.update(self._high('echo two', 'cmd', 'run',
+                               {'require': [{'cmd': 'echo one'}]}))
+        high.update(self._high('failing', 'test', 'fail_without_changes'))
+        # Kills the process running its group
+        high.update(self._high('kill -9 $PPID', 'cmd', 'run'))
+        high.update(self._high('last', 'test', 'succeed_without_changes',
+                               {'order': 'last'}))
+        ret = state.call_high(high)
+
+        results = dict((tag.split('_|-')[1], data)
+                       for tag, data in ret.items())
+        self.assertEqual(sorted(results),
+                         ['echo one', 'echo two', 'failing', 'first',
+                          'kill -9 $PPID', 'last'])
+        self.assertEqual(sorted(data['__run_num__'] for data in ret.values()),
+                         list(range(6)))
+        self.assertTrue(results['first']['result'])
+        self.assertTrue(results['first']['changes'])
+        self.assertTrue(results['echo one']['result'])
+        self.assertTrue(results['echo two']['result'])
+        # The required state ran after its requisite, in the same group
+        self.assertEqual(results['echo two']['__run_num__'],
+                         results['echo one']['__run_num__'] + 1)
+        self.assertFalse(results['failing']['result'])
+        self.assertFalse(results['kill -9 $PPID']['result'])
+        self.assertIn('exited without returning',
+                      results['kill -9 $PPID']['comment'])
+        # The states ordered last run after the parallel block
+        self.assertEqual(results['last']['__run_num__'], 5)
+        self.assertTrue(results['last']['result'])
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(ParallelStateTest)
@@ -3,10 +3,13 @@
     :codeauthor: :email:`Mike Place <mp@saltstack.com>`
 '''
 
+# Import python libs
+import itertools
+
 # Import Salt Testing libs
 from salttesting import TestCase, skipIf
 from salttesting.helpers import ensure_in_syspath
-from salttesting.mock import patch, NO_MOCK, NO_MOCK_REASON
+from salttesting.mock import patch, MagicMock, NO_MOCK, NO_MOCK_REASON
 ensure_in_syspath('../')
 
 # Import Salt libs
@@ -72,7 +75,67 @@ class LocalClientTestCase(TestCase,
                                   self.client.pub,
                                   'non_existent_group', 'test.ping', expr_form='nodegroup')
 
+    def test_get_iter_returns(self):
+        events = [
+            {'tag': 'salt/job/1/ret/m1', 'data': {'id': 'm1', 'return': True}},
+            {'tag': 'salt/job/1', 'data': {'minions': ['m3']}},
+            {'tag': 'salt/job/1/ret/m1', 'data': {'id': 'm1', 'return': True}},
+            {'tag': 'salt/job/1/ret/m2', 'data': {'id': 'm2', 'return': True}},
+            {'tag': 'salt/job/1/ret/m3', 'data': {'id': 'm3', 'return': 1}},
+        ]
+        returners = {'local_cache.get_load': MagicMock(return_value={'jid': '1'})}
+        tracker = client.ReturnTracker()
+        with patch.object(self.client, 'returners', returners):
+            with patch.object(self.client, 'get_returns_no_block',
+                              return_value=itertools.chain(events, itertools.repeat(None))):
+                with patch.dict(self.client.opts, {'master_job_cache': 'local_cache',
+                                                   'order_masters': False}):
+                    rets = list(self.client.get_iter_returns('1', ['m1', 'm2'],
+                                                             timeout=5,
+                                                             tracker=tracker))
+        self.assertEqual(len(rets), 4)
+        self.assertEqual(rets[-1], {'m3': {'ret': 1}})
+        self.assertEqual(tracker.stats(), {'minion_count': 3, 'return_count': 3,
+                                           'pending': 0, 'timed_out': 0})
+
+
+class ReturnTrackerTestCase(TestCase):
+
+    def test_returns(self):
+        tracker = client.ReturnTracker(['m1', 'm2'])
+        self.assertTrue(tracker.add_return('m1'))
+        self.assertFalse(tracker.add_return('m1'))
+        # Unexpected minions are not pending, even once expected
+        self.assertTrue(tracker.add_return('m3'))
+        tracker.add_minions(['m3', 'm4'])
+        self.assertEqual(tracker.pending, set(['m2', 'm4']))
+        self.assertFalse(tracker.all_returned())
+        self.assertEqual(tracker.stats(), {'minion_count': 4, 'return_count': 2,
+                                           'pending': 2, 'timed_out': 0})
+        tracker.add_return('m2')
+        tracker.add_return('m4')
+        self.assertTrue(tracker.all_returned())
+
+    @skipIf(NO_MOCK, NO_MOCK_REASON)
+    def test_timeouts(self):
+        with patch('time.time', MagicMock(return_value=100)):
+            tracker = client.ReturnTracker(['m1', 'm2', 'm3'], timeout=10)
+        self.assertFalse(tracker.expire(105))
+        with patch('time.time', MagicMock(return_value=105)):
+            # m1 is still running the job, m4 too although not targeted
+            tracker.extend('m1')
+            tracker.extend('m4')
+        tracker.add_return('m2')
+        self.assertFalse(tracker.expire(110))
+        self.assertEqual(tracker.timed_out, set(['m3']))
+        self.assertTrue(tracker.expire(115))
+        self.assertEqual(tracker.timed_out, set(['m1', 'm3', 'm4']))
+        self.assertEqual(tracker.stats()['timed_out'], 3)
+        # A late return is no longer timed out
+        tracker.add_return('m3')
+        self.assertEqual(tracker.timed_out, set(['m1', 'm4']))
+
 
 if __name__ == '__main__':
     from integration import run_tests
-    run_tests(LocalClientTestCase, needs_daemon=False)
+    run_tests(LocalClientTestCase, ReturnTrackerTestCase, needs_daemon=False)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.crypt_test
+    ~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import python libs
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import skipIf, TestCase
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, patch
+ensure_in_syspath('../')
+
+# Import salt libs
+import salt.crypt
+import salt.utils
+
+# Import 3rd-party libs
+try:
+    from M2Crypto import RSA
+    HAS_M2 = True
+except ImportError:
+    HAS_M2 = False
+
+
+def _write_key(path):
+    '''
+    Write the public key of a new RSA key pair to path and return the pair
+    '''
+    rsa = RSA.gen_key(1024, 65537, callback=lambda *args: None)
+    rsa.save_pub_key(path)
+    return rsa
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+@skipIf(not HAS_M2, 'M2Crypto is not installed')
+class PubKeyCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'minion')
+        self.rsa = _write_key(self.path)
+        self.token = self.rsa.private_encrypt('salt', 5)
+        self.cache = salt.crypt.PubKeyCache(size=2, token_ttl=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_get_key(self):
+        pub = self.cache.get_key(self.path)
+        self.assertIs(self.cache.get_key(self.path), pub)
+        with salt.utils.fopen(self.path) as fp_:
+            self.assertEqual(self.cache.get_str(self.path), fp_.read())
+        self.assertEqual(pub.public_decrypt(self.token, 5), 'salt')
+
+        # Only size keys are kept
+        for name in ('a', 'b'):
+            _write_key(os.path.join(self.tmp, name))
+            self.cache.get_key(os.path.join(self.tmp, name))
+        self.assertEqual(len(self.cache._keys), 2)
+        self.assertIsNot(self.cache.get_key(self.path), pub)
+
+    def test_verify_token(self):
+        self.assertTrue(self.cache.verify_token(self.path, self.token))
+        self.assertFalse(self.cache.verify_token(self.path, 'bogus'))
+        # A verified token is not decrypted again
+        with patch.object(salt.crypt.PubKeyCache, '_rsa',
+                          side_effect=AssertionError):
+            self.assertTrue(self.cache.verify_token(self.path, self.token))
+
+        # The key of the minion changed
+        os.remove(self.path)
+        _write_key(self.path)
+        self.assertFalse(self.cache.verify_token(self.path, self.token))
+
+        # The key was deleted or rejected
+        os.remove(self.path)
+        self.assertFalse(self.cache.verify_token(self.path, self.token))
+        self.assertEqual(len(self.cache._keys), 0)
+
+    def test_disabled(self):
+        cache = salt.crypt.PubKeyCache(size=0, token_ttl=0)
+        self.assertTrue(cache.verify_token(self.path, self.token))
+        self.assertIsNot(cache.get_key(self.path), cache.get_key(self.path))
+        self.assertEqual(len(cache._keys), 0)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class SAuthTestCase(TestCase):
+
+    @patch('time.sleep')
+    def test_busy(self, sleep):
+        auth = object.__new__(salt.crypt.SAuth)
+        auth.opts = {'acceptance_wait_time': 10,
+                     'acceptance_wait_time_max': 0}
+        creds = {'aes': salt.crypt.Crypticle.generate_key_string()}
+
+        def sign_in(timeout, safe):
+            if sign_in.calls:
+                sign_in.calls -= 1
+                auth.retry_after = 4
+                return 'busy'
+            return creds
+        sign_in.calls = 2
+        auth.sign_in = sign_in
+        auth.authenticate()
+        self.assertIs(auth.creds, creds)
+        self.assertEqual(sleep.call_count, 2)
+        for call in sleep.call_args_list:
+            self.assertTrue(4 <= call[0][0] <= 5)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests([PubKeyCacheTestCase, SAuthTestCase], needs_daemon=False)
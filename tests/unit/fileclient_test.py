@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.fileclient_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import python libs
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.mock import patch
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../')
+
+# Import salt libs
+import salt.utils
+from salt import fileclient
+
+
+class FileStoreTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.opts = {'cachedir': self.tmp, 'serial': 'msgpack'}
+        self.store = fileclient.FileStore(self.opts)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmp, name)
+        with salt.utils.fopen(path, 'w') as fp_:
+            fp_.write(data)
+        return path, hashlib.md5(data).hexdigest()
+
+    def test_hash_index(self):
+        path, hsum = self._write('file', 'spam')
+        self.assertEqual(self.store.hash(path, 'md5'), hsum)
+        with patch('salt.utils.get_hash') as get_hash:
+            self.assertEqual(self.store.hash(path, 'md5'), hsum)
+            # The index persists across instances
+            store = fileclient.FileStore(self.opts)
+            self.assertEqual(store.hash(path, 'md5'), hsum)
+            self.assertFalse(get_hash.called)
+        path, hsum = self._write('file', 'eggs and ham')
+        self.assertEqual(store.hash(path, 'md5'), hsum)
+
+    def test_add_place(self):
+        path, hsum = self._write('download', 'spam')
+        obj = self.store.add(path, 'md5', hsum)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.store.lookup('md5', hsum), obj)
+
+        cached = os.path.join(self.tmp, 'base_file')
+        other = os.path.join(self.tmp, 'prod_file')
+        self.store.place(obj, cached, 'md5', hsum)
+        self.store.place(obj, other, 'md5', hsum)
+        self.assertEqual(os.stat(cached).st_ino, os.stat(obj).st_ino)
+        self.assertEqual(os.stat(obj).st_nlink, 3)
+        copy = os.path.join(self.tmp, 'copy')
+        self.store.place(obj, copy, 'md5', hsum, link=False)
+        self.assertNotEqual(os.stat(copy).st_ino, os.stat(obj).st_ino)
+
+        # Replacing the last links drops the old content
+        path, new = self._write('download', 'eggs')
+        new_obj = self.store.add(path, 'md5', new)
+        self.store.place(new_obj, cached, 'md5', new)
+        self.assertTrue(os.path.exists(obj))
+        self.store.place(new_obj, other, 'md5', new)
+        self.assertFalse(os.path.exists(obj))
+        self.assertEqual(self.store.lookup('md5', hsum), None)
+
+    def test_modified(self):
+        path, hsum = self._write('download', 'spam')
+        obj = self.store.add(path, 'md5', hsum)
+        cached = os.path.join(self.tmp, 'cached')
+        self.store.place(obj, cached, 'md5', hsum)
+        with salt.utils.fopen(cached, 'a') as fp_:
+            fp_.write('eggs')
+        self.assertEqual(self.store.lookup('md5', hsum), None)
+        self.assertFalse(os.path.exists(obj))
+
+    def test_bounded(self):
+        # Copies, such as the downloads to another destination, do not keep
+        # the stored file
+        copy = os.path.join(self.tmp, 'copy')
+        for ind in range(5):
+            path, hsum = self._write('download', 'version {0}'.format(ind))
+            obj = self.store.add(path, 'md5', hsum)
+            self.store.place(obj, copy, 'md5', hsum, link=False)
+        self.assertEqual(self._objects(), [])
+
+        cached = os.path.join(self.tmp, 'cached')
+        for ind in range(5):
+            path, hsum = self._write('download', 'version {0}'.format(ind))
+            obj = self.store.add(path, 'md5', hsum)
+            self.store.place(obj, cached, 'md5', hsum)
+        self.assertEqual(self._objects(), [obj])
+
+        # The stored files whose cached files were removed are swept, once
+        # they are old enough
+        os.remove(cached)
+        self.assertEqual(self.store.sweep(), 0)
+        later = time.time() + fileclient.FileStore.ORPHAN_AGE + 1
+        with patch('time.time', return_value=later):
+            self.assertEqual(self.store.sweep(), 1)
+        self.assertEqual(self._objects(), [])
+
+    def test_sweep_interval(self):
+        path, hsum = self._write('download', 'spam')
+        obj = self.store.add(path, 'md5', hsum)
+        later = time.time() + fileclient.FileStore.ORPHAN_AGE + 1
+        with patch('time.time', return_value=later):
+            path, hsum = self._write('download', 'eggs')
+            self.store.add(path, 'md5', hsum)
+            # Swept by the first add only
+            self.assertTrue(os.path.exists(obj))
+        later += fileclient.FileStore.SWEEP_INTERVAL
+        with patch('time.time', return_value=later):
+            path, hsum = self._write('download', 'ham')
+            new = self.store.add(path, 'md5', hsum)
+        self.assertEqual(self._objects(), [new])
+
+    def _objects(self):
+        # The stored files, not the index
+        return sorted(os.path.join(dirpath, name)
+                      for dirpath, dirnames, filenames
+                      in os.walk(self.store.root)
+                      for name in filenames
+                      if dirpath != self.store.root)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(FileStoreTestCase, needs_daemon=False)
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.fileserver.gitfs_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import python libs
+import collections
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.utils
+from salt.fileserver import gitfs
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class GitFSUpdateTestCase(TestCase):
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.repos = []
+        for name in ('slow', 'fast', 'hung'):
+            self.repos.append({
+                'url': name,
+                'fetch_timeout': '0.5' if name == 'hung' else '',
+                'lockfile': os.path.join(self.cachedir, name + '.lk')})
+        self.release = threading.Event()
+        gitfs.__opts__ = {'cachedir': self.cachedir,
+                          'gitfs_fetch_workers': 2,
+                          'fileserver_events': False}
+
+    def tearDown(self):
+        self.release.set()
+        shutil.rmtree(self.cachedir)
+
+    def _fetch(self, repo, provider):
+        if repo['url'] == 'slow':
+            time.sleep(0.2)
+        elif repo['url'] == 'hung':
+            self.release.wait()
+        return repo['url'] == 'slow'
+
+    def test_update(self):
+        with patch.object(gitfs, '_get_provider', return_value='gitpython'), \
+                patch.object(gitfs, '_clear_old_remotes',
+                             return_value=(False, self.repos)), \
+                patch.object(gitfs, '_fetch', self._fetch), \
+                patch.object(gitfs, 'envs', MagicMock(return_value=['base'])):
+            start = time.time()
+            ret = gitfs.update()
+            self.assertLess(time.time() - start, 5)
+            self.assertEqual(ret['slow']['changed'], True)
+            self.assertGreaterEqual(ret['slow']['duration'], 0.2)
+            self.assertEqual(ret['fast']['changed'], False)
+            self.assertEqual(ret['hung'], {'changed': False,
+                                           'fetched': False,
+                                           'duration': None})
+
+            # the fetch which timed out still holds its lock
+            self.assertTrue(os.path.exists(self.repos[2]['lockfile']))
+            self.assertEqual(gitfs.update()['hung']['fetched'], False)
+            self.release.set()
+            for _ in range(50):
+                if not os.path.exists(self.repos[2]['lockfile']):
+                    break
+                time.sleep(0.1)
+            self.assertEqual(gitfs.update()['hung']['fetched'], True)
+
+    def test_stale_lock(self):
+        repo = self.repos[1]
+        locks = []
+
+        def fetch(repo, provider):
+            with salt.utils.fopen(repo['lockfile']) as fp_:
+                locks.append(fp_.read())
+            return True
+        with patch.object(gitfs, '_fetch', fetch):
+            # The locks set with lock() and by running processes are kept
+            gitfs.lock(repo)
+            self.assertEqual(gitfs._update_remote(repo, 'gitpython'), None)
+            with salt.utils.fopen(repo['lockfile'], 'w') as fp_:
+                fp_.write(str(os.getppid()))
+            self.assertEqual(gitfs._update_remote(repo, 'gitpython'), None)
+            self.assertEqual(locks, [])
+
+            # The lock of a process which exited during its fetch is removed
+            proc = subprocess.Popen(['true'])
+            proc.wait()
+            with salt.utils.fopen(repo['lockfile'], 'w') as fp_:
+                fp_.write(str(proc.pid))
+            self.assertEqual(gitfs._update_remote(repo, 'gitpython'), True)
+            self.assertEqual(locks, [str(os.getpid())])
+            self.assertFalse(os.path.exists(repo['lockfile']))
+
+
+class _Tree(object):
+    '''
+    A tree of pygit2 and dulwich, iterating on its entries
+    '''
+    def __init__(self, *entries):
+        self.entries = entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def items(self):
+        return self.entries
+
+
+class _Blob(object):
+    def __init__(self, data, sha):
+        self.data = data
+        self.hex = sha
+
+    def as_raw_string(self):
+        return self.data
+
+
+class _Repo(dict):
+    def get_object(self, sha):
+        return self[sha]
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class GitFSIndexTestCase(TestCase):
+    '''
+    Test indexing the trees of the providers not used by the integration tests
+    '''
+    def setUp(self):
+        self.objects = _Repo({'b1': _Blob('data', 'b1'),
+                              'b2': _Blob('top', 'b2'),
+                              'b3': _Blob('more', 'b3')})
+        self.expected = ({'top': ('b1', 0o100644, None),
+                          'sub/link': ('b2', 0o120000, 'top'),
+                          'sub/deeper/file': ('b3', 0o100755, None)},
+                         ['sub', 'sub/deeper'])
+
+    def _tree(self, entry):
+        self.objects['t2'] = _Tree(entry('file', 'b3', 0o100755))
+        self.objects['t1'] = _Tree(entry('link', 'b2', 0o120000),
+                                   entry('deeper', 't2', 0o40000))
+        return _Tree(entry('top', 'b1', 0o100644),
+                     entry('sub', 't1', 0o40000))
+
+    def test_walk_tree_pygit2(self):
+        entry = collections.namedtuple('TreeEntry', 'name oid filemode')
+        pygit2 = MagicMock(Tree=_Tree, Blob=_Blob)
+        with patch.object(gitfs, 'pygit2', pygit2, create=True):
+            self.assertEqual(
+                gitfs._walk_tree_pygit2({'repo': self.objects},
+                                        self._tree(entry)),
+                self.expected)
+
+    def test_walk_tree_dulwich(self):
+        entry = collections.namedtuple('TreeEntry', 'path sha mode')
+        dulwich = MagicMock()
+        dulwich.objects.Tree = _Tree
+        dulwich.objects.Blob = _Blob
+        with patch.object(gitfs, 'dulwich', dulwich, create=True):
+            self.assertEqual(
+                gitfs._walk_tree_dulwich({'repo': self.objects},
+                                         self._tree(entry)),
+                self.expected)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(GitFSUpdateTestCase, GitFSIndexTestCase, needs_daemon=False)
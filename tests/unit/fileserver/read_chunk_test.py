@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.fileserver.read_chunk_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import python libs
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, patch
+
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.fileserver
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ReadChunkTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        with salt.fileserver._MMAPS_LOCK:
+            for path in list(salt.fileserver._MMAPS):
+                salt.fileserver._close_mmap(path)
+        shutil.rmtree(self.tmp)
+
+    def _write(self, name, data, age=120):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as fp_:
+            fp_.write(data)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def _read(self, path, size):
+        ret = []
+        loc = 0
+        while True:
+            data, total = salt.fileserver.read_chunk(path, loc, size)
+            if not data:
+                return ''.join(ret), total
+            ret.append(data)
+            loc += len(data)
+
+    def test_mapped(self):
+        data = os.urandom(10000)
+        path = self._write('big', data)
+        self.assertEqual(self._read(path, 1024), (data, 10000))
+        self.assertIn(path, salt.fileserver._MMAPS)
+
+        # Small and recently modified files are read
+        small = self._write('small', 'small')
+        self.assertEqual(self._read(small, 1024), ('small', 5))
+        self._write('big', data, age=0)
+        self.assertEqual(self._read(path, 1024), (data, 10000))
+        self.assertEqual(list(salt.fileserver._MMAPS), [])
+
+    def test_changed(self):
+        data = os.urandom(10000)
+        path = self._write('big', data)
+        stat = os.stat(path)
+        self.assertEqual(salt.fileserver.read_chunk(path, 0, 1024),
+                         (data[:1024], 10000))
+
+        # Truncated in place after it was checked, the mapping is not used
+        with open(path, 'r+b') as fp_:
+            fp_.truncate(2000)
+        with patch('os.stat', return_value=stat):
+            self.assertEqual(salt.fileserver.read_chunk(path, 1024, 4096),
+                             (data[1024:2000], 10000))
+        self.assertEqual(list(salt.fileserver._MMAPS), [])
+
+        # Replaced by another file
+        new = os.urandom(5000)
+        self._write('big', new)
+        self.assertEqual(self._read(path, 1024), (new, 5000))
+
+    @patch('salt.fileserver.MMAP_CACHE_SIZE', 2)
+    def test_threads(self):
+        files = dict((self._write(str(num), os.urandom(5000 + num)), None)
+                     for num in range(4))
+        for path in files:
+            with open(path, 'rb') as fp_:
+                files[path] = fp_.read()
+        errors = []
+
+        def read():
+            try:
+                for _ in range(20):
+                    for path, data in files.items():
+                        self.assertEqual(self._read(path, 512),
+                                         (data, len(data)))
+            except Exception as exc:
+                errors.append(exc)
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertTrue(len(salt.fileserver._MMAPS) <= 2)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(ReadChunkTestCase, needs_daemon=False)
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.master_test
+    ~~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import python libs
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Import Salt Testing libs
+from salttesting import skipIf, TestCase
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+ensure_in_syspath('../')
+
+# Import salt libs
+import salt.crypt
+import salt.master
+import salt.payload
+from salt.utils.odict import OrderedDict
+
+# Import third party libs
+import zmq
+
+
+class _Funcs(object):
+    '''
+    Stand in for ClearFuncs and AESFuncs, recording the threads using every
+    instance and how many requests run at once
+    '''
+    instances = []
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def __init__(self, *args):
+        self.crypticle = args[-1]
+        self.threads = set()
+        self.instances.append(self)
+
+    def run_func(self, cmd, load):
+        with self.lock:
+            self.threads.add(threading.current_thread().ident)
+            self.running[0] += 1
+            self.running[1] = max(self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running[0] -= 1
+        return {'cmd': cmd, 'id': load['id']}
+
+    def _stop(self, load):
+        raise KeyboardInterrupt
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class AuthAdmissionTestCase(TestCase):
+
+    @patch('time.time', MagicMock(return_value=1000.0))
+    def test_rate(self):
+        admission = salt.master.AuthAdmission({'auth_rate': 10,
+                                               'auth_burst': 2})
+        self.assertEqual(admission.admit(), (0, None))
+        self.assertEqual(admission.admit(), (0, None))
+        # The minions turned away are spread at the rate
+        waits = [admission.admit()[0] for _ in range(3)]
+        self.assertAlmostEqual(waits[0], 0.2)
+        self.assertAlmostEqual(waits[1], 0.3)
+        self.assertAlmostEqual(waits[2], 0.4)
+
+        func = MagicMock()
+        ret = admission.run(func, {'id': 'minion'})
+        self.assertEqual(ret['load']['ret'], 'busy')
+        self.assertAlmostEqual(ret['load']['retry_after'], 0.5)
+        self.assertFalse(func.called)
+
+        with patch('time.time', MagicMock(return_value=1001.0)):
+            self.assertEqual(admission.run(func, {'id': 'minion'}),
+                             func.return_value)
+
+    @patch('time.time', MagicMock(return_value=1000.0))
+    def test_retry_max(self):
+        admission = salt.master.AuthAdmission({'auth_rate': 1,
+                                               'auth_retry_max': 5})
+        waits = [admission.admit()[0] for _ in range(10)]
+        self.assertEqual(waits[0], 0)
+        self.assertEqual(waits[1:5], [1, 2, 3, 4])
+        self.assertEqual(set(waits[5:]), set([5]))
+
+    def test_concurrency(self):
+        admission = salt.master.AuthAdmission({'auth_max_concurrent': 1})
+        retry_after, lease = admission.admit()
+        self.assertEqual(retry_after, 0)
+        self.assertEqual(admission.admit(), (1.0, None))
+        admission.release(lease)
+        self.assertEqual(admission.run(lambda load: load, {'id': 'minion'}),
+                         {'id': 'minion'})
+        self.assertEqual(admission.admit()[0], 0)
+
+    def test_lease(self):
+        admission = salt.master.AuthAdmission({'auth_max_concurrent': 1})
+        with patch('time.time', MagicMock(return_value=1000.0)):
+            # The MWorker serving this sign-in dies and never releases it
+            lost = admission.admit()[1]
+            self.assertEqual(admission.admit()[0], 1.0)
+        later = 1000.0 + salt.master.AUTH_SLOT_LEASE
+        with patch('time.time', MagicMock(return_value=later)):
+            retry_after, lease = admission.admit()
+            self.assertEqual(retry_after, 0)
+            # The expired lease does not release the slot leased again
+            admission.release(lost)
+            self.assertEqual(admission.admit()[0], 1.0)
+            admission.release(lease)
+            self.assertEqual(admission.admit()[0], 0)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class AuthBlobTestCase(TestCase):
+
+    def setUp(self):
+        self.clear_funcs = salt.master.ClearFuncs.__new__(
+            salt.master.ClearFuncs)
+        self.clear_funcs.opts = {'auth_mode': 1}
+        self.clear_funcs.master_key = MagicMock()
+        # Tokens are encrypted with OAEP, every ciphertext of the same token
+        # differs
+        self.clear_funcs.master_key.key.private_decrypt.side_effect = \
+            lambda data, padding: data.split(':')[0]
+        self.clear_funcs.pub_keys = MagicMock(size=2)
+        self.clear_funcs.auth_blobs = OrderedDict()
+        self.aes = salt.master.SMaster.aes
+        salt.master.SMaster.aes = MagicMock(value='aes')
+
+    def tearDown(self):
+        salt.master.SMaster.aes = self.aes
+
+    def test_auth_blob(self):
+        auth_blob = self.clear_funcs._ClearFuncs__auth_blob
+        pub = MagicMock()
+        load = {'id': 'minion', 'token': 'token:1'}
+        blob = auth_blob(load, pub)
+        self.assertEqual(sorted(blob), ['aes', 'sig', 'token'])
+        pub.public_encrypt.assert_any_call('token', 4)
+        self.assertIs(auth_blob({'id': 'minion', 'token': 'token:2'}, pub),
+                      blob)
+        self.assertEqual(pub.public_encrypt.call_count, 2)
+
+        # A new token, public key or AES key gets a new reply
+        self.assertIsNot(auth_blob({'id': 'minion', 'token': 'new:3'}, pub),
+                         blob)
+        self.assertIsNot(auth_blob(load, MagicMock()), blob)
+        blob = auth_blob(load, pub)
+        salt.master.SMaster.aes.value = 'rotated'
+        self.assertIsNot(auth_blob(load, pub), blob)
+
+        # Only as many minions as public keys are kept
+        auth_blob({'id': 'other'}, pub)
+        auth_blob({'id': 'third'}, pub)
+        self.assertEqual(list(self.clear_funcs.auth_blobs), ['other', 'third'])
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class AsyncMWorkerTestCase(TestCase):
+
+    def setUp(self):
+        self.sock_dir = tempfile.mkdtemp()
+        self.opts = {'sock_dir': self.sock_dir,
+                     'serial': 'msgpack',
+                     'worker_async_threads': 2,
+                     'worker_async_cmds': ['_pillar', '_serve_file']}
+        self.serial = salt.payload.Serial(self.opts)
+        key = salt.crypt.Crypticle.generate_key_string()
+        self.crypticle = salt.crypt.Crypticle(self.opts, key)
+        self.aes = salt.master.SMaster.aes
+        salt.master.SMaster.aes = multiprocessing.Array('c', key)
+        _Funcs.instances = []
+        _Funcs.running = [0, 0]
+
+        # The worker queue of the master
+        self.context = zmq.Context()
+        self.c_uri = 'ipc://{0}'.format(os.path.join(self.sock_dir, 'clients.ipc'))
+        clients = self.context.socket(zmq.ROUTER)
+        clients.bind(self.c_uri)
+        workers = self.context.socket(zmq.DEALER)
+        workers.bind('ipc://{0}'.format(os.path.join(self.sock_dir, 'workers.ipc')))
+
+        def device():
+            try:
+                zmq.device(zmq.QUEUE, clients, workers)
+            except zmq.ZMQError:
+                clients.close()
+                workers.close()
+        self.device = threading.Thread(target=device)
+        self.device.daemon = True
+        self.device.start()
+
+    def tearDown(self):
+        self.context.term()
+        salt.master.SMaster.aes = self.aes
+        shutil.rmtree(self.sock_dir)
+
+    def _send(self, payload):
+        sock = self.context.socket(zmq.REQ)
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.connect(self.c_uri)
+        try:
+            sock.send(self.serial.dumps(payload))
+            if not sock.poll(10000):
+                return None
+            return self.serial.loads(sock.recv())
+        finally:
+            sock.close()
+
+    @patch('salt.master.AESFuncs', _Funcs)
+    @patch('salt.master.ClearFuncs', _Funcs)
+    def test_concurrent_requests(self):
+        worker = salt.master.AsyncMWorker(self.opts, {}, {}, self.crypticle)
+        loop = threading.Thread(target=worker._bind_async)
+        loop.daemon = True
+        loop.start()
+
+        replies = {}
+
+        def request(num):
+            cmd = ('_pillar', '_serve_file', '_return')[num % 3]
+            load = self.crypticle.dumps({'cmd': cmd, 'id': num})
+            replies[num] = self._send({'enc': 'aes', 'load': load})
+        threads = [threading.Thread(target=request, args=(num,))
+                   for num in range(15)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._send({'enc': 'clear', 'load': {'cmd': '_stop'}})
+        loop.join(10)
+        self.assertFalse(loop.is_alive())
+
+        self.assertEqual(
+            replies,
+            dict((num, {'cmd': ('_pillar', '_serve_file', '_return')[num % 3],
+                        'id': num})
+                 for num in range(15)))
+        # Two pool threads and the event loop, each with its own ClearFuncs
+        # and AESFuncs, used by no other thread
+        self.assertEqual(len(_Funcs.instances), 6)
+        for funcs in _Funcs.instances:
+            self.assertTrue(len(funcs.threads) <= 1)
+        self.assertTrue(_Funcs.running[1] > 1)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests([AuthAdmissionTestCase, AuthBlobTestCase, AsyncMWorkerTestCase],
+              needs_daemon=False)
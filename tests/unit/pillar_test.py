@@ -7,7 +7,11 @@
     ~~~~~~~~~~~~~~~~~~~~~~
 '''
 
+import os
+import shutil
 import tempfile
+import threading
+import time
 
 # Import Salt Testing libs
 from salttesting import skipIf, TestCase
@@ -17,6 +21,7 @@ ensure_in_syspath('../')
 
 # Import salt libs
 import salt.pillar
+import salt.utils
 
 
 @skipIf(NO_MOCK, NO_MOCK_REASON)
@@ -128,6 +133,101 @@ class PillarTestCase(TestCase):
         pillar = salt.pillar.Pillar(opts, grains, 'mocked-minion', 'base')
         self.assertEqual(pillar.compile_pillar()['ssh'], 'foo')
 
+    def test_concurrent_ext_pillar(self):
+        opts = {
+            'renderer': 'yaml',
+            'state_top': '',
+            'pillar_roots': [],
+            'file_roots': [],
+            'extension_modules': '',
+            'ext_pillar': [{'first': 'a'}, {'slow': 'b'}, {'second': 'c'},
+                           {'first': 'd'}],
+            'ext_pillar_concurrency': 4,
+            'ext_pillar_timeout': 1,
+        }
+        stop = threading.Event()
+        running = set()
+
+        def ext(name):
+            def ext_pillar(minion_id, pillar, arg):
+                running.add(arg)
+                if name == 'slow':
+                    stop.wait(5)
+                # The sources of the same module do not run concurrently
+                self.assertNotIn('d' if arg == 'a' else 'a', running)
+                running.discard(arg)
+                return {'foo': arg, arg: pillar['bar']}
+            return ext_pillar
+
+        pillar = salt.pillar.Pillar(opts, {}, 'mocked-minion', 'base')
+        pillar.ext_pillars = dict((name, ext(name))
+                                  for name in ('first', 'slow', 'second'))
+        errors = []
+        try:
+            ret = pillar.ext_pillar({'bar': 'baz'}, {}, errors)
+        finally:
+            stop.set()
+        # The data is merged in the configured order
+        self.assertEqual(ret, {'bar': 'baz', 'foo': 'd',
+                               'a': 'baz', 'c': 'baz', 'd': 'baz'})
+        self.assertEqual(errors, ['ext_pillar slow did not return within 1s'])
+
+    def test_concurrent_ext_pillar_queued(self):
+        opts = {
+            'renderer': 'yaml',
+            'state_top': '',
+            'pillar_roots': [],
+            'file_roots': [],
+            'extension_modules': '',
+            'ext_pillar': [{'first': 'a'}, {'second': 'b'}, {'hung': 'c'},
+                           {'last': 'd'}],
+            'ext_pillar_concurrency': 2,
+            'ext_pillar_timeout': 1,
+        }
+        stop = threading.Event()
+
+        def ext_pillar(minion_id, pillar, arg):
+            if arg == 'c':
+                stop.wait(5)
+            else:
+                time.sleep(0.6)
+            return {arg: True}
+
+        pillar = salt.pillar.Pillar(opts, {}, 'mocked-minion', 'base')
+        pillar.ext_pillars = dict((name, ext_pillar)
+                                  for name in ('first', 'second', 'hung',
+                                               'last'))
+        errors = []
+        start = time.time()
+        try:
+            ret = pillar.ext_pillar({}, {}, errors)
+        finally:
+            stop.set()
+        # The source queued for a slot was not timed out before it was called
+        self.assertEqual(ret, {'a': True, 'b': True, 'd': True})
+        self.assertEqual(errors, ['ext_pillar hung did not return within 1s'])
+        self.assertTrue(time.time() - start < 3)
+
+        # Every slot is kept by a hung source
+        opts['ext_pillar'] = [{'hung': 'c'}, {'stuck': 'c'}, {'last': 'd'}]
+        stop.clear()
+        pillar = salt.pillar.Pillar(opts, {}, 'mocked-minion', 'base')
+        pillar.ext_pillars = dict((name, ext_pillar)
+                                  for name in ('hung', 'stuck', 'last'))
+        errors = []
+        start = time.time()
+        try:
+            ret = pillar.ext_pillar({}, {}, errors)
+        finally:
+            stop.set()
+        self.assertEqual(ret, {})
+        self.assertEqual(errors, [
+            'ext_pillar hung did not return within 1s',
+            'ext_pillar stuck did not return within 1s',
+            'ext_pillar last did not start, the ext_pillars before it did '
+            'not return within 1s'])
+        self.assertTrue(time.time() - start < 3)
+
     def _setup_test_topfile_mocks(self, Matcher, get_file_client,
             nodegroup_order, glob_order):
         # Write a simple topfile and two pillar state files
@@ -173,6 +273,108 @@ ssh:
         client.get_state.side_effect = get_state
 
 
+class PillarCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmp, 'pillar')
+        os.makedirs(self.root)
+        self._write('top.sls', 'base:\n  \'*\':\n    - foo\n')
+        self.opts = {'cachedir': os.path.join(self.tmp, 'cache'),
+                     'serial': 'msgpack',
+                     'pillar_roots': {'base': [self.root]},
+                     'pillar_cache': True,
+                     'pillar_cache_ttl': 60,
+                     'pillar_cache_shared_ext': ['shared']}
+        self.cache = salt.pillar.PillarCache(self.opts)
+        self.key = self.cache.key('minion', {'os': 'Ubuntu'}, 'base')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _write(self, name, data):
+        with salt.utils.fopen(os.path.join(self.root, name), 'w') as fp_:
+            fp_.write(data)
+
+    def test_get_pillar_cache(self):
+        self.assertIs(salt.pillar.get_pillar_cache(self.opts),
+                      salt.pillar.get_pillar_cache(self.opts))
+        self.assertEqual(salt.pillar.get_pillar_cache({}), None)
+
+    def test_hit_miss(self):
+        self.assertEqual(self.cache.get('minion', self.key), None)
+        self.cache.set('minion', self.key, {'foo': 'bar'})
+        # The cache is shared by the master processes
+        cache = salt.pillar.PillarCache(self.opts)
+        self.assertEqual(cache.get('minion', self.key), {'foo': 'bar'})
+        other = cache.key('minion', {'os': 'Debian'}, 'base')
+        self.assertEqual(cache.get('minion', other), None)
+        self.assertEqual(cache.stats['hits'], 1)
+        self.assertEqual(cache.stats['misses'], 1)
+        # Pillars with render errors are not cached
+        self.cache.set('minion', other, {'_errors': ['failed']})
+        self.assertEqual(cache.get('minion', other), None)
+
+    def test_invalidation(self):
+        self.cache.set('minion', self.key, {'foo': 'bar'})
+        with patch('time.time', return_value=salt.pillar.time.time() + 61):
+            self.assertEqual(self.cache.get('minion', self.key), None)
+        self.assertEqual(self.cache.get('minion', self.key), {'foo': 'bar'})
+        # Changing the pillar_roots invalidates the cache
+        self._write('foo.sls', 'foo: baz\n')
+        self.cache._roots = None
+        self.assertEqual(self.cache.get('minion', self.key), None)
+        self.assertEqual(self.cache.stats['expired'], 2)
+
+        self.cache.set('minion', self.key, {'foo': 'baz'})
+        self.cache.set('other', self.key, {'foo': 'baz'})
+        self.assertEqual(self.cache.clear('min*'), ['minion'])
+        self.assertEqual(self.cache.get('minion', self.key), None)
+        self.assertEqual(self.cache.get('other', self.key), {'foo': 'baz'})
+
+    def test_shared(self):
+        self.cache.set_top('base', {'base': {'*': ['foo']}})
+        self.assertEqual(self.cache.get_top('base'), {'base': {'*': ['foo']}})
+        self.assertEqual(self.cache.get_top('prod'), None)
+        compile_ext = MagicMock(return_value={'shared': True})
+        for _ in range(3):
+            self.assertEqual(
+                self.cache.ext_pillar('shared', {'arg': 1}, compile_ext),
+                {'shared': True})
+        self.assertEqual(compile_ext.call_count, 1)
+        # Clearing the cache drops the shared data of every master process
+        cache = salt.pillar.PillarCache(self.opts)
+        cache.set_top('base', {})
+        with patch('time.time', return_value=salt.pillar.time.time() + 1):
+            self.cache.clear()
+        self.assertEqual(cache.get_top('base'), None)
+
+    @patch('salt.pillar.salt.fileclient.get_file_client', autospec=True)
+    @patch('salt.pillar.salt.minion.Matcher', autospec=True)
+    def test_static_top(self, Matcher, get_file_client):
+        opts = dict(self.opts,
+                    renderer='yaml',
+                    state_top='top.sls',
+                    extension_modules='',
+                    environment='base',
+                    file_roots=[])
+        salt.pillar._PILLAR_CACHES.pop(opts['cachedir'], None)
+        client = get_file_client.return_value
+        client.cache_file.return_value = os.path.join(self.root, 'top.sls')
+        pillar = salt.pillar.Pillar(opts, {}, 'minion', 'base')
+        self.assertEqual(pillar.get_top()[0]['base'], {'*': ['foo']})
+        self.assertEqual(pillar.get_top()[0]['base'], {'*': ['foo']})
+        self.assertEqual(client.cache_file.call_count, 1)
+
+        # Top files using templating are rendered for every minion
+        self._write('top.sls', 'base:\n  {{ grains.id }}:\n    - foo\n')
+        pillar.cache._roots = None
+        pillar.get_top()
+        pillar.get_top()
+        self.assertEqual(client.cache_file.call_count, 3)
+        salt.pillar._PILLAR_CACHES.pop(opts['cachedir'], None)
+
+
 if __name__ == '__main__':
     from integration import run_tests
-    run_tests(PillarTestCase, needs_daemon=False)
+    run_tests([PillarTestCase, PillarCacheTestCase], needs_daemon=False)
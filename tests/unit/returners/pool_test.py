@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.returners.pool_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import python libs
+import sqlite3
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.returners
+from salt.returners import mysql
+
+mysql.__salt__ = {}
+mysql.__opts__ = {'id': 'master'}
+
+
+class ConnectionPoolTestCase(TestCase):
+
+    def setUp(self):
+        self.connect = MagicMock(side_effect=lambda: sqlite3.connect(':memory:'))
+        self.close = MagicMock(side_effect=lambda conn: conn.close())
+        self.pool = salt.returners.ConnectionPool(self.connect, self.close,
+                                                  size=2)
+
+    def test_reuse(self):
+        for _ in range(5):
+            with self.pool.connection() as conn:
+                conn.execute('SELECT 1')
+        self.assertEqual(self.connect.call_count, 1)
+        self.assertEqual(self.pool.stats()['reused'], 4)
+
+        # Only size connections are kept idle
+        conns = [self.pool.acquire() for _ in range(3)]
+        for conn in conns:
+            self.pool.release(conn)
+        self.assertEqual(self.close.call_count, 1)
+        self.assertEqual(self.pool.stats()['idle'], 2)
+        self.pool.clear()
+        self.assertEqual(self.pool.stats()['idle'], 0)
+
+    def test_discard(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            with self.pool.connection() as conn:
+                conn.execute('SELECT * FROM missing')
+        self.assertEqual(self.pool.stats()['discarded'], 1)
+        self.assertEqual(self.pool.stats()['in_use'], 0)
+        with self.pool.connection() as conn:
+            pass
+        self.assertEqual(self.connect.call_count, 2)
+
+    def test_expired(self):
+        self.pool.check = MagicMock(return_value=False)
+        with self.pool.connection():
+            pass
+        with self.pool.connection():
+            pass
+        self.assertEqual(self.connect.call_count, 2)
+        self.pool.check = None
+        self.pool.max_idle = -1
+        with self.pool.connection():
+            pass
+        self.assertEqual(self.connect.call_count, 3)
+
+    def test_fork(self):
+        with self.pool.connection():
+            pass
+        with patch('os.getpid', return_value=-1):
+            with self.pool.connection():
+                pass
+        # The connection of the parent is neither reused nor closed
+        self.assertEqual(self.connect.call_count, 2)
+        self.assertEqual(self.close.call_count, 0)
+
+    def test_get_connection_pool(self):
+        pool = salt.returners.get_connection_pool(
+            'test', {'host': 'a'}, self.connect, self.close,
+            opts={'returner_pool_size': 0})
+        self.assertIs(salt.returners.get_connection_pool(
+            'test', {'host': 'a'}, self.connect, self.close), pool)
+        self.assertIsNot(salt.returners.get_connection_pool(
+            'test', {'host': 'b'}, self.connect, self.close), pool)
+        # A pool of size 0 does not keep connections
+        with pool.connection():
+            pass
+        self.assertEqual(self.close.call_count, 1)
+        self.assertIn('test', salt.returners.pool_stats())
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class MySQLPoolTestCase(TestCase):
+
+    @patch('salt.returners.mysql.MySQLdb', create=True)
+    def test_pooled_returns(self, mysqldb):
+        mysqldb.DatabaseError = sqlite3.DatabaseError
+        with patch.dict(mysql.__opts__, {'mysql.host': 'pooled'}):
+            for ind in range(3):
+                mysql.returner({'fun': 'test.ping', 'jid': str(ind),
+                                'return': True, 'id': 'minion'})
+            mysql.event_return([{'tag': 'a', 'data': {}},
+                                {'tag': 'b', 'data': {}}])
+        self.assertEqual(mysqldb.connect.call_count, 1)
+        cursor = mysqldb.connect.return_value.cursor.return_value
+        self.assertEqual(len(cursor.executemany.call_args[0][1]), 2)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests([ConnectionPoolTestCase, MySQLPoolTestCase], needs_daemon=False)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.returners.segment_cache_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import python libs
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+
+ensure_in_syspath('../../')
+
+# Import salt libs
+from salt.returners import segment_cache
+
+segment_cache.__opts__ = {}
+
+
+class SegmentCacheTestCase(TestCase):
+    '''
+    Test the segmented job cache
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        segment_cache.__opts__ = {'cachedir': self.cachedir,
+                                  'serial': 'msgpack',
+                                  'keep_jobs': 24}
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
+        segment_cache._INDEXES.clear()
+
+    def test_returns(self):
+        jid = segment_cache.prep_jid()
+        segment_cache.save_load(jid, {'fun': 'test.ping', 'arg': [],
+                                      'jid': jid})
+        for minion in ('web1', 'web2'):
+            segment_cache.returner({'jid': jid, 'id': minion,
+                                    'return': True, 'out': 'nested'})
+        self.assertEqual(segment_cache.get_load(jid)['fun'], 'test.ping')
+        self.assertEqual(segment_cache.get_jid(jid),
+                         {'web1': {'return': True, 'out': 'nested'},
+                          'web2': {'return': True, 'out': 'nested'}})
+        self.assertEqual(segment_cache.get_jids()[jid]['Function'],
+                         'test.ping')
+
+    def test_duplicate_return(self):
+        jid = segment_cache.prep_jid()
+        segment_cache.returner({'jid': jid, 'id': 'web1', 'return': 1})
+        self.assertFalse(
+            segment_cache.returner({'jid': jid, 'id': 'web1', 'return': 2}))
+        self.assertEqual(segment_cache.get_jid(jid),
+                         {'web1': {'return': 1}})
+
+    def test_nocache_and_unknown(self):
+        jid = segment_cache.prep_jid(nocache=True)
+        segment_cache.returner({'jid': jid, 'id': 'web1', 'return': 1})
+        self.assertEqual(segment_cache.get_jid(jid), {})
+        self.assertEqual(segment_cache.get_load('20000101000000000000'), {})
+        self.assertFalse(
+            segment_cache.returner({'jid': '20000101000000000000',
+                                    'id': 'web1', 'return': 1}))
+
+    def test_recreated_segment(self):
+        old = segment_cache.prep_jid(passed_jid='20150101000000000000')
+        segment_cache.returner({'jid': old, 'id': 'web1', 'return': 1})
+        self.assertEqual(segment_cache.get_jid(old), {'web1': {'return': 1}})
+
+        # Another master process removes the segment and writes it again
+        # past the position indexed by this one
+        indexes = dict(segment_cache._INDEXES)
+        shutil.rmtree(os.path.join(self.cachedir, 'segment_jobs', old[:10]))
+        new = segment_cache.prep_jid(passed_jid='20150101000000000001')
+        for minion in ('db1', 'db2', 'db3'):
+            segment_cache.returner({'jid': new, 'id': minion, 'return': 2})
+        segment_cache._INDEXES.clear()
+        segment_cache._INDEXES.update(indexes)
+        self.assertEqual(segment_cache.get_jid(old), {})
+        self.assertEqual(sorted(segment_cache.get_jid(new)),
+                         ['db1', 'db2', 'db3'])
+
+    def test_clean_old_jobs(self):
+        old = '20000101000000000000'
+        new = segment_cache.prep_jid()
+        segment_cache.prep_jid(passed_jid=old)
+        segment_cache.clean_old_jobs()
+        self.assertFalse(
+            os.path.isdir(os.path.join(self.cachedir, 'segment_jobs', old[:10])))
+        self.assertIsNotNone(segment_cache._job(new))
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(SegmentCacheTestCase, needs_daemon=False)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.state_test
+    ~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import python libs
+import os
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../')
+
+# Import salt libs
+import salt.state
+
+
+def _chunk(state, id_, name, sls='base'):
+    return {'state': state, '__id__': id_, 'name': name, '__sls__': sls,
+            'fun': 'run'}
+
+
+def _ordered(*ids):
+    chunks = []
+    for order, id_ in enumerate(ids):
+        chunk = _chunk('cmd', id_, id_)
+        chunk['order'] = salt.state.AUTO_ORDER_START + order
+        chunks.append(chunk)
+    return chunks
+
+
+class RequisiteIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.chunks = [_chunk('pkg', 'nginx', 'nginx', 'web'),
+                       _chunk('file', 'conf', '/etc/nginx.conf', 'web'),
+                       _chunk('service', 'nginx', 'nginx', 'web'),
+                       _chunk('file', '/etc/motd', '/etc/motd', 'core'),
+                       _chunk('cmd', 'reload', 'nginx -s reload', 'web')]
+        self.index = salt.state.RequisiteIndex(self.chunks)
+
+    def test_literal(self):
+        self.assertEqual(self.index.find('pkg', 'nginx'), [self.chunks[0]])
+        self.assertEqual(self.index.find('file', 'conf'), [self.chunks[1]])
+        self.assertEqual(self.index.find('file', '/etc/nginx.conf'),
+                         [self.chunks[1]])
+        self.assertEqual(self.index.find('file', '/etc/motd'),
+                         [self.chunks[3]])
+        self.assertEqual(self.index.find('pkg', 'apache'), [])
+
+    def test_glob(self):
+        self.assertEqual(self.index.find('file', '/etc/*'),
+                         [self.chunks[1], self.chunks[3]])
+        self.assertEqual(self.index.find('cmd', 'rel*'), [self.chunks[4]])
+
+    def test_sls(self):
+        self.assertEqual(self.index.find('sls', 'core'), [self.chunks[3]])
+        self.assertEqual(self.index.find('sls', 'w?b'),
+                         [self.chunks[0], self.chunks[1], self.chunks[2],
+                          self.chunks[4]])
+
+    def test_find_name_index(self):
+        high = {'nginx': {'pkg': ['installed'], '__sls__': 'web'},
+                'conf': {'file': [{'name': '/etc/nginx.conf'}, 'managed'],
+                         '__sls__': 'web'}}
+        find = salt.state._find_name_index(high)
+        for name, state in (('nginx', 'pkg'),
+                            ('/etc/nginx.conf', 'file'),
+                            ('/etc/other', 'file')):
+            self.assertEqual(find(name, state),
+                             salt.state.find_name(name, state, high))
+
+
+class ParallelBlocksTestCase(TestCase):
+
+    def _blocks(self, chunks, aggregate=()):
+        index = salt.state.RequisiteIndex(chunks)
+        return [(parallel, [[low['__id__'] for low in group]
+                            for group in groups])
+                for parallel, groups in salt.state.parallel_blocks(
+                    chunks, index, aggregate)]
+
+    def test_independent(self):
+        chunks = _ordered('a', 'b', 'c')
+        self.assertEqual(self._blocks(chunks),
+                         [(True, [['a'], ['b'], ['c']])])
+
+    def test_requisites(self):
+        chunks = _ordered('a', 'b', 'c', 'd')
+        chunks[2]['require'] = [{'cmd': 'a'}]
+        chunks[1]['watch'] = [{'cmd': 'd'}]
+        self.assertEqual(self._blocks(chunks),
+                         [(True, [['a', 'c'], ['b', 'd']])])
+        chunks[3]['prereq'] = [{'sls': 'base'}]
+        self.assertEqual(self._blocks(chunks),
+                         [(False, [['a', 'b', 'c', 'd']])])
+
+    def test_aggregate(self):
+        chunks = _ordered('a', 'b', 'c')
+        chunks[1]['state'] = 'pkg'
+        chunks[2]['state'] = 'pkg'
+        self.assertEqual(self._blocks(chunks, ['pkg']),
+                         [(True, [['a'], ['b', 'c']])])
+
+    def test_order(self):
+        chunks = _ordered('a', 'b', 'c', 'd')
+        chunks[0]['order'] = 1
+        chunks[3]['order'] = salt.state.LAST_ORDER_START + 200
+        self.assertEqual(self._blocks(chunks),
+                         [(False, [['a']]),
+                          (True, [['b'], ['c']]),
+                          (False, [['d']])])
+        # A requisite across stages runs them all serially
+        chunks[3]['require'] = [{'cmd': 'b'}]
+        self.assertEqual(self._blocks(chunks),
+                         [(False, [['a']]),
+                          (False, [['b', 'c', 'd']])])
+
+    def test_failhard(self):
+        chunks = _ordered('a', 'b', 'c')
+        chunks[1]['failhard'] = True
+        self.assertEqual(self._blocks(chunks),
+                         [(False, [['a', 'b', 'c']])])
+
+
+@skipIf(not hasattr(os, 'fork'), 'Parallel state runs need fork')
+class ParallelFailhardTestCase(TestCase):
+
+    def setUp(self):
+        self.state = salt.state.State.__new__(salt.state.State)
+        self.state.opts = {'failhard': False,
+                           'state_parallel': True,
+                           'state_parallel_workers': 2}
+        self.state.functions = {'config.option': lambda key: None}
+        self.state.active = set()
+        self.state.pre = {}
+        self.state._refreshes = 0
+        self.state._State__run_num = 0
+        self.state._mod_init = lambda low: None
+        self.state.call_chunk = self._call_chunk
+
+    def _call_chunk(self, low, running, chunks):
+        running[salt.state._gen_tag(low)] = {
+            'changes': {},
+            'result': low['__id__'] not in ('bad', 'hard'),
+            'comment': '',
+            '__run_num__': len(running),
+            '__sls__': low['__sls__']}
+        if low['__id__'] == 'hard':
+            # Set when a requisite of the chunk failed hard
+            running['__FAILHARD__'] = True
+        return running
+
+    def _run(self, chunks):
+        ret = self.state.call_chunks(chunks)
+        self.assertNotIn('__FAILHARD__', ret)
+        return sorted(tag.split('_|-')[1] for tag in ret)
+
+    def test_failhard(self):
+        chunks = _ordered('bad', 'after', 'other')
+        chunks[0]['order'] = 1
+        chunks[0]['failhard'] = True
+        # A serial block failing hard stops the run
+        self.assertEqual(self._run(chunks), ['bad'])
+
+        chunks = _ordered('hard', 'first', 'last')
+        chunks[2]['order'] = salt.state.LAST_ORDER_START + 200
+        # So does a group of a parallel block
+        self.assertEqual(self._run(chunks), ['first', 'hard'])
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(RequisiteIndexTestCase, ParallelBlocksTestCase,
+              ParallelFailhardTestCase, needs_daemon=False)
@@ -3,6 +3,7 @@
 # Import python libs
 import copy
 import os
+import shutil
 import tempfile
 import json
 import datetime
@@ -12,11 +13,13 @@ import pprint
 from salttesting.unit import skipIf, TestCase
 from salttesting.case import ModuleCase
 from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import patch
 ensure_in_syspath('../../')
 
 # Import salt libs
 import salt.loader
 import salt.utils
+import salt.utils.templates
 from salt.exceptions import SaltRenderError
 from salt.utils import get_context
 from salt.utils.jinja import (
@@ -159,6 +162,9 @@ class TestGetTemplate(TestCase):
                 'extmods'),
         }
 
+    def tearDown(self):
+        shutil.rmtree(os.path.join(TEMPLATES_DIR, 'jinja'), ignore_errors=True)
+
     def test_fallback(self):
         '''
         A Template with a filesystem loader is returned as fallback
@@ -438,6 +444,78 @@ class TestGetTemplate(TestCase):
         )
 
 
+class TestBytecodeCache(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        roots = {'base': [os.path.join(self.tmp, 'files')]}
+        self.opts = {'cachedir': self.tmp,
+                     'file_client': 'remote',
+                     'file_roots': roots,
+                     'pillar_roots': roots}
+        os.makedirs(roots['base'][0])
+        self.write('lib', '{% macro who() %}{{ name }}{% endmacro %}')
+        self.main = os.path.join(self.tmp, 'main')
+        with salt.utils.fopen(self.main, 'w') as fp_:
+            fp_.write("{% from 'lib' import who %}{{ who() }}")
+        self.compiled = []
+        compile_ = Environment.compile
+
+        def counted(env, source, *args, **kwargs):
+            self.compiled.append(source)
+            return compile_(env, source, *args, **kwargs)
+        patches = [patch.object(Environment, 'compile', counted),
+                   patch.object(SaltCacheLoader, 'file_client',
+                                lambda loader: MockFileClient()),
+                   patch.dict(salt.utils.templates._JINJA_ENVS, clear=True)]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, data):
+        with salt.utils.fopen(os.path.join(self.tmp, 'files', name), 'w') as fp_:
+            fp_.write(data)
+
+    def render(self, name):
+        with salt.utils.fopen(self.main) as fp_:
+            return render_jinja_tmpl(
+                fp_.read(),
+                dict(opts=self.opts, saltenv='base', name=name),
+                tmplpath=self.main)
+
+    def test_reuse(self):
+        '''
+        Templates are compiled once, the context of a render does not leak
+        into the next ones
+        '''
+        self.assertEqual(self.render('one'), 'one')
+        self.assertEqual(len(self.compiled), 2)
+        self.assertEqual(self.render('two'), 'two')
+        self.assertEqual(len(self.compiled), 2)
+        # A new process reads them from the cachedir
+        salt.utils.templates._JINJA_ENVS.clear()
+        self.assertEqual(self.render('three'), 'three')
+        self.assertEqual(len(self.compiled), 2)
+
+    def test_changed_import(self):
+        '''
+        A changed import is compiled again
+        '''
+        self.assertEqual(self.render('one'), 'one')
+        self.write('lib', '{% macro who() %}{{ name|upper }}{% endmacro %}')
+        self.assertEqual(self.render('two'), 'TWO')
+        self.assertEqual(len(self.compiled), 3)
+
+    def test_disabled(self):
+        self.opts['jinja_bytecode_cache'] = False
+        self.render('one')
+        self.render('two')
+        self.assertEqual(len(self.compiled), 4)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, 'jinja')))
+
+
 class TestCustomExtensions(TestCase):
     def test_serialize_json(self):
         dataset = {
@@ -709,6 +787,6 @@ class TestDotNotationLookup(ModuleCase):
 
 if __name__ == '__main__':
     from integration import run_tests
-    run_tests(TestSaltCacheLoader, TestGetTemplate, TestCustomExtensions,
-            TestDotNotationLookup,
+    run_tests(TestSaltCacheLoader, TestGetTemplate, TestBytecodeCache,
+              TestCustomExtensions, TestDotNotationLookup,
               needs_daemon=False)
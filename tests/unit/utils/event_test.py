@@ -10,6 +10,7 @@
 # Import python libs
 import os
 import hashlib
+import threading
 import time
 import zmq
 from contextlib import contextmanager
@@ -18,6 +19,7 @@ from multiprocessing import Process
 # Import Salt Testing libs
 from salttesting import (expectedFailure, skipIf)
 from salttesting import TestCase
+from salttesting.mock import Mock, call, patch
 from salttesting.helpers import ensure_in_syspath
 ensure_in_syspath('../../')
 
@@ -294,7 +296,200 @@ class TestSaltEvent(TestCase):
                 evt = me.get_event(tag='testevents')
                 self.assertGotEvent(evt, {'data': '{0}'.format(i)}, 'Event {0}'.format(i))
 
+    def test_event_pending_bounded(self):
+        '''Test use_pending keeps at most max_event_pending events'''
+        with eventpublisher_process():
+            me = event.SaltEvent('master', SOCK_DIR,
+                                 opts={'max_event_pending': 5})
+            me.subscribe()
+            for i in xrange(20):
+                me.fire_event({'data': '{0}'.format(i)}, 'evt{0}'.format(i))
+            me.fire_event({'data': 'last'}, 'last')
+            evt = me.get_event(tag='last', use_pending=True)
+            self.assertGotEvent(evt, {'data': 'last'})
+            self.assertEqual(len(me.pending_events), 5)
+            self.assertEqual(me.pending_events.dropped, 15)
+            evt = me.get_event(tag='evt1', use_pending=True)
+            self.assertGotEvent(evt, {'data': '15'})
+
+
+class TestTagTrie(TestCase):
+    def test_matches(self):
+        trie = event.TagTrie()
+        trie['salt/job'] = 1
+        trie['salt/job/123'] = 2
+        trie['salt/key'] = 3
+        trie[''] = 4
+        self.assertEqual(trie.matches('salt/job/123/ret/minion'),
+                         [('', 4), ('salt/job', 1), ('salt/job/123', 2)])
+        self.assertEqual(trie.matches('salt/auth'), [('', 4)])
+        del trie['']
+        del trie['salt/job']
+        self.assertEqual(trie.matches('salt/job/123/ret'),
+                         [('salt/job/123', 2)])
+        self.assertEqual(sorted(trie), ['salt/job/123', 'salt/key'])
+        del trie['salt/job/123']
+        del trie['salt/key']
+        self.assertEqual(trie._root, {})
+
+
+class TestPendingEvents(TestCase):
+    def _evt(self, tag):
+        return {'tag': tag, 'data': {}}
+
+    def test_route_once(self):
+        pending = event.PendingEvents()
+        pending.subscribe(['salt/job', 'salt/job/1'])
+        first = self._evt('salt/job/1/ret/a')
+        self.assertTrue(pending.add(first))
+        self.assertFalse(pending.add(self._evt('salt/auth')))
+        second = self._evt('salt/job/2/ret/a')
+        pending.add(second)
+        self.assertEqual(len(pending), 2)
+        # Consumed through one tag, the event is gone from the others
+        self.assertIs(pending.pop('salt/job/1'), first)
+        self.assertIs(pending.pop('salt/job'), second)
+        self.assertIsNone(pending.pop('salt/job'))
+
+    def test_subscribe(self):
+        pending = event.PendingEvents()
+        pending.subscribe(['salt/job', 'salt/key'])
+        job = self._evt('salt/job/1/ret/a')
+        pending.add(job)
+        pending.add(self._evt('salt/key/accept'))
+        # Events matching no tag anymore are dropped, the others are picked
+        # up by the new tags
+        pending.subscribe(['salt/job/1'])
+        self.assertEqual(len(pending), 1)
+        self.assertIs(pending.pop('salt/job/1'), job)
+
+    def test_subscribe_unchanged(self):
+        pending = event.PendingEvents()
+        pending.subscribe(['salt/job', 'salt/key'])
+        pending.add(self._evt('salt/job/1/ret/a'))
+        with patch('salt.utils.event.sorted', create=True,
+                   side_effect=sorted) as sorted_:
+            # The same tags again do not rescan the pending events
+            pending.subscribe(['salt/key', 'salt/job'])
+            pending.subscribe(['salt/job', 'salt/key', 'salt/job'])
+            self.assertEqual(sorted_.call_count, 0)
+            # They are scanned once for all the new tags
+            pending.subscribe(['salt/job', 'salt/job/1', 'salt/job/1/ret'])
+            self.assertEqual(sorted_.call_count, 1)
+        self.assertEqual(pending.pop('salt/job/1/ret')['tag'],
+                         'salt/job/1/ret/a')
+
+    def test_bounded(self):
+        pending = event.PendingEvents(maxlen=3)
+        pending.subscribe(['salt/job', 'salt/job/1'])
+        for i in range(5):
+            pending.add(self._evt('salt/job/{0}'.format(i)))
+        self.assertEqual(pending.stats(),
+                         {'salt/job': {'queued': 3, 'dropped': 2},
+                          'salt/job/1': {'queued': 1, 'dropped': 0}})
+        # Still held for the other tag
+        self.assertEqual(pending.pop('salt/job/1')['tag'], 'salt/job/1')
+        self.assertEqual(pending.dropped, 2)
+        self.assertEqual(pending.pop('salt/job')['tag'], 'salt/job/2')
+
+
+class _Done(Exception):
+    pass
+
+
+class _FakeBus(object):
+    '''
+    Hand out the given events, None standing for a wait without any event
+    '''
+    def __init__(self, events):
+        self.events = list(events)
+        self.waits = []
+
+    def fire_event(self, data, tag):
+        pass
+
+    def get_event(self, wait=5, full=False):
+        self.waits.append(wait)
+        if not self.events:
+            raise _Done()
+        evt = self.events.pop(0)
+        if evt is None:
+            time.sleep(wait)
+        elif callable(evt):
+            evt = evt()
+        return evt
+
+
+class TestEventReturn(TestCase):
+    def _returner(self, opts, returners):
+        defaults = {'event_return': 'spam',
+                    'event_return_queue': 2,
+                    'event_return_queue_max_seconds': 0,
+                    'event_return_backlog': 1,
+                    'event_return_whitelist': [],
+                    'event_return_blacklist': []}
+        defaults.update(opts)
+        minion = Mock()
+        minion.returners = returners
+        with patch('salt.minion.MasterMinion', return_value=minion):
+            return event.EventReturn(defaults)
+
+    def _evt(self, tag):
+        return {'tag': tag, 'data': {}}
+
+    def test_filter(self):
+        ret = self._returner({'event_return_whitelist': ['salt/job/*/ret/*',
+                                                         'salt/key'],
+                              'event_return_blacklist': ['*/ret/master']},
+                             {})
+        self.assertTrue(ret._filter(self._evt('salt/job/1/ret/minion')))
+        self.assertTrue(ret._filter(self._evt('salt/key')))
+        self.assertFalse(ret._filter(self._evt('salt/key/accept')))
+        self.assertFalse(ret._filter(self._evt('salt/job/1/ret/master')))
+        ret = self._returner({}, {})
+        self.assertTrue(ret._filter(self._evt('salt/auth')))
+
+    def test_run(self):
+        written = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(events):
+            started.set()
+            release.wait(5)
+            written.append([evt['tag'] for evt in events])
+
+        ret = self._returner({'event_return': 'spam, eggs, missing',
+                              'event_return_queue_max_seconds': 0.05},
+                             {'spam.event_return': slow,
+                              'eggs.event_return': Mock()})
+        bus = _FakeBus([self._evt('a'), self._evt('b'),
+                        lambda: started.wait(5) and self._evt('c'),
+                        self._evt('d'), self._evt('e'), self._evt('f'),
+                        # A lone event is flushed once it is old enough
+                        self._evt('g'), None])
+        with patch('salt.utils.event.get_event', return_value=bus):
+            self.assertRaises(_Done, ret.run)
+        self.assertEqual([writer.returner for writer in ret.writers],
+                         ['spam', 'eggs'])
+        # The bus is read while the slow returner holds up its batches
+        self.assertEqual(ret.stats()['spam']['dropped'], 3)
+        release.set()
+        eggs = ret.minion.returners['eggs.event_return']
+        for _ in range(50):
+            if len(written) == 2 and eggs.call_args == call([self._evt('g')]):
+                break
+            time.sleep(0.1)
+        self.assertEqual(written, [['a', 'b'], ['c', 'd']])
+        # Depending on how fast its writer picks them up, the batches sent
+        # to eggs while it still had one queued were dropped
+        returned = sum(len(args[0]) for args, kwargs in eggs.call_args_list)
+        self.assertEqual(returned + ret.stats()['eggs']['dropped'], 7)
+        self.assertEqual(eggs.call_args[0][0], [self._evt('g')])
+        self.assertTrue(0 < bus.waits[-2] <= 0.05)
+
 
 if __name__ == '__main__':
     from integration import run_tests
-    run_tests(TestSaltEvent, needs_daemon=False)
+    run_tests(TestSaltEvent, TestTagTrie, TestPendingEvents, TestEventReturn,
+              needs_daemon=False)
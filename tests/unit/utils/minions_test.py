@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.utils.minions_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test the minion data index used for grain and pillar targeting, the key
+    index and the compound target compiler
+'''
+
+# Import python libs
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import patch
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.payload
+import salt.utils
+import salt.utils.minions
+
+
+class MinionDataIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.opts = {'cachedir': self.cachedir,
+                     'serial': 'msgpack',
+                     'minion_data_cache': True,
+                     'minion_data_index': True,
+                     'minion_data_index_refresh': 0,
+                     'minion_data_index_grains': ['role', 'os']}
+        self.serial = salt.payload.Serial(self.opts)
+        self._write('web1', {'role': 'web', 'os': 'Debian'}, {'dc': 'ams'})
+        self._write('web2', {'role': ['web', 'cache'], 'os': 'CentOS'}, {})
+        self._write('db1', {'role': 'db', 'os': 'Debian'}, {'dc': 'fra'})
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
+
+    def _write(self, minion_id, grains, pillar):
+        cdir = os.path.join(self.cachedir, 'minions', minion_id)
+        if not os.path.isdir(cdir):
+            os.makedirs(cdir)
+        with salt.utils.fopen(os.path.join(cdir, 'data.p'), 'w+b') as fp_:
+            fp_.write(self.serial.dumps({'grains': grains, 'pillar': pillar}))
+
+    def test_disabled(self):
+        self.opts['minion_data_index'] = False
+        self.assertIsNone(salt.utils.minions.get_minion_data_index(self.opts))
+
+    def test_inverted_index(self):
+        index = salt.utils.minions.MinionDataIndex(self.opts)
+        self.assertEqual(index.search('grains', 'role:web'),
+                         set(['web1', 'web2']))
+        self.assertEqual(index.search('grains', 'os:debian'),
+                         set(['web1', 'db1']))
+        self.assertEqual(index.search('grains', 'role:mail'), set())
+
+    def test_scan_fallback(self):
+        index = salt.utils.minions.MinionDataIndex(self.opts)
+        self.assertEqual(index.search('grains', 'role:w*'),
+                         set(['web1', 'web2']))
+        self.assertEqual(index.search('grains', 'os:cent.*', regex_match=True),
+                         set(['web2']))
+        self.assertEqual(index.search('pillar', 'dc:ams'), set(['web1']))
+
+    def test_update_and_removal(self):
+        index = salt.utils.minions.MinionDataIndex(self.opts)
+        index.update('db1', {'role': 'web', 'os': 'Debian'}, {})
+        self.assertEqual(index.search('grains', 'role:db'), set())
+        self.assertIn('db1', index.search('grains', 'role:web'))
+        shutil.rmtree(os.path.join(self.cachedir, 'minions', 'web2'))
+        self.assertEqual(index.ids(), set(['web1', 'db1']))
+        self.assertEqual(index.search('grains', 'role:web'),
+                         set(['web1', 'db1']))
+
+    def test_refresh_interval(self):
+        self.opts['minion_data_index_refresh'] = 60
+        index = salt.utils.minions.MinionDataIndex(self.opts)
+        self.assertEqual(index.ids(), set(['web1', 'web2', 'db1']))
+        # Other processes' changes are only picked up every 60 seconds
+        shutil.rmtree(os.path.join(self.cachedir, 'minions', 'web2'))
+        with patch('os.listdir', side_effect=AssertionError):
+            self.assertEqual(index.ids(), set(['web1', 'web2', 'db1']))
+            index.update('db1', {'role': 'web'}, {})
+            self.assertEqual(index.search('grains', 'role:web'),
+                             set(['web1', 'web2', 'db1']))
+        index.refresh(force=True)
+        self.assertEqual(index.ids(), set(['web1', 'db1']))
+
+    def test_threads(self):
+        self.opts['minion_data_index_refresh'] = 60
+        index = salt.utils.minions.MinionDataIndex(self.opts)
+        errors = []
+
+        def update(minion_id):
+            try:
+                for ind in range(200):
+                    index.update(minion_id, {'role': 'web', 'n': ind}, {})
+                    index.search('grains', 'role:web')
+                    index.search('grains', 'role:w*')
+            except Exception as exc:
+                errors.append(exc)
+        threads = [threading.Thread(target=update, args=('minion{0}'.format(num),))
+                   for num in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(index.search('grains', 'role:web'),
+                         set(['web1', 'web2', 'minion0', 'minion1',
+                              'minion2', 'minion3']))
+
+    def test_compound_minions(self):
+        pki_dir = os.path.join(self.cachedir, 'pki')
+        os.makedirs(os.path.join(pki_dir, 'minions'))
+        for minion_id in ('web1', 'web2', 'db1'):
+            open(os.path.join(pki_dir, 'minions', minion_id), 'w').close()
+        self.opts.update({'pki_dir': pki_dir, 'transport': 'zeromq'})
+        ckminions = salt.utils.minions.CkMinions(self.opts)
+        check = lambda expr: sorted(ckminions.check_minions(expr, 'compound'))
+        self.assertEqual(check('G@role:web and not G@os:CentOS'), ['web1'])
+        self.assertEqual(check('db* or P@os:Cent.*'), ['db1', 'web2'])
+        self.assertEqual(check('not ( web* and I@dc:ams )'), ['db1', 'web2'])
+        self.assertEqual(check('web1 L@db1,web2 and'), [])
+
+
+class KeyIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.pki_dir = tempfile.mkdtemp()
+        self.opts = {'pki_dir': self.pki_dir,
+                     'serial': 'msgpack',
+                     'transport': 'zeromq',
+                     'key_index': True}
+        for name in ('web1', 'Web2', 'web10', 'db1'):
+            self._add('minions', name)
+        os.makedirs(os.path.join(self.pki_dir, 'minions', 'notakey'))
+        self._add('minions_pre', 'new')
+        self._age()
+        self.index = salt.utils.minions.KeyIndex(self.opts)
+
+    def tearDown(self):
+        shutil.rmtree(self.pki_dir)
+
+    def _add(self, status, name):
+        path = os.path.join(self.pki_dir, status)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        open(os.path.join(path, name), 'w').close()
+
+    def _age(self):
+        # Make the key directories look unchanged for a while
+        past = time.time() - 10
+        for status in ('minions', 'minions_pre'):
+            os.utime(os.path.join(self.pki_dir, status), (past, past))
+
+    def test_disabled(self):
+        self.assertIsNone(salt.utils.minions.get_key_index(
+            {'pki_dir': self.pki_dir}))
+
+    def test_keys(self):
+        self.assertEqual(self.index.keys('minions'),
+                         ['db1', 'web1', 'web10', 'Web2'])
+        self.assertEqual(self.index.keys('minions_pre'), ['new'])
+        self.assertEqual(self.index.keys('minions_rejected'), [])
+        self.assertTrue(os.path.isfile(self.index.path))
+
+        # The index is used until a key directory changes
+        with patch('os.listdir', side_effect=OSError):
+            self.assertEqual(self.index.keys('minions_pre'), ['new'])
+            other = salt.utils.minions.KeyIndex(self.opts)
+            self.assertEqual(other.keys('minions_pre'), ['new'])
+        self._add('minions_pre', 'newer')
+        self.assertEqual(self.index.keys('minions_pre'), ['new', 'newer'])
+
+        # Removing the index file is safe
+        os.remove(self.index.path)
+        other = salt.utils.minions.KeyIndex(self.opts)
+        self.assertEqual(other.keys('minions_pre'), ['new', 'newer'])
+
+    def test_match(self):
+        self.assertEqual(self.index.glob('minions', 'web*'), ['web1', 'web10'])
+        self.assertEqual(self.index.glob('minions', '*1'), ['db1', 'web1'])
+        self.assertEqual(self.index.pcre('minions', r'web\d+$'),
+                         ['web1', 'web10'])
+        self.assertEqual(self.index.pcre('minions', '^W'), ['Web2'])
+        self.assertEqual(self.index.pcre('minions', 'web?1'),
+                         ['web1', 'web10'])
+        self.assertEqual(self.index.pcre('minions', 'db|web1$'),
+                         ['db1', 'web1'])
+
+        ckminions = salt.utils.minions.CkMinions(self.opts)
+        self.assertEqual(sorted(ckminions.check_minions('web1*')),
+                         ['web1', 'web10'])
+        self.assertEqual(sorted(ckminions.check_minions('.*2', 'pcre')),
+                         ['Web2'])
+
+    def test_prefix(self):
+        self.assertEqual(salt.utils.minions._glob_prefix('web[12]*'), 'web')
+        self.assertEqual(salt.utils.minions._pcre_prefix('web.*'), 'web')
+        self.assertEqual(salt.utils.minions._pcre_prefix('webs?'), 'web')
+        self.assertEqual(salt.utils.minions._pcre_prefix('webs+'), 'webs')
+        self.assertEqual(salt.utils.minions._pcre_prefix('web|db'), '')
+        self.assertEqual(salt.utils.minions._pcre_prefix('(?i)web'), '')
+
+
+class CompoundTargetTestCase(TestCase):
+
+    def _tree(self, expr):
+        return salt.utils.minions.compile_compound(expr).tree
+
+    def test_parse(self):
+        glob = lambda val: ('match', None, val)
+        grain = lambda val: ('match', 'G', val)
+        self.assertEqual(self._tree('a or b and not G@os:Debian'),
+                         ('or', glob('a'),
+                          ('and', glob('b'), ('not', grain('os:Debian')))))
+        # A not following an operand implies an and
+        self.assertEqual(self._tree('( a or b ) not G@x:y@z'),
+                         ('and', ('or', glob('a'), glob('b')),
+                          ('not', grain('x:y@z'))))
+        self.assertEqual(self._tree('not not a'),
+                         ('not', ('not', glob('a'))))
+        for expr in ('a b', 'a and', '( a', 'a )', 'or a', '', 'a ( b )'):
+            self.assertIsNone(salt.utils.minions.compile_compound(expr))
+
+    def test_cache(self):
+        target = salt.utils.minions.compile_compound('web* and G@os:Debian')
+        self.assertIs(
+            salt.utils.minions.compile_compound('web* and G@os:Debian'),
+            target)
+        size = salt.utils.minions.COMPOUND_CACHE_SIZE
+        for ind in range(size):
+            salt.utils.minions.compile_compound('web{0}'.format(ind))
+        self.assertEqual(len(salt.utils.minions._COMPOUND_TARGETS), size)
+        self.assertIsNot(
+            salt.utils.minions.compile_compound('web* and G@os:Debian'),
+            target)
+
+    def test_match(self):
+        target = salt.utils.minions.compile_compound(
+            'web* or G@os:Debian and not I@dc:ams')
+        calls = []
+
+        def matcher(result):
+            def match(value):
+                calls.append(value)
+                return result
+            return match
+
+        self.assertTrue(target.match({None: matcher(True),
+                                      'G': matcher(True),
+                                      'I': matcher(True)}))
+        # Only the matches needed are evaluated
+        self.assertEqual(calls, ['web*'])
+        self.assertTrue(target.match({None: matcher(False),
+                                      'G': matcher(True),
+                                      'I': matcher(False)}))
+        self.assertFalse(target.match({None: matcher(True)}))
+
+    def test_minions(self):
+        target = salt.utils.minions.compile_compound(
+            'not L@a,b or ( web* and not web2 )')
+        matchers = {'L': lambda value: value.split(','),
+                    None: lambda value: {'web*': ['web1', 'web2'],
+                                         'web2': ['web2']}[value]}
+        self.assertEqual(
+            target.minions(matchers, ['a', 'b', 'web1', 'web2']),
+            set(['web1', 'web2']))
+        self.assertEqual(target.minions({}, ['a']), set())
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests([MinionDataIndexTestCase, KeyIndexTestCase,
+               CompoundTargetTestCase],
+              needs_daemon=False)
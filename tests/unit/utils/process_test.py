@@ -4,6 +4,7 @@
 import os
 import time
 import signal
+import threading
 import multiprocessing
 
 # Import Salt Testing libs
@@ -119,9 +120,40 @@ class TestThreadPool(TestCase):
         self.assertEqual(pool._job_queue.qsize(), 1)
 
 
+class TestIterThreaded(TestCase):
+
+    def test_order(self):
+        '''
+        Make sure the results come in order whichever function returns first
+        '''
+        funcs = [('slow', lambda: time.sleep(0.2) or 'slow'),
+                 ('fast', lambda: 'fast'),
+                 ('error', lambda: 1 / 0)]
+        results = list(salt.utils.process.iter_threaded(funcs, 3))
+        self.assertEqual([(key, ret) for key, ret, _, _ in results],
+                         [('slow', 'slow'), ('fast', 'fast'), ('error', None)])
+        self.assertGreaterEqual(results[0][3], 0.2)
+        self.assertIs(results[2][2][0], ZeroDivisionError)
+
+    def test_timeout(self):
+        '''
+        Make sure a function running for too long does not block the others
+        '''
+        release = threading.Event()
+        funcs = [('hung', release.wait),
+                 ('next', lambda: 'next')]
+        start = time.time()
+        results = list(salt.utils.process.iter_threaded(
+            funcs, 1, lambda key: 0.2 if key == 'hung' else 0))
+        release.set()
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(results, [('hung', None, None, None),
+                                   ('next', 'next', None, results[1][3])])
+
+
 if __name__ == '__main__':
     from integration import run_tests
     run_tests(
-        [TestProcessManager, TestThreadPool],
+        [TestProcessManager, TestThreadPool, TestIterThreaded],
         needs_daemon=False
     )
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.utils.zeromq_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test the publish topic helpers
+'''
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.utils.zeromq
+
+
+class PublishTopicsTestCase(TestCase):
+
+    def test_per_minion_topics(self):
+        topics = salt.utils.zeromq.publish_topics(['web1', 'web2'])
+        self.assertEqual(topics, [salt.utils.zeromq.id_topic('web1'),
+                                  salt.utils.zeromq.id_topic('web2')])
+
+    def test_small_targets_skip_groups(self):
+        topics = salt.utils.zeromq.publish_topics(['web1', 'web2'], 8)
+        self.assertEqual(topics, [salt.utils.zeromq.id_topic('web1'),
+                                  salt.utils.zeromq.id_topic('web2')])
+
+    def test_group_topics(self):
+        tgt = ['minion{0}'.format(idx) for idx in range(5000)]
+        topics = salt.utils.zeromq.publish_topics(tgt, 16)
+        self.assertTrue(len(topics) <= 16)
+        for minion_id in tgt:
+            self.assertIn(salt.utils.zeromq.group_topic(minion_id, 16), topics)
+
+    def test_group_topics_are_not_prefixes(self):
+        topics = ['group{0}|'.format(idx) for idx in range(32)]
+        for topic in topics:
+            self.assertEqual(
+                [other for other in topics if other.startswith(topic)],
+                [topic])
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(PublishTopicsTestCase, needs_daemon=False)